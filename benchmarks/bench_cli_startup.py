@@ -0,0 +1,128 @@
+"""Benchmark: import time of `tt` start-up.
+
+Runs ``python -X importtime -m tasktree.cli`` for a few commands on a
+generated recipe, each in a new interpreter (a cold start, as from the
+shell), and reports per command:
+
+- ``import ms``: time spent importing modules once the interpreter is up,
+  from ``-X importtime`` (the interpreter's own start-up is not counted)
+- ``wall ms``: time until the command exits, start-up included
+
+and the modules that cost ``tt --list`` the most. Which modules each command
+imports is checked by ``TestStartupImports`` in ``tests/unit/test_cli.py``;
+this script measures what they cost.
+
+Usage:
+    python benchmarks/bench_cli_startup.py [--runs 10] [--tasks 50]
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+_COMMANDS = {
+    "--version": ["--version"],
+    "--list": ["--list"],
+    "--show": ["--show", "task0"],
+    "run on host": ["task0"],
+}
+
+_PROFILED = "--list"
+
+
+def _recipe(tasks: int) -> str:
+    return "tasks:\n" + "".join(
+        f"  task{i}:\n"
+        f"    desc: Step {i}\n"
+        f"    args: [{{jobs: {{type: int, default: 4}}}}]\n"
+        + (f"    deps: [task{i - 1}]\n" if i else "")
+        + f"    cmd: echo {i}\n"
+        for i in range(tasks)
+    )
+
+
+def _parse_importtime(stderr: str) -> list[tuple[str, int, int, int]]:
+    """(module, depth, self us, cumulative us) per import, in import order."""
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        if not self_us.strip().isdigit():
+            continue  # The header line
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        imports.append((name.strip(), depth, int(self_us), int(cumulative_us)))
+    return imports
+
+
+def _import_ms(imports: list[tuple[str, int, int, int]]) -> float:
+    """Total import time of the top-level imports from the first of tasktree."""
+    names = [name for name, _, _, _ in imports]
+    first = names.index("tasktree")
+    return (
+        sum(cumulative for _, depth, _, cumulative in imports[first:] if depth == 0)
+        / 1000
+    )
+
+
+def _run(args: list[str], cwd: Path) -> tuple[float, float, list]:
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "tasktree.cli", *args],
+        cwd=cwd,
+        capture_output=True,
+        text=True,
+    )
+    wall = (time.perf_counter() - started) * 1000
+    if result.returncode != 0:
+        errors = "\n".join(
+            line
+            for line in result.stderr.splitlines()
+            if not line.startswith("import time:")
+        )
+        raise SystemExit(f"tt {' '.join(args)} failed:\n{errors}")
+    imports = _parse_importtime(result.stderr)
+    return _import_ms(imports), wall, imports
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10, help="cold starts per command")
+    parser.add_argument(
+        "--tasks", type=int, default=50, help="tasks in the generated recipe"
+    )
+    parser.add_argument(
+        "--top", type=int, default=10, help=f"slowest modules of tt {_PROFILED} to show"
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        project = Path(tmpdir)
+        (project / "tasktree.yaml").write_text(_recipe(args.tasks))
+
+        print(f"{'command':<12} {'import ms':>10} {'wall ms':>8} {'modules':>8}")
+        slowest = []
+        for label, command in _COMMANDS.items():
+            runs = [_run(command, project) for _ in range(args.runs)]
+            imports = runs[-1][2]
+            print(
+                f"{label:<12} {statistics.median(run[0] for run in runs):>10.1f} "
+                f"{statistics.median(run[1] for run in runs):>8.1f} "
+                f"{len(imports):>8}"
+            )
+            if label == _PROFILED:
+                slowest = sorted(imports, key=lambda item: item[2], reverse=True)
+
+    print(f"\nSlowest modules of tt {_PROFILED} (self time, last run):")
+    for name, _, self_us, _ in slowest[: args.top]:
+        print(f"  {self_us / 1000:>7.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
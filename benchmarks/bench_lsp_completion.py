@@ -0,0 +1,177 @@
+"""Benchmark: LSP completion latency on large recipes.
+
+Sends completion requests to the LSP server's handlers on generated recipes
+of several sizes, each request at a random task, cycling through the
+completion kinds (``{{ arg.``, ``{{ self.inputs.``, ``{{ self.outputs.``,
+``{{ var.`` and task names in ``deps``). Requests are timed in two
+situations:
+
+- ``edited``: after a keystroke elsewhere in the document (an incremental
+  didChange), so that the request is the first on a new document version
+- ``repeated``: a second request on the same version, as when the editor
+  asks again while the user moves the cursor
+
+Each generated task is 10 lines long. tree-sitter-yaml stops producing a
+valid tree somewhere past 32,000 lines, so sizes above about 3,200 tasks
+measure error recovery rather than completion.
+
+Usage:
+    python benchmarks/bench_lsp_completion.py [--tasks 100,1000,3000] [--requests 300]
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import time
+
+from lsprotocol.types import (
+    CompletionParams,
+    DidChangeTextDocumentParams,
+    DidOpenTextDocumentParams,
+    Position,
+    Range,
+    TextDocumentContentChangePartial,
+    TextDocumentIdentifier,
+    TextDocumentItem,
+    VersionedTextDocumentIdentifier,
+)
+
+from tasktree.lsp.server import create_server
+
+_URI = "file:///bench/tasktree.yaml"
+
+_HEADER = "variables:\n  step: 1\n  mode: release\ntasks:\n"
+
+_TASK = """\
+  task{index}:
+    desc: Step {index} of the build
+    args: [target, {{jobs: {{type: int, default: 4}}}}]
+    deps: [task{previous}]
+    inputs: [{{src: "src/part{index}/*.c"}}]
+    outputs: [{{obj: "build/part{index}.o"}}]
+    cmd: |
+      cc -j {{{{ arg.jobs }}}} -DSTEP={{{{ var.step }}}}
+        {{{{ self.inputs.src }}}}
+        -o {{{{ self.outputs.obj }}}}
+"""
+
+_TASK_LINES = _TASK.count("\n")
+
+# Completion kind → (line within the task, text the cursor follows)
+_KINDS = {
+    "arg": (7, "{{ arg."),
+    "self.inputs": (8, "{{ self.inputs."),
+    "self.outputs": (9, "{{ self.outputs."),
+    "var": (7, "{{ var."),
+    "deps": (3, "deps: ["),
+}
+
+
+def _recipe(tasks: int) -> str:
+    return _HEADER + "".join(
+        _TASK.format(index=i, previous=max(i - 1, 0)) for i in range(tasks)
+    )
+
+
+def _cursor(lines: list[str], task: int, kind: str) -> Position:
+    offset, marker = _KINDS[kind]
+    line = _HEADER.count("\n") + task * _TASK_LINES + offset
+    return Position(line, lines[line].index(marker) + len(marker))
+
+
+def _run(tasks: int, requests: int, rng: random.Random) -> dict[str, list[float]]:
+    text = _recipe(tasks)
+    lines = text.split("\n")
+    server = create_server()
+    server.handlers["textDocument/didOpen"](
+        DidOpenTextDocumentParams(
+            text_document=TextDocumentItem(
+                uri=_URI, language_id="yaml", version=1, text=text
+            )
+        )
+    )
+
+    def complete(position: Position) -> float:
+        started = time.perf_counter()
+        result = server.handlers["textDocument/completion"](
+            CompletionParams(
+                text_document=TextDocumentIdentifier(uri=_URI), position=position
+            )
+        )
+        elapsed = time.perf_counter() - started
+        assert result.items, f"no completions at {position}"
+        return elapsed
+
+    timings: dict[str, list[float]] = {"edited": [], "repeated": []}
+    kinds = list(_KINDS)
+    for version in range(2, requests + 2):
+        # A keystroke in another task's desc: "Step N" ↔ "Step N "
+        edited = _HEADER.count("\n") + rng.randrange(tasks) * _TASK_LINES + 1
+        end = len(lines[edited])
+        if lines[edited].endswith(" "):
+            change_range, new_text = (
+                Range(Position(edited, end - 1), Position(edited, end)),
+                "",
+            )
+            lines[edited] = lines[edited][:-1]
+        else:
+            change_range, new_text = (
+                Range(Position(edited, end), Position(edited, end)),
+                " ",
+            )
+            lines[edited] += " "
+        server.handlers["textDocument/didChange"](
+            DidChangeTextDocumentParams(
+                text_document=VersionedTextDocumentIdentifier(
+                    uri=_URI, version=version
+                ),
+                content_changes=[
+                    TextDocumentContentChangePartial(range=change_range, text=new_text)
+                ],
+            )
+        )
+
+        kind = kinds[version % len(kinds)]
+        timings["edited"].append(complete(_cursor(lines, rng.randrange(tasks), kind)))
+        timings["repeated"].append(complete(_cursor(lines, rng.randrange(tasks), kind)))
+    return timings
+
+
+def _percentile(timings: list[float], fraction: float) -> float:
+    ordered = sorted(timings)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--tasks",
+        default="100,1000,3000",
+        help="comma-separated recipe sizes, in tasks",
+    )
+    parser.add_argument(
+        "--requests", type=int, default=300, help="requests per recipe size"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    args = parser.parse_args()
+
+    print(
+        f"{'tasks':>6} {'lines':>7} {'request':<10} "
+        f"{'median ms':>10} {'p99 ms':>8} {'max ms':>8}"
+    )
+    for tasks in (int(size) for size in args.tasks.split(",")):
+        timings = _run(tasks, args.requests, random.Random(args.seed))
+        lines = _HEADER.count("\n") + tasks * _TASK_LINES
+        for situation, values in timings.items():
+            print(
+                f"{tasks:>6} {lines:>7} {situation:<10} "
+                f"{statistics.median(values) * 1000:>10.2f} "
+                f"{_percentile(values, 0.99) * 1000:>8.2f} "
+                f"{max(values) * 1000:>8.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""Benchmark: LSP per-keystroke latency, full vs incremental document sync.
+
+Replays an edit session against the LSP server's handlers: each keystroke is
+a textDocument/didChange notification followed by a completion request at
+the cursor, timed together. The session runs twice on a generated recipe of
+about LINES lines:
+
+- ``full``: every change carries the whole document (TextDocumentSyncKind.Full),
+  which is parsed from scratch
+- ``incremental``: every change carries only the edited range, applied to
+  the stored text and tree (Tree.edit), then re-parsed reusing the old tree
+
+By default the session types a new task near the middle of the recipe,
+character by character. ``--session`` replays a recorded one instead: a JSON
+list of keystrokes, each ``{"changes": [...], "cursor": [line, character]}``
+with ``changes`` as an editor sends them in didChange (``range`` and
+``text``).
+
+Usage:
+    python benchmarks/bench_lsp_incremental.py [--lines 5000] [--session FILE]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import time
+from pathlib import Path
+
+from lsprotocol.types import (
+    CompletionParams,
+    DidChangeTextDocumentParams,
+    DidOpenTextDocumentParams,
+    Position,
+    Range,
+    TextDocumentContentChangePartial,
+    TextDocumentContentChangeWholeDocument,
+    TextDocumentIdentifier,
+    TextDocumentItem,
+    VersionedTextDocumentIdentifier,
+)
+
+from tasktree.lsp.server import create_server
+from tasktree.lsp.ts_context import apply_edit
+
+_URI = "file:///bench/tasktree.yaml"
+
+_TASK = """\
+  task{index}:
+    desc: Step {index} of the build
+    deps: [task{previous}]
+    inputs: ["src/part{index}/**/*.c"]
+    outputs: ["build/part{index}.o"]
+    cmd: |
+      mkdir -p build
+      cc -c src/part{index}/*.c -o build/part{index}.o -DSTEP={{{{ var.step }}}}
+"""
+
+_TYPED = """\
+  typed:
+    deps: [task1, task2]
+    cmd: echo {{ var.step }} {{ tt.project_root }}
+"""
+
+
+def _recipe(lines: int) -> str:
+    tasks = max(1, lines // _TASK.count("\n"))
+    return "variables:\n  step: 1\ntasks:\n" + "".join(
+        _TASK.format(index=i, previous=max(i - 1, 0)) for i in range(tasks)
+    )
+
+
+def _typing_session(text: str) -> list[dict]:
+    """Keystrokes typing _TYPED as a new task in the middle of the recipe."""
+    lines = text.split("\n")
+    line = next(
+        i for i in range(len(lines) // 2, len(lines)) if lines[i].startswith("  task")
+    )
+    session = []
+    character = 0
+    for char in _TYPED:
+        session.append(
+            {
+                "changes": [
+                    {
+                        "range": {
+                            "start": {"line": line, "character": character},
+                            "end": {"line": line, "character": character},
+                        },
+                        "text": char,
+                    }
+                ],
+                "cursor": [line, character + 1] if char != "\n" else [line + 1, 0],
+            }
+        )
+        if char == "\n":
+            line += 1
+            character = 0
+        else:
+            character += 1
+    return session
+
+
+def _replay(text: str, session: list[dict], incremental: bool) -> list[float]:
+    server = create_server()
+    server.handlers["textDocument/didOpen"](
+        DidOpenTextDocumentParams(
+            text_document=TextDocumentItem(
+                uri=_URI, language_id="yaml", version=1, text=text
+            )
+        )
+    )
+    timings = []
+    for version, keystroke in enumerate(session, start=2):
+        changes = []
+        for change in keystroke["changes"]:
+            start, end = change["range"]["start"], change["range"]["end"]
+            if incremental:
+                changes.append(
+                    TextDocumentContentChangePartial(
+                        range=Range(
+                            start=Position(start["line"], start["character"]),
+                            end=Position(end["line"], end["character"]),
+                        ),
+                        text=change["text"],
+                    )
+                )
+            else:
+                # The editor's side of full sync: it sends the whole document
+                text = apply_edit(
+                    text,
+                    None,
+                    (start["line"], start["character"]),
+                    (end["line"], end["character"]),
+                    change["text"],
+                )
+        if not incremental:
+            changes = [TextDocumentContentChangeWholeDocument(text=text)]
+
+        line, character = keystroke["cursor"]
+        started = time.perf_counter()
+        server.handlers["textDocument/didChange"](
+            DidChangeTextDocumentParams(
+                text_document=VersionedTextDocumentIdentifier(
+                    uri=_URI, version=version
+                ),
+                content_changes=changes,
+            )
+        )
+        server.handlers["textDocument/completion"](
+            CompletionParams(
+                text_document=TextDocumentIdentifier(uri=_URI),
+                position=Position(line, character),
+            )
+        )
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=5000, help="recipe size")
+    parser.add_argument(
+        "--session", type=Path, help="recorded session to replay (JSON)"
+    )
+    args = parser.parse_args()
+
+    text = _recipe(args.lines)
+    if args.session:
+        session = json.loads(args.session.read_text())
+    else:
+        session = _typing_session(text)
+
+    print(f"{text.count(chr(10))} lines, {len(session)} keystrokes")
+    print(f"{'sync':<12} {'median ms':>10} {'p95 ms':>8} {'max ms':>8}")
+    for mode in ("full", "incremental"):
+        timings = sorted(_replay(text, session, mode == "incremental"))
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        print(
+            f"{mode:<12} {statistics.median(timings) * 1000:>10.2f} "
+            f"{p95 * 1000:>8.2f} {timings[-1] * 1000:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
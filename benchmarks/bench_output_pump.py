@@ -0,0 +1,116 @@
+"""Benchmark: streaming task output through the output pump vs a thread per pipe.
+
+Runs N producer processes at once, each writing SIZE bytes of short lines
+(compiler-style output) to stdout, and streams every pipe to /dev/null:
+
+- ``threads``: one thread per pipe, line-buffered text reads and a flush per
+  line (``stream_output``, the pre-pump design, still used on Windows)
+- ``pump``: every pipe on the shared selector-based ``OutputPump``
+
+Usage:
+    python benchmarks/bench_output_pump.py [--size-mb 1024] [--producers 1,8]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import time
+from threading import Thread
+
+from tasktree.output_pump import OutputPump, StreamSink
+from tasktree.process_runner import stream_output
+
+# Writes `size` bytes of 80-byte lines to stdout
+_PRODUCER = """
+import sys
+size = int(sys.argv[1])
+line = b"x" * 79 + b"\\n"
+block = line * 8192
+out = sys.stdout.buffer
+for _ in range(size // len(block)):
+    out.write(block)
+out.write(line * ((size % len(block)) // len(line)))
+"""
+
+
+def _spawn(size: int, text: bool) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-c", _PRODUCER, str(size)],
+        stdout=subprocess.PIPE,
+        text=text,
+        bufsize=1 if text else 0,
+    )
+
+
+def _run_threads(producers: int, size: int, devnull) -> None:
+    processes = [_spawn(size, text=True) for _ in range(producers)]
+    threads = [
+        Thread(target=stream_output, args=(p.stdout, devnull), daemon=True)
+        for p in processes
+    ]
+    for thread in threads:
+        thread.start()
+    for process, thread in zip(processes, threads):
+        process.wait()
+        thread.join()
+        process.stdout.close()
+
+
+def _run_pump(producers: int, size: int, devnull) -> None:
+    pump = OutputPump()
+    processes = [_spawn(size, text=False) for _ in range(producers)]
+    streams = []
+    for process in processes:
+        OutputPump.enlarge_pipe(process.stdout.fileno())
+        streams.append(pump.add(process.stdout, StreamSink(devnull)))
+    for process, stream in zip(processes, streams):
+        process.wait()
+        pump.finish(stream, timeout=None)
+        process.stdout.close()
+
+
+def _measure(fn, producers: int, size: int) -> tuple[float, float]:
+    """Wall-clock seconds and this process's CPU seconds for one run."""
+    with open(os.devnull, "w") as devnull:
+        usage_before = resource.getrusage(resource.RUSAGE_SELF)
+        start = time.perf_counter()
+        fn(producers, size, devnull)
+        elapsed = time.perf_counter() - start
+        usage_after = resource.getrusage(resource.RUSAGE_SELF)
+    cpu = (usage_after.ru_utime - usage_before.ru_utime) + (
+        usage_after.ru_stime - usage_before.ru_stime
+    )
+    return elapsed, cpu
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--size-mb", type=int, default=1024, help="total output across all producers"
+    )
+    parser.add_argument(
+        "--producers", default="1,8", help="comma-separated producer counts to try"
+    )
+    args = parser.parse_args()
+
+    if not OutputPump.supported():
+        sys.exit("The output pump is not used on this platform")
+
+    total = args.size_mb * 1024 * 1024
+    print(f"{'design':<8} {'producers':>9} {'wall s':>8} {'MB/s':>8} {'tt CPU s':>9}")
+    for producers in (int(n) for n in args.producers.split(",")):
+        size = total // producers
+        for name, fn in (("threads", _run_threads), ("pump", _run_pump)):
+            elapsed, cpu = _measure(fn, producers, size)
+            print(
+                f"{name:<8} {producers:>9} {elapsed:>8.2f} "
+                f"{args.size_mb / elapsed:>8.0f} {cpu:>9.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
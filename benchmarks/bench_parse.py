@@ -0,0 +1,142 @@
+"""Benchmark: recipe parse time at 100, 1k and 10k tasks.
+
+Generates a recipe of N tasks, a tenth of them in tasktree.yaml and the
+rest spread over imported files, and reports the median of a few runs of:
+
+- ``load pure``: loading every file with PyYAML's pure-Python SafeLoader
+- ``load C``: loading every file with libyaml (yaml_loader.load_yaml)
+- ``all pure``: parse_recipe of every task with the pure-Python loader
+- ``all``: parse_recipe of every task, as ``tt --list`` parses it
+- ``run``: parse_recipe for running task0, which reaches three imported
+  tasks: the imported files' other task definitions are skipped over
+
+Usage:
+    python benchmarks/bench_parse.py [--sizes 100,1000,10000] [--runs 3] [--imports 3]
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import yaml
+
+from tasktree.parser import parse_recipe
+from tasktree.yaml_loader import load_yaml
+
+
+def _task(i: int, deps: list[str]) -> str:
+    return (
+        f"  task{i}:\n"
+        f"    desc: Build part {i}\n"
+        f"    deps: [{', '.join(deps)}]\n"
+        f"    inputs: ['src/part{i}/**/*.py', pyproject.toml]\n"
+        f"    outputs: [build/part{i}.out]\n"
+        f"    args:\n"
+        f"      - mode: {{ choices: [debug, release], default: debug }}\n"
+        f"      - jobs: {{ type: int, default: 4 }}\n"
+        f"    cmd: |\n"
+        f"      echo building {i} in {{{{ arg.mode }}}}\n"
+        f"      make -j{{{{ arg.jobs }}}} part{i}\n"
+    )
+
+
+def _write_recipe(project: Path, tasks: int, imports: int) -> list[Path]:
+    """Write the recipe and its imports; returns every file written."""
+    root_tasks = max(tasks // 10, 1)
+    per_import = (tasks - root_tasks) // imports
+    files = []
+    for k in range(imports):
+        path = project / f"lib{k}.tasks"
+        path.write_text(
+            "tasks:\n"
+            + "".join(
+                _task(i, [f"task{i - 1}"] if i else []) for i in range(per_import)
+            )
+        )
+        files.append(path)
+
+    # task0 reaches lib0.task2, which reaches lib0.task1 and lib0.task0
+    root = project / "tasktree.yaml"
+    root.write_text(
+        "imports:\n"
+        + "".join(f"  - file: lib{k}.tasks\n    as: lib{k}\n" for k in range(imports))
+        + "tasks:\n"
+        + "".join(
+            _task(i, ["lib0.task2"] if i == 0 else [f"task{i - 1}"])
+            for i in range(root_tasks)
+        )
+    )
+    return [root, *files]
+
+
+def _pure_loader(path: Path):
+    with open(path, encoding="utf-8") as f:
+        return yaml.load(f, Loader=yaml.SafeLoader)
+
+
+def _median_ms(fn, runs: int) -> float:
+    times = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - started) * 1000)
+    return statistics.median(times)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes",
+        default="100,1000,10000",
+        help="comma-separated task counts of the generated recipes",
+    )
+    parser.add_argument("--runs", type=int, default=3, help="runs per measurement")
+    parser.add_argument(
+        "--imports", type=int, default=3, help="imported files per recipe"
+    )
+    args = parser.parse_args()
+
+    if not yaml.__with_libyaml__:
+        print("note: PyYAML has no libyaml here, so 'C' rows use the pure loader")
+
+    print(
+        f"{'tasks':>6} {'load pure':>10} {'load C':>8} "
+        f"{'all pure':>9} {'all':>8} {'run':>8}   (ms)"
+    )
+    for size in (int(s) for s in args.sizes.split(",")):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            project = Path(tmpdir)
+            files = _write_recipe(project, size, args.imports)
+            recipe_path = files[0]
+
+            def load_all(load):
+                for path in files:
+                    load(path)
+
+            load_pure = _median_ms(lambda: load_all(_pure_loader), args.runs)
+            load_c = _median_ms(
+                lambda: load_all(lambda p: load_yaml(p.read_text(encoding="utf-8"))),
+                args.runs,
+            )
+            all_pure = _median_ms(
+                lambda: parse_recipe(recipe_path, loader=_pure_loader), args.runs
+            )
+            all_tasks = _median_ms(lambda: parse_recipe(recipe_path), args.runs)
+            run = _median_ms(
+                lambda: parse_recipe(recipe_path, root_task="task0"), args.runs
+            )
+
+        print(
+            f"{size:>6} {load_pure:>10.1f} {load_c:>8.1f} "
+            f"{all_pure:>9.1f} {all_tasks:>8.1f} {run:>8.1f}"
+        )
+    sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
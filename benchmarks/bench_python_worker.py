@@ -0,0 +1,90 @@
+"""Benchmark: a recipe of many small Python tasks, with and without a persistent interpreter.
+
+Generates a recipe of TASKS tasks run by a ``python3`` interpreter, each
+importing a few standard modules and writing a small JSON file, plus one task
+depending on all of them, and times ``tt all`` in a fresh process:
+
+- ``fresh``: every task starts its own interpreter (the default)
+- ``persistent``: ``persistent: true``, with the modules preloaded, so every
+  task is a fork of one warm worker
+
+Usage:
+    python benchmarks/bench_python_worker.py [--tasks 200] [--jobs 1] [--repeat 3]
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+_MODULES = ["json", "pathlib", "hashlib", "argparse"]
+
+_TASK = """\
+  t{index}:
+    interpreter: py
+    cmd: |
+      import argparse, hashlib, json, pathlib
+      data = {{"task": {index}, "digest": hashlib.sha256(b"{index}").hexdigest()}}
+      pathlib.Path("out/t{index}.json").write_text(json.dumps(data))
+"""
+
+
+def _write_recipe(directory: Path, tasks: int, persistent: bool) -> None:
+    lines = ["interpreters:", "  py:", "    cmd: python3"]
+    if persistent:
+        lines += ["    persistent: true", f"    preload: [{', '.join(_MODULES)}]"]
+    lines += [
+        "tasks:",
+        "  all:",
+        "    deps: [" + ", ".join(f"t{i}" for i in range(tasks)) + "]",
+    ]
+    lines += ["    cmd: echo done"]
+    recipe = (
+        "\n".join(lines) + "\n" + "".join(_TASK.format(index=i) for i in range(tasks))
+    )
+    (directory / "tasktree.yaml").write_text(recipe)
+    (directory / "out").mkdir(exist_ok=True)
+
+
+def _time_run(directory: Path, jobs: int) -> float:
+    start = time.perf_counter()
+    subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "from tasktree.cli import app; app()",
+            "-j",
+            str(jobs),
+            "all",
+        ],
+        cwd=directory,
+        check=True,
+        stdout=subprocess.DEVNULL,
+    )
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=200, help="number of small tasks")
+    parser.add_argument("--jobs", type=int, default=1, help="tasks to run at once")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per design")
+    args = parser.parse_args()
+
+    print(f"{'design':<12} {'wall s':>8} {'ms/task':>8}")
+    for design in ("fresh", "persistent"):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            directory = Path(tmpdir)
+            _write_recipe(directory, args.tasks, design == "persistent")
+            timings = [_time_run(directory, args.jobs) for _ in range(args.repeat)]
+        elapsed = statistics.median(timings)
+        print(f"{design:<12} {elapsed:>8.2f} {elapsed / args.tasks * 1000:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Benchmark: container freshness probing, per-file stat loop vs a single find.
+
+Generates a tree of FILES source files and probes it the way RunnerProbe
+probes a container, running the probe script with the local ``sh`` in place of
+``docker run`` (so the figures leave out container start-up):
+
+- ``stat-loop``: the previous script, which expands each pattern with sh
+  globbing and runs ``stat -c %Y`` once per matched file
+- ``find``: RunnerProbe's script, one ``find -printf`` listing streamed back
+  and matched against the patterns (``**`` included) on the host
+- ``find-busybox``: the same script on a ``find`` without ``-printf``, so it
+  falls back to ``find -exec stat -c %Y {} +``
+
+Usage:
+    python benchmarks/bench_runner_probe.py [--files 20000] [--repeat 3] [--skip-stat-loop]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+from collections.abc import Iterator
+from pathlib import Path
+
+from tasktree.freshness import RunnerProbe
+
+_FILES_PER_DIR = 500
+
+# The probe script RunnerProbe used before: sh globbing (no "**") and one
+# stat process per file
+_STAT_LOOP_SCRIPT = (
+    'cd "$1" 2>/dev/null || exit 0\n'
+    "shift\n"
+    'for pat in "$@"; do\n'
+    "  for f in $pat; do\n"
+    '    [ -f "$f" ] && printf \'%s\\t%s\\t%s\\n\' "$pat" "$f" "$(stat -c %Y "$f")"\n'
+    "  done\n"
+    "done\n"
+)
+
+
+def _make_tree(base: Path, files: int) -> None:
+    for index in range(files):
+        directory = base / "src" / f"d{index // _FILES_PER_DIR}"
+        if index % _FILES_PER_DIR == 0:
+            directory.mkdir(parents=True)
+        (directory / f"f{index}.c").write_text("x")
+
+
+def _stream(argv: list[str], env: dict[str, str] | None = None) -> Iterator[str]:
+    with subprocess.Popen(argv, stdout=subprocess.PIPE, text=True, env=env) as process:
+        for line in process.stdout:
+            yield line.rstrip("\n")
+
+
+def _stat_loop(base: Path) -> int:
+    argv = ["sh", "-c", _STAT_LOOP_SCRIPT, "sh", str(base), "src/*/*.c"]
+    return sum(1 for _ in _stream(argv))
+
+
+def _find(base: Path, env: dict[str, str] | None = None) -> int:
+    probe = RunnerProbe(str(base), lambda argv: _stream(argv, env))
+    return len(probe.stat_patterns(["src/**/*.c"])["src/**/*.c"])
+
+
+def _busybox_env(shim_dir: Path) -> dict[str, str]:
+    """An environment whose find rejects -printf, like busybox's."""
+    shim = shim_dir / "find"
+    shim.write_text(
+        "#!/bin/sh\n"
+        'for arg in "$@"; do [ "$arg" = -printf ] && exit 1; done\n'
+        f'exec {shutil.which("find")} "$@"\n'
+    )
+    shim.chmod(0o755)
+    return dict(os.environ, PATH=f"{shim_dir}{os.pathsep}{os.environ['PATH']}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=20000, help="files in the tree")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per design")
+    parser.add_argument(
+        "--skip-stat-loop",
+        action="store_true",
+        help="leave out the previous design (slow on large trees)",
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        base = Path(tmpdir) / "tree"
+        _make_tree(base, args.files)
+        shim_dir = Path(tmpdir) / "shim"
+        shim_dir.mkdir()
+        busybox_env = _busybox_env(shim_dir)
+
+        designs = [
+            ("find", lambda: _find(base)),
+            ("find-busybox", lambda: _find(base, busybox_env)),
+        ]
+        if not args.skip_stat_loop:
+            designs.insert(0, ("stat-loop", lambda: _stat_loop(base)))
+
+        print(f"{'design':<14} {'files':>8} {'median s':>9}")
+        for design, run in designs:
+            timings = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                found = run()
+                timings.append(time.perf_counter() - start)
+            print(f"{design:<14} {found:>8} {statistics.median(timings):>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Benchmark: latency of running a task's script through its interpreter.
+
+Each iteration writes a one-line script, runs it with the interpreter and
+cleans up, the way a task (or an eval variable) is run:
+
+- ``tempfile``: a new file in the default temporary directory, unlinked
+  afterwards (the previous design)
+- ``rundir``: a file in the per-run script directory, on a tmpfs where there
+  is one
+- ``memfd``: an in-memory script passed as /proc/self/fd/N (Linux only)
+
+Usage:
+    python benchmarks/bench_script_spawn.py [--iterations 200] [--interpreters bash,sh,python3]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+from collections.abc import Callable
+
+from tasktree.interpreter import Interpreter
+from tasktree.temp_script import memory_script, memory_script_path, script_dir
+
+_SCRIPTS = {"python3": "x = 1"}
+_DEFAULT_SCRIPT = "true"
+
+
+def _run_from_file(
+    interpreter: Interpreter, script: str, directory: str | None
+) -> None:
+    with tempfile.NamedTemporaryFile(
+        mode="w", dir=directory, delete=False, encoding="utf-8"
+    ) as script_file:
+        script_file.write(script)
+    try:
+        subprocess.run(interpreter.invocation + [script_file.name], check=True)
+    finally:
+        os.unlink(script_file.name)
+
+
+def _run_tempfile(interpreter: Interpreter, script: str) -> None:
+    _run_from_file(interpreter, script, None)
+
+
+def _run_rundir(interpreter: Interpreter, script: str) -> None:
+    _run_from_file(interpreter, script, str(script_dir()))
+
+
+def _run_memfd(interpreter: Interpreter, script: str) -> None:
+    fd = memory_script(script, interpreter)
+    try:
+        subprocess.run(
+            interpreter.invocation + [str(memory_script_path(fd))],
+            check=True,
+            pass_fds=(fd,),
+        )
+    finally:
+        os.close(fd)
+
+
+def _measure(
+    run: Callable[[Interpreter, str], None], interpreter: Interpreter, iterations: int
+) -> list[float]:
+    script = _SCRIPTS.get(interpreter.cmd, _DEFAULT_SCRIPT)
+    run(interpreter, script)  # Warm up the page cache
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        run(interpreter, script)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200, help="runs per design")
+    parser.add_argument(
+        "--interpreters",
+        default="bash,sh,python3",
+        help="comma-separated interpreters to try",
+    )
+    args = parser.parse_args()
+
+    designs = [("tempfile", _run_tempfile), ("rundir", _run_rundir)]
+    if hasattr(os, "memfd_create"):
+        designs.append(("memfd", _run_memfd))
+
+    print(f"script directory: {script_dir()}")
+    print(f"{'interpreter':<12} {'design':<9} {'median ms':>10} {'p95 ms':>8}")
+    for name in args.interpreters.split(","):
+        if shutil.which(name) is None:
+            print(f"{name:<12} not installed")
+            continue
+        interpreter = Interpreter(cmd=name)
+        for design, run in designs:
+            timings = sorted(_measure(run, interpreter, args.iterations))
+            p95 = timings[int(len(timings) * 0.95) - 1]
+            print(
+                f"{name:<12} {design:<9} "
+                f"{statistics.median(timings) * 1000:>10.2f} {p95 * 1000:>8.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
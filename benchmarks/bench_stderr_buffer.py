@@ -0,0 +1,107 @@
+"""Benchmark: peak memory of holding a failing task's stderr for on-err output.
+
+A producer writes SIZE bytes of warning lines to stderr and exits non-zero,
+the worst case for ``--task-output on-err``, which must hold stderr until it
+knows the task failed. Each design runs in a fresh interpreter, so its peak
+RSS is its own:
+
+- ``memory``: all of stderr collected in memory, then written out (the
+  previous design)
+- ``spill``: ``StderrOnlyOnFailureProcessRunner`` with its spill-to-disk buffer
+
+The replayed stderr goes to /dev/null.
+
+Usage:
+    python benchmarks/bench_stderr_buffer.py [--size-mb 2048] [--designs memory,spill]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+# Writes `size` bytes of 80-byte lines to stderr, then fails
+_PRODUCER = """
+import sys
+size = int(sys.argv[1])
+line = b"w" * 79 + b"\\n"
+block = line * 8192
+err = sys.stderr.buffer
+for _ in range(size // len(block)):
+    err.write(block)
+sys.exit(1)
+"""
+
+
+def _worker(design: str, size: int) -> None:
+    from rich.console import Console
+
+    from tasktree.console_logger import ConsoleLogger
+    from tasktree.output_pump import BufferSink, StreamSink
+    from tasktree.process_runner import (
+        StderrOnlyOnFailureProcessRunner,
+        _pump_and_wait,
+    )
+
+    producer = [sys.executable, "-c", _PRODUCER, str(size)]
+    # The spill design keeps the full stderr of a truncated replay; don't leave it behind
+    with tempfile.TemporaryDirectory() as spill_dir, open(os.devnull, "w") as devnull:
+        tempfile.tempdir = spill_dir
+        logger = ConsoleLogger(Console(file=devnull))
+        sys.stderr = devnull
+        start = time.perf_counter()
+        if design == "memory":
+            process = subprocess.Popen(
+                producer, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, bufsize=0
+            )
+            buffer = BufferSink()
+            returncode = _pump_and_wait(process, [(process.stderr, buffer)], None, logger)
+            StreamSink(devnull).write(buffer.getvalue())
+        else:
+            runner = StderrOnlyOnFailureProcessRunner(logger)
+            returncode = runner.run(producer).returncode
+        elapsed = time.perf_counter() - start
+    sys.stderr = sys.__stderr__
+    assert returncode == 1, returncode
+
+    # ru_maxrss is in KiB on Linux, bytes on macOS
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    scale = 1 if sys.platform == "darwin" else 1024
+    print(f"{elapsed} {max_rss * scale}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mb", type=int, default=2048, help="stderr to produce")
+    parser.add_argument(
+        "--designs", default="memory,spill", help="comma-separated designs to run"
+    )
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    size = args.size_mb * 1024 * 1024
+    if args.worker:
+        _worker(args.worker, size)
+        return
+
+    print(f"{'design':<8} {'wall s':>8} {'peak RSS MB':>12}")
+    for design in args.designs.split(","):
+        result = subprocess.run(
+            [sys.executable, __file__, "--worker", design, "--size-mb", str(args.size_mb)],
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode != 0:
+            print(f"{design:<8} failed: {result.stderr.strip().splitlines()[-1:]}")
+            continue
+        elapsed, max_rss = result.stdout.split()
+        print(f"{design:<8} {float(elapsed):>8.2f} {int(max_rss) / 2**20:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,48 +1,59 @@
 """
 Task Tree - A task automation tool with intelligent incremental execution.
+
+The names below are imported from their modules on first use, so that
+importing a submodule (as ``tt`` does on every start-up) does not import the
+executor, the Docker support and the parser with it.
 """
 
-try:
-    from importlib.metadata import version
-
-    __version__ = version("tasktree")
-except Exception:
-    __version__ = "0.0.0.dev0+local"  # Fallback for development
-
-from tasktree.executor import Executor, ExecutionError, TaskStatus
-from tasktree.graph import (
-    CycleError,
-    TaskNotFoundError,
-    build_dependency_tree,
-    get_implicit_inputs,
-    resolve_dependency_output_references,
-    resolve_execution_order,
-    resolve_self_references,
-)
-from tasktree.hasher import hash_args, hash_task, make_cache_key
-from tasktree.parser import Recipe, Task, find_recipe_file, parse_arg_spec, parse_recipe
-from tasktree.state import StateManager, TaskState
-
-__all__ = [
-    "__version__",
-    "Executor",
-    "ExecutionError",
-    "TaskStatus",
-    "CycleError",
-    "TaskNotFoundError",
-    "build_dependency_tree",
-    "get_implicit_inputs",
-    "resolve_dependency_output_references",
-    "resolve_execution_order",
-    "resolve_self_references",
-    "hash_args",
-    "hash_task",
-    "make_cache_key",
-    "Recipe",
-    "Task",
-    "find_recipe_file",
-    "parse_arg_spec",
-    "parse_recipe",
-    "StateManager",
-    "TaskState",
-]
+import importlib
+
+# Public name → module defining it
+_EXPORTS = {
+    "Executor": "tasktree.executor",
+    "ExecutionError": "tasktree.executor",
+    "TaskStatus": "tasktree.executor",
+    "CycleError": "tasktree.graph",
+    "TaskNotFoundError": "tasktree.graph",
+    "build_dependency_tree": "tasktree.graph",
+    "get_implicit_inputs": "tasktree.graph",
+    "resolve_dependency_output_references": "tasktree.graph",
+    "resolve_execution_order": "tasktree.graph",
+    "resolve_self_references": "tasktree.graph",
+    "hash_args": "tasktree.hasher",
+    "hash_task": "tasktree.hasher",
+    "make_cache_key": "tasktree.hasher",
+    "Recipe": "tasktree.parser",
+    "Task": "tasktree.parser",
+    "find_recipe_file": "tasktree.discovery",
+    "parse_arg_spec": "tasktree.parser",
+    "parse_recipe": "tasktree.parser",
+    "StateManager": "tasktree.state",
+    "TaskState": "tasktree.state",
+}
+
+__all__ = ["__version__", *_EXPORTS]
+
+
+def _get_version() -> str:
+    try:
+        from importlib.metadata import version
+
+        return version("tasktree")
+    except Exception:
+        return "0.0.0.dev0+local"  # Fallback for development
+
+
+def __getattr__(name: str):
+    if name == "__version__":
+        value = _get_version()
+    elif name in _EXPORTS:
+        value = getattr(importlib.import_module(_EXPORTS[name]), name)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
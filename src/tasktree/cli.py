@@ -13,17 +13,16 @@ import click
 import typer
 from rich.console import Console
 
-from tasktree import __version__
-from tasktree.cli_commands.clean_state import clean_state
-from tasktree.cli_commands.execute_dynamic_task import execute_dynamic_task
-from tasktree.cli_commands.init_recipe import init_recipe
-from tasktree.cli_commands.list_tasks import list_tasks
-from tasktree.cli_commands.show_task import show_task
-from tasktree.cli_commands.show_tree import show_tree
 from tasktree.console_logger import ConsoleLogger
 from tasktree.logging import LogLevel
-from tasktree.parser import get_recipe
-from tasktree.process_runner import TaskOutputTypes
+
+# Every command imports its own modules when it runs, so that `tt --version`
+# and `tt --list` do not import the executor, the Docker support or the
+# output multiplexer.  The --output-mode and --task-output choices are
+# spelled out here for the same reason: they are OutputMode and
+# TaskOutputTypes' values (test_cli.py checks that they stay in step).
+_OUTPUT_MODES = ("interleaved", "grouped", "tail")
+_TASK_OUTPUT_TYPES = ("all", "none", "out", "err", "on-err")
 
 app = typer.Typer(
     help="Task Tree - A task automation tool with intelligent incremental execution",
@@ -39,10 +38,31 @@ def _version_callback(value: bool):
     Show version and exit.
     """
     if value:
+        from tasktree import __version__
+
         console.print(f"task-tree version {__version__}")
         raise typer.Exit()
 
 
+def _jobs_callback(value: str):
+    """
+    Parse --jobs into a job count or an adaptive range (AutoJobs).
+
+    (Typer resolves callbacks' type hints when the CLI is built, so the return
+    type is not annotated: that would import the scheduler on every start-up.)
+    """
+    # A plain job count, the default included, needs no scheduler import
+    if value.strip().isdigit() and int(value) >= 1:
+        return int(value)
+
+    from tasktree.scheduler import parse_jobs
+
+    try:
+        return parse_jobs(value)
+    except ValueError as e:
+        raise typer.BadParameter(str(e))
+
+
 @app.callback(invoke_without_command=True)
 def main(
     ctx: typer.Context,
@@ -63,6 +83,9 @@ def main(
     tree: Optional[str] = typer.Option(
         None, "--tree", "-t", help="Show dependency tree"
     ),
+    logs: Optional[str] = typer.Option(
+        None, "--logs", help="Show a task's full output from the last parallel run"
+    ),
     tasks_file: Optional[str] = typer.Option(
         None, "--tasks", "-T", help="Path to recipe file (tasktree.yaml, *.tasks, etc.)"
     ),
@@ -72,6 +95,12 @@ def main(
     clean: Optional[bool] = typer.Option(
         None, "--clean", "-c", help="Remove state file (reset task cache)"
     ),
+    completion: Optional[str] = typer.Option(
+        None,
+        "--completion",
+        click_type=click.Choice(("bash", "zsh", "fish")),
+        help="Print the shell completion script for bash, zsh or fish",
+    ),
     force: Optional[bool] = typer.Option(
         None, "--force", "-f", help="Force re-run all tasks (ignore freshness)"
     ),
@@ -81,6 +110,42 @@ def main(
         "-o",
         help="Run only the specified task, skip dependencies (implies --force)",
     ),
+    jobs: str = typer.Option(
+        "1",
+        "--jobs",
+        "-j",
+        callback=_jobs_callback,
+        help="Maximum number of tasks to run concurrently, or 'auto[:MIN-MAX]' "
+        "to adapt to system load",
+    ),
+    keep_going: Optional[bool] = typer.Option(
+        None,
+        "--keep-going",
+        "-k",
+        help="After a failure, keep running every task whose dependencies succeeded",
+    ),
+    fail_fast: Optional[bool] = typer.Option(
+        None,
+        "--fail-fast",
+        help="After a failure, terminate tasks that are still running",
+    ),
+    output_mode: Optional[str] = typer.Option(
+        None,
+        "--output-mode",
+        click_type=click.Choice(_OUTPUT_MODES, case_sensitive=False),
+        help="""How to show the output of tasks running concurrently (default:
+        interleaved when -j allows more than one task, otherwise direct):
+
+        - interleaved: whole lines as they arrive, prefixed with [task]\n
+        - grouped: each task's output in one block when it finishes\n
+        - tail: live view of running tasks and their last lines""",
+    ),
+    max_concurrent_builds: int = typer.Option(
+        4,
+        "--max-concurrent-builds",
+        min=1,
+        help="Maximum number of runner images to build at once",
+    ),
     runner: Optional[str] = typer.Option(
         None, "--runner", "-r", help="Override runner for all tasks"
     ),
@@ -100,9 +165,7 @@ def main(
         None,
         "--task-output",
         "-O",
-        click_type=click.Choice(
-            [t.value for t in TaskOutputTypes], case_sensitive=False
-        ),
+        click_type=click.Choice(_TASK_OUTPUT_TYPES, case_sensitive=False),
         help="""Control task subprocess output display:
         
         - all: show both stdout and stderr output from tasks\n
@@ -146,31 +209,64 @@ def main(
     tt deploy prod region=us-1   # Run 'deploy' with arguments
     tt --list                    # List all tasks
     tt --tree test               # Show dependency tree for 'test'
+    tt -j 4 build                # Run up to 4 independent tasks at once
+    tt -j auto build             # Adapt concurrency to system load
+    tt --logs test               # Full output of 'test' from the last parallel run
+    eval "$(tt --completion bash)"  # Enable Tab completion in bash
     """
 
     logger = ConsoleLogger(console, LogLevel(LogLevel[log_level.upper()]))
 
     if list_opt:
+        from tasktree.cli_commands.list_tasks import list_tasks
+
         list_tasks(logger, tasks_file)
         raise typer.Exit()
 
     if show:
+        from tasktree.cli_commands.show_task import show_task
+
         show_task(logger, show, tasks_file, runner_override=runner)
         raise typer.Exit()
 
     if tree:
+        from tasktree.cli_commands.show_tree import show_tree
+
         show_tree(logger, tree, tasks_file)
         raise typer.Exit()
 
+    if logs:
+        from tasktree.cli_commands.show_logs import show_logs
+
+        show_logs(logger, logs, tasks_file)
+        raise typer.Exit()
+
     if init:
+        from tasktree.cli_commands.init_recipe import init_recipe
+
         init_recipe(logger)
         raise typer.Exit()
 
     if clean:
+        from tasktree.cli_commands.clean_state import clean_state
+
         clean_state(logger, tasks_file)
         raise typer.Exit()
 
+    if completion:
+        from tasktree.completion import completion_script
+
+        typer.echo(completion_script(completion), nl=False)
+        raise typer.Exit()
+
+    if keep_going and fail_fast:
+        logger.error("[red]--keep-going and --fail-fast cannot be used together[/red]")
+        raise typer.Exit(1)
+
     if task_args:
+        from tasktree.cli_commands.execute_dynamic_task import execute_dynamic_task
+        from tasktree.output_mux import OutputMode
+
         # --only implies --force
         force_execution = force or only or False
         execute_dynamic_task(
@@ -178,12 +274,19 @@ def main(
             task_args,
             force=force_execution,
             only=only or False,
+            jobs=jobs,
+            keep_going=keep_going or False,
+            fail_fast=fail_fast or False,
+            output_mode=OutputMode(output_mode.lower()) if output_mode else None,
+            max_concurrent_builds=max_concurrent_builds,
             runner=runner,
             interpreter=interpreter,
             tasks_file=tasks_file,
             task_output=task_output,
         )
     else:
+        from tasktree.parser import get_recipe
+
         recipe = get_recipe(logger, tasks_file)
         if recipe is None:
             logger.error(
@@ -15,8 +15,10 @@ from tasktree.graph import (
 )
 from tasktree.hasher import hash_task
 from tasktree.logging import Logger
+from tasktree.output_mux import OutputMode
 from tasktree.parser import get_recipe, parse_task_args
 from tasktree.process_runner import TaskOutputTypes, make_process_runner
+from tasktree.scheduler import AutoJobs
 from tasktree.state import StateManager
 
 
@@ -25,6 +27,11 @@ def execute_dynamic_task(
     args: list[str],
     force: bool = False,
     only: bool = False,
+    jobs: int | AutoJobs = 1,
+    keep_going: bool = False,
+    fail_fast: bool = False,
+    output_mode: OutputMode | None = None,
+    max_concurrent_builds: int = 4,
     runner: Optional[str] = None,
     interpreter: Optional[str] = None,
     tasks_file: Optional[str] = None,
@@ -38,6 +45,11 @@ def execute_dynamic_task(
     args: Task name followed by optional task arguments
     force: Force re-execution even if task is up-to-date
     only: Execute only the specified task, skip dependencies
+    jobs: Maximum number of tasks to run concurrently, or AutoJobs for -j auto
+    keep_going: After a failure, keep running tasks whose dependencies succeeded
+    fail_fast: After a failure, terminate tasks that are still running
+    output_mode: How to multiplex the output of concurrent tasks (None for the default)
+    max_concurrent_builds: Maximum number of runner images to build at once
     runner: Override runner for task execution
     interpreter: Override interpreter for all tasks
     tasks_file: Path to recipe file (optional)
@@ -116,23 +128,26 @@ def execute_dynamic_task(
         raise typer.Exit(1)
 
     # Prune state based on tasks that will actually execute (with their specific arguments)
-    # This ensures template-substituted dependencies are handled correctly
-    valid_hashes = set()
-    for _, task in recipe.tasks.items():
-        # Compute base task hash
-        task_hash = hash_task(
-            task.cmd,
-            task.outputs,
-            task.working_dir,
-            task.args,
-            executor._get_effective_runner_name(task),
-            task.deps,
-            executor._interpreter_identity(executor._resolve_interpreter(task)),
-        )
+    # This ensures template-substituted dependencies are handled correctly.
+    # Imported tasks this run does not reach were not parsed, so without them
+    # there is nothing to tell their state entries from stale ones.
+    if not recipe.unparsed_tasks:
+        valid_hashes = set()
+        for _, task in recipe.tasks.items():
+            # Compute base task hash
+            task_hash = hash_task(
+                task.cmd,
+                task.outputs,
+                task.working_dir,
+                task.args,
+                executor._get_effective_runner_name(task),
+                task.deps,
+                executor._interpreter_identity(executor._resolve_interpreter(task)),
+            )
 
-        valid_hashes.add(task_hash)
+            valid_hashes.add(task_hash)
 
-    state.prune(valid_hashes)
+        state.prune(valid_hashes)
     state.save()
     try:
         executor.execute_task(
@@ -141,6 +156,11 @@ def execute_dynamic_task(
             args_dict,
             force=force,
             only=only,
+            jobs=jobs,
+            keep_going=keep_going,
+            fail_fast=fail_fast,
+            output_mode=output_mode,
+            max_concurrent_builds=max_concurrent_builds,
         )
         logger.info(
             f"[green]{get_action_success_string()} Task '{task_name}' completed successfully[/green]",
@@ -5,8 +5,7 @@ from typing import Optional
 import typer
 from rich.table import Table
 
-from tasktree import parse_arg_spec
-from tasktree.parser import get_recipe
+from tasktree.parser import get_recipe, parse_arg_spec
 from tasktree.logging import Logger
 
 
@@ -14,7 +13,9 @@ def list_tasks(logger: Logger, tasks_file: Optional[str] = None):
     """
     List all available tasks with descriptions.
     """
-    recipe = get_recipe(logger, tasks_file)
+    # Only the variables descriptions and argument specs use are evaluated:
+    # listing runs no other { eval: ... } command and reads no other file
+    recipe = get_recipe(logger, tasks_file, metadata_only=True)
     if recipe is None:
         logger.error(
             "[red]No recipe file found (tasktree.yaml, tasktree.yml, tt.yaml, or *.tasks)[/red]",
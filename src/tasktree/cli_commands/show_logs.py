@@ -0,0 +1,70 @@
+"""Show task log command implementation."""
+
+from __future__ import annotations
+
+import shutil
+import sys
+from pathlib import Path
+from typing import Optional
+
+import typer
+
+from tasktree.logging import Logger
+from tasktree.output_mux import RunLogs
+from tasktree.parser import find_recipe_file
+
+
+def show_logs(logger: Logger, task_name: str, tasks_file: Optional[str] = None) -> None:
+    """
+    Print a task's full output from the most recent multiplexed run.
+
+    A task run more than once in that run (with different arguments) has its
+    later runs' output under ``<task>.2``, ``<task>.3``, ...
+    """
+    # The project root, where the executor writes the logs, is found as
+    # get_recipe finds it
+    if tasks_file:
+        recipe_path = Path(tasks_file)
+        if not recipe_path.exists():
+            logger.error(f"[red]Recipe file not found: {tasks_file}[/red]")
+            raise typer.Exit(1)
+        project_root = Path.cwd()
+    else:
+        recipe_path = find_recipe_file()
+        if recipe_path is None:
+            logger.error(
+                "[red]No recipe file found (tasktree.yaml, tasktree.yml, tt.yaml, or *.tasks)[/red]",
+            )
+            raise typer.Exit(1)
+        project_root = recipe_path.parent
+
+    run_dir = RunLogs.latest(project_root)
+    if run_dir is None:
+        logger.error("[red]No task logs found[/red]")
+        logger.info(
+            "Task logs are written by runs with more than one job (-j) or an --output-mode"
+        )
+        raise typer.Exit(1)
+
+    # A numbered run's file is named as a task called "<task>.<n>" would be
+    log_path = run_dir / RunLogs.file_name(task_name)
+    if not log_path.exists():
+        logger.error(f"[red]Task '{task_name}' did not run in the last run ({run_dir.name})[/red]")
+        logged = sorted(p.name[: -len(".log")] for p in run_dir.glob("*.log"))
+        if logged:
+            logger.info("Logs of the last run: " + ", ".join(logged))
+        raise typer.Exit(1)
+
+    logger.debug(f"Showing {log_path}")
+    sys.stdout.flush()
+    with open(log_path, "rb") as f:
+        shutil.copyfileobj(f, sys.stdout.buffer)
+    sys.stdout.buffer.flush()
+
+    repeats = RunLogs.repeat_labels(run_dir, task_name)
+    if repeats:
+        # On stderr, so that redirected output is the log alone
+        print(
+            f"'{task_name}' also ran as: {', '.join(repeats)} (tt --logs {repeats[0]})",
+            file=sys.stderr,
+        )
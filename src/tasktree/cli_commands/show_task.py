@@ -7,7 +7,7 @@ import yaml
 from rich.syntax import Syntax
 
 from tasktree.logging import Logger
-from tasktree.parser import Recipe, Task, get_recipe
+from tasktree.parser import Recipe, Task, format_memory_size, get_recipe
 
 
 def _resolve_effective_runner(recipe: Recipe, task: Task) -> Optional[str]:
@@ -40,12 +40,25 @@ def _resolve_effective_runner(recipe: Recipe, task: Task) -> Optional[str]:
     return None
 
 
+def _resources_yaml(task: Task) -> dict:
+    """
+    YAML form of a task's resource request, omitting unset fields.
+    """
+    resources = {
+        "cpu": task.resources.cpu,
+        "mem": format_memory_size(task.resources.mem) if task.resources.mem else None,
+        "pools": list(task.resources.pools),
+    }
+    return {k: v for k, v in resources.items() if v}
+
+
 def show_task(logger: Logger, task_name: str, tasks_file: Optional[str] = None, runner_override: Optional[str] = None):
     """
     Show task definition with syntax highlighting.
     """
-    # Pass task_name as root_task for lazy variable evaluation
-    recipe = get_recipe(logger, tasks_file, root_task=task_name)
+    # Only the variables the task's description and argument specs use are
+    # evaluated: the other fields are shown with their {{ var.* }} placeholders
+    recipe = get_recipe(logger, tasks_file, root_task=task_name, metadata_only=True)
     if recipe is None:
         logger.error(
             "[red]No recipe file found (tasktree.yaml, tasktree.yml, tt.yaml, or *.tasks)[/red]",
@@ -66,6 +79,13 @@ def show_task(logger: Logger, task_name: str, tasks_file: Optional[str] = None,
     if task.source_file:
         logger.info(f"Source: {task.source_file}")
 
+    # Pools are shared recipe-wide, so show the capacity the task competes for
+    if task.resources.pools:
+        capacities = ", ".join(
+            f"{pool}={recipe.pools[pool]}" for pool in task.resources.pools
+        )
+        logger.info(f"Pool capacity: {capacities}")
+
     # Resolve and display effective runner
     effective_runner = _resolve_effective_runner(recipe, task)
     if effective_runner:
@@ -83,6 +103,7 @@ def show_task(logger: Logger, task_name: str, tasks_file: Optional[str] = None,
             "working_dir": task.working_dir,
             "run_in": task.run_in,
             "args": task.args,
+            "resources": _resources_yaml(task),
             "cmd": task.cmd,
         }
     }
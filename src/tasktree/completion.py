@@ -0,0 +1,582 @@
+"""Shell completion for tt, answered from a precomputed index.
+
+Completing ``tt <task> <arg>`` by asking tt itself would import the CLI and
+parse the recipe, with all its imports, on every Tab press.  Instead, each
+time tt parses a recipe it writes a completion index next to the recipe:
+``.tasktree/completion/<recipe file name>`` in the recipe's directory.  The
+index holds the task names, whether each is private, their descriptions and
+each task's arguments with their types, defaults and choices, together with
+the size and modification time of the recipe and of every file it imports.
+
+The scripts ``tt --completion bash|zsh|fish`` prints call ``tt-complete``,
+which imports nothing beyond this module, recipe discovery and the standard
+library: it finds the recipe, checks the index's fingerprints and answers
+from the index.  Only when a fingerprint no longer matches does it parse the
+recipe again (without running { eval: ... } commands or reading
+{ read: ... } files) and rewrite the index.
+
+Index format, one record per line, fields separated by tabs (tabs and line
+breaks inside values are written as spaces):
+
+    tasktree-completion  <INDEX_VERSION>
+    file                 <mtime_ns>  <size>  <absolute path>
+    task                 <name>  <0|1: private>  <first line of desc>
+    arg                  <task>  <name>  <type>  <"" or "=" + default>
+    choice               <task>  <arg>  <value>
+    runner               <name>
+    interpreter          <name>
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+from tasktree.discovery import find_recipe_file
+
+if TYPE_CHECKING:
+    from tasktree.parser import Recipe
+
+# Bumped whenever a record changes meaning, or indexes already written may
+# hold wrong records; an index of another version is treated as stale and
+# rebuilt
+INDEX_VERSION = "2"
+
+COMPLETION_DIR = Path(".tasktree") / "completion"
+
+SHELLS = ("bash", "zsh", "fish")
+
+# What each of tt's options that takes a value is completed with: a tuple of
+# choices, or "task", "runner" or "interpreter" for names from the index.
+# The empty tuple means no completion: the shell scripts complete --tasks
+# with file names themselves.  test_completion.py checks these against the
+# CLI's options.
+_TASK, _RUNNER, _INTERPRETER = "task", "runner", "interpreter"
+_LOG_LEVELS = ("fatal", "error", "warn", "info", "debug", "trace")
+_OUTPUT_MODES = ("interleaved", "grouped", "tail")
+_TASK_OUTPUT_TYPES = ("all", "none", "out", "err", "on-err")
+_OPTION_VALUES: dict[str, tuple[str, ...] | str] = {
+    "--show": _TASK,
+    "-s": _TASK,
+    "--tree": _TASK,
+    "-t": _TASK,
+    "--logs": _TASK,
+    "--tasks": (),
+    "-T": (),
+    "--jobs": (),
+    "-j": (),
+    "--output-mode": _OUTPUT_MODES,
+    "--max-concurrent-builds": (),
+    "--runner": _RUNNER,
+    "-r": _RUNNER,
+    "--interpreter": _INTERPRETER,
+    "--log-level": _LOG_LEVELS,
+    "-L": _LOG_LEVELS,
+    "--task-output": _TASK_OUTPUT_TYPES,
+    "-O": _TASK_OUTPUT_TYPES,
+    "--completion": SHELLS,
+}
+
+# Options offered when the word being completed starts with "-" (long forms)
+_FLAGS = (
+    "--version",
+    "--list",
+    "--show",
+    "--tree",
+    "--logs",
+    "--tasks",
+    "--init",
+    "--clean",
+    "--completion",
+    "--force",
+    "--only",
+    "--jobs",
+    "--keep-going",
+    "--fail-fast",
+    "--output-mode",
+    "--max-concurrent-builds",
+    "--runner",
+    "--interpreter",
+    "--log-level",
+    "--task-output",
+    "--help",
+)
+
+
+class IndexedArg(NamedTuple):
+    """
+    A task argument as recorded in the completion index.
+    """
+
+    name: str
+    type: str
+    default: str | None
+    choices: list[str]
+
+
+class IndexedTask(NamedTuple):
+    """
+    A task as recorded in the completion index.
+    """
+
+    private: bool
+    desc: str
+    args: list[IndexedArg]
+
+
+class CompletionIndex(NamedTuple):
+    """
+    A recipe's completion index, as read back from disk.
+
+    Attributes:
+    files: (path, mtime_ns, size) of the recipe and every file it imports
+    tasks: Tasks by name, in recipe order
+    runners: Runner names
+    interpreters: Interpreter names
+    """
+
+    files: list[tuple[str, int, int]]
+    tasks: dict[str, IndexedTask]
+    runners: list[str]
+    interpreters: list[str]
+
+
+def index_path(recipe_path: Path) -> Path:
+    """
+    Path of the completion index for a recipe file.
+    """
+    return recipe_path.parent / COMPLETION_DIR / recipe_path.name
+
+
+def _field(value: Any) -> str:
+    """
+    A value as one index field: tabs and line breaks would split the record.
+    """
+    text = str(value)
+    if "\t" in text or "\n" in text or "\r" in text:
+        text = text.replace("\t", " ").replace("\r", " ").replace("\n", " ")
+    return text
+
+
+def _indexed_arg(spec: str | dict) -> IndexedArg:
+    """
+    A task's argument spec in the form the index records it.
+    """
+    from tasktree.parser import parse_arg_spec
+
+    try:
+        parsed = parse_arg_spec(spec)
+    except ValueError:
+        # E.g. an int default still holding its {{ var.* }} placeholder: the
+        # name is still worth completing
+        name = next(iter(spec)) if isinstance(spec, dict) else str(spec)
+        return IndexedArg(name.lstrip("$"), "str", None, [])
+    choices = [str(c) for c in parsed.choices] if parsed.choices else []
+    return IndexedArg(parsed.name, parsed.arg_type, parsed.default, choices)
+
+
+def build_index(recipe: Recipe) -> str:
+    """
+    The text of a recipe's completion index.
+
+    Args:
+    recipe: A parsed recipe (its descriptions are indexed as they stand, so
+    {{ var.* }} placeholders are kept unless they were evaluated)
+
+    Returns:
+    The index, in the format described in the module docstring
+    """
+    lines = [f"tasktree-completion\t{INDEX_VERSION}"]
+    for source_file in recipe.source_files or [recipe.recipe_path]:
+        try:
+            st = os.stat(source_file)
+        except OSError:
+            # Served by a loader without being on disk: never fresh
+            st = None
+        mtime, size = (st.st_mtime_ns, st.st_size) if st else (-1, -1)
+        lines.append(f"file\t{mtime}\t{size}\t{_field(os.path.abspath(source_file))}")
+
+    for name, task in recipe.tasks.items():
+        desc = (task.desc or "").strip().split("\n", 1)[0]
+        lines.append(f"task\t{_field(name)}\t{int(task.private)}\t{_field(desc)}")
+        for spec in task.args:
+            arg = _indexed_arg(spec)
+            default = "" if arg.default is None else "=" + _field(arg.default)
+            lines.append(
+                f"arg\t{_field(name)}\t{_field(arg.name)}\t{arg.type}\t{default}"
+            )
+            for choice in arg.choices:
+                lines.append(
+                    f"choice\t{_field(name)}\t{_field(arg.name)}\t{_field(choice)}"
+                )
+
+    lines.extend(f"runner\t{_field(name)}" for name in recipe.runners)
+    lines.extend(f"interpreter\t{_field(name)}" for name in recipe.interpreters)
+    return "\n".join(lines) + "\n"
+
+
+def _store(path: Path, text: str) -> None:
+    """
+    Write an index unless the same text is already there.
+
+    The file is replaced atomically, so a shell completing while tt runs
+    never reads half an index.  Failures (a read-only checkout, say) are
+    ignored: completion then parses the recipe itself.
+    """
+    try:
+        if path.read_text(encoding="utf-8") == text:
+            return
+    except OSError:
+        pass
+
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path.write_text(text, encoding="utf-8")
+        os.replace(tmp_path, path)
+    except OSError:
+        try:
+            tmp_path.unlink()
+        except OSError:
+            pass
+
+
+def write_index(recipe: Recipe) -> None:
+    """
+    Write (or refresh) the completion index for a parsed recipe.
+    """
+    _store(index_path(recipe.recipe_path), build_index(recipe))
+
+
+def parse_index(text: str) -> CompletionIndex | None:
+    """
+    Read the records of an index's text.
+
+    Returns:
+    The index, or None if it is not an index of this INDEX_VERSION
+    """
+    lines = text.split("\n")
+    if lines[0] != f"tasktree-completion\t{INDEX_VERSION}":
+        return None
+
+    index = CompletionIndex([], {}, [], [])
+    try:
+        for line in lines[1:]:
+            kind, _, rest = line.partition("\t")
+            if kind == "file":
+                mtime, size, path = rest.split("\t", 2)
+                index.files.append((path, int(mtime), int(size)))
+            elif kind == "task":
+                name, private, desc = rest.split("\t", 2)
+                index.tasks[name] = IndexedTask(private == "1", desc, [])
+            elif kind == "arg":
+                task, name, arg_type, default = rest.split("\t", 3)
+                index.tasks[task].args.append(
+                    IndexedArg(name, arg_type, default[1:] if default else None, [])
+                )
+            elif kind == "choice":
+                task, arg, value = rest.split("\t", 2)
+                for indexed_arg in index.tasks[task].args:
+                    if indexed_arg.name == arg:
+                        indexed_arg.choices.append(value)
+            elif kind == "runner":
+                index.runners.append(rest)
+            elif kind == "interpreter":
+                index.interpreters.append(rest)
+    except (ValueError, KeyError):
+        return None
+    return index
+
+
+def _is_fresh(index: CompletionIndex) -> bool:
+    """
+    Whether every file the index was built from is unchanged.
+    """
+    for path, mtime, size in index.files:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return False
+        if st.st_mtime_ns != mtime or st.st_size != size:
+            return False
+    return bool(index.files)
+
+
+def load_index(recipe_path: Path) -> CompletionIndex | None:
+    """
+    The completion index for a recipe, rebuilt first if it is missing or stale.
+
+    Rebuilding parses the recipe with only its descriptions' and argument
+    specs' variables evaluated, and no { eval: ... } or { read: ... } ones:
+    pressing Tab must never run a recipe's commands.
+
+    Returns:
+    The index, or None if the recipe cannot be parsed
+    """
+    path = index_path(recipe_path)
+    try:
+        index = parse_index(path.read_text(encoding="utf-8"))
+    except OSError:
+        index = None
+    if index is not None and _is_fresh(index):
+        return index
+
+    from tasktree.parser import parse_recipe
+
+    try:
+        recipe = parse_recipe(recipe_path, metadata_only=True, side_effects=False)
+    except Exception:
+        return None
+    text = build_index(recipe)
+    _store(path, text)
+    return parse_index(text)
+
+
+def _arg_description(arg: IndexedArg) -> str:
+    """
+    Short description of an argument: its type and default.
+    """
+    if arg.default is None:
+        return arg.type
+    return f"{arg.type}, default {arg.default}"
+
+
+def _complete_task_args(
+    task: IndexedTask, given: list[str], current: str
+) -> list[tuple[str, str]]:
+    """
+    Completions for a task's arguments: name= for those not given yet, or
+    the choices of the one being typed as name=value.
+    """
+    if "=" in current:
+        name, _, prefix = current.partition("=")
+        arg = next((a for a in task.args if a.name == name), None)
+        if arg is None:
+            return []
+        values = arg.choices or (["true", "false"] if arg.type == "bool" else [])
+        return [(f"{name}={v}", "") for v in values if v.startswith(prefix)]
+
+    named = {word.partition("=")[0] for word in given if "=" in word}
+    positional = sum(1 for word in given if "=" not in word)
+    remaining = [a for a in task.args[positional:] if a.name not in named]
+
+    completions = [
+        (f"{a.name}=", _arg_description(a))
+        for a in remaining
+        if a.name.startswith(current)
+    ]
+    # The next argument may also be given by position: offer its choices
+    if positional < len(task.args) and task.args[positional].name not in named:
+        next_arg = task.args[positional]
+        completions.extend(
+            (v, next_arg.name) for v in next_arg.choices if v.startswith(current)
+        )
+    return completions
+
+
+def complete(words: list[str], start_dir: Path | None = None) -> list[tuple[str, str]]:
+    """
+    Completions for the word being typed on a tt command line.
+
+    Args:
+    words: The command line's words after `tt`, ending with the (possibly
+    empty) word being completed
+    start_dir: Directory tt runs in (defaults to cwd)
+
+    Returns:
+    (completion, description) pairs, each starting with the word being
+    completed; the description may be empty
+    """
+    *before, current = words or [""]
+    start_dir = Path.cwd() if start_dir is None else start_dir
+
+    # Follow tt's own reading of the command line: options (which Click
+    # accepts anywhere) and their values, then the task and its arguments
+    tasks_file: str | None = None
+    pending: str | None = None
+    task_name: str | None = None
+    given: list[str] = []
+    for word in before:
+        if pending is not None:
+            if pending in ("--tasks", "-T"):
+                tasks_file = word
+            pending = None
+        elif word.startswith("-") and len(word) > 1:
+            option, has_value, value = word.partition("=")
+            if option in _OPTION_VALUES and not has_value:
+                pending = option
+            elif option in ("--tasks", "-T"):
+                tasks_file = value
+        elif task_name is None:
+            task_name = word
+        else:
+            given.append(word)
+
+    def index() -> CompletionIndex | None:
+        try:
+            recipe_path = (
+                start_dir / tasks_file if tasks_file else find_recipe_file(start_dir)
+            )
+        except ValueError:
+            return None
+        return load_index(recipe_path) if recipe_path is not None else None
+
+    def option_values(option: str, prefix: str) -> list[tuple[str, str]]:
+        kind = _OPTION_VALUES[option]
+        if isinstance(kind, tuple):
+            return [(v, "") for v in kind if v.startswith(prefix)]
+        loaded = index()
+        if loaded is None:
+            return []
+        if kind == _TASK:
+            return [
+                (name, task.desc)
+                for name, task in loaded.tasks.items()
+                if not task.private and name.startswith(prefix)
+            ]
+        names = loaded.runners if kind == _RUNNER else loaded.interpreters
+        return [(name, "") for name in names if name.startswith(prefix)]
+
+    if pending is not None:
+        return option_values(pending, current)
+
+    if current.startswith("-"):
+        option, has_value, prefix = current.partition("=")
+        if has_value:
+            if option not in _OPTION_VALUES:
+                return []
+            return [
+                (f"{option}={value}", desc)
+                for value, desc in option_values(option, prefix)
+            ]
+        return [(flag, "") for flag in _FLAGS if flag.startswith(current)]
+
+    if task_name is None:
+        return option_values("--show", current)
+
+    loaded = index()
+    task = loaded.tasks.get(task_name) if loaded is not None else None
+    if task is None:
+        return []
+    return _complete_task_args(task, given, current)
+
+
+_BASH_SCRIPT = r"""# bash completion for tt (Task Tree)
+# Load it with:  eval "$(tt --completion bash)"   (e.g. in ~/.bashrc)
+_tt_complete() {
+    local line="${COMP_LINE:0:COMP_POINT}"
+    local -a words
+    read -r -a words <<< "$line"
+    if [[ -z "$line" || "$line" == *[[:space:]] ]]; then
+        words+=("")
+    fi
+    local cur="${words[${#words[@]}-1]}"
+    local prev=""
+    if (( ${#words[@]} > 1 )); then
+        prev="${words[${#words[@]}-2]}"
+    fi
+
+    if [[ "$prev" == "-T" || "$prev" == "--tasks" ]]; then
+        local IFS=$'\n'
+        COMPREPLY=($(compgen -f -- "$cur"))
+        return
+    fi
+
+    local IFS=$'\n'
+    COMPREPLY=($(tt-complete -- "${words[@]:1}" 2>/dev/null | cut -f1))
+
+    # Readline completes only the part after the last "=" of name=value
+    if [[ "$cur" == *=* && "$COMP_WORDBREAKS" == *=* ]]; then
+        local typed="${cur%=*}="
+        COMPREPLY=("${COMPREPLY[@]#"$typed"}")
+    fi
+    # No space after "name=": the value comes next
+    if [[ ${#COMPREPLY[@]} -eq 1 && "${COMPREPLY[0]}" == *= ]]; then
+        compopt -o nospace 2>/dev/null
+    fi
+}
+complete -F _tt_complete tt
+"""
+
+_ZSH_SCRIPT = r"""#compdef tt
+# zsh completion for tt (Task Tree)
+# Load it with:  eval "$(tt --completion zsh)"   (in ~/.zshrc, after compinit)
+_tt() {
+    if [[ "${words[CURRENT-1]}" == (-T|--tasks) ]]; then
+        _files
+        return
+    fi
+
+    local -a finished unfinished
+    local line value desc
+    for line in "${(@f)$(tt-complete -- "${(@)words[2,CURRENT]}" 2>/dev/null)}"; do
+        [[ -n "$line" ]] || continue
+        value="${line%%$'\t'*}"
+        desc="${line#*$'\t'}"
+        value="${value//:/\\:}"
+        # No space after "name=": the value comes next
+        if [[ "$value" == *= ]]; then
+            unfinished+=("${value}${desc:+:$desc}")
+        else
+            finished+=("${value}${desc:+:$desc}")
+        fi
+    done
+    _describe -t values 'tt' finished
+    _describe -t arguments 'task argument' unfinished -S ''
+}
+compdef _tt tt
+"""
+
+_FISH_SCRIPT = r"""# fish completion for tt (Task Tree)
+# Load it with:  tt --completion fish | source   (e.g. in ~/.config/fish/config.fish)
+function __tt_complete
+    set -l words (commandline -opc)
+    set -e words[1]
+    set -l current (commandline -ct)
+    tt-complete -- $words "$current" 2>/dev/null
+end
+complete -c tt -f -a '(__tt_complete)'
+complete -c tt -s T -l tasks -r -F -d 'Path to recipe file'
+"""
+
+
+def completion_script(shell: str) -> str:
+    """
+    The completion script for a shell (one of SHELLS).
+
+    Raises:
+    ValueError: If the shell is not supported
+    """
+    scripts = {"bash": _BASH_SCRIPT, "zsh": _ZSH_SCRIPT, "fish": _FISH_SCRIPT}
+    if shell not in scripts:
+        raise ValueError(
+            f"Unsupported shell '{shell}' (expected one of: {', '.join(SHELLS)})"
+        )
+    return scripts[shell]
+
+
+def main(argv: list[str] | None = None) -> int:
+    """
+    Entry point for tt-complete, which the completion scripts call.
+
+    Usage: tt-complete [--] WORD... where the words follow `tt` on the
+    command line and the last is the one being completed.  Prints one
+    completion per line: the completion, a tab, then its description.
+    """
+    words = sys.argv[1:] if argv is None else argv
+    if words[:1] == ["--"]:
+        words = words[1:]
+    try:
+        completions = complete(words)
+    except Exception:
+        # A broken recipe just leaves nothing to offer: never a traceback
+        # at the prompt
+        return 1
+    sys.stdout.write("".join(f"{value}\t{desc}\n" for value, desc in completions))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -15,6 +15,7 @@ from tasktree.parser import (
     parse_interpreter_spec,
     runner_from_config,
 )
+from tasktree.yaml_loader import load_yaml
 
 __all__ = [
     "get_user_config_path",
@@ -235,7 +236,7 @@ def parse_config_file(path: Path) -> Optional[Runner]:
         return None
 
     try:
-        data = yaml.safe_load(content)
+        data = load_yaml(content)
     except yaml.YAMLError as e:
         raise ConfigError(f"Error parsing YAML in config file '{path}': {e}") from e
 
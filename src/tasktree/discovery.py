@@ -0,0 +1,91 @@
+"""Finding the recipe file tt runs from.
+
+Kept apart from the parser, which imports PyYAML, Typer and Jinja, so that
+the shell completion helper (see completion.py) can find a recipe on every
+Tab press without paying for them.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+
+def find_recipe_file(start_dir: Path | None = None) -> Path | None:
+    """
+    Find recipe file in current or parent directories.
+
+    Looks for recipe files matching these patterns (in order of preference):
+    - tasktree.yaml
+    - tasktree.yml
+    - tt.yaml
+    - *.tasks
+
+    If multiple recipe files are found in the same directory, raises ValueError
+    with instructions to use --tasks option.
+
+    Args:
+    start_dir: Directory to start searching from (defaults to cwd)
+
+    Returns:
+    Path to recipe file if found, None otherwise
+
+    Raises:
+    ValueError: If multiple recipe files found in the same directory
+    """
+    if start_dir is None:
+        start_dir = Path.cwd()
+
+    current = start_dir.resolve()
+
+    # Search up the directory tree
+    while True:
+        candidates = []
+
+        # Check for exact filenames first (these are preferred)
+        for filename in ["tasktree.yaml", "tasktree.yml", "tt.yaml", "tt.yml"]:
+            recipe_path = current / filename
+            if recipe_path.exists():
+                candidates.append(recipe_path)
+
+        # If we found standard recipe files, use the first one
+        if len(candidates) > 1:
+            # Multiple standard recipe files found - ambiguous
+            filenames = [c.name for c in candidates]
+            raise ValueError(
+                f"Multiple recipe files found in {current}:\n"
+                f"  {', '.join(filenames)}\n\n"
+                f"Please specify which file to use with --tasks (-T):\n"
+                f"  tt --tasks {filenames[0]} <task-name>"
+            )
+        elif len(candidates) == 1:
+            return candidates[0]
+
+        # Only check for *.tasks files if no standard recipe files found
+        # (*.tasks files are typically imports, not main recipes)
+        tasks_files = []
+        globs = ["*.tasks", "*.tt"]
+        for g in globs:
+            for tasks_file in current.glob(g):
+                if tasks_file.is_file():
+                    tasks_files.append(tasks_file)
+
+        if len(tasks_files) > 1:
+            # Multiple *.tasks files found - ambiguous
+            filenames = [t.name for t in tasks_files]
+            raise ValueError(
+                f"Multiple recipe files found in {current}:\n"
+                f"  {', '.join(filenames)}\n\n"
+                f"Please specify which file to use with --tasks (-T):\n"
+                f"  tt --tasks {filenames[0]} <task-name>"
+            )
+        elif len(tasks_files) == 1:
+            return tasks_files[0]
+
+        # Move to parent directory
+        parent = current.parent
+        if parent == current:
+            # Reached root
+            break
+        current = parent
+
+    return None
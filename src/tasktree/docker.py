@@ -1,19 +1,38 @@
 """Docker integration for Task Tree.
 
 Provides Docker image building and container execution capabilities.
+
+Consecutive tasks of one runner can share a container session: a single
+long-running container, started with the runner's ``docker run`` flags, that
+each task's script is ``docker exec``'d into. That saves starting (and
+removing) a container per task, while every task keeps its own process, exit
+code and output.
 """
 
 from __future__ import annotations
 
+import json
 import os
 import platform
 import subprocess
+import tempfile
+import threading
+import time
 import uuid
-from pathlib import Path
-from typing import TYPE_CHECKING
-
+from collections.abc import Callable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import AbstractContextManager
+from dataclasses import dataclass
+from pathlib import Path, PurePosixPath
+from typing import TYPE_CHECKING, Any
+
+from tasktree.docker_engine import (
+    ENGINE_UNAVAILABLE,
+    DockerEngineClient,
+    DockerEngineError,
+)
 from tasktree.interpreter import Interpreter
-from tasktree.temp_script import TempScript
+from tasktree.temp_script import TempScript, script_dir
 
 if TYPE_CHECKING:
     from tasktree.logging import Logger
@@ -21,6 +40,10 @@ if TYPE_CHECKING:
     from tasktree.process_runner import ProcessRunner
 
 
+# Keeps a session's container running until tt removes it
+_SESSION_KEEPALIVE = ["sh", "-c", "while :; do sleep 3600; done"]
+
+
 class DockerError(Exception):
     """
     Raised when Docker operations fail.
@@ -29,24 +52,71 @@ class DockerError(Exception):
     pass
 
 
+@dataclass
+class ContainerSession:
+    """
+    A running container that tasks of one runner are exec'd into.
+
+    The per-run script directory is mounted read-only at ``script_mount``.
+    """
+
+    container_id: str
+    runner_name: str
+    script_mount: str
+    startup_seconds: float  # Time taken to start the container
+    tasks_run: int = 0
+    in_flight: int = 0
+    retired: bool = False  # No new tasks; stopped once in_flight drops to 0
+
+    def describe_savings(self) -> str:
+        """How many container starts (and roughly how long) the session saved."""
+        saved = max(self.tasks_run - 1, 0)
+        return (
+            f"{self.tasks_run} task(s) in one container, saving {saved} container "
+            f"start(s) (about {saved * self.startup_seconds:.2f}s)"
+        )
+
+
 class DockerManager:
     """
     Manages Docker image building and container execution.
     """
 
-    def __init__(self, project_root: Path, logger: Logger):
+    def __init__(
+        self,
+        project_root: Path,
+        logger: Logger,
+        engine: DockerEngineClient | None = None,
+    ):
         """
         Initialize Docker manager.
 
         Args:
             project_root: Root directory of the project (where tasktree.yaml is located)
             logger: Logger instance for debug/trace messages
+            engine: Engine API client for inspecting images and removing
+                containers without the docker CLI (None to use the CLI)
         """
         self._project_root = project_root
         self._logger = logger
-        self._built_images: dict[
-            str, tuple[str, str]
-        ] = {}  # env_name -> (image_tag, image_id) cache
+        self._engine = engine
+        # Whether the engine has been pinged yet
+        self._engine_checked = False
+        self._engine_lock = threading.Lock()
+        # Image tag -> its inspect document, fetched once from the engine
+        self._image_info: dict[str, dict[str, Any]] = {}
+        # Runner name -> its image build, resolving to (image_tag, image_id),
+        # so concurrently scheduled tasks sharing a runner build its image once
+        self._builds: dict[str, Future[tuple[str, str]]] = {}
+        self._build_lock = threading.Lock()
+        # Builds started ahead of the tasks that need them (start_builds),
+        # with the pool's jobs by runner name
+        self._build_pool: ThreadPoolExecutor | None = None
+        self._queued_builds: dict[str, Future[None]] = {}
+        # Container sessions by (runner name, image tag, *run flags); None
+        # records one that could not be started, so it is not retried
+        self._sessions: dict[tuple[str, ...], ContainerSession | None] = {}
+        self._session_lock = threading.Lock()
 
     @staticmethod
     def _should_add_user_flag() -> bool:
@@ -68,6 +138,9 @@ class DockerManager:
         """
         Build Docker image if not already built this invocation.
 
+        If the image is already being built (by another task, or ahead of
+        time by start_builds), waits for that build instead.
+
         Args:
         env: Runner definition with dockerfile and context
         process_runner: ProcessRunner instance for subprocess execution
@@ -80,13 +153,128 @@ class DockerManager:
         Raises:
         DockerError: If docker command not available or build fails
         """
-        # Check if already built this invocation
-        if env.name in self._built_images:
-            tag, image_id = self._built_images[env.name]
-            return tag, image_id
+        build, claimed = self._claim_build(env.name)
+        if claimed:
+            self._run_build(build, env, process_runner)
+        return build.result()
+
+    def start_builds(
+        self,
+        builds: list[
+            tuple[Runner, Callable[[], AbstractContextManager[ProcessRunner]]]
+        ],
+        max_concurrent: int,
+    ) -> None:
+        """
+        Start building runners' images in the background.
+
+        At most max_concurrent builds run at once. Tasks needing one of these
+        images wait for its build in ensure_image_built; a failed build fails
+        them with its DockerError. Runners already being built are skipped.
+
+        Args:
+        builds: Each runner, with a callable opening the process runner its
+            build's output goes to (closed when the build finishes)
+        max_concurrent: Most builds to run at once
+        """
+        claimed = []
+        for env, open_process_runner in builds:
+            build, is_new = self._claim_build(env.name)
+            if is_new:
+                claimed.append((build, env, open_process_runner))
+        if not claimed:
+            return
+
+        self._logger.debug(
+            f"Building {len(claimed)} image(s), at most {max_concurrent} at once: "
+            + ", ".join(env.name for _, env, _ in claimed)
+        )
+        with self._build_lock:
+            if self._build_pool is None:
+                self._build_pool = ThreadPoolExecutor(
+                    max_workers=max_concurrent, thread_name_prefix="tt-build"
+                )
+            for build, env, open_process_runner in claimed:
+                self._queued_builds[env.name] = self._build_pool.submit(
+                    self._run_started_build, build, env, open_process_runner
+                )
+
+    def cancel_builds(self) -> None:
+        """
+        Drop the builds start_builds queued that have not begun.
+
+        Builds already running are left to finish.
+        """
+        with self._build_lock:
+            pool, self._build_pool = self._build_pool, None
+            if pool is None:
+                return
+            pool.shutdown(wait=False, cancel_futures=True)
+            # A cancelled build never resolves: forget it, so a later task
+            # builds the image itself
+            for env_name, job in self._queued_builds.items():
+                if job.cancelled():
+                    del self._builds[env_name]
+            self._queued_builds.clear()
+
+    def _claim_build(self, env_name: str) -> tuple[Future[tuple[str, str]], bool]:
+        """
+        The build of a runner's image, and whether the caller must run it.
+        """
+        with self._build_lock:
+            build = self._builds.get(env_name)
+            if build is not None:
+                return build, False
+            build = self._builds[env_name] = Future()
+            return build, True
+
+    def _run_started_build(
+        self,
+        build: Future[tuple[str, str]],
+        env: Runner,
+        open_process_runner: Callable[[], AbstractContextManager[ProcessRunner]],
+    ) -> None:
+        """
+        Run a build queued by start_builds; its failure is reported to the
+        tasks waiting on it.
+        """
+        try:
+            with open_process_runner() as process_runner:
+                self._run_build(build, env, process_runner)
+        except BaseException as e:
+            if not build.done():
+                build.set_exception(e)
+
+    def _run_build(
+        self,
+        build: Future[tuple[str, str]],
+        env: Runner,
+        process_runner: ProcessRunner,
+    ) -> None:
+        """
+        Build a runner's image, resolving its build with the result.
+
+        Raises:
+        DockerError: If the build fails (also set on the build)
+        """
+        try:
+            build.set_result(self._build_image(env, process_runner))
+        except BaseException as e:
+            build.set_exception(e)
+            raise
+
+    def _build_image(
+        self, env: Runner, process_runner: ProcessRunner
+    ) -> tuple[str, str]:
+        """
+        Build a runner's image with docker build.
 
+        Returns:
+        Tuple of (image_tag, image_id)
+        """
         # Check if docker is available
-        self._check_docker_available()
+        if self._active_engine() is None:
+            self._check_docker_available()
 
         # Resolve paths
         dockerfile_path = self._project_root / env.dockerfile
@@ -134,10 +322,9 @@ class DockerManager:
             )
 
         # Get the image ID
-        image_id = self._get_image_id(image_tag)
-
-        # Cache both tag and ID
-        self._built_images[env.name] = (image_tag, image_id)
+        self._image_info.pop(image_tag, None)
+        info = self._engine_image_info(image_tag)
+        image_id = info["Id"] if info is not None else self._get_image_id(image_tag)
         return image_tag, image_id
 
     def run_in_container(
@@ -148,6 +335,8 @@ class DockerManager:
         container_working_dir: str | None,
         process_runner: ProcessRunner,
         interpreter: Interpreter,
+        task_env_vars: dict[str, str] | None = None,
+        reuse_container: bool = False,
     ) -> subprocess.CompletedProcess:
         """
         Execute command inside Docker container.
@@ -159,6 +348,9 @@ class DockerManager:
         container_working_dir: Working directory inside container, or None to use Dockerfile's WORKDIR
         process_runner: ProcessRunner instance to use for subprocess execution
         interpreter: Interpreter used to run the script inside the container
+        task_env_vars: Environment variables for this task only, set on top of the runner's
+        reuse_container: Run in the runner's container session where possible,
+        instead of a container of its own
 
         Returns:
         CompletedProcess from subprocess.run
@@ -168,6 +360,25 @@ class DockerManager:
         """
         # Ensure image is built (returns tag and ID)
         image_tag, image_id = self.ensure_image_built(env, process_runner)
+        task_env_vars = task_env_vars or {}
+
+        base_flags = self._base_run_flags(env)
+        session = (
+            self._acquire_session(env, image_tag, base_flags) if reuse_container else None
+        )
+        if session is not None:
+            try:
+                return self._run_in_session(
+                    session,
+                    cmd,
+                    working_dir,
+                    container_working_dir,
+                    process_runner,
+                    interpreter,
+                    task_env_vars,
+                )
+            finally:
+                self._release_session(session)
 
         # Script extension comes verbatim from the interpreter (empty = none).
         script_ext = interpreter.ext
@@ -190,7 +401,9 @@ class DockerManager:
             ) as script_path:
                 # Build docker run command from the shared flags (user mapping,
                 # run args, volume mounts incl. the auto repo-mount, ports, env).
-                docker_cmd = ["docker", "run", "--rm"] + self._base_run_flags(env)
+                docker_cmd = ["docker", "run", "--rm"] + base_flags
+                for var_name, var_value in task_env_vars.items():
+                    docker_cmd.extend(["-e", f"{var_name}={var_value}"])
 
                 # Mount temp script into container at unique path (read-only for security)
                 docker_cmd.extend(["-v", f"{script_path}:{container_script_path}:ro"])
@@ -223,6 +436,214 @@ class DockerManager:
                 f"Failed to create temporary script for Docker execution: {e}"
             ) from e
 
+    def _run_in_session(
+        self,
+        session: ContainerSession,
+        cmd: str,
+        working_dir: Path,
+        container_working_dir: str | None,
+        process_runner: ProcessRunner,
+        interpreter: Interpreter,
+        task_env_vars: dict[str, str],
+    ) -> subprocess.CompletedProcess:
+        """
+        Execute command in a container session, with ``docker exec``.
+
+        The script is written to the per-run script directory, which the
+        session's container already mounts. The container's user, mounts and
+        environment carry over from the session; the working directory and the
+        task's own variables are set per exec.
+
+        Raises:
+        DockerError: If the script cannot be written or the command fails
+        """
+        try:
+            with TempScript(
+                logger=self._logger,
+                cmd=cmd,
+                preamble=interpreter.preamble,
+                interpreter=interpreter,
+            ) as script_path:
+                docker_cmd = ["docker", "exec"]
+                if container_working_dir:
+                    docker_cmd.extend(["-w", container_working_dir])
+                for var_name, var_value in task_env_vars.items():
+                    docker_cmd.extend(["-e", f"{var_name}={var_value}"])
+                docker_cmd.append(session.container_id)
+                docker_cmd.extend(
+                    interpreter.invocation
+                    + [f"{session.script_mount}/{script_path.name}"]
+                )
+
+                try:
+                    return process_runner.run(
+                        docker_cmd,
+                        cwd=working_dir,
+                        check=True,
+                        capture_output=False,  # Stream output to terminal
+                    )
+                except subprocess.CalledProcessError as e:
+                    raise DockerError(
+                        f"Docker container execution failed with exit code {e.returncode}"
+                    ) from e
+                finally:
+                    self._logger.trace(
+                        f"Container session {session.container_id[:12]} for runner "
+                        f"'{session.runner_name}': {session.describe_savings()}"
+                    )
+        except OSError as e:
+            raise DockerError(
+                f"Failed to create temporary script for Docker execution: {e}"
+            ) from e
+
+    def _acquire_session(
+        self, env: Runner, image_tag: str, base_flags: list[str]
+    ) -> ContainerSession | None:
+        """
+        Get the container session for a runner's run flags, starting it if
+        need be, and count a task in.
+
+        Returns None when the task needs a container of its own: the runner
+        publishes ports (a long-lived container would hold them), replaces or
+        has an entrypoint (tasks would no longer run through it), or the
+        session could not be started.
+        """
+        if env.ports or any(
+            arg == "--entrypoint" or arg.startswith("--entrypoint=")
+            for arg in env.args.run
+        ):
+            return None
+        key = (env.name, image_tag, *base_flags)
+        with self._session_lock:
+            if key not in self._sessions:
+                self._sessions[key] = self._start_session(env, image_tag, base_flags)
+            session = self._sessions[key]
+            if session is not None:
+                session.tasks_run += 1
+                session.in_flight += 1
+            return session
+
+    def _release_session(self, session: ContainerSession) -> None:
+        """Count a task out of a session, stopping it if it was retired."""
+        with self._session_lock:
+            session.in_flight -= 1
+            stop = session.retired and session.in_flight == 0
+        if stop:
+            self._stop_session(session)
+
+    def _start_session(
+        self, env: Runner, image_tag: str, base_flags: list[str]
+    ) -> ContainerSession | None:
+        """
+        Start a container session with the runner's run flags.
+
+        Returns:
+        The session, or None if the image has an entrypoint or the container
+        could not be started
+        """
+        try:
+            info = self._engine_image_info(image_tag)
+            if info is not None:
+                entrypoint = json.dumps((info.get("Config") or {}).get("Entrypoint"))
+            else:
+                entrypoint = subprocess.run(
+                    ["docker", "inspect", "--format", "{{json .Config.Entrypoint}}", image_tag],
+                    check=True,
+                    capture_output=True,
+                    text=True,
+                ).stdout.strip()
+        except (subprocess.CalledProcessError, OSError, DockerError) as e:
+            self._logger.debug(f"Not using a container session for runner '{env.name}': {e}")
+            return None
+        if entrypoint not in ("null", "[]", ""):
+            self._logger.debug(
+                f"Not using a container session for runner '{env.name}': "
+                f"image '{image_tag}' has an entrypoint"
+            )
+            return None
+
+        script_mount = f"/tmp/tt-scripts-{uuid.uuid4()}"
+        docker_cmd = (
+            ["docker", "run", "--detach", "--rm", "--init"]
+            + base_flags
+            + ["-v", f"{script_dir()}:{script_mount}:ro", image_tag]
+            + _SESSION_KEEPALIVE
+        )
+        start = time.monotonic()
+        try:
+            result = subprocess.run(
+                docker_cmd, check=True, capture_output=True, text=True
+            )
+        except (subprocess.CalledProcessError, OSError) as e:
+            detail = getattr(e, "stderr", None) or e
+            self._logger.debug(
+                f"Could not start a container session for runner '{env.name}' "
+                f"({str(detail).strip()}); running its tasks in containers of their own"
+            )
+            return None
+        session = ContainerSession(
+            container_id=result.stdout.strip(),
+            runner_name=env.name,
+            script_mount=script_mount,
+            startup_seconds=time.monotonic() - start,
+        )
+        self._logger.debug(
+            f"Started container session {session.container_id[:12]} for runner "
+            f"'{env.name}' in {session.startup_seconds:.2f}s"
+        )
+        return session
+
+    def close_sessions(self, runner_name: str | None = None) -> None:
+        """
+        Stop container sessions once their in-flight tasks have finished.
+
+        Later tasks of the runner start a new session.
+
+        Args:
+        runner_name: Only close this runner's sessions (default: all of them)
+        """
+        with self._session_lock:
+            idle = []
+            for key, session in list(self._sessions.items()):
+                if runner_name is not None and key[0] != runner_name:
+                    continue
+                del self._sessions[key]
+                if session is None:
+                    continue
+                session.retired = True
+                if session.in_flight == 0:
+                    idle.append(session)
+        for session in idle:
+            self._stop_session(session)
+
+    def _stop_session(self, session: ContainerSession) -> None:
+        """Remove a session's container, killing anything still running in it."""
+        try:
+            self._remove_container(session.container_id)
+        except (OSError, DockerEngineError) as e:
+            self._logger.warn(
+                f"Failed to remove container {session.container_id[:12]}: {e}"
+            )
+        self._logger.trace(
+            f"Closed container session {session.container_id[:12]} for runner "
+            f"'{session.runner_name}': {session.describe_savings()}"
+        )
+
+    def _remove_container(self, container_id: str) -> None:
+        """docker rm --force, through the engine when there is one."""
+        engine = self._active_engine()
+        if engine is not None:
+            try:
+                engine.remove_container(container_id, force=True)
+                return
+            except ENGINE_UNAVAILABLE as e:
+                self._drop_engine(e)
+        subprocess.run(
+            ["docker", "rm", "--force", container_id],
+            check=False,
+            capture_output=True,
+        )
+
     def _base_run_flags(self, env: Runner) -> list[str]:
         """
         Build the docker run flags shared by task execution and freshness probing.
@@ -298,6 +719,116 @@ class DockerManager:
                 f"Docker freshness probe failed with exit code {e.returncode}: {e.stderr}"
             ) from e
 
+    def stream_in_container(
+        self, env: Runner, argv: list[str], process_runner: ProcessRunner
+    ) -> Iterator[str]:
+        """
+        Run a command inside the container and yield its stdout line by line.
+
+        Like capture_in_container (same image and mounts), but the output is
+        consumed as the command produces it, so a long listing is parsed while
+        it is still being written and is never held in memory whole.
+
+        Args:
+            env: Runner definition
+            argv: Command (and args) to run in the container
+            process_runner: ProcessRunner used to build the image if needed
+
+        Yields:
+            Each line of the command's stdout, without its line ending.
+
+        Raises:
+            DockerError: If the docker command fails (once the output is read).
+        """
+        image_tag, _ = self.ensure_image_built(env, process_runner)
+        docker_cmd = (
+            ["docker", "run", "--rm"]
+            + self._base_run_flags(env)
+            + [image_tag]
+            + list(argv)
+        )
+        # stderr goes to a file, so a chatty command cannot block on a full pipe
+        with tempfile.TemporaryFile() as stderr:
+            process = subprocess.Popen(
+                docker_cmd,
+                stdout=subprocess.PIPE,
+                stderr=stderr,
+                text=True,
+                errors="surrogateescape",
+            )
+            try:
+                for line in process.stdout:
+                    yield line.rstrip("\n")
+            finally:
+                process.stdout.close()
+                if process.poll() is None:
+                    process.kill()
+                returncode = process.wait()
+            if returncode != 0:
+                stderr.seek(0)
+                raise DockerError(
+                    f"Docker freshness probe failed with exit code {returncode}: "
+                    f"{stderr.read().decode(errors='replace')}"
+                )
+
+    def host_mirror(self, env: Runner, path: Path) -> Path | None:
+        """
+        Find the directory around ``path`` that the runner's containers see
+        exactly as the host does.
+
+        That is the case when the mount serving ``path`` in the container
+        bind-mounts a host directory at its own path (as the automatic
+        project-root mount does) and no other mount inside it maps a
+        different host directory. Everything under the returned directory then
+        has the same path, content and mtimes in the container as on the host.
+
+        Args:
+            env: Runner definition (built-in variables already substituted)
+            path: Host path to look up
+
+        Returns:
+            The mirrored directory (a host path, also valid in the container),
+            or None if the container's view of ``path`` may differ
+        """
+        if platform.system() == "Windows":
+            return None
+        path = PurePosixPath(path.resolve().as_posix())
+        mounts = self._volume_mounts(env)
+        serving = [
+            (host, container)
+            for host, container in mounts
+            if path.is_relative_to(container)
+        ]
+        if not serving:
+            return None
+        host, mirror = max(serving, key=lambda mount: len(mount[1].parts))
+        if host != mirror:
+            return None
+        for host, container in mounts:
+            if container.is_relative_to(mirror) and host != container:
+                return None
+        return Path(mirror)
+
+    def _volume_mounts(self, env: Runner) -> list[tuple[PurePosixPath, PurePosixPath]]:
+        """
+        The bind mounts _base_run_flags gives a runner's containers, as
+        (resolved host path, container path) pairs.
+        """
+        mounts = []
+        if not self._project_root_is_mounted(env.volumes):
+            root = PurePosixPath(self._project_root.resolve().as_posix())
+            mounts.append((root, root))
+        for volume in env.volumes:
+            host_path, container_path = self._resolve_volume_mount(volume).split(":", 1)
+            # Drop a mode suffix such as ":ro"
+            container_path = container_path.split(":", 1)[0]
+            try:
+                host = PurePosixPath(Path(host_path).resolve().as_posix())
+            except OSError:
+                host = PurePosixPath(host_path)
+            mounts.append((host, PurePosixPath(container_path)))
+        return mounts
+
     def _project_root_is_mounted(self, volumes: list[str]) -> bool:
         """
         Check whether any volume already bind-mounts the project root.
@@ -357,6 +888,57 @@ class DockerManager:
 
         return f"{host_path}:{container_path}"
 
+    def _active_engine(self) -> DockerEngineClient | None:
+        """
+        The engine client, if in use; the daemon is pinged the first time.
+        """
+        with self._engine_lock:
+            engine = self._engine
+            if engine is None or self._engine_checked:
+                return engine
+            self._engine_checked = True
+        if engine.ping():
+            self._logger.debug(f"Using the Docker Engine API on {engine.socket_path}")
+            return engine
+        self._drop_engine(f"no daemon answers on {engine.socket_path}")
+        return None
+
+    def _drop_engine(self, reason: object) -> None:
+        """Stop using the engine client: the docker CLI is used from now on."""
+        with self._engine_lock:
+            engine, self._engine = self._engine, None
+        if engine is not None:
+            self._logger.debug(
+                f"Not using the Docker Engine API ({reason}); using the docker CLI"
+            )
+
+    def _engine_image_info(self, image_tag: str) -> dict[str, Any] | None:
+        """
+        An image's inspect document, from the engine.
+
+        Each image is inspected once: its ID, content fingerprint and entrypoint
+        all come from the one document.
+
+        Returns:
+        The document, or None if the docker CLI is to be asked instead
+
+        Raises:
+        DockerError: If the daemon cannot inspect the image
+        """
+        info = self._image_info.get(image_tag)
+        engine = self._active_engine()
+        if info is not None or engine is None:
+            return info
+        try:
+            info = engine.inspect_image(image_tag)
+        except DockerEngineError as e:
+            raise DockerError(f"Failed to inspect image {image_tag}: {e}") from e
+        except ENGINE_UNAVAILABLE as e:
+            self._drop_engine(e)
+            return None
+        self._image_info[image_tag] = info
+        return info
+
     @staticmethod
     def _check_docker_available() -> None:
         """
@@ -397,8 +979,7 @@ class DockerManager:
         except subprocess.CalledProcessError as e:
             raise DockerError(f"Failed to inspect image {image_tag}: {e.stderr}")
 
-    @staticmethod
-    def image_content_fingerprint(image_tag: str) -> str:
+    def image_content_fingerprint(self, image_tag: str) -> str:
         """
         Return a content fingerprint for a built image.
 
@@ -418,6 +999,12 @@ class DockerManager:
         Raises:
             DockerError: If the image cannot be inspected.
         """
+        info = self._engine_image_info(image_tag)
+        if info is not None:
+            # As the CLI's {{json .RootFS.Layers}} prints it, so fingerprints
+            # recorded by either backend compare equal
+            layers = (info.get("RootFS") or {}).get("Layers")
+            return json.dumps(layers, separators=(",", ":"))
         try:
             result = subprocess.run(
                 ["docker", "inspect", "--format", "{{json .RootFS.Layers}}", image_tag],
@@ -0,0 +1,225 @@
+"""Docker Engine API client, over the daemon's Unix socket.
+
+Every ``docker`` CLI call starts the Go client, which costs 50-150 ms before
+the daemon does any work. With ``TT_DOCKER_API=1`` in the environment,
+DockerManager sends its control calls (the availability check, image
+inspection, removing session containers) to the Engine API instead: HTTP over
+``/var/run/docker.sock``, or the ``unix://`` socket in ``DOCKER_HOST``, on one
+kept-alive connection per thread.
+
+Image builds and task containers still go through the CLI: they run under the
+process runners (output, timeouts, --fail-fast), with the runner's
+``docker build`` and ``docker run`` flags passed as they are.
+
+Where the socket cannot be used (another DOCKER_HOST scheme, a non-default
+Docker context, Windows named pipes, or no daemon listening), DockerManager
+falls back to the CLI.
+"""
+
+from __future__ import annotations
+
+import http.client
+import json
+import os
+import socket
+import threading
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Any
+from urllib.parse import quote
+
+__all__ = [
+    "DEFAULT_SOCKET",
+    "ENGINE_API_ENV_VAR",
+    "ENGINE_UNAVAILABLE",
+    "DockerEngineClient",
+    "DockerEngineError",
+    "socket_path_from_environment",
+]
+
+# Set to 1 to use the Engine API
+ENGINE_API_ENV_VAR = "TT_DOCKER_API"
+
+DEFAULT_SOCKET = "/var/run/docker.sock"
+
+# Transport failures, after which the CLI is used instead
+ENGINE_UNAVAILABLE = (OSError, http.client.HTTPException)
+
+
+class DockerEngineError(Exception):
+    """
+    An error response from the Docker Engine API.
+    """
+
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(f"{message} (HTTP {status})")
+        self.status = status
+
+
+def socket_path_from_environment(environ: Mapping[str, str]) -> str | None:
+    """
+    The daemon socket the docker CLI would talk to, if it is a Unix socket.
+
+    Args:
+        environ: Environment to read DOCKER_HOST, DOCKER_CONTEXT and
+            DOCKER_CONFIG from
+
+    Returns:
+        The socket's path, or None if the CLI would use another transport
+    """
+    if os.name != "posix":
+        return None
+    host = environ.get("DOCKER_HOST", "")
+    if host:
+        return host[len("unix://") :] if host.startswith("unix://") else None
+    if environ.get("DOCKER_CONTEXT", "default") != "default":
+        return None
+    config_dir = environ.get("DOCKER_CONFIG") or Path.home() / ".docker"
+    try:
+        config = json.loads((Path(config_dir) / "config.json").read_text())
+    except (OSError, ValueError):
+        config = {}
+    if (
+        isinstance(config, dict)
+        and config.get("currentContext", "default") != "default"
+    ):
+        return None
+    return DEFAULT_SOCKET
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    """An HTTP connection over a Unix socket."""
+
+    def __init__(self, socket_path: str, timeout: float) -> None:
+        super().__init__("localhost", timeout=timeout)
+        self._socket_path = socket_path
+
+    def connect(self) -> None:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self._socket_path)
+        except OSError:
+            sock.close()
+            raise
+        self.sock = sock
+
+
+class DockerEngineClient:
+    """
+    A client for the Docker Engine API on a Unix socket.
+
+    Each thread keeps its own connection open between requests.
+
+    Raises (from every request):
+        DockerEngineError: If the daemon answers with an error
+        OSError, http.client.HTTPException: If it cannot be reached
+    """
+
+    def __init__(self, socket_path: str, timeout: float = 60.0) -> None:
+        self.socket_path = socket_path
+        self._timeout = timeout
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections: list[_UnixHTTPConnection] = []
+
+    @classmethod
+    def from_environment(
+        cls, environ: Mapping[str, str] | None = None
+    ) -> DockerEngineClient | None:
+        """
+        A client for the daemon the docker CLI would use, if TT_DOCKER_API=1.
+
+        Args:
+            environ: Environment to read (default: os.environ)
+
+        Returns:
+            The client, or None if the CLI is to be used
+        """
+        environ = os.environ if environ is None else environ
+        if environ.get(ENGINE_API_ENV_VAR, "").strip() != "1":
+            return None
+        socket_path = socket_path_from_environment(environ)
+        return cls(socket_path) if socket_path else None
+
+    def ping(self) -> bool:
+        """Whether the daemon is listening and answering."""
+        try:
+            status, _ = self._request("GET", "/_ping")
+        except ENGINE_UNAVAILABLE:
+            return False
+        return status == 200
+
+    def inspect_image(self, image: str) -> dict[str, Any]:
+        """
+        An image's inspect document, as ``docker image inspect`` prints it.
+
+        Args:
+            image: Image reference (e.g. "tt-env-builder", "python:3.11")
+
+        Returns:
+            The document (Id, Config, RootFS, ...)
+        """
+        return self._json("GET", f"/images/{quote(image, safe='/:@')}/json")
+
+    def remove_container(self, container_id: str, force: bool = False) -> None:
+        """
+        Remove a container, like ``docker rm``; one already gone is ignored.
+
+        Args:
+            container_id: Container ID or name
+            force: Kill the container first if it is running
+        """
+        path = f"/containers/{quote(container_id, safe='')}"
+        status, body = self._request("DELETE", path + ("?force=1" if force else ""))
+        if status >= 400 and status != 404:
+            raise DockerEngineError(status, _error_message(body))
+
+    def close(self) -> None:
+        """Close every thread's connection."""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for connection in connections:
+            connection.close()
+
+    def _connection(self) -> _UnixHTTPConnection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = _UnixHTTPConnection(self.socket_path, self._timeout)
+            self._local.connection = connection
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    def _request(self, method: str, path: str) -> tuple[int, bytes]:
+        """Send a request and read the whole response."""
+        connection = self._connection()
+        try:
+            return _send(connection, method, path)
+        except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+            # The daemon closed the kept-alive connection since its last use;
+            # every request sent here is safe to send again
+            connection.close()
+            return _send(connection, method, path)
+
+    def _json(self, method: str, path: str) -> Any:
+        status, body = self._request(method, path)
+        if status >= 400:
+            raise DockerEngineError(status, _error_message(body))
+        return json.loads(body)
+
+
+def _send(
+    connection: http.client.HTTPConnection, method: str, path: str
+) -> tuple[int, bytes]:
+    connection.request(method, path)
+    response = connection.getresponse()
+    return response.status, response.read()
+
+
+def _error_message(body: bytes) -> str:
+    """The message of an Engine API error response."""
+    try:
+        return str(json.loads(body)["message"])
+    except (ValueError, KeyError, TypeError):
+        return body.decode(errors="replace").strip() or "no message"
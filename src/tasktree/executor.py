@@ -2,24 +2,28 @@
 
 from __future__ import annotations
 
+import contextlib
+import functools
 import io
 import os
 import platform
 import shlex
 import subprocess
 import sys
+import threading
 import time
+from collections import Counter
+from collections.abc import Iterator
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Callable
+from typing import TYPE_CHECKING, Any, Callable
 
-from tasktree import docker as docker_module
 from tasktree.config import ConfigError
 from tasktree.freshness import FreshnessProbe, HostProbe, RunnerProbe
 from tasktree.graph import (
     get_implicit_inputs,
-    resolve_execution_order,
+    resolve_execution_graph,
     resolve_dependency_output_references,
     resolve_self_references,
 )
@@ -27,10 +31,29 @@ from tasktree.hasher import hash_args, hash_task, make_cache_key
 from tasktree.logging import Logger, LogLevel
 from tasktree.parser import DockerArgs, Recipe, Task, Runner, HostRunner, ContainerisedRunner, platform_default_interpreter, container_default_interpreter
 from tasktree.interpreter import Interpreter
-from tasktree.process_runner import ProcessRunner, TaskOutputTypes
+from tasktree.jobserver import MAKEFLAGS_ENV_VAR, JobServer, JobTokens
+from tasktree.output_mux import OutputMode, OutputMultiplexer, RunLogs
+from tasktree.process_runner import (
+    MultiplexedProcessRunner,
+    ProcessGroups,
+    ProcessRunner,
+    TaskOutputTypes,
+)
+from tasktree.scheduler import (
+    AutoJobs,
+    ResourceBudget,
+    SchedulerNode,
+    TaskFailures,
+    TaskScheduler,
+)
+from tasktree.resource_usage import ResourceUsage
 from tasktree.state import StateManager, TaskState
 from tasktree.hasher import hash_runner_definition
-from tasktree.temp_script import TempScript
+from tasktree.python_worker import PythonWorkerPool
+from tasktree.temp_script import TempScript, script_content
+
+if TYPE_CHECKING:
+    from tasktree.docker import DockerManager
 
 
 def _supports_fileno(stream) -> bool:
@@ -81,6 +104,8 @@ class TaskStatus:
     # "never_run", "no_inputs", "outputs_missing", "forced", "environment_changed"
     changed_files: list[str] = field(default_factory=list)
     last_run: datetime | None = None
+    # Resources the task's processes used, if it ran and they are known
+    usage: ResourceUsage | None = None
 
 
 class ExecutionError(Exception):
@@ -99,6 +124,9 @@ class Executor:
     # Environment variable for tracking task call chain (recursion detection)
     TT_CALL_CHAIN_ENV_VAR = "TT_CALL_CHAIN"
 
+    # Seconds between SIGTERM and SIGKILL when --fail-fast stops in-flight tasks
+    FAIL_FAST_GRACE_PERIOD = 5.0
+
     # Protected environment variables that cannot be overridden by exported args
     PROTECTED_ENV_VARS = {
         "PATH",
@@ -131,7 +159,37 @@ class Executor:
         self.state = state_manager
         self.logger = logger
         self._process_runner_factory = process_runner_factory
-        self.docker_manager = docker_module.DockerManager(recipe.project_root, logger)
+        # Created on first use (see docker_manager), so that runs on the host
+        # do not import the Docker support
+        self._docker_manager: DockerManager | None = None
+        self._docker_manager_lock = threading.Lock()
+        # Guards the state manager when several tasks run concurrently
+        self._state_lock = threading.Lock()
+        # Jobserver pool for the current run (inherited or our own), advertised
+        # to task subprocesses via MAKEFLAGS; _jobserver is set only if we own it
+        self._job_tokens: JobTokens | None = None
+        self._jobserver: JobServer | None = None
+        # Warm workers for persistent interpreters, started on first use
+        self._python_workers = PythonWorkerPool(logger)
+
+    @property
+    def docker_manager(self) -> DockerManager:
+        """The run's Docker manager, created when a task first needs it."""
+        with self._docker_manager_lock:
+            if self._docker_manager is None:
+                from tasktree.docker import DockerManager
+                from tasktree.docker_engine import DockerEngineClient
+
+                self._docker_manager = DockerManager(
+                    self.recipe.project_root,
+                    self.logger,
+                    engine=DockerEngineClient.from_environment(),
+                )
+            return self._docker_manager
+
+    @docker_manager.setter
+    def docker_manager(self, manager: DockerManager) -> None:
+        self._docker_manager = manager
 
     @staticmethod
     def _has_regular_args(task: Task) -> bool:
@@ -306,6 +364,10 @@ class Executor:
         if call_chain is not None:
             env[self.TT_CALL_CHAIN_ENV_VAR] = call_chain
 
+        # Share the job slots with make, cargo and nested tt
+        if self._job_tokens is not None:
+            env[MAKEFLAGS_ENV_VAR] = self._job_tokens.makeflags(env.get(MAKEFLAGS_ENV_VAR))
+
         return env
 
     def _try_load_config(
@@ -466,6 +528,18 @@ class Executor:
         # Return session default runner name
         return self.get_session_default_runner().name
 
+    def _declared_runner_name(self, task: Task) -> str | None:
+        """
+        The runner named for a task by --runner, its run_in or the recipe
+        default, without falling back to the session default runner.
+        """
+        return (
+            self.recipe.global_runner_override
+            or task.run_in
+            or self.recipe.default_runner
+            or None
+        )
+
     def _resolve_interpreter(self, task: Task) -> Interpreter:
         """
         Resolve the Interpreter used to run a task's command.
@@ -658,6 +732,9 @@ class Executor:
     ) -> TaskOutputTypes:
         if user_inputted_value is None:
             if task.task_output is not None:
+                # A recipe's task_output arrives as the YAML string
+                if isinstance(task.task_output, str):
+                    return TaskOutputTypes(task.task_output.lower())
                 return task.task_output
 
             return TaskOutputTypes.ALL
@@ -671,6 +748,11 @@ class Executor:
         args_dict: dict[str, Any] | None = None,
         force: bool = False,
         only: bool = False,
+        jobs: int | AutoJobs = 1,
+        keep_going: bool = False,
+        fail_fast: bool = False,
+        output_mode: OutputMode | None = None,
+        max_concurrent_builds: int = 4,
     ) -> dict[str, TaskStatus]:
         """
         Execute a task and its dependencies.
@@ -681,13 +763,24 @@ class Executor:
         args_dict: Arguments to pass to the task
         force: If True, ignore freshness and re-run all tasks
         only: If True, run only the specified task without dependencies (implies force=True)
+        jobs: Maximum number of tasks to run concurrently, or AutoJobs to adapt it to system pressure
+        keep_going: If True, keep running every task whose dependencies succeeded after a failure
+        fail_fast: If True, terminate in-flight tasks as soon as one fails
+        output_mode: How to multiplex task output. Defaults to interleaved when
+        more than one job may run, and to direct terminal output otherwise
+        max_concurrent_builds: Most Docker images to build at once. Every
+        runner image the run needs starts building before the first task runs
 
         Returns:
         Dictionary of task names to their execution status
 
         Raises:
-        ExecutionError: If task execution fails
+        ExecutionError: If task execution fails (in keep-going mode, after
+        everything runnable has run, with a summary of all failures)
         """
+        if keep_going and fail_fast:
+            raise ValueError("keep_going and fail_fast are mutually exclusive")
+
         if args_dict is None:
             args_dict = {}
 
@@ -699,10 +792,13 @@ class Executor:
         if only:
             # Only execute the target task, skip dependencies
             execution_order = [(task_name, args_dict)]
+            dependencies: dict[int, set[int]] = {0: set()}
             self.logger.debug(f"Skipping dependencies (--only mode)")
         else:
             # Execute task and all dependencies
-            execution_order = resolve_execution_order(self.recipe, task_name, args_dict)
+            execution_order, dependencies = resolve_execution_graph(
+                self.recipe, task_name, args_dict
+            )
             task_names = [name for name, _ in execution_order]
             self.logger.debug(f"Execution order: {' -> '.join(task_names)}")
 
@@ -714,61 +810,292 @@ class Executor:
         # This substitutes {{ self.inputs.* }} and {{ self.outputs.* }} templates
         resolve_self_references(self.recipe, execution_order)
 
-        # Single phase: Check and execute incrementally
-        statuses: dict[str, TaskStatus] = {}
-        for name, task_args in execution_order:
+        # Check and execute incrementally, each task as soon as its dependencies
+        # have completed and the scheduler can admit it
+        statuses_by_index: dict[int, tuple[str, TaskStatus]] = {}
+
+        # With --fail-fast, task processes run in their own process groups so
+        # the whole tree under each in-flight task can be stopped at once
+        process_groups = ProcessGroups() if fail_fast else None
+
+        def stop_in_flight_tasks() -> None:
+            self.logger.debug("Fail-fast: stopping in-flight tasks")
+            process_groups.terminate_all(self.FAIL_FAST_GRACE_PERIOD, self.logger)
+
+        # Concurrent tasks' output goes through the multiplexer, which keeps
+        # lines whole and logs every task's output under .tasktree/logs
+        if output_mode is None and jobs != 1:
+            output_mode = OutputMode.INTERLEAVED
+        multiplexer = (
+            OutputMultiplexer(
+                output_mode, RunLogs.create(self.recipe.project_root), self.logger
+            )
+            if output_mode is not None
+            else None
+        )
+
+        # Tasks left to finish per runner: a runner's container session is
+        # closed once its last task has run
+        runner_tasks_left = Counter(
+            self._declared_runner_name(self.recipe.tasks[name])
+            for name, _ in execution_order
+        )
+        runner_tasks_lock = threading.Lock()
+
+        def finish_runner_task(task: Task) -> None:
+            runner_name = self._declared_runner_name(task)
+            with runner_tasks_lock:
+                runner_tasks_left[runner_name] -= 1
+                last = runner_tasks_left[runner_name] == 0
+            if last and runner_name and self._docker_manager is not None:
+                self._docker_manager.close_sessions(runner_name)
+
+        def run_invocation(index: int) -> None:
+            name, task_args = execution_order[index]
             task = self.recipe.tasks[name]
+            try:
+                run_task_invocation(index, name, task, task_args)
+            finally:
+                finish_runner_task(task)
 
+        def run_task_invocation(
+            index: int, name: str, task: Task, task_args: dict[str, Any] | None
+        ) -> None:
             # Convert None to {} for internal use (None is used to distinguish simple deps in graph)
             args_dict_for_execution = task_args if task_args is not None else {}
 
-            process_runner = self._process_runner_factory(
-                self._get_task_output_type(user_inputted_task_output_types, task),
+            output_type = self._get_task_output_type(user_inputted_task_output_types, task)
+            if multiplexer is not None:
+                output = multiplexer.open(name, output_type)
+                process_runner = MultiplexedProcessRunner(
+                    self.logger, output.stdout, output.stderr
+                )
+            else:
+                output = None
+                process_runner = self._process_runner_factory(output_type, self.logger)
+            if process_groups is not None:
+                process_runner.process_groups = process_groups
+
+            try:
+                # Check if task needs to run (based on CURRENT filesystem state)
+                status = self.check_task_status(
+                    task, args_dict_for_execution, process_runner, force=force
+                )
+                status_key = self._status_key(
+                    task, args_dict_for_execution, is_root_task=name == task_name
+                )
+                statuses_by_index[index] = (status_key, status)
+
+                # Execute immediately if needed
+                if status.will_run:
+                    # Warn if re-running due to missing outputs
+                    if status.reason == "outputs_missing":
+                        self.logger.log(
+                            LogLevel.WARN,
+                            f"Warning: Re-running task '{name}' because declared outputs are missing",
+                        )
+
+                    if output is not None:
+                        output.start()
+                    # Only count what the task itself runs, not the status checks
+                    process_runner.usage = None
+                    self._run_task(task, args_dict_for_execution, process_runner)
+                    status.usage = self._usage_of(process_runner)
+                    if status.usage is not None:
+                        self.logger.debug(
+                            f"Task '{name}' used: {status.usage.describe()}"
+                        )
+            except BaseException:
+                if output is not None:
+                    output.close(failed=True)
+                raise
+            if output is not None:
+                output.close(failed=False)
+
+        nodes = [
+            SchedulerNode(
+                label=name,
+                request=self.recipe.tasks[name].resources,
+                deps=dependencies[index],
+            )
+            for index, (name, _) in enumerate(execution_order)
+        ]
+        self._open_jobserver(jobs)
+        try:
+            scheduler = TaskScheduler(
+                jobs,
+                ResourceBudget.for_host(self.recipe.pools),
                 self.logger,
+                tokens=self._job_tokens,
+                keep_going=keep_going,
+                on_abort=stop_in_flight_tasks if process_groups else None,
             )
+            with multiplexer or contextlib.nullcontext():
+                self._start_image_builds(
+                    execution_order,
+                    user_inputted_task_output_types,
+                    multiplexer,
+                    max_concurrent_builds,
+                )
+                scheduler.run(nodes, run_invocation)
+        except TaskFailures as e:
+            raise ExecutionError(self._summarise_failures(e, execution_order)) from None
+        finally:
+            if self._docker_manager is not None:
+                self._docker_manager.cancel_builds()
+            self._close_jobserver()
+            self._python_workers.close()
+            if self._docker_manager is not None:
+                self._docker_manager.close_sessions()
+
+        # Report statuses in execution order, however the tasks were interleaved
+        return dict(statuses_by_index[index] for index in sorted(statuses_by_index))
+
+    def _start_image_builds(
+        self,
+        execution_order: list[tuple[str, dict[str, Any] | None]],
+        user_inputted_task_output_types: TaskOutputTypes | None,
+        multiplexer: OutputMultiplexer | None,
+        max_concurrent_builds: int,
+    ) -> None:
+        """
+        Start building the image of every Docker runner the run's tasks use.
 
-            # Check if task needs to run (based on CURRENT filesystem state)
-            status = self.check_task_status(
-                task, args_dict_for_execution, process_runner, force=force
-            )
+        The builds run in the background, so tasks on the host (and tasks of
+        runners already built) need not wait behind them; a task needing an
+        image waits for its build in ensure_image_built. Build output goes
+        through the multiplexer, as "image:<runner>", when there is one.
+        Otherwise tasks write straight to the terminal, so a build's output
+        is only shown if it fails (its stderr, under an "image:<runner>"
+        header).
+        """
+        runners: dict[str, tuple[Runner, TaskOutputTypes]] = {}
+        for name, _ in execution_order:
+            task = self.recipe.tasks[name]
+            try:
+                env = self._docker_env_for_top_level_task(task)
+            except ValueError:
+                # Reported when the task itself runs
+                continue
+            if env is not None and env.name not in runners:
+                runners[env.name] = (
+                    env,
+                    self._get_task_output_type(user_inputted_task_output_types, task),
+                )
+        if not runners:
+            return
 
-            # Use a key that includes args for status tracking
-            # Only include regular (non-exported) args in status key for parameterized dependencies
-            # For the root task (invoked from CLI), status key is always just the task name
-            # For dependencies with parameterized invocations, include the regular args
-            is_root_task = name == task_name
-            if (
-                not is_root_task
-                and args_dict_for_execution
-                and self._has_regular_args(task)
-            ):
-                import json
+        @contextlib.contextmanager
+        def build_output(
+            env: Runner, output_type: TaskOutputTypes
+        ) -> Iterator[ProcessRunner]:
+            if multiplexer is None:
+                process_runner = self._process_runner_factory(
+                    (
+                        TaskOutputTypes.NONE
+                        if output_type is TaskOutputTypes.NONE
+                        else TaskOutputTypes.ON_ERR
+                    ),
+                    self.logger,
+                )
+                process_runner.failure_header = f"==> image:{env.name} <=="
+                yield process_runner
+                return
+            output = multiplexer.open(f"image:{env.name}", output_type)
+            output.start()
+            failed = True
+            try:
+                yield MultiplexedProcessRunner(self.logger, output.stdout, output.stderr)
+                failed = False
+            finally:
+                output.close(failed=failed)
 
-                # Filter to only include regular (non-exported) args
-                regular_args = self._filter_regular_args(task, args_dict_for_execution)
-                if regular_args:
-                    args_str = json.dumps(
-                        regular_args, sort_keys=True, separators=(",", ":")
-                    )
-                    status_key = f"{name}({args_str})"
-                else:
-                    status_key = name
-            else:
-                status_key = name
-            statuses[status_key] = status
-
-            # Execute immediately if needed
-            if status.will_run:
-                # Warn if re-running due to missing outputs
-                if status.reason == "outputs_missing":
-                    self.logger.log(
-                        LogLevel.WARN,
-                        f"Warning: Re-running task '{name}' because declared outputs are missing",
-                    )
+        self.docker_manager.start_builds(
+            [
+                (env, functools.partial(build_output, env, output_type))
+                for env, output_type in runners.values()
+            ],
+            max_concurrent_builds,
+        )
+
+    @staticmethod
+    def _summarise_failures(
+        failures: TaskFailures, execution_order: list[tuple[str, dict[str, Any] | None]]
+    ) -> str:
+        """
+        Summary of a keep-going run: every failure, then the tasks skipped
+        because of them.
+        """
+        lines = [f"{len(failures.failures)} task(s) failed:"]
+        for index, error in failures.failures:
+            lines.append(f"  - {execution_order[index][0]}: {error}")
+        if failures.skipped:
+            skipped = ", ".join(execution_order[index][0] for index in failures.skipped)
+            lines.append(f"Skipped because a dependency failed: {skipped}")
+        return "\n".join(lines)
+
+    def _open_jobserver(self, jobs: int | AutoJobs) -> None:
+        """
+        Join an inherited jobserver, or start one for a parallel top-level run.
+
+        A jobserver advertised in MAKEFLAGS (by a parent tt or make) is always
+        joined, so a nested tt takes its extra slots from the parent's pool
+        instead of adding its own. Otherwise, when more than one job may run,
+        a new jobserver is started. Either way the pool is then advertised to
+        host task subprocesses.
+        """
+        self._job_tokens = JobTokens.from_makeflags(
+            os.environ.get(MAKEFLAGS_ENV_VAR), self.logger
+        )
+        if self._job_tokens is not None:
+            return
+
+        slots = jobs.resolved_max() if isinstance(jobs, AutoJobs) else jobs
+        if slots > 1 and JobServer.supported():
+            self._jobserver = JobServer(slots, self.logger)
+            self._job_tokens = self._jobserver.tokens
+
+    def _close_jobserver(self) -> None:
+        """Return held tokens and, if we own the jobserver, remove it."""
+        if self._jobserver is not None:
+            self._jobserver.close()
+        elif self._job_tokens is not None:
+            self._job_tokens.close()
+        self._jobserver = None
+        self._job_tokens = None
+
+    def _spawn_kwargs(self, script_fds: tuple[int, ...] = ()) -> dict[str, Any]:
+        """
+        Extra subprocess arguments so a task inherits its in-memory script and
+        the jobserver descriptors named in MAKEFLAGS (empty when there are
+        neither).
+        """
+        pass_fds = script_fds
+        if self._job_tokens is not None:
+            pass_fds += self._job_tokens.pass_fds
+        return {"pass_fds": pass_fds} if pass_fds else {}
+
+    def _status_key(
+        self, task: Task, args_dict: dict[str, Any], is_root_task: bool
+    ) -> str:
+        """
+        Key under which a task invocation's status is reported.
+
+        Only regular (non-exported) args are included, and only for
+        parameterized dependencies. For the root task (invoked from CLI), the
+        status key is always just the task name.
+        """
+        if is_root_task or not args_dict or not self._has_regular_args(task):
+            return task.name
 
-                self._run_task(task, args_dict_for_execution, process_runner)
+        import json
 
-        return statuses
+        # Filter to only include regular (non-exported) args
+        regular_args = self._filter_regular_args(task, args_dict)
+        if not regular_args:
+            return task.name
+        args_str = json.dumps(regular_args, sort_keys=True, separators=(",", ":"))
+        return f"{task.name}({args_str})"
 
     @staticmethod
     def _parse_call_chain(call_chain: str) -> list[tuple[str, str]]:
@@ -971,7 +1298,8 @@ class Executor:
 
         # Record the state file's hash before execution
         # This allows us to skip re-reading if no nested tt calls modified it
-        initial_state_hash = self.state.get_hash()
+        with self._state_lock:
+            initial_state_hash = self.state.get_hash()
 
         # Parse task arguments to identify exported args
         # Note: args_dict already has defaults applied by CLI (cli.py:413-424)
@@ -1064,9 +1392,10 @@ class Executor:
 
         # Reload state from disk to capture any updates from nested tt calls
         # Only reload if the state file contents have changed since we started
-        current_state_hash = self.state.get_hash()
-        if current_state_hash != initial_state_hash:
-            self.state.load()
+        with self._state_lock:
+            current_state_hash = self.state.get_hash()
+            if current_state_hash != initial_state_hash:
+                self.state.load()
 
         # Update state
         self._update_state(task, args_dict, process_runner)
@@ -1121,6 +1450,8 @@ class Executor:
         This method handles both single-line and multi-line commands by writing
         them to a temporary script file and executing the script. This provides
         consistent behavior and applies the interpreter's preamble to all commands.
+        On Linux the script is kept in memory where the interpreter allows, and
+        passed as /proc/self/fd/N (see temp_script).
 
         The interpreter's invocation is prepended to the script path when
         invoking the subprocess, e.g. ["python"] + ["/tmp/script"] →
@@ -1141,65 +1472,125 @@ class Executor:
         # Prepare environment with exported args and call chain
         env = self._prepare_env_with_exports(exported_env_vars, call_chain)
 
+        worker = (
+            self._python_workers.get(interpreter, env)
+            if interpreter.persistent
+            else None
+        )
+        if worker is not None:
+            # Forked from the interpreter's warm worker: no script file, and
+            # no interpreter start-up. The last argument only names the script.
+            self._run_script_process(
+                interpreter.invocation + [f"<{task_name}>"],
+                cmd,
+                working_dir,
+                task_name,
+                process_runner,
+                env,
+                popen=worker.popen(script_content(cmd, interpreter.preamble)),
+                **self._spawn_kwargs(),
+            )
+            return
+
         # Create temporary script using context manager. The interpreter is passed
         # explicitly in the subprocess call, so no shebang is needed. The script
         # extension is the interpreter's literal ext (empty = no extension).
-        with TempScript(
+        temp_script = TempScript(
             logger=self.logger,
             cmd=cmd,
             preamble=interpreter.preamble,
             interpreter=interpreter,
-        ) as script_path:
-            run_cmd = interpreter.invocation + [str(script_path)]
+            in_memory=True,
+        )
+        with temp_script as script_path:
+            self._run_script_process(
+                interpreter.invocation + [str(script_path)],
+                cmd,
+                working_dir,
+                task_name,
+                process_runner,
+                env,
+                **self._spawn_kwargs(temp_script.pass_fds),
+            )
 
-            # Execute script file
-            try:
-                # If streams support fileno, pass them directly (most efficient).
-                # CliRunner uses StringIO which has fileno() but raises on call,
-                # so capture and write manually in that case.
-                if not (_supports_fileno(sys.stdout) and _supports_fileno(sys.stderr)):
-                    # CliRunner path: capture and write manually
-                    result = process_runner.run(
-                        run_cmd,
-                        cwd=working_dir,
-                        check=True,
-                        capture_output=True,
-                        text=True,
-                        env=env,
-                    )
-                    if result.stdout:
-                        sys.stdout.write(result.stdout)
-                    if result.stderr:
-                        sys.stderr.write(result.stderr)
-                else:
-                    process_runner.run(
-                        run_cmd,
-                        cwd=working_dir,
-                        check=True,
-                        stdout=sys.stdout,
-                        stderr=sys.stderr,
-                        env=env,
-                    )
-            except FileNotFoundError as e:
-                # Check if this is a containerized environment
-                # Note: Only proceed if the variable is set AND non-empty
-                current_containerized_runner = os.environ.get("TT_CONTAINERIZED_RUNNER", "").strip()
-                if current_containerized_runner and ("tt" in cmd or "tasktree" in cmd):
-                    raise ExecutionError(
-                        f"Task '{task_name}' failed: Command not found. "
-                        f"When running nested tasks inside Docker container '{current_containerized_runner}', "
-                        f"the 'tt' binary must be installed in the container image. "
-                        f"Add 'RUN pip install tasktree' to your Dockerfile, or ensure the tasktree package "
-                        f"is available in your container's Python environment."
-                    ) from e
-                else:
-                    raise ExecutionError(
-                        f"Task '{task_name}' failed: Command not found. {e}"
-                    ) from e
-            except subprocess.CalledProcessError as e:
-                raise ExecutionError(
-                    f"Task '{task_name}' failed with exit code {e.returncode}"
+    def _run_script_process(
+        self,
+        run_cmd: list[str],
+        cmd: str,
+        working_dir: Path,
+        task_name: str,
+        process_runner: ProcessRunner,
+        env: dict[str, str],
+        **spawn_kwargs: Any,
+    ) -> None:
+        """
+        Run a task's script process to completion, with its output going to
+        tt's stdout and stderr.
+
+        Args:
+        run_cmd: Interpreter invocation plus script path
+        cmd: The task's command (for error messages)
+        working_dir: Working directory
+        task_name: Task name (for error messages)
+        process_runner: ProcessRunner instance to use for subprocess execution
+        env: Environment for the process
+        **spawn_kwargs: Further arguments for process_runner.run
+
+        Raises:
+        ExecutionError: If command execution fails
+        """
+        try:
+            # If streams support fileno, pass them directly (most efficient).
+            # CliRunner uses StringIO which has fileno() but raises on call,
+            # so capture and write manually in that case.
+            # The multiplexed runner pipes output itself, so it never needs this.
+            if not isinstance(process_runner, MultiplexedProcessRunner) and not (
+                _supports_fileno(sys.stdout) and _supports_fileno(sys.stderr)
+            ):
+                # CliRunner path: capture and write manually
+                result = process_runner.run(
+                    run_cmd,
+                    cwd=working_dir,
+                    check=True,
+                    capture_output=True,
+                    text=True,
+                    env=env,
+                    **spawn_kwargs,
+                )
+                if result.stdout:
+                    sys.stdout.write(result.stdout)
+                if result.stderr:
+                    sys.stderr.write(result.stderr)
+            else:
+                process_runner.run(
+                    run_cmd,
+                    cwd=working_dir,
+                    check=True,
+                    stdout=sys.stdout,
+                    stderr=sys.stderr,
+                    env=env,
+                    **spawn_kwargs,
                 )
+        except FileNotFoundError as e:
+            # Check if this is a containerized environment
+            # Note: Only proceed if the variable is set AND non-empty
+            current_containerized_runner = os.environ.get("TT_CONTAINERIZED_RUNNER", "").strip()
+            if current_containerized_runner and ("tt" in cmd or "tasktree" in cmd):
+                raise ExecutionError(
+                    f"Task '{task_name}' failed: Command not found. "
+                    f"When running nested tasks inside Docker container '{current_containerized_runner}', "
+                    f"the 'tt' binary must be installed in the container image. "
+                    f"Add 'RUN pip install tasktree' to your Dockerfile, or ensure the tasktree package "
+                    f"is available in your container's Python environment."
+                ) from e
+            else:
+                raise ExecutionError(
+                    f"Task '{task_name}' failed: Command not found. {e}"
+                ) from e
+        except subprocess.CalledProcessError as e:
+            raise ExecutionError(
+                f"Task '{task_name}' failed with exit code {e.returncode}"
+            )
 
     def _substitute_builtin_in_runner(
         self, env: Runner, builtin_vars: dict[str, str]
@@ -1347,9 +1738,13 @@ class Executor:
         )
         docker_env_vars["TT_PROJECT_ROOT"] = str(container_project_root)
 
+        # Variables specific to this task are set per task, so that tasks of the
+        # runner can share a container session (see docker.ContainerSession)
+        task_env_vars = {}
+
         # Add call chain for recursion detection
         if call_chain:
-            docker_env_vars[self.TT_CALL_CHAIN_ENV_VAR] = call_chain
+            task_env_vars[self.TT_CALL_CHAIN_ENV_VAR] = call_chain
 
         if exported_env_vars:
             # Check for protected environment variable overrides
@@ -1359,7 +1754,7 @@ class Executor:
                         f"Cannot override protected environment variable: {key}\n"
                         f"Protected variables are: {', '.join(sorted(self.PROTECTED_ENV_VARS))}"
                     )
-            docker_env_vars.update(exported_env_vars)
+            task_env_vars.update(exported_env_vars)
 
         # The state file lives in the project root, which is bind-mounted into the
         # container, so nested `tt` calls read/write the same .tasktree-state with no
@@ -1373,6 +1768,8 @@ class Executor:
 
         modified_env = replace(env, env_vars=docker_env_vars)
 
+        from tasktree.docker import DockerError
+
         # Execute in container
         try:
             self.docker_manager.run_in_container(
@@ -1382,8 +1779,10 @@ class Executor:
                 container_working_dir=container_working_dir,
                 process_runner=process_runner,
                 interpreter=interpreter,
+                task_env_vars=task_env_vars,
+                reuse_container=True,
             )
-        except docker_module.DockerError as e:
+        except DockerError as e:
             raise ExecutionError(str(e)) from e
 
     @staticmethod
@@ -1439,6 +1838,12 @@ class Executor:
         Raises:
         ValueError: If a placeholder cannot be resolved or the template is malformed
         """
+        # Text without template syntax renders as itself: no need for Jinja2
+        if isinstance(text, str) and not any(
+            marker in text for marker in ("{{", "{%", "{#")
+        ):
+            return text
+
         from tasktree.rendering import render
         from tasktree.task_config import build_task_config
 
@@ -1752,7 +2157,9 @@ class Executor:
         """
         task_wd = "" if task.working_dir == "." else task.working_dir
         if env.working_dir:
-            return docker_module.resolve_container_working_dir(env.working_dir, task_wd)
+            from tasktree.docker import resolve_container_working_dir
+
+            return resolve_container_working_dir(env.working_dir, task_wd)
         return str(self._resolve_container_path(host_working_dir, env.volumes or []))
 
     def _freshness_probe(
@@ -1763,18 +2170,27 @@ class Executor:
 
         For a task that will launch its own container (a Docker runner, and we are
         not already executing inside a container), returns a RunnerProbe so the
-        patterns are resolved in the container's filesystem view. Otherwise -- a
-        shell runner, or a nested call already running inside the container where
-        the local filesystem *is* the container -- returns a HostProbe rooted at
-        the task's working directory.
+        patterns are resolved in the container's filesystem view -- unless the
+        container provably sees the task's files at their host paths (see
+        _container_mirrors_host), when probing on the host gives the same answer
+        without starting a container. Otherwise -- a shell runner, or a nested
+        call already running inside the container where the local filesystem
+        *is* the container -- returns a HostProbe rooted at the task's working
+        directory.
         """
         env = self._docker_env_for_top_level_task(task)
         if env is not None:
             host_working_dir = self.recipe.project_root / task.working_dir
             container_dir = self._container_working_dir(task, env, host_working_dir)
+            if self._container_mirrors_host(task, env, host_working_dir, container_dir):
+                self.logger.trace(
+                    f"Probing freshness of '{task.name}' on the host: runner "
+                    f"'{env.name}' mounts its files at their host paths"
+                )
+                return HostProbe(host_working_dir)
 
-            def run(argv: list[str]) -> str:
-                return self.docker_manager.capture_in_container(
+            def run(argv: list[str]) -> Iterator[str]:
+                return self.docker_manager.stream_in_container(
                     env, argv, process_runner
                 )
 
@@ -1782,6 +2198,35 @@ class Executor:
 
         return HostProbe(self.recipe.project_root / task.working_dir)
 
+    def _container_mirrors_host(
+        self,
+        task: Task,
+        env: Runner,
+        host_working_dir: Path,
+        container_dir: str | None,
+    ) -> bool:
+        """
+        Whether a task's container sees its working directory, and everything
+        its input and output patterns can reach, at the host path with the
+        host's content.
+
+        True when the container working directory is the host one, inside a
+        directory the runner's volumes mount at its own path (typically the
+        automatic project-root mount), and no pattern leads out of that
+        directory (an absolute path, or one climbing out with ``..``).
+        """
+        host_dir = host_working_dir.resolve()
+        if container_dir != host_dir.as_posix():
+            return False
+        mirror = self.docker_manager.host_mirror(env, host_dir)
+        if mirror is None:
+            return False
+        patterns = self._get_all_inputs(task) + self._expand_output_paths(task)
+        return all(
+            Path(os.path.normpath(host_dir / pattern)).is_relative_to(mirror)
+            for pattern in patterns
+        )
+
     def _docker_env_for_top_level_task(self, task: Task) -> Runner | None:
         """
         Return the Docker runner for a task that will launch its own container,
@@ -1869,9 +2314,24 @@ class Executor:
             input_state[f"_runner_image_fp_{env_name}"] = fingerprint
 
         output_state = self._output_files_to_modified_times(task, process_runner)
-        new_state = TaskState(last_run=time.time(), input_state=input_state, output_state=output_state)
-        self.state.set(cache_key, new_state)
-        self.state.save()
+        new_state = TaskState(
+            last_run=time.time(),
+            input_state=input_state,
+            output_state=output_state,
+            usage=self._usage_of(process_runner),
+        )
+        with self._state_lock:
+            self.state.set(cache_key, new_state)
+            self.state.save()
+
+    @staticmethod
+    def _usage_of(process_runner: ProcessRunner | None) -> ResourceUsage | None:
+        """
+        Resources used by the processes a runner has run, if it measured them
+        (test doubles don't).
+        """
+        usage = getattr(process_runner, "usage", None)
+        return usage if isinstance(usage, ResourceUsage) else None
 
     def _current_image_fingerprint(
         self, task: Task, process_runner: ProcessRunner | None
@@ -10,15 +10,25 @@ For tasks that run inside a container, the equivalent query must be evaluated in
 the container's filesystem namespace (the runner implementation) so that the
 declared input/output paths are resolved exactly as the task itself sees them --
 otherwise a runner that remaps paths via volumes could make the host-side view
-disagree with reality and cause a stale task to be skipped.
+disagree with reality and cause a stale task to be skipped. When the container
+provably sees the task's files at their host paths (the common case of the
+project root mounted at its own path), the executor uses :class:`HostProbe`
+for container tasks too: it needs no container and has sub-second mtimes and
+``**`` globbing.
 """
 
 from __future__ import annotations
 
+import re
+import sys
 from abc import ABC, abstractmethod
+from collections.abc import Container, Iterable
 from pathlib import Path
 from typing import Callable
 
+# Characters that make a path segment a glob rather than a literal name
+_GLOB_MAGIC = re.compile(r"[*?[]")
+
 
 class FreshnessProbe(ABC):
     """
@@ -72,41 +82,52 @@ class RunnerProbe(FreshnessProbe):
     """
     A :class:`FreshnessProbe` that resolves patterns inside a container.
 
-    It runs a small portable shell snippet in the runner (via an injected
-    callable) that, for each pattern, expands the glob relative to the base
-    directory and prints the matching regular files with their mtimes. This means
-    paths are resolved in the container's filesystem view -- correct even when a
-    runner remaps the working directory to a non-project-root volume.
-
-    Limitations (by design):
-    - Uses the container shell's globbing, which does NOT expand ``**``
-      recursively (``sh`` treats it as a single ``*``).
-    - Mtimes come from ``stat -c %Y`` (whole seconds), so a file rewritten within
-      the same second as the previous capture may not be detected. This is
-      internally consistent: a task's state never mixes host and runner mtimes
-      because the runner is part of the task's cache key.
+    It runs ``find`` in the runner (via an injected callable) to list every
+    regular file under the patterns' literal directory prefixes with its mtime,
+    and the symbolic links to directories there, and matches the patterns
+    against that listing on the host (see :class:`GlobMatcher`). Paths are
+    therefore resolved in the container's filesystem view -- correct even when
+    a runner remaps the working directory to a non-project-root volume -- and
+    selected as :class:`HostProbe`'s ``Path.glob`` selects them, with one
+    exception: a ``..`` segment after a wildcard (``src/*/../x.c``) matches
+    nothing, as ``find`` lists no paths that climb back up.
+
+    Mtimes come from GNU find's ``%T@`` (sub-second). Images whose ``find``
+    has no ``-printf`` (busybox) fall back to ``stat -c %Y``, batched by
+    ``find -exec ... +``, which has whole-second precision: a file rewritten
+    within the same second as the previous capture may then not be detected.
+    This is internally consistent: a task's state never mixes host and runner
+    mtimes because the runner is part of the task's cache key.
     """
 
-    # Reads "$1" as the base dir, then treats the remaining args as glob patterns.
-    # Unmatched globs stay literal in sh, and the "-f" test then skips them, so a
-    # pattern with no matches simply produces no output.
+    # Reads "$1" as the base dir, then lists under the remaining args, first
+    # each symbolic link to a directory as "path<TAB>@link", then each regular
+    # file (following symlinks, as globbing does) as "path<TAB>mtime", one per
+    # line. A missing directory lists nothing. The stat format holds a literal
+    # tab: stat -c does not interpret escapes.
     _SCRIPT = (
         'cd "$1" 2>/dev/null || exit 0\n'
         "shift\n"
-        'for pat in "$@"; do\n'
-        "  for f in $pat; do\n"
-        '    [ -f "$f" ] && printf \'%s\\t%s\\t%s\\n\' "$pat" "$f" "$(stat -c %Y "$f")"\n'
-        "  done\n"
-        "done\n"
+        "if find . -maxdepth 0 -printf '' >/dev/null 2>&1; then\n"
+        "  find -L \"$@\" -type d -xtype l -printf '%p\\t@link\\n' 2>/dev/null\n"
+        "  find -L \"$@\" -type f -printf '%p\\t%T@\\n' 2>/dev/null\n"
+        "else\n"
+        '  find -L "$@" -type d -exec sh -c '
+        '\'for d; do [ -L "$d" ] && printf "%s\\t@link\\n" "$d"; done; exit 0\''
+        " sh {} + 2>/dev/null\n"
+        "  find -L \"$@\" -type f -exec stat -L -c '%n\t%Y' {} + 2>/dev/null\n"
+        "fi\n"
+        "exit 0\n"
     )
 
-    def __init__(self, base_dir: str, run: Callable[[list[str]], str]):
+    def __init__(self, base_dir: str, run: Callable[[list[str]], Iterable[str]]):
         """
         Args:
             base_dir: Container path that patterns are resolved relative to (the
                 task's container working directory).
             run: Callable that executes an argv inside the container and returns
-                its stdout.
+                its stdout as an iterable of lines, ideally streamed as the
+                command produces them.
         """
         self._base_dir = base_dir
         self._run = run
@@ -116,19 +137,188 @@ class RunnerProbe(FreshnessProbe):
         if not patterns:
             return result
 
-        argv = ["sh", "-c", self._SCRIPT, "sh", self._base_dir, *patterns]
-        output = self._run(argv)
+        matchers = [(pattern, GlobMatcher(pattern)) for pattern in patterns]
+        argv = ["sh", "-c", self._SCRIPT, "sh", self._base_dir, *_find_roots(patterns)]
+        symlinked_dirs: set[str] = set()
 
-        for line in output.splitlines():
-            parts = line.split("\t")
-            if len(parts) != 3:
+        # Parsed line by line, so a large listing is never held in memory whole.
+        # The links come first, so they are known before any file is matched.
+        for line in self._run(argv):
+            path, separator, mtime = line.rstrip("\n").rpartition("\t")
+            if not separator:
                 continue
-            pattern, rel_path, mtime = parts
-            if pattern not in result:
+            if mtime == "@link":
+                symlinked_dirs.add(_normalise(path))
                 continue
             try:
-                result[pattern][rel_path] = float(mtime)
+                mtime_value = float(mtime)
             except ValueError:
                 continue
+            path = _normalise(path)
+            for pattern, matcher in matchers:
+                if matcher.matches(path, symlinked_dirs):
+                    result[pattern][path] = mtime_value
 
         return result
+
+
+class GlobMatcher:
+    """
+    Selects listed file paths as ``Path.glob`` would select them.
+
+    ``*``, ``?`` and ``[...]`` match within one path segment, but never a ``.``
+    or ``..`` segment (a directory listing has none). A ``**`` segment matches
+    any number of directories (none included), without descending into
+    symbolic links to directories. A trailing ``**`` selects directories only
+    before Python 3.13, so no files, and everything below from 3.13 on.
+    ``.`` segments are ignored, as they are by pathlib.
+    """
+
+    _RECURSIVE = "**"
+
+    def __init__(self, pattern: str):
+        """
+        Args:
+            pattern: Glob pattern, relative to the base directory
+        """
+        self._absolute = pattern.startswith("/")
+        segments = _segments(pattern)
+        if segments and segments[-1] == "**":
+            if sys.version_info >= (3, 13):
+                segments.append("*")
+            else:
+                segments = None
+
+        self._segments: list[str | re.Pattern[str]] = []
+        parts = ["/" if self._absolute else ""]
+        for index, segment in enumerate(segments or []):
+            if segment == "**":
+                self._segments.append(self._RECURSIVE)
+                parts.append(r"(?:(?!\.\.?/)[^/]+/)*")
+                continue
+            if _GLOB_MAGIC.search(segment):
+                segment_regex = r"(?!\.\.?(?:/|$))" + _segment_regex(segment)
+            else:
+                segment_regex = re.escape(segment)
+            self._segments.append(re.compile(segment_regex))
+            parts.append(f"(?:{segment_regex})")
+            if index < len(segments) - 1:
+                parts.append("/")
+        # Matches the paths the pattern selects but for symlinks: a quick
+        # test, before the segment-wise one
+        self._regex = re.compile("".join(parts)) if segments else None
+        self._recursive = self._RECURSIVE in self._segments
+
+    def matches(self, path: str, symlinked_dirs: Container[str] = ()) -> bool:
+        """
+        Whether the pattern selects a listed file.
+
+        Args:
+            path: File path, normalised (no ``.`` or empty segments; leading
+                ``/`` if absolute)
+            symlinked_dirs: Listed directories that are symbolic links,
+                normalised the same way
+
+        Returns:
+            True if the pattern selects the path
+        """
+        if self._regex is None or not self._regex.fullmatch(path):
+            return False
+        if not (self._recursive and symlinked_dirs):
+            return True
+        return self._match(0, _segments(path), 0, symlinked_dirs)
+
+    def _match(
+        self, index: int, parts: list[str], start: int, symlinked_dirs: Container[str]
+    ) -> bool:
+        """Whether segments[index:] match parts[start:], ``**`` not entering symlinks."""
+        if index == len(self._segments):
+            return start == len(parts)
+        segment = self._segments[index]
+        if segment is self._RECURSIVE:
+            # The last part is the file: "**" spans the directories before it
+            for end in range(start, len(parts)):
+                if self._match(index + 1, parts, end, symlinked_dirs):
+                    return True
+                directory = ("/" if self._absolute else "") + "/".join(parts[: end + 1])
+                if parts[end] == ".." or directory in symlinked_dirs:
+                    return False
+            return False
+        return (
+            start < len(parts)
+            and segment.fullmatch(parts[start]) is not None
+            and self._match(index + 1, parts, start + 1, symlinked_dirs)
+        )
+
+
+def _segment_regex(segment: str) -> str:
+    """Regex for one glob path segment, in the manner of fnmatch.translate."""
+    out = []
+    i = 0
+    while i < len(segment):
+        char = segment[i]
+        i += 1
+        if char == "*":
+            out.append("[^/]*")
+        elif char == "?":
+            out.append("[^/]")
+        elif char == "[":
+            end = segment.find("]", i + 1 if segment[i : i + 1] in ("!", "]") else i)
+            if end == -1:
+                out.append(re.escape(char))
+                continue
+            body = segment[i:end].replace("\\", "\\\\")
+            i = end + 1
+            if body.startswith("!"):
+                body = "^" + body[1:]
+            elif body.startswith("^"):
+                body = "\\" + body
+            out.append(f"[{body}]")
+        else:
+            out.append(re.escape(char))
+    return "".join(out)
+
+
+def _segments(path: str) -> list[str]:
+    """A path's segments, without empty and ``.`` ones."""
+    return [segment for segment in path.split("/") if segment not in ("", ".")]
+
+
+def _normalise(path: str) -> str:
+    """A listed path in the form GlobMatcher matches (no ``./``)."""
+    return ("/" if path.startswith("/") else "") + "/".join(_segments(path))
+
+
+def _find_roots(patterns: list[str]) -> list[str]:
+    """
+    The directories (or files) ``find`` must list to cover every pattern: each
+    pattern's literal prefix, without those already under another.
+    """
+    roots = set()
+    for pattern in patterns:
+        prefix = []
+        for segment in _segments(pattern):
+            if _GLOB_MAGIC.search(segment):
+                break
+            prefix.append(segment)
+        absolute = pattern.startswith("/")
+        roots.add((absolute, tuple(prefix)))
+
+    kept = []
+    for absolute, prefix in sorted(roots):
+        # Listing a directory covers what is below it, but not what a ".."
+        # climbs out to
+        if any(
+            absolute == other_absolute
+            and prefix[: len(other)] == other
+            and ".." not in prefix[len(other) :]
+            for other_absolute, other in kept
+        ):
+            continue
+        kept.append((absolute, prefix))
+
+    # "./" keeps find from reading a relative root as an option
+    return [
+        ("/" if absolute else "./") + "/".join(prefix) if prefix or absolute else "."
+        for absolute, prefix in kept
+    ]
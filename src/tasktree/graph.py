@@ -247,6 +247,33 @@ def resolve_execution_order(
     Returns:
     List of (task_name, args_dict) tuples in execution order (dependencies first)
 
+    Raises:
+    TaskNotFoundError: If target task or any dependency doesn't exist
+    CycleError: If a dependency cycle is detected
+    """
+    execution_order, _ = resolve_execution_graph(recipe, target_task, target_args)
+    return execution_order
+
+
+def resolve_execution_graph(
+    recipe: Recipe, target_task: str, target_args: dict[str, Any] | None = None
+) -> tuple[list[tuple[str, dict[str, Any]]], dict[int, set[int]]]:
+    """
+    Resolve execution order for a task together with its dependency edges.
+
+    The order is the same as resolve_execution_order. The edges are what a
+    scheduler needs to run independent invocations concurrently: each
+    invocation is identified by its index in the execution order.
+
+    Args:
+    recipe: Parsed recipe containing all tasks
+    target_task: Name of the task to execute
+    target_args: Arguments for the target task (optional)
+
+    Returns:
+    Tuple of (execution_order, dependencies) where dependencies maps the index
+    of each invocation to the indices of the invocations it directly depends on
+
     Raises:
     TaskNotFoundError: If target task or any dependency doesn't exist
     CycleError: If a dependency cycle is detected
@@ -318,12 +345,19 @@ def resolve_execution_order(
     try:
         sorter = TopologicalSorter(graph)
         ordered_nodes = list(sorter.static_order())
-
-        # Convert TaskNode objects to (task_name, args_dict) tuples
-        return [(node.task_name, node.args) for node in ordered_nodes]
     except ValueError as e:
         raise CycleError(f"Dependency cycle detected: {e}")
 
+    # Convert TaskNode objects to (task_name, args_dict) tuples, and the
+    # node-to-node edges to index-to-index edges over that same order
+    index_of = {node: idx for idx, node in enumerate(ordered_nodes)}
+    execution_order = [(node.task_name, node.args) for node in ordered_nodes]
+    dependencies = {
+        index_of[node]: {index_of[dep] for dep in graph[node]}
+        for node in ordered_nodes
+    }
+    return execution_order, dependencies
+
 
 def resolve_dependency_output_references(
     recipe: Recipe,
@@ -0,0 +1,139 @@
+"""Loading a recipe's imported files in worker processes.
+
+Loading YAML is most of the cost of parsing a recipe with many imported files,
+and it is CPU-bound, so one process leaves the other cores idle.
+ParallelImportLoader is a loader for _parse_file: each time it returns a file's
+data, it submits the files that file imports to a process pool, so that they
+load while _parse_file validates and namespaces the files before them.
+
+_parse_file still walks the imports depth-first in one process, merging each
+file's tasks, runners and variables as it returns, so the recipe, circular
+import detection and which error is raised first are the same as with a plain
+loader: a worker's error is raised only when _parse_file asks for that file.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from concurrent.futures import Executor, Future
+
+# Below this much YAML, starting worker processes costs more than it saves
+_MIN_PARALLEL_BYTES = 256 * 1024
+
+
+class ParallelImportLoader:
+    """
+    Loads the files a recipe imports in a process pool, ahead of _parse_file
+    asking for them.
+
+    The pool is started once the imported files found but not yet loaded add
+    up to _MIN_PARALLEL_BYTES; until then, and for any file it was not given
+    ahead, a file is loaded in this process.  Use it as a context manager: the
+    pool is shut down on exit.
+    """
+
+    def __init__(self, load: Callable[..., Any], defer_tasks: bool = False):
+        """
+        Args:
+        load: Loads a file's YAML, given its path; it must be picklable (a
+        module-level function), as workers call it
+        defer_tasks: The option _parse_file loads imported files with (see
+        load_yaml_file)
+        """
+        self._load = load
+        self._options = {"defer_tasks": True} if defer_tasks else {}
+        self._pool: Executor | None = None
+        self._seen: set[Path] = set()
+        # Imported files found before the pool started, with their sizes
+        self._waiting: dict[Path, int] = {}
+        self._loading: dict[Path, Future] = {}
+
+    def __enter__(self) -> ParallelImportLoader:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def __call__(self, file_path: Path, **options: Any) -> Any:
+        self._seen.add(file_path)
+        self._waiting.pop(file_path, None)
+        future = self._loading.pop(file_path, None)
+        if future is not None and options == self._options:
+            data = future.result()
+        else:
+            data = self._load(file_path, **options)
+        self._load_imports_ahead(file_path, data)
+        return data
+
+    def _load_imports_ahead(self, file_path: Path, data: Any) -> None:
+        """
+        Submit the files a file imports, skipping any found already.
+
+        Import specs _parse_file would reject, and files that do not exist,
+        are left for it to report.
+        """
+        imports = data.get("imports") if isinstance(data, dict) else None
+        if not isinstance(imports, list):
+            return
+        for import_spec in imports:
+            child_file = (
+                import_spec.get("file") if isinstance(import_spec, dict) else None
+            )
+            if not isinstance(child_file, str):
+                continue
+            child_path = file_path.parent / child_file
+            if child_path in self._seen:
+                continue
+            self._seen.add(child_path)
+            try:
+                size = child_path.stat().st_size
+            except OSError:
+                continue
+            if self._pool is None:
+                self._waiting[child_path] = size
+            else:
+                self._submit(child_path)
+
+        if self._pool is None and sum(self._waiting.values()) >= _MIN_PARALLEL_BYTES:
+            self._start_pool()
+
+    def _start_pool(self) -> None:
+        """Start the worker processes and submit the files found so far."""
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        from tasktree.scheduler import host_cpu_count
+
+        workers = min(host_cpu_count(), len(self._waiting))
+        if workers < 2:
+            return
+        # Never fork: this process may already run threads (the output pump,
+        # a caller's), and a forked child inherits their locks held
+        method = (
+            "forkserver"
+            if "forkserver" in multiprocessing.get_all_start_methods()
+            else "spawn"
+        )
+        try:
+            self._pool = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context(method)
+            )
+        except (OSError, NotImplementedError):
+            # No process support here (e.g. no semaphores): keep loading in
+            # this process
+            self._waiting.clear()
+            return
+        for child_path in self._waiting:
+            self._submit(child_path)
+        self._waiting.clear()
+
+    def _submit(self, file_path: Path) -> None:
+        self._loading[file_path] = self._pool.submit(
+            self._load, file_path, **self._options
+        )
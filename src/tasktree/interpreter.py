@@ -6,13 +6,23 @@ An interpreter describes, literally, how to run a task's temporary script:
 - ``ext``: the temp-script file extension. Empty means the script has no
   extension. When non-empty it must start with a dot.
 - ``preamble``: text prepended to every task body run by this interpreter.
+- ``persistent``: run tasks in forks of a warm worker instead of starting the
+  interpreter for each one (Python interpreters only, see python_worker).
+- ``preload``: modules a persistent interpreter's worker imports up front.
 """
 
 from __future__ import annotations
 
+import re
 import shlex
 from dataclasses import dataclass
 
+# A Python executable, by file name: python, python3.12, pypy3, py (the Windows
+# launcher), pythonw.exe, ...
+_PYTHON_EXECUTABLE = re.compile(
+    r"(?:python|pypy|py)(?:\d+(?:\.\d+)*)?w?(?:\.exe)?", re.IGNORECASE
+)
+
 
 class InterpreterError(Exception):
     """Raised when an interpreter definition is invalid or unresolved."""
@@ -27,6 +37,8 @@ class Interpreter:
     cmd: str
     ext: str = ""
     preamble: str = ""
+    persistent: bool = False
+    preload: tuple[str, ...] = ()
 
     def __post_init__(self):
         if not self.cmd:
@@ -35,8 +47,28 @@ class Interpreter:
             raise InterpreterError(
                 f"Interpreter 'ext' must start with a dot (got {self.ext!r})"
             )
+        if self.preload and not self.persistent:
+            raise InterpreterError(
+                "Interpreter 'preload' is only used with 'persistent: true'"
+            )
+        if self.persistent and not self.is_python:
+            raise InterpreterError(
+                f"Interpreter 'persistent: true' needs a Python interpreter, as its "
+                f"tasks run in a Python worker (got cmd {self.cmd!r})"
+            )
 
     @property
     def invocation(self) -> list[str]:
         """The interpreter command tokens, used verbatim before the script path."""
         return shlex.split(self.cmd)
+
+    @property
+    def is_python(self) -> bool:
+        """
+        Whether the command runs Python: one of its tokens names a Python
+        executable (``python3``, ``/usr/bin/env python3``, ``uv run python``).
+        """
+        return any(
+            _PYTHON_EXECUTABLE.fullmatch(re.split(r"[\\/]", token)[-1])
+            for token in self.invocation
+        )
@@ -0,0 +1,191 @@
+"""GNU make jobserver support.
+
+Tasks commonly run ``make -j``, ``cargo`` or a nested ``tt`` themselves, and
+each of those would otherwise assume it owns every CPU. The GNU make
+jobserver protocol lets them share one pool of job slots instead: a FIFO holds
+one single-byte token per slot beyond the first, a process reads a token
+before starting an extra job and writes the same byte back when that job
+finishes. Every process also owns one implicit slot, which is never in the FIFO.
+
+When ``tt`` runs tasks in parallel at the top level it creates such a FIFO
+(:class:`JobServer`) and advertises it to task subprocesses in ``MAKEFLAGS``.
+A ``tt`` that finds a FIFO jobserver in its own environment (a nested ``tt``
+call, or ``tt`` run from a GNU make 4.4 recipe) joins that pool as a client
+(:class:`JobTokens`) rather than starting its own.
+
+``MAKEFLAGS`` names the pool twice: ``--jobserver-auth=fifo:PATH``, the form
+GNU make 4.4+ uses, then ``--jobserver-auth=R,W`` with descriptors on the same
+FIFO that the subprocess inherits. Make 4.2/4.3 do not understand the
+``fifo:`` form but honour the last ``--jobserver-auth`` given, so they use the
+descriptors; ``tt`` itself prefers the ``fifo:`` form, which needs none.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import shutil
+import tempfile
+from pathlib import Path
+
+from tasktree.logging import Logger
+
+MAKEFLAGS_ENV_VAR = "MAKEFLAGS"
+
+# Matches --jobserver-auth=fifo:PATH (and the pre-4.2 --jobserver-fds spelling)
+_FIFO_AUTH_PATTERN = re.compile(r"--jobserver-(?:auth|fds)=fifo:(\S+)")
+# Jobserver flags, replaced by ours when advertising a pool
+_JOBSERVER_FLAGS_PATTERN = re.compile(r"(?:^|\s)--jobserver-(?:auth|fds)=\S+(?=\s|$)")
+# Job-count flag, replaced as well when advertising a pool of known size
+_JOBS_FLAG_PATTERN = re.compile(r"(?:^|\s)-j\d*(?=\s|$)")
+
+# The byte make itself uses for tokens
+_TOKEN = b"+"
+
+
+class JobTokens:
+    """
+    Client of a jobserver FIFO: takes and returns tokens for extra jobs.
+
+    Tokens are only taken without blocking, because the scheduler has other
+    work to do (reaping finished tasks) while it waits for one.
+    """
+
+    def __init__(self, fifo_path: Path, logger: Logger, slots: int | None = None):
+        """
+        Args:
+            fifo_path: Path of the jobserver FIFO
+            logger: Logger for diagnostics
+            slots: Size of the pool, if known (advertised as -jN)
+
+        Raises:
+            OSError: If the FIFO cannot be opened
+        """
+        self.fifo_path = fifo_path
+        self.slots = slots
+        self._logger = logger
+        # O_RDWR keeps the open from blocking for a peer and means reads never
+        # see EOF; O_NONBLOCK turns an empty pool into EAGAIN
+        self._fd = os.open(fifo_path, os.O_RDWR | os.O_NONBLOCK)
+        # Separate, blocking descriptors handed to subprocesses, so that our
+        # non-blocking mode never leaks into make or cargo
+        self._child_read_fd = os.open(fifo_path, os.O_RDONLY)
+        self._child_write_fd = os.open(fifo_path, os.O_WRONLY)
+        self._held: list[bytes] = []
+        self._closed = False
+
+    @classmethod
+    def from_makeflags(cls, makeflags: str | None, logger: Logger) -> JobTokens | None:
+        """
+        Join the jobserver advertised in a MAKEFLAGS value, if there is one.
+
+        Returns:
+            JobTokens for the advertised FIFO, or None if MAKEFLAGS names no
+            usable FIFO jobserver
+        """
+        if not makeflags:
+            return None
+        match = _FIFO_AUTH_PATTERN.search(makeflags)
+        if not match:
+            if "--jobserver" in makeflags:
+                logger.debug(
+                    "Ignoring inherited jobserver: only the fifo: form of "
+                    "--jobserver-auth is supported"
+                )
+            return None
+        fifo_path = Path(match.group(1))
+        try:
+            tokens = cls(fifo_path, logger)
+        except OSError as e:
+            logger.debug(f"Ignoring inherited jobserver '{fifo_path}': {e}")
+            return None
+        logger.debug(f"Joining inherited jobserver '{fifo_path}'")
+        return tokens
+
+    @property
+    def pass_fds(self) -> tuple[int, int]:
+        """Descriptors a subprocess must inherit for the R,W form of MAKEFLAGS."""
+        return self._child_read_fd, self._child_write_fd
+
+    def makeflags(self, existing: str | None) -> str:
+        """
+        MAKEFLAGS value advertising this pool to a subprocess.
+
+        Any jobserver already in ``existing`` is replaced (and, when the pool
+        size is known, any job count); other flags are kept.
+        """
+        kept = _JOBSERVER_FLAGS_PATTERN.sub("", existing or "")
+        ours = []
+        if self.slots is not None:
+            kept = _JOBS_FLAG_PATTERN.sub("", kept)
+            ours.append(f"-j{self.slots}")
+        ours.append(f"--jobserver-auth=fifo:{self.fifo_path}")
+        ours.append(f"--jobserver-auth={self._child_read_fd},{self._child_write_fd}")
+        return " ".join(filter(None, [kept.strip(), *ours]))
+
+    @property
+    def held(self) -> int:
+        """Number of tokens currently taken from the pool."""
+        return len(self._held)
+
+    def try_acquire(self) -> bool:
+        """
+        Take a token if one is free.
+
+        Returns:
+            True if a token was taken, False if the pool is empty
+        """
+        try:
+            token = os.read(self._fd, 1)
+        except BlockingIOError:
+            return False
+        if not token:
+            return False
+        self._held.append(token)
+        return True
+
+    def release(self) -> None:
+        """Return a token to the pool (the same byte that was taken)."""
+        token = self._held.pop()
+        os.write(self._fd, token)
+
+    def close(self) -> None:
+        """Return any tokens still held, then close the FIFO (idempotent)."""
+        if self._closed:
+            return
+        while self._held:
+            self.release()
+        for fd in (self._fd, self._child_read_fd, self._child_write_fd):
+            os.close(fd)
+        self._closed = True
+
+
+class JobServer:
+    """
+    A jobserver owned by this process, for task subprocesses to share.
+    """
+
+    def __init__(self, slots: int, logger: Logger):
+        """
+        Create the FIFO and fill it with one token per slot beyond the first.
+
+        Args:
+            slots: Total number of jobs that may run at once
+            logger: Logger for diagnostics
+        """
+        self._dir = Path(tempfile.mkdtemp(prefix="tt-jobserver-"))
+        fifo_path = self._dir / "fifo"
+        os.mkfifo(fifo_path, 0o600)
+        self.tokens = JobTokens(fifo_path, logger, slots=slots)
+        os.write(self.tokens._fd, _TOKEN * (slots - 1))
+        logger.debug(f"Started jobserver with {slots} slot(s) at '{fifo_path}'")
+
+    @staticmethod
+    def supported() -> bool:
+        """True if this platform has FIFOs (GNU make uses semaphores on Windows)."""
+        return hasattr(os, "mkfifo")
+
+    def close(self) -> None:
+        """Close and remove the FIFO."""
+        self.tokens.close()
+        shutil.rmtree(self._dir, ignore_errors=True)
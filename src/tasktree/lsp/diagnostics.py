@@ -0,0 +1,409 @@
+"""Recipe diagnostics for the LSP server, from tasktree's own parser.
+
+Errors that completion cannot see (unknown dependencies, invalid arg specs,
+dependency cycles, unknown interpreters, broken imports) are otherwise only
+found when ``tt`` runs.  check_document() validates an open document the way
+``tt`` would:
+
+- ``parse_recipe`` on the editor's text (and on open documents' text for the
+  files it imports), with ``{ eval: ... }`` and ``{ read: ... }`` variables
+  left unevaluated: nothing is run, and no variable file is read
+- each of the document's tasks' dependencies, which ``tt`` checks only for
+  the tasks it runs, and cycles among all tasks
+
+A full parse on every keystroke would make editing lag, so DiagnosticsWorker
+checks documents in its own thread, once a document has not changed for
+DEBOUNCE_SECONDS; a check whose document has changed since it started is
+not published.  Imported files not open in the editor are parsed once per
+change on disk (ImportCache).
+"""
+
+from __future__ import annotations
+
+import copy
+import logging
+import os
+import re
+import threading
+import time
+from collections.abc import Callable, Mapping
+from dataclasses import dataclass
+from graphlib import CycleError, TopologicalSorter
+from pathlib import Path
+from typing import Any
+
+import yaml
+from tree_sitter import Tree
+from lsprotocol.types import Diagnostic, DiagnosticSeverity, Position, Range
+
+from tasktree.lsp.ts_context import (
+    Span,
+    extract_imports,
+    extract_task_symbols,
+    import_range,
+    parse_document,
+    task_key_range,
+)
+from tasktree.parser import (
+    Recipe,
+    load_yaml_file,
+    parse_dependency_spec,
+    parse_recipe,
+)
+
+__all__ = ["DEBOUNCE_SECONDS", "DiagnosticsWorker", "ImportCache", "check_document"]
+
+logger = logging.getLogger(__name__)
+
+# How long a document must be left unchanged before it is checked
+DEBOUNCE_SECONDS = 0.3
+
+_SOURCE = "tasktree"
+
+_TASK_IN_MESSAGE = re.compile(r"Task '([^']+)'")
+_ARG_IN_MESSAGE = re.compile(r"argument '([^']+)'")
+
+
+def _normalise(path: Path | str) -> Path:
+    return Path(os.path.normpath(os.path.abspath(path)))
+
+
+class ImportCache:
+    """
+    Imported files' YAML, loaded once per version of the file on disk.
+
+    A file is loaded again when its modification time or size changes.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._documents: dict[Path, tuple[tuple[int, int], Any]] = {}
+
+    def load(self, path: Path) -> Any:
+        """
+        Load a file's YAML, from the cache if the file is unchanged.
+
+        Args:
+            path: Path to the YAML file
+
+        Returns:
+            A copy of the parsed document, which the caller may modify
+
+        Raises:
+            OSError: If the file cannot be read
+            yaml.YAMLError: If it is not valid YAML
+        """
+        path = _normalise(path)
+        stat = path.stat()
+        key = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            cached = self._documents.get(path)
+        if cached is None or cached[0] != key:
+            cached = (key, load_yaml_file(path))
+            with self._lock:
+                self._documents[path] = cached
+        return copy.deepcopy(cached[1])
+
+
+def check_document(
+    path: Path | str,
+    text: str,
+    open_documents: Mapping[Path, str] | None = None,
+    imports: ImportCache | None = None,
+) -> list[Diagnostic]:
+    """
+    Validate a recipe document with tasktree's parser.
+
+    Args:
+        path: The document's path (imports are resolved against it)
+        text: The document's text, saved or not
+        open_documents: Text of other open documents, by normalised path,
+            used in place of those files on disk
+        imports: Cache of imported files' YAML
+
+    Returns:
+        The errors found, located in the document where possible
+    """
+    path = _normalise(path)
+    open_documents = open_documents or {}
+    imports = imports or ImportCache()
+    lines = text.splitlines() or [""]
+
+    try:
+        data = yaml.safe_load(text)
+    except yaml.YAMLError as e:
+        return [_yaml_error(e, lines)]
+
+    def loader(file_path: Path) -> Any:
+        file_path = _normalise(file_path)
+        if file_path == path:
+            return copy.deepcopy(data)
+        if file_path in open_documents:
+            return yaml.safe_load(open_documents[file_path])
+        return imports.load(file_path)
+
+    tree = parse_document(text)
+    try:
+        recipe = parse_recipe(
+            path, project_root=path.parent, loader=loader, side_effects=False
+        )
+    except Exception as e:
+        return [_diagnostic(str(e), _locate_error(str(e), tree), lines)]
+    return [
+        _diagnostic(message, task_key_range(tree, task_name), lines)
+        for task_name, message in _check_tasks(recipe, path)
+    ]
+
+
+def _check_tasks(recipe: Recipe, path: Path) -> list[tuple[str, str]]:
+    """
+    Check the document's tasks' dependencies, and find cycles.
+
+    Returns:
+        (local task name, message) per error
+    """
+    local_tasks = {
+        name: task
+        for name, task in recipe.tasks.items()
+        if _normalise(task.source_file) == path
+    }
+    errors: list[tuple[str, str]] = []
+    for name, task in local_tasks.items():
+        for dep_spec in task.deps:
+            dep_name = _dependency_name(dep_spec)
+            if dep_name is not None and dep_name not in recipe.tasks:
+                errors.append(
+                    (name, f"Task '{name}' depends on unknown task '{dep_name}'")
+                )
+            elif "{{" not in str(dep_spec):
+                # Arguments with {{ arg.* }} templates are only known when the
+                # task runs
+                try:
+                    parse_dependency_spec(dep_spec, recipe)
+                except ValueError as e:
+                    errors.append((name, f"Task '{name}': {e}"))
+
+    graph = {
+        name: {
+            dep_name
+            for dep_spec in task.deps
+            if (dep_name := _dependency_name(dep_spec)) in recipe.tasks
+        }
+        for name, task in recipe.tasks.items()
+    }
+    try:
+        TopologicalSorter(graph).prepare()
+    except CycleError as e:
+        cycle = e.args[1]
+        chain = " → ".join(reversed(cycle))
+        for name in dict.fromkeys(cycle):
+            if name in local_tasks:
+                errors.append((name, f"Dependency cycle: {chain}"))
+    return errors
+
+
+def _dependency_name(dep_spec: Any) -> str | None:
+    """The task a dependency spec names, or None if it names none."""
+    if isinstance(dep_spec, str):
+        return dep_spec
+    if isinstance(dep_spec, dict) and len(dep_spec) == 1:
+        name = next(iter(dep_spec))
+        return name if isinstance(name, str) else None
+    return None
+
+
+def _locate_error(message: str, tree: Tree) -> Span | None:
+    """Where in the document a parse error is about, if it can be told."""
+    match = _TASK_IN_MESSAGE.search(message)
+    if match:
+        task_name = match.group(1)
+        span = task_key_range(tree, task_name)
+        if span is None and "." in task_name:
+            span = import_range(tree, task_name.split(".", 1)[0])
+        if span is not None:
+            return span
+    # Arg spec errors name the arg only: find the task declaring it
+    match = _ARG_IN_MESSAGE.search(message)
+    if match:
+        for task_name, (args, _, _) in extract_task_symbols(tree).items():
+            if match.group(1) in args:
+                return task_key_range(tree, task_name)
+    # Errors in (or about) an imported file name it
+    for file, namespace in extract_imports(tree):
+        if Path(file).name in message:
+            return import_range(tree, namespace)
+    return None
+
+
+def _yaml_error(error: yaml.YAMLError, lines: list[str]) -> Diagnostic:
+    mark = getattr(error, "problem_mark", None)
+    if mark is None:
+        return _diagnostic(f"Invalid YAML: {error}", None, lines)
+    line = min(mark.line, len(lines) - 1)
+    column = _utf16_length(lines[line][: mark.column])
+    message = " ".join(part for part in (error.context, error.problem) if part) or str(
+        error
+    )
+    return Diagnostic(
+        range=Range(
+            start=Position(line=line, character=column),
+            end=Position(line=line, character=_utf16_length(lines[line])),
+        ),
+        message=f"Invalid YAML: {message}",
+        severity=DiagnosticSeverity.Error,
+        source=_SOURCE,
+    )
+
+
+def _diagnostic(message: str, span: Span | None, lines: list[str]) -> Diagnostic:
+    """An error at *span*, or on the first line if it cannot be located."""
+    if span is None:
+        start, end = (0, 0), (0, len(lines[0].encode("utf-8")))
+    else:
+        start, end = span
+    return Diagnostic(
+        range=Range(start=_position(lines, start), end=_position(lines, end)),
+        message=message,
+        severity=DiagnosticSeverity.Error,
+        source=_SOURCE,
+    )
+
+
+def _position(lines: list[str], point: tuple[int, int]) -> Position:
+    """Convert a tree-sitter point (byte column) to an LSP position."""
+    row, byte_column = point
+    if row >= len(lines):
+        return Position(line=row, character=0)
+    prefix = lines[row].encode("utf-8")[:byte_column].decode("utf-8", "ignore")
+    return Position(line=row, character=_utf16_length(prefix))
+
+
+def _utf16_length(text: str) -> int:
+    return len(text.encode("utf-16-le")) // 2
+
+
+@dataclass
+class _Check:
+    """A document version waiting to be checked."""
+
+    due: float
+    version: int | None
+    path: Path
+    text: str
+    open_documents: Mapping[Path, str]
+
+
+class DiagnosticsWorker:
+    """
+    Checks documents in a background thread, debounced per document.
+
+    Results go to *publish*, from the worker thread, unless the document has
+    been scheduled again (or cancelled) since the check started.
+    """
+
+    def __init__(
+        self,
+        publish: Callable[[str, int | None, list[Diagnostic]], None],
+        delay: float = DEBOUNCE_SECONDS,
+    ) -> None:
+        self._publish = publish
+        self._delay = delay
+        self._imports = ImportCache()
+        self._condition = threading.Condition()
+        self._pending: dict[str, _Check] = {}
+        # Latest version scheduled per document
+        self._latest: dict[str, int | None] = {}
+        self._thread: threading.Thread | None = None
+        self._stopped = False
+
+    def schedule(
+        self,
+        uri: str,
+        version: int | None,
+        path: Path | str,
+        text: str,
+        open_documents: Mapping[Path, str] | None = None,
+    ) -> None:
+        """
+        Check a document version once it has been left unchanged for a while.
+
+        Args:
+            uri: The document's URI
+            version: Its version, published with the diagnostics
+            path: Its path
+            text: Its text
+            open_documents: Text of the other open documents (see check_document)
+        """
+        check = _Check(
+            time.monotonic() + self._delay,
+            version,
+            Path(path),
+            text,
+            open_documents or {},
+        )
+        with self._condition:
+            self._latest[uri] = version
+            self._pending[uri] = check
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="tasktree-lsp-diagnostics", daemon=True
+                )
+                self._thread.start()
+            self._condition.notify()
+
+    def cancel(self, uri: str) -> None:
+        """
+        Forget a document: its pending or running check is not published.
+
+        Args:
+            uri: The document's URI
+        """
+        with self._condition:
+            self._pending.pop(uri, None)
+            self._latest.pop(uri, None)
+
+    def stop(self) -> None:
+        """Stop the worker thread, dropping pending checks."""
+        with self._condition:
+            self._stopped = True
+            self._pending.clear()
+            self._condition.notify()
+
+    def _next(self) -> tuple[str, _Check] | None:
+        """Wait for the next check that is due, or None once stopped."""
+        with self._condition:
+            while not self._stopped:
+                if not self._pending:
+                    self._condition.wait()
+                    continue
+                uri, check = min(self._pending.items(), key=lambda item: item[1].due)
+                remaining = check.due - time.monotonic()
+                if remaining <= 0:
+                    del self._pending[uri]
+                    return uri, check
+                self._condition.wait(remaining)
+            return None
+
+    def _run(self) -> None:
+        while (item := self._next()) is not None:
+            uri, check = item
+            started = time.perf_counter()
+            try:
+                diagnostics = check_document(
+                    check.path, check.text, check.open_documents, self._imports
+                )
+            except Exception:
+                logger.exception("Checking %s failed", uri)
+                continue
+            with self._condition:
+                current = self._latest.get(uri, object()) == check.version
+            logger.debug(
+                "Checked %s version %s in %.1f ms: %d diagnostic(s)%s",
+                uri,
+                check.version,
+                (time.perf_counter() - started) * 1000,
+                len(diagnostics),
+                "" if current else " (outdated, not published)",
+            )
+            if current:
+                self._publish(uri, check.version, diagnostics)
@@ -1,6 +1,10 @@
 """Tasktree LSP server main entry point."""
 
+import asyncio
+import logging
+import os
 import re
+import threading
 from pathlib import Path
 from urllib.parse import unquote
 
@@ -13,16 +17,28 @@ from lsprotocol.types import (
     TextDocumentSyncKind,
     DidOpenTextDocumentParams,
     DidChangeTextDocumentParams,
+    TextDocumentContentChangePartial,
     DidCloseTextDocumentParams,
     CompletionParams,
     CompletionList,
     CompletionItem,
     CompletionItemKind,
+    Diagnostic,
+    DidChangeWatchedFilesParams,
+    DidChangeWatchedFilesRegistrationOptions,
+    FileChangeType,
+    FileSystemWatcher,
+    InitializedParams,
+    PublishDiagnosticsParams,
+    Registration,
+    RegistrationParams,
 )
 
 import tasktree
 from tasktree.lsp.builtin_variables import BUILTIN_VARIABLES
-from tasktree.lsp.ts_context import parse_document
+from tasktree.lsp.diagnostics import DiagnosticsWorker
+from tasktree.lsp.ts_context import apply_edit, parse_count, parse_document
+from tasktree.lsp.workspace_index import WorkspaceIndex
 from tree_sitter import Tree
 from tasktree.lsp.position_utils import (
     get_prefix_at_position,
@@ -40,6 +56,11 @@ from tasktree.lsp.parser_wrapper import (
     get_env_var_names,
 )
 
+logger = logging.getLogger(__name__)
+
+# Files whose changes the client is asked to report (recipes and imports)
+_WATCHED_FILES_GLOB = "**/*.{yaml,yml,tasks,tt}"
+
 
 def _is_inside_open_parens(prefix: str) -> bool:
     """Check if the cursor is inside unmatched parentheses in the prefix.
@@ -86,6 +107,38 @@ def _uri_to_path(uri: str) -> str | None:
     return None
 
 
+def _workspace_root(params: InitializeParams) -> str | None:
+    """Get the workspace folder to index from the initialize request.
+
+    Args:
+        params: Client initialization parameters
+
+    Returns:
+        The folder's path, or None if the client opened no local folder.
+    """
+    if params.root_uri:
+        return _uri_to_path(params.root_uri)
+    if params.root_path:
+        return params.root_path
+    if params.workspace_folders:
+        return _uri_to_path(params.workspace_folders[0].uri)
+    return None
+
+
+def _supports_watched_files_registration(params: InitializeParams) -> bool:
+    """Check if the client accepts a dynamically registered file watcher.
+
+    Args:
+        params: Client initialization parameters
+
+    Returns:
+        True if workspace/didChangeWatchedFiles can be registered.
+    """
+    workspace = getattr(params.capabilities, "workspace", None)
+    watched_files = getattr(workspace, "did_change_watched_files", None)
+    return bool(getattr(watched_files, "dynamic_registration", False))
+
+
 __all__ = ["TasktreeLanguageServer", "main"]
 
 
@@ -111,13 +164,59 @@ class TasktreeLanguageServer(LanguageServer):
         # Store document contents in memory
         self.documents: dict[str, str] = {}
         # Cache tree-sitter parse trees, one per open document URI.
-        # Trees are re-parsed on every textDocument/didOpen and
-        # textDocument/didChange notification so completion always has
-        # access to the latest structural information.
+        # Trees are parsed on textDocument/didOpen and re-parsed
+        # incrementally on every textDocument/didChange notification so
+        # completion always has access to the latest structural information.
         self.trees: dict[str, Tree] = {}
+        # The latest tree of each document that parsed without errors: while
+        # the document is mid-edit and broken, its tasks are still known
+        self.valid_trees: dict[str, Tree] = {}
+        # Symbols of the workspace's recipe files and their imports, so deps
+        # completion need not read imported files on every request
+        self.index = WorkspaceIndex()
+        # Set on initialize if the client can report file changes
+        self.watch_files = False
+        # Version of each open document, from didOpen / didChange
+        self.versions: dict[str, int] = {}
+        # Checks documents with tasktree's parser in the background, once
+        # the client has initialized the server (it may not be sent
+        # notifications before)
+        self.diagnostics = DiagnosticsWorker(self.publish_diagnostics)
+        self.diagnostics_enabled = False
+        # The event loop handling client messages, which diagnostics are
+        # handed to from the worker thread (None outside a running server)
+        self.event_loop: asyncio.AbstractEventLoop | None = None
         # Store handler references for testing
         self.handlers: dict[str, callable] = {}
 
+    def publish_diagnostics(
+        self, uri: str, version: int | None, diagnostics: list[Diagnostic]
+    ) -> None:
+        """Send a document's diagnostics to the client.
+
+        Safe to call from any thread: the notification is sent from the
+        event loop's.
+
+        Args:
+            uri: The document's URI
+            version: The document version they were computed for
+            diagnostics: The diagnostics (empty to clear them)
+        """
+        if self.protocol.writer is None:
+            # Not connected to a client (the handlers are being called directly)
+            return
+        params = PublishDiagnosticsParams(
+            uri=uri,
+            version=version if isinstance(version, int) else None,
+            diagnostics=diagnostics,
+        )
+        if self.event_loop is None:
+            self.text_document_publish_diagnostics(params)
+        else:
+            self.event_loop.call_soon_threadsafe(
+                self.text_document_publish_diagnostics, params
+            )
+
 
 def create_server() -> TasktreeLanguageServer:
     """Create and configure the tasktree LSP server."""
@@ -132,21 +231,89 @@ def create_server() -> TasktreeLanguageServer:
 
         Returns:
             InitializeResult with server capabilities including text document sync
-            (full mode) and completion provider with '.' as trigger character
+            (incremental mode) and completion provider with '.' as trigger character
+
+        Also starts indexing the workspace folder's recipe files in the
+        background.
         """
+        server.watch_files = _supports_watched_files_registration(params)
+        server.diagnostics_enabled = True
+        try:
+            server.event_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            server.event_loop = None
+        root = _workspace_root(params)
+        if root is not None:
+            threading.Thread(
+                target=server.index.build,
+                args=(root,),
+                name="tasktree-lsp-index",
+                daemon=True,
+            ).start()
         return InitializeResult(
             capabilities=ServerCapabilities(
-                text_document_sync=TextDocumentSyncKind.Full,
+                text_document_sync=TextDocumentSyncKind.Incremental,
                 completion_provider=CompletionOptions(
                     trigger_characters=["."],
                 )
             )
         )
 
+    @server.feature("initialized")
+    def initialized(params: InitializedParams) -> None:
+        """Handle LSP initialized notification.
+
+        Asks the client to report changes to recipe files (including
+        imported ones not open in the editor) through
+        ``workspace/didChangeWatchedFiles``, if it supports that.
+
+        Args:
+            params: Initialized notification parameters (empty)
+        """
+        if not server.watch_files:
+            return
+        server.client_register_capability(
+            RegistrationParams(
+                registrations=[
+                    Registration(
+                        id="tasktree-watched-files",
+                        method="workspace/didChangeWatchedFiles",
+                        register_options=DidChangeWatchedFilesRegistrationOptions(
+                            watchers=[
+                                FileSystemWatcher(glob_pattern=_WATCHED_FILES_GLOB)
+                            ]
+                        ),
+                    )
+                ]
+            )
+        )
+
+    @server.feature("workspace/didChangeWatchedFiles")
+    def did_change_watched_files(params: DidChangeWatchedFilesParams) -> None:
+        """Handle watched files notification.
+
+        Updates the workspace index for files created, changed or deleted
+        outside the editor.
+
+        Args:
+            params: The file events
+        """
+        for event in params.changes:
+            path = _uri_to_path(event.uri)
+            if path is None:
+                continue
+            if event.type == FileChangeType.Deleted:
+                server.index.file_deleted(path)
+            else:
+                server.index.file_changed(path)
+        # Open documents may import the files that changed
+        for uri in server.documents:
+            _schedule_diagnostics(uri)
+
     @server.feature("shutdown")
     def shutdown() -> None:
         """Handle LSP shutdown request."""
-        pass
+        server.diagnostics.stop()
 
     @server.feature("exit")
     def exit() -> None:
@@ -167,24 +334,45 @@ def create_server() -> TasktreeLanguageServer:
         text = params.text_document.text
         server.documents[uri] = text
         server.trees[uri] = parse_document(text)
+        server.versions[uri] = params.text_document.version
+        _update_index(uri)
+        _schedule_diagnostics(uri)
 
     @server.feature("textDocument/didChange")
     def did_change(params: DidChangeTextDocumentParams) -> None:
         """Handle document change notification.
 
-        Updates the stored document text and re-parses the tree-sitter tree
-        when changes occur.  Operates in full sync mode where the entire
-        document content is sent.
+        Operates in incremental sync mode: each change replaces a range of
+        the stored text, and is also applied to the cached tree-sitter tree
+        with ``Tree.edit``.  The tree is then re-parsed once, reusing every
+        subtree the changes did not touch.  A change without a range
+        replaces the whole document, which is then parsed from scratch.
 
         Args:
             params: Document change parameters containing URI and content changes
         """
         uri = params.text_document.uri
-        # In full sync mode, we get the entire document in the first change
-        if params.content_changes:
-            text = params.content_changes[0].text
-            server.documents[uri] = text
-            server.trees[uri] = parse_document(text)
+        if not params.content_changes:
+            return
+        text = server.documents.get(uri, "")
+        tree = server.trees.get(uri)
+        for change in params.content_changes:
+            if isinstance(change, TextDocumentContentChangePartial):
+                text = apply_edit(
+                    text,
+                    tree,
+                    (change.range.start.line, change.range.start.character),
+                    (change.range.end.line, change.range.end.character),
+                    change.text,
+                )
+            else:
+                text = change.text
+                tree = None
+        server.documents[uri] = text
+        server.trees[uri] = parse_document(text, tree)
+        server.versions[uri] = params.text_document.version
+        _update_index(uri)
+        _schedule_diagnostics(uri)
 
     @server.feature("textDocument/didClose")
     def did_close(params: DidCloseTextDocumentParams) -> None:
@@ -199,6 +387,45 @@ def create_server() -> TasktreeLanguageServer:
         uri = params.text_document.uri
         server.documents.pop(uri, None)
         server.trees.pop(uri, None)
+        server.valid_trees.pop(uri, None)
+        server.versions.pop(uri, None)
+        path = _uri_to_path(uri)
+        if path is not None:
+            server.index.close_document(path)
+        if server.diagnostics_enabled:
+            # A closed document's diagnostics are no longer kept up to date
+            server.diagnostics.cancel(uri)
+            server.publish_diagnostics(uri, None, [])
+
+    def _schedule_diagnostics(uri: str) -> None:
+        """Have an open document checked once the user stops typing."""
+        path = _uri_to_path(uri)
+        if path is None or not server.diagnostics_enabled:
+            return
+        open_documents = {
+            Path(os.path.abspath(open_path)): text
+            for open_uri, text in server.documents.items()
+            if open_uri != uri and (open_path := _uri_to_path(open_uri))
+        }
+        server.diagnostics.schedule(
+            uri,
+            server.versions.get(uri),
+            path,
+            server.documents[uri],
+            open_documents,
+        )
+
+    def _update_index(uri: str) -> None:
+        """Record an open document's latest tree, for the workspace index and
+        as its last valid tree if it has no errors."""
+        tree = server.trees[uri]
+        if not tree.root_node.has_error:
+            # A copy (sharing its subtrees), since didChange edits the
+            # document's tree in place
+            server.valid_trees[uri] = tree.copy()
+        path = _uri_to_path(uri)
+        if path is not None:
+            server.index.update_document(path, tree)
 
     def _get_deps_partial_from_prefix(prefix: str) -> str:
         """Extract the partial task name being typed in a deps field.
@@ -281,6 +508,32 @@ def create_server() -> TasktreeLanguageServer:
     def completion(params: CompletionParams) -> CompletionList:
         """Handle completion request.
 
+        See ``_complete``.  The number of parses the request cost is logged
+        at debug level: with the recovery trees of a broken document cached
+        per version, it is at most one per document version, and none for
+        further requests on that version.
+
+        Args:
+            params: Completion request parameters containing document URI and cursor position
+
+        Returns:
+            CompletionList containing matching completion items, or empty list if no matches
+        """
+        parses = parse_count()
+        result = _complete(params)
+        logger.debug(
+            "completion %s %d:%d: %d item(s), %d parse(s)",
+            params.text_document.uri,
+            params.position.line,
+            params.position.character,
+            len(result.items),
+            parse_count() - parses,
+        )
+        return result
+
+    def _complete(params: CompletionParams) -> CompletionList:
+        """Compute completions for a completion request.
+
         Provides context-aware completions for tasktree YAML files.
         Currently supports:
         - tt.* built-in variable completion
@@ -397,12 +650,18 @@ def create_server() -> TasktreeLanguageServer:
             and not is_inside_open_template(prefix)
             and not _is_inside_open_parens(prefix)
         ):
-            # Resolve the document path so we can follow imports
+            # Local task names, plus those of the files the document
+            # imports (transitively), from the workspace index
+            all_task_names = extract_task_names(tree)
+            if not all_task_names and uri in server.valid_trees:
+                # Nothing recovered from the broken document: fall back to
+                # its last version that parsed
+                all_task_names = extract_task_names(server.valid_trees[uri])
             file_path = _uri_to_path(uri)
-            base_path = str(Path(file_path).parent) if file_path else None
-
-            # Get all available task names, including from imported files
-            all_task_names = extract_task_names(tree, base_path)
+            if file_path is not None:
+                all_task_names = sorted(
+                    all_task_names + list(server.index.imported_tasks(file_path))
+                )
 
             # Exclude the current task (a task cannot depend on itself)
             current_task = get_task_at_position(tree, position)
@@ -431,6 +690,8 @@ def create_server() -> TasktreeLanguageServer:
 
     # Store handler references for testing
     server.handlers["initialize"] = initialize
+    server.handlers["initialized"] = initialized
+    server.handlers["workspace/didChangeWatchedFiles"] = did_change_watched_files
     server.handlers["shutdown"] = shutdown
     server.handlers["exit"] = exit
     server.handlers["textDocument/didOpen"] = did_open
@@ -7,9 +7,17 @@ invalid regions as ERROR nodes rather than aborting.  This gives consistent,
 queryable structure regardless of document validity — essential for an LSP
 that operates on documents that are almost always incomplete.
 
+Mappings and sequences are read with compiled tree-sitter queries, matched
+in C, rather than by walking their children in Python.  What completion
+asks for again and again is computed once per tree, i.e. per document
+version: the ``tasks:`` section's index (task names and where each starts)
+and each task's args and named inputs and outputs.
+
 Public API
 ----------
-parse_document(text)                   → Tree
+parse_document(text, old_tree)         → Tree
+parse_count()                          → int
+apply_edit(text, tree, start, end, s)  → str
 get_task_at_position(tree, line, col)  → str | None
 is_in_field(tree, line, col, name)     → bool
 is_in_substitutable_field(tree, l, c)  → bool
@@ -18,13 +26,22 @@ extract_task_args(tree, task_name)     → list[str]
 extract_task_inputs(tree, task_name)   → list[str]
 extract_task_outputs(tree, task_name)  → list[str]
 extract_task_names(tree, base_path)    → list[str]
+extract_imports(tree)                  → list[tuple[str, str]]
+extract_task_symbols(tree)             → dict[str, tuple[list, list, list]]
+task_key_range(tree, task_name)        → Span | None
+import_range(tree, namespace)          → Span | None
 """
 
 import logging
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+from collections.abc import Callable
 from pathlib import Path
+from typing import NamedTuple
 
 import tree_sitter_yaml as tsyaml
-from tree_sitter import Language, Node, Parser, Tree
+from tree_sitter import Language, Node, Parser, Query, QueryCursor, Tree
 
 logger = logging.getLogger(__name__)
 
@@ -35,6 +52,18 @@ logger = logging.getLogger(__name__)
 _YAML_LANGUAGE = Language(tsyaml.language())
 _parser = Parser(_YAML_LANGUAGE)
 
+# Parses run by parse_document, per thread (see parse_count)
+_parse_stats = threading.local()
+
+# Values derived from a tree's source (its decoded text, and the recovery
+# trees re-parsed from it), per tree: each document version has its own
+# Tree, so a broken document is re-parsed once per version rather than by
+# every helper on every completion request.  Entries hold their tree, so its
+# id cannot be reused while they exist; the least recently used are dropped.
+_DERIVED_CACHE_SIZE = 8
+_derived: OrderedDict[int, tuple[Tree, dict[str, object]]] = OrderedDict()
+_derived_lock = threading.Lock()
+
 # ---------------------------------------------------------------------------
 # Node-type sets (verified against tree-sitter-yaml 0.7.x grammar)
 # ---------------------------------------------------------------------------
@@ -42,19 +71,54 @@ _parser = Parser(_YAML_LANGUAGE)
 _PAIR_TYPES = frozenset({"block_mapping_pair", "flow_pair"})
 _MAPPING_TYPES = frozenset({"block_mapping", "flow_mapping"})
 _SEQUENCE_TYPES = frozenset({"block_sequence", "flow_sequence"})
-# Punctuation tokens that appear as direct children of flow sequences
-_FLOW_SEQ_PUNCT = frozenset({"[", "]", ","})
 
 # Fields where {{ arg.* }} and {{ self.* }} substitutions are valid
 _SUBSTITUTABLE_FIELDS = frozenset({"cmd", "working_dir", "outputs", "deps", "default"})
 
+# ---------------------------------------------------------------------------
+# Compiled queries
+# ---------------------------------------------------------------------------
+#
+# Run with a max start depth of 0, so that they match the node they are run
+# on (a mapping, a sequence) and not the collections nested in it.
+
+# A mapping's key/value pairs with a string key, and the key's scalar
+# (other keys, such as numbers, are not names _get_scalar_value would read)
+_MAPPING_PAIRS_QUERY = Query(
+    _YAML_LANGUAGE,
+    """
+    (block_mapping
+      (block_mapping_pair
+        key: (flow_node
+          [(plain_scalar (string_scalar) @key)
+           (double_quote_scalar) @key
+           (single_quote_scalar) @key])) @pair)
+    (flow_mapping
+      (flow_pair
+        key: (flow_node
+          [(plain_scalar (string_scalar) @key)
+           (double_quote_scalar) @key
+           (single_quote_scalar) @key])) @pair)
+    """,
+)
+
+# A sequence's items; the punctuation of flow sequences is anonymous, so
+# (_) skips it
+_SEQUENCE_ITEMS_QUERY = Query(
+    _YAML_LANGUAGE,
+    """
+    (block_sequence (block_sequence_item) @item)
+    (flow_sequence (_) @item)
+    """,
+)
+
 
 # ---------------------------------------------------------------------------
 # Document parsing
 # ---------------------------------------------------------------------------
 
 
-def parse_document(text: str) -> Tree:
+def parse_document(text: str, old_tree: Tree | None = None) -> Tree:
     """Parse YAML text with tree-sitter, always returning a Tree.
 
     Unlike PyYAML, tree-sitter never raises on invalid input.  ERROR nodes
@@ -62,12 +126,154 @@ def parse_document(text: str) -> Tree:
     and traversable.
 
     Args:
-        text: Raw YAML document text (may be incomplete or malformed).
+        text:     Raw YAML document text (may be incomplete or malformed).
+        old_tree: The document's previous tree, already updated with
+                  ``apply_edit``.  Tree-sitter reuses its unchanged subtrees,
+                  so only the edited regions are parsed again.
 
     Returns:
         A tree_sitter.Tree for the document.
     """
-    return _parser.parse(bytes(text, "utf-8"))
+    source = bytes(text, "utf-8")
+    _parse_stats.count = parse_count() + 1
+    if old_tree is None:
+        return _parser.parse(source)
+    return _parser.parse(source, old_tree)
+
+
+def parse_count() -> int:
+    """Return how many parses parse_document has run on this thread.
+
+    Recovery trees for broken documents are parsed here too, so the
+    difference across a request counts every parse it cost.
+
+    Returns:
+        The running count for the calling thread.
+    """
+    return getattr(_parse_stats, "count", 0)
+
+
+# ---------------------------------------------------------------------------
+# Incremental editing
+# ---------------------------------------------------------------------------
+
+
+def _locate(text: str, line: int, character: int) -> tuple[int, int, tuple[int, int]]:
+    """Locate an LSP position (UTF-16 code units) in *text*.
+
+    Positions past the end of a line or of the document are clamped to it,
+    as the LSP specification asks.
+
+    Returns:
+        The string index, the byte offset and the tree-sitter point
+        (row, byte column) of the position.
+    """
+    line_start = 0
+    row = 0
+    while row < line:
+        newline = text.find("\n", line_start)
+        if newline < 0:
+            break
+        line_start = newline + 1
+        row += 1
+    line_end = text.find("\n", line_start)
+    line_text = text[line_start : line_end if line_end >= 0 else len(text)]
+    if row < line:
+        # Past the last line: the end of the document
+        character = len(line_text) * 2
+
+    index = 0
+    units = 0
+    while index < len(line_text) and units < character:
+        units += 2 if ord(line_text[index]) > 0xFFFF else 1
+        index += 1
+    column = len(line_text[:index].encode("utf-8"))
+    byte_offset = len(text[:line_start].encode("utf-8")) + column
+    return line_start + index, byte_offset, (row, column)
+
+
+def apply_edit(
+    text: str,
+    tree: Tree | None,
+    start: tuple[int, int],
+    end: tuple[int, int],
+    new_text: str,
+) -> str:
+    """Apply an LSP range edit to a document and, in place, to its tree.
+
+    The tree is only told where the text changed (``Tree.edit``), not
+    re-parsed: pass it to ``parse_document`` with the new text once all of
+    a notification's edits are applied.
+
+    Args:
+        text:     The document text before the edit.
+        tree:     The document's tree, or None to edit only the text.
+        start:    (line, character) where the replaced range starts.
+        end:      (line, character) where it ends.
+        new_text: The text replacing the range.
+
+    Returns:
+        The document text after the edit.
+    """
+    start_index, start_byte, start_point = _locate(text, *start)
+    end_index, old_end_byte, old_end_point = _locate(text, *end)
+    if tree is not None:
+        # The tree no longer matches what was derived from its old source
+        with _derived_lock:
+            _derived.pop(id(tree), None)
+        inserted = new_text.encode("utf-8")
+        newline = inserted.rfind(b"\n")
+        if newline < 0:
+            new_end_point = (start_point[0], start_point[1] + len(inserted))
+        else:
+            new_end_point = (
+                start_point[0] + inserted.count(b"\n"),
+                len(inserted) - newline - 1,
+            )
+        tree.edit(
+            start_byte=start_byte,
+            old_end_byte=old_end_byte,
+            new_end_byte=start_byte + len(inserted),
+            start_point=start_point,
+            old_end_point=old_end_point,
+            new_end_point=new_end_point,
+        )
+    return text[:start_index] + new_text + text[end_index:]
+
+
+# ---------------------------------------------------------------------------
+# Values derived from a tree's source
+# ---------------------------------------------------------------------------
+
+
+def _derive(tree: Tree, key: str, compute: Callable[[], object]) -> object:
+    """Return ``compute()`` for *tree*, computed once per tree and *key*."""
+    with _derived_lock:
+        entry = _derived.get(id(tree))
+        if entry is not None and entry[0] is tree:
+            _derived.move_to_end(id(tree))
+            if key in entry[1]:
+                return entry[1][key]
+    value = compute()
+    with _derived_lock:
+        entry = _derived.get(id(tree))
+        if entry is None or entry[0] is not tree:
+            entry = (tree, {})
+            _derived[id(tree)] = entry
+            while len(_derived) > _DERIVED_CACHE_SIZE:
+                _derived.popitem(last=False)
+        entry[1][key] = value
+    return value
+
+
+def _source_text(tree: Tree) -> str | None:
+    """Return the tree's source as text, or None if it is unavailable."""
+
+    def decode() -> str | None:
+        source_bytes = tree.root_node.text
+        return None if source_bytes is None else source_bytes.decode("utf-8")
+
+    return _derive(tree, "text", decode)
 
 
 # ---------------------------------------------------------------------------
@@ -144,28 +350,42 @@ def _get_pair_value_node(pair_node: Node) -> Node | None:
     return None
 
 
-def _iter_mapping_pairs(mapping_node: Node):
-    """Yield all ``block_mapping_pair`` / ``flow_pair`` children."""
-    if mapping_node is None:
-        return
-    for child in mapping_node.children:
-        if child.type in _PAIR_TYPES:
-            yield child
+def _query_cursor(query: Query) -> QueryCursor:
+    """Return a cursor matching *query* at the node it is run on only."""
+    cursor = QueryCursor(query)
+    cursor.set_max_start_depth(0)
+    return cursor
 
 
-def _iter_sequence_items(sequence_node: Node):
-    """Yield content items from a ``block_sequence`` or ``flow_sequence``.
+def _mapping_pairs(mapping_node: Node | None) -> list[tuple[str, Node]]:
+    """Return ``(key, pair)`` for each pair of a mapping, in document order.
 
-    Skips punctuation tokens (``[``, ``]``, ``,``).
-    For ``block_sequence``, children are ``block_sequence_item`` nodes.
-    For ``flow_sequence``, children are ``flow_node`` values interleaved
-    with punctuation.
+    Pairs without a string key are skipped.
+    """
+    if mapping_node is None:
+        return []
+    pairs = []
+    for _, captures in _query_cursor(_MAPPING_PAIRS_QUERY).matches(mapping_node):
+        pair = captures["pair"][0]
+        key = _get_text(captures["key"][0])
+        if captures["key"][0].type != "string_scalar":
+            key = key[1:-1] if len(key) >= 2 else key  # strip the quotes
+        pairs.append((key, pair))
+    pairs.sort(key=lambda key_and_pair: key_and_pair[1].start_byte)
+    return pairs
+
+
+def _sequence_items(sequence_node: Node | None) -> list[Node]:
+    """Return the items of a ``block_sequence`` or ``flow_sequence``.
+
+    For ``block_sequence``, items are ``block_sequence_item`` nodes.  For
+    ``flow_sequence``, they are its named children (``flow_node`` values,
+    without the punctuation between them).
     """
     if sequence_node is None:
-        return
-    for child in sequence_node.children:
-        if child.type not in _FLOW_SEQ_PUNCT:
-            yield child
+        return []
+    items = _query_cursor(_SEQUENCE_ITEMS_QUERY).captures(sequence_node)
+    return sorted(items.get("item", []), key=lambda item: item.start_byte)
 
 
 def _find_mapping_in_node(node: Node) -> Node | None:
@@ -231,11 +451,8 @@ def _find_section_value(root_node: Node, key: str) -> Node | None:
 
     Works for any value type (mapping, sequence, scalar).
     """
-    root_mapping = _get_root_mapping(root_node)
-    if root_mapping is None:
-        return None
-    for pair in _iter_mapping_pairs(root_mapping):
-        if _get_pair_key(pair) == key:
+    for pair_key, pair in _mapping_pairs(_get_root_mapping(root_node)):
+        if pair_key == key:
             return _get_pair_value_node(pair)
     return None
 
@@ -246,28 +463,81 @@ def _find_section_mapping(root_node: Node, key: str) -> Node | None:
     return _find_mapping_in_node(value)
 
 
-def _find_task_mapping(tree: Tree, task_name: str) -> Node | None:
-    """Return the body mapping for a named task."""
+class _TaskIndex(NamedTuple):
+    """The tasks of a ``tasks:`` section, in document order."""
+
+    names: list[str]
+    # Where each task's pair starts, for bisecting a position
+    starts: list[tuple[int, int]]
+    # The first pair of each task name
+    pairs: dict[str, Node]
+
+
+def _index_tasks(tree: Tree) -> _TaskIndex | None:
+    """Index the ``tasks:`` section, or return None if there is none."""
     tasks_mapping = _find_section_mapping(tree.root_node, "tasks")
     if tasks_mapping is None:
         return None
-    for pair in _iter_mapping_pairs(tasks_mapping):
-        if _get_pair_key(pair) == task_name:
-            value = _get_pair_value_node(pair)
-            return _find_mapping_in_node(value)
-    return None
+    index = _TaskIndex([], [], {})
+    for name, pair in _mapping_pairs(tasks_mapping):
+        if name:
+            index.names.append(name)
+            index.starts.append(tuple(pair.start_point))
+            index.pairs.setdefault(name, pair)
+    return index
+
 
+def _tasks(tree: Tree) -> _TaskIndex | None:
+    """Return the tree's task index, built once per tree (see ``_derive``)."""
+    return _derive(tree, "tasks", lambda: _index_tasks(tree))
 
-def _find_field_value_in_mapping(
-    task_mapping: Node, field_name: str
-) -> Node | None:
-    """Return the value node for a named field inside a task mapping."""
-    if task_mapping is None:
+
+def _find_task_mapping(tree: Tree, task_name: str) -> Node | None:
+    """Return the body mapping for a named task."""
+    index = _tasks(tree)
+    pair = index.pairs.get(task_name) if index is not None else None
+    if pair is None:
         return None
-    for pair in _iter_mapping_pairs(task_mapping):
-        if _get_pair_key(pair) == field_name:
-            return _get_pair_value_node(pair)
-    return None
+    return _find_mapping_in_node(_get_pair_value_node(pair))
+
+
+def _symbols_of_task(
+    task_mapping: Node | None,
+) -> tuple[list[str], list[str], list[str]]:
+    """Return a task body's (arg names, named inputs, named outputs), sorted."""
+    fields: dict[str, Node | None] = {}
+    for key, pair in _mapping_pairs(task_mapping):
+        if key in ("args", "inputs", "outputs"):
+            fields.setdefault(key, _get_pair_value_node(pair))
+    args = _find_sequence_in_node(fields.get("args"))
+    inputs = _find_sequence_in_node(fields.get("inputs"))
+    outputs = _find_sequence_in_node(fields.get("outputs"))
+    return (
+        sorted(_extract_arg_names_from_sequence(args)),
+        sorted(_extract_named_io_from_sequence(inputs)),
+        sorted(_extract_named_io_from_sequence(outputs)),
+    )
+
+
+def _task_symbols(
+    tree: Tree, task_name: str
+) -> tuple[list[str], list[str], list[str]]:
+    """Return a task's symbols (see ``_symbols_of_task``), once per tree.
+
+    A task not found in a broken document is looked for in the document
+    re-parsed without its unclosed template.  The lists are shared between
+    callers: copy them before handing them out.
+    """
+
+    def compute() -> tuple[list[str], list[str], list[str]]:
+        task_mapping = _find_task_mapping(tree, task_name)
+        if task_mapping is None:
+            clean = _tree_without_broken_template(tree)
+            if clean is not None:
+                task_mapping = _find_task_mapping(clean, task_name)
+        return _symbols_of_task(task_mapping)
+
+    return _derive(tree, f"task:{task_name}", compute)
 
 
 # ---------------------------------------------------------------------------
@@ -295,10 +565,10 @@ def _get_task_at_position_by_text(
         Task name string, or ``None`` if detection fails.
     """
     try:
-        source_bytes = tree.root_node.text
-        if source_bytes is None:
+        text = _source_text(tree)
+        if text is None:
             return None
-        lines = source_bytes.decode("utf-8").splitlines()
+        lines = text.splitlines()
 
         tasks_indent: int | None = None
         task_indent: int | None = None
@@ -359,7 +629,8 @@ def get_task_at_position(tree: Tree, line: int, col: int) -> str | None:
 
     The algorithm finds the task whose ``block_mapping_pair`` (or
     ``flow_pair``) in the ``tasks:`` mapping starts closest to — but not
-    after — the cursor position.  When tree-sitter error-recovery has lost
+    after — the cursor position, by bisecting the tasks' start positions
+    (indexed once per tree).  When tree-sitter error-recovery has lost
     the mapping structure (entire document in one ERROR node), falls back
     to a line-based text scan via :func:`_get_task_at_position_by_text`.
 
@@ -377,24 +648,13 @@ def get_task_at_position(tree: Tree, line: int, col: int) -> str | None:
         if line > tree.root_node.end_point[0]:
             return None
 
-        tasks_mapping = _find_section_mapping(tree.root_node, "tasks")
-        if tasks_mapping is None:
+        index = _tasks(tree)
+        if index is None:
             return _get_task_at_position_by_text(tree, line)
 
-        cursor_pt = (line, col)
-        best_task: str | None = None
-        best_start = (-1, -1)
-
-        for pair in _iter_mapping_pairs(tasks_mapping):
-            task_name = _get_pair_key(pair)
-            if not task_name:
-                continue
-            pair_start = pair.start_point  # (row, col)
-            if pair_start <= cursor_pt and pair_start > best_start:
-                best_task = task_name
-                best_start = pair_start
-
-        return best_task
+        # Tasks starting at or before the cursor
+        preceding = bisect_right(index.starts, (line, col))
+        return index.names[preceding - 1] if preceding else None
     except Exception as e:
         logger.debug("get_task_at_position failed: %s", e)
         return None
@@ -427,10 +687,10 @@ def _is_in_field_by_text(
         True if the cursor appears to be in the value of the named field.
     """
     try:
-        source_bytes = tree.root_node.text
-        if source_bytes is None:
+        text = _source_text(tree)
+        if text is None:
             return False
-        lines = source_bytes.decode("utf-8").splitlines()
+        lines = text.splitlines()
         if line >= len(lines):
             return False
 
@@ -567,12 +827,15 @@ def _tree_without_last_line(tree: Tree) -> Tree | None:
     Removing the last line often restores a structurally valid document.
 
     Returns ``None`` when the source is unavailable or stripping leaves no
-    useful content.
+    useful content.  Computed once per tree (see ``_derive``).
     """
-    source_bytes = tree.root_node.text
-    if source_bytes is None:
+    return _derive(tree, "without_last_line", lambda: _strip_last_line(tree))
+
+
+def _strip_last_line(tree: Tree) -> Tree | None:
+    text = _source_text(tree)
+    if text is None:
         return None
-    text = source_bytes.decode("utf-8")
     last_newline = text.rfind("\n")
     if last_newline == -1:
         return None  # single-line document; nothing useful to keep
@@ -595,12 +858,18 @@ def _tree_without_broken_template(tree: Tree) -> Tree | None:
     document whose task/section structure is intact.
 
     Returns ``None`` when no unclosed template is found, when the source
-    is unavailable, or when stripping leaves no useful content.
+    is unavailable, or when stripping leaves no useful content.  Computed
+    once per tree (see ``_derive``).
     """
-    source_bytes = tree.root_node.text
-    if source_bytes is None:
+    return _derive(
+        tree, "without_broken_template", lambda: _strip_broken_template(tree)
+    )
+
+
+def _strip_broken_template(tree: Tree) -> Tree | None:
+    text = _source_text(tree)
+    if text is None:
         return None
-    text = source_bytes.decode("utf-8")
     last_open = text.rfind("{{")
     # Assumption: if `}}` appears anywhere after the last `{{` in the document,
     # the template is considered closed and no stripping is needed.  This is
@@ -638,14 +907,7 @@ def extract_variables(tree: Tree) -> list[str]:
     """
     try:
         variables_mapping = _find_section_mapping(tree.root_node, "variables")
-        if variables_mapping is None:
-            return []
-        names = []
-        for pair in _iter_mapping_pairs(variables_mapping):
-            name = _get_pair_key(pair)
-            if name:
-                names.append(name)
-        return sorted(names)
+        return sorted(name for name, _ in _mapping_pairs(variables_mapping) if name)
     except Exception as e:
         logger.debug("extract_variables failed: %s", e)
         return []
@@ -658,14 +920,13 @@ def _extract_arg_names_from_sequence(sequence_node: Node) -> list[str]:
     - Dict items (``- arg_name: {…}``) → the first key is the arg name.
     """
     names = []
-    for item in _iter_sequence_items(sequence_node):
+    for item in _sequence_items(sequence_node):
         inner = _item_to_scalar_or_mapping(item)
         if isinstance(inner, str):
             if inner:
                 names.append(inner)
         elif inner is not None:
-            for pair in _iter_mapping_pairs(inner):
-                name = _get_pair_key(pair)
+            for name, _ in _mapping_pairs(inner):
                 if name:
                     names.append(name)
                     break  # one key per arg item
@@ -678,13 +939,12 @@ def _extract_named_io_from_sequence(sequence_node: Node) -> list[str]:
     Only dict items are returned; plain string items (anonymous) are skipped.
     """
     names = []
-    for item in _iter_sequence_items(sequence_node):
+    for item in _sequence_items(sequence_node):
         inner = _item_to_scalar_or_mapping(item)
         if isinstance(inner, str):
             pass  # anonymous — skip
         elif inner is not None:
-            for pair in _iter_mapping_pairs(inner):
-                name = _get_pair_key(pair)
+            for name, _ in _mapping_pairs(inner):
                 if name:
                     names.append(name)
                     break
@@ -705,18 +965,7 @@ def extract_task_args(tree: Tree, task_name: str) -> list[str]:
         Alphabetically sorted list of arg names, or empty list.
     """
     try:
-        task_mapping = _find_task_mapping(tree, task_name)
-        if task_mapping is None:
-            clean = _tree_without_broken_template(tree)
-            if clean is not None:
-                task_mapping = _find_task_mapping(clean, task_name)
-        if task_mapping is None:
-            return []
-        args_value = _find_field_value_in_mapping(task_mapping, "args")
-        if args_value is None:
-            return []
-        sequence = _find_sequence_in_node(args_value)
-        return sorted(_extract_arg_names_from_sequence(sequence))
+        return list(_task_symbols(tree, task_name)[0])
     except Exception as e:
         logger.debug("extract_task_args(%r) failed: %s", task_name, e)
         return []
@@ -736,18 +985,7 @@ def extract_task_inputs(tree: Tree, task_name: str) -> list[str]:
         Alphabetically sorted list of named input identifiers.
     """
     try:
-        task_mapping = _find_task_mapping(tree, task_name)
-        if task_mapping is None:
-            clean = _tree_without_broken_template(tree)
-            if clean is not None:
-                task_mapping = _find_task_mapping(clean, task_name)
-        if task_mapping is None:
-            return []
-        inputs_value = _find_field_value_in_mapping(task_mapping, "inputs")
-        if inputs_value is None:
-            return []
-        sequence = _find_sequence_in_node(inputs_value)
-        return sorted(_extract_named_io_from_sequence(sequence))
+        return list(_task_symbols(tree, task_name)[1])
     except Exception as e:
         logger.debug("extract_task_inputs(%r) failed: %s", task_name, e)
         return []
@@ -767,18 +1005,7 @@ def extract_task_outputs(tree: Tree, task_name: str) -> list[str]:
         Alphabetically sorted list of named output identifiers.
     """
     try:
-        task_mapping = _find_task_mapping(tree, task_name)
-        if task_mapping is None:
-            clean = _tree_without_broken_template(tree)
-            if clean is not None:
-                task_mapping = _find_task_mapping(clean, task_name)
-        if task_mapping is None:
-            return []
-        outputs_value = _find_field_value_in_mapping(task_mapping, "outputs")
-        if outputs_value is None:
-            return []
-        sequence = _find_sequence_in_node(outputs_value)
-        return sorted(_extract_named_io_from_sequence(sequence))
+        return list(_task_symbols(tree, task_name)[2])
     except Exception as e:
         logger.debug("extract_task_outputs(%r) failed: %s", task_name, e)
         return []
@@ -802,30 +1029,22 @@ def extract_task_names(
         Alphabetically sorted list of all available task names.
     """
     try:
-        tasks_mapping = _find_section_mapping(tree.root_node, "tasks")
+        index = _tasks(tree)
 
         # If the tree is all ERROR (broken YAML), try re-parsing with the
         # broken content removed so we can still query task structure.
-        if tasks_mapping is None:
+        if index is None:
             for candidate in (
                 _tree_without_broken_template(tree),
                 _tree_without_last_line(tree),
             ):
                 if candidate is not None:
-                    tasks_mapping = _find_section_mapping(
-                        candidate.root_node, "tasks"
-                    )
-                    if tasks_mapping is not None:
+                    index = _tasks(candidate)
+                    if index is not None:
                         tree = candidate  # use clean tree for imports too
                         break
 
-        task_names: list[str] = []
-
-        if tasks_mapping is not None:
-            for pair in _iter_mapping_pairs(tasks_mapping):
-                name = _get_pair_key(pair)
-                if name:
-                    task_names.append(name)
+        task_names = list(index.names) if index is not None else []
 
         if base_path is not None:
             _extend_with_imported_task_names(tree, base_path, task_names)
@@ -852,16 +1071,50 @@ def _extend_with_imported_task_names(
         base_path:  Directory of the current file.
         task_names: List to extend in-place.
     """
+    try:
+        for import_file, namespace in extract_imports(tree):
+            try:
+                import_path = Path(base_path) / import_file
+                if not import_path.exists():
+                    continue
+                imported_text = import_path.read_text(encoding="utf-8")
+                # Not _tasks(): a throwaway tree would push the open
+                # documents' trees out of the cache
+                imported_index = _index_tasks(parse_document(imported_text))
+                if imported_index is None:
+                    continue
+                for name in imported_index.names:
+                    task_names.append(f"{namespace}.{name}")
+            except OSError as e:
+                logger.debug(
+                    "Could not read import file %s: %s", import_file, e
+                )
+    except Exception as e:
+        logger.debug("_extend_with_imported_task_names failed: %s", e)
+
+
+def extract_imports(tree: Tree) -> list[tuple[str, str]]:
+    """Extract the ``imports:`` section as (file, namespace) pairs.
+
+    Items missing ``file`` or ``as`` are skipped.
+
+    Args:
+        tree: Tree-sitter parse tree.
+
+    Returns:
+        The imports, in document order.
+    """
+    imports: list[tuple[str, str]] = []
     try:
         imports_value = _find_section_value(tree.root_node, "imports")
         if imports_value is None:
-            return
+            return imports
 
         imports_sequence = _find_sequence_in_node(imports_value)
         if imports_sequence is None:
-            return
+            return imports
 
-        for item in _iter_sequence_items(imports_sequence):
+        for item in _sequence_items(imports_sequence):
             item_mapping = _find_mapping_in_node(item)
             if item_mapping is None:
                 continue
@@ -869,35 +1122,112 @@ def _extend_with_imported_task_names(
             import_file: str | None = None
             namespace: str | None = None
 
-            for pair in _iter_mapping_pairs(item_mapping):
-                key = _get_pair_key(pair)
+            for key, pair in _mapping_pairs(item_mapping):
                 value_node = _get_pair_value_node(pair)
                 if key == "file":
                     import_file = _get_scalar_value(value_node)
                 elif key == "as":
                     namespace = _get_scalar_value(value_node)
 
-            if not import_file or not namespace:
-                continue
+            if import_file and namespace:
+                imports.append((import_file, namespace))
+    except Exception as e:
+        logger.debug("extract_imports failed: %s", e)
+    return imports
 
-            try:
-                import_path = Path(base_path) / import_file
-                if not import_path.exists():
-                    continue
-                imported_text = import_path.read_text(encoding="utf-8")
-                imported_tree = parse_document(imported_text)
-                imported_tasks_mapping = _find_section_mapping(
-                    imported_tree.root_node, "tasks"
-                )
-                if imported_tasks_mapping is None:
-                    continue
-                for pair in _iter_mapping_pairs(imported_tasks_mapping):
-                    name = _get_pair_key(pair)
-                    if name:
-                        task_names.append(f"{namespace}.{name}")
-            except OSError as e:
-                logger.debug(
-                    "Could not read import file %s: %s", import_file, e
+
+def extract_task_symbols(
+    tree: Tree,
+) -> dict[str, tuple[list[str], list[str], list[str]]]:
+    """Extract every task with its args and named inputs and outputs.
+
+    One pass over the ``tasks:`` section.  Unlike ``extract_task_args``
+    and friends, nothing is memoized: the workspace index calls this once
+    per file version, and keeps the result.
+
+    Args:
+        tree: Tree-sitter parse tree.
+
+    Returns:
+        Task name → (arg names, named inputs, named outputs), each list
+        sorted alphabetically.
+    """
+    symbols: dict[str, tuple[list[str], list[str], list[str]]] = {}
+    try:
+        tasks_mapping = _find_section_mapping(tree.root_node, "tasks")
+        for name, pair in _mapping_pairs(tasks_mapping):
+            if name:
+                symbols[name] = _symbols_of_task(
+                    _find_mapping_in_node(_get_pair_value_node(pair))
                 )
     except Exception as e:
-        logger.debug("_extend_with_imported_task_names failed: %s", e)
+        logger.debug("extract_task_symbols failed: %s", e)
+    return symbols
+
+
+# ---------------------------------------------------------------------------
+# Public API — definition ranges (for diagnostics)
+# ---------------------------------------------------------------------------
+
+# ((start line, start column), (end line, end column)), zero-based; columns
+# are in UTF-8 bytes, as tree-sitter counts them
+Span = tuple[tuple[int, int], tuple[int, int]]
+
+
+def task_key_range(tree: Tree, task_name: str) -> Span | None:
+    """Find where a task's name is written in the ``tasks:`` section.
+
+    Args:
+        tree:      Tree-sitter parse tree.
+        task_name: Name of the task (local, not namespaced).
+
+    Returns:
+        The span of the task's key, or None if the task is not found.
+    """
+    try:
+        index = _tasks(tree)
+        pair = index.pairs.get(task_name) if index is not None else None
+        if pair is not None:
+            key = pair.children[0]
+            return key.start_point, key.end_point
+    except Exception as e:
+        logger.debug("task_key_range(%r) failed: %s", task_name, e)
+    return None
+
+
+def import_range(tree: Tree, namespace: str) -> Span | None:
+    """Find the ``imports:`` item importing a file as *namespace*.
+
+    Args:
+        tree:      Tree-sitter parse tree.
+        namespace: The import's ``as`` value.
+
+    Returns:
+        The span of the item's ``file`` value, or None if not found.
+    """
+    try:
+        imports_value = _find_section_value(tree.root_node, "imports")
+        imports_sequence = (
+            _find_sequence_in_node(imports_value) if imports_value else None
+        )
+        if imports_sequence is None:
+            return None
+        for item in _sequence_items(imports_sequence):
+            item_mapping = _find_mapping_in_node(item)
+            if item_mapping is None:
+                continue
+            fields = {
+                key: _get_pair_value_node(pair)
+                for key, pair in _mapping_pairs(item_mapping)
+            }
+            file_node = fields.get("file")
+            as_node = fields.get("as")
+            if (
+                file_node is not None
+                and as_node is not None
+                and _get_scalar_value(as_node) == namespace
+            ):
+                return file_node.start_point, file_node.end_point
+    except Exception as e:
+        logger.debug("import_range(%r) failed: %s", namespace, e)
+    return None
@@ -0,0 +1,312 @@
+"""Workspace index of recipe files and their imports, for the LSP server.
+
+Completing a dependency name offers the tasks of every file the document
+imports, transitively, under their namespace chain (``build.utils.clean``
+for a task ``clean`` in a file imported ``as: utils`` by one imported
+``as: build``), the same names the real parser gives them.  Reading and
+parsing those files on every completion request would cost a disk read and
+a parse per import.
+
+The index instead keeps each file's symbols (tasks with their args and named
+inputs and outputs, variables, and imports) in memory:
+
+- on ``initialize``, a background thread indexes every recipe file in the
+  workspace, and the files they import
+- open documents are indexed from the editor's text, as it is edited
+- other files are re-read when the client reports them changed
+  (``workspace/didChangeWatchedFiles``), or dropped when deleted
+
+A document's imported tasks are computed once and memoized until one of the
+files they come from changes, or the document's own imports do.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+from tree_sitter import Tree
+
+from tasktree.lsp.ts_context import (
+    extract_imports,
+    extract_task_symbols,
+    extract_variables,
+    parse_document,
+)
+
+__all__ = ["FileSymbols", "TaskSymbols", "WorkspaceIndex", "is_recipe_file"]
+
+logger = logging.getLogger(__name__)
+
+# File names tt finds a recipe under (see discovery.find_recipe_file)
+_RECIPE_NAMES = frozenset({"tasktree.yaml", "tasktree.yml", "tt.yaml", "tt.yml"})
+_RECIPE_SUFFIXES = frozenset({".tasks", ".tt"})
+
+
+def is_recipe_file(path: Path) -> bool:
+    """Whether *path* is named like a recipe tt would find on its own."""
+    return path.name in _RECIPE_NAMES or path.suffix in _RECIPE_SUFFIXES
+
+
+def _normalise(path: Path | str) -> Path:
+    return Path(os.path.normpath(os.path.abspath(path)))
+
+
+@dataclass(frozen=True)
+class TaskSymbols:
+    """The completable names of one task."""
+
+    args: tuple[str, ...] = ()
+    inputs: tuple[str, ...] = ()
+    outputs: tuple[str, ...] = ()
+
+
+@dataclass(frozen=True)
+class FileSymbols:
+    """The completable names of one recipe file."""
+
+    tasks: dict[str, TaskSymbols]
+    variables: tuple[str, ...]
+    # (namespace, resolved path) per import, in document order
+    imports: tuple[tuple[str, Path], ...]
+
+    @classmethod
+    def from_tree(cls, tree: Tree, path: Path) -> FileSymbols:
+        """Extract a file's symbols from its parse tree."""
+        return cls(
+            tasks={
+                name: TaskSymbols(tuple(args), tuple(inputs), tuple(outputs))
+                for name, (args, inputs, outputs) in extract_task_symbols(tree).items()
+            },
+            variables=tuple(extract_variables(tree)),
+            imports=_resolve_imports(tree, path),
+        )
+
+
+def _resolve_imports(tree: Tree, path: Path) -> tuple[tuple[str, Path], ...]:
+    """A file's imports, resolved against its directory as the parser does."""
+    return tuple(
+        (namespace, _normalise(path.parent / file))
+        for file, namespace in extract_imports(tree)
+    )
+
+
+class WorkspaceIndex:
+    """
+    Symbols of the workspace's recipe files, kept up to date as they change.
+
+    Safe to use from the server's handlers while build() runs in another
+    thread.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        # None records a file that could not be read
+        self._files: dict[Path, FileSymbols | None] = {}
+        # Open documents' latest trees, whose symbols are extracted when
+        # first needed (not on every keystroke)
+        self._open: dict[Path, Tree] = {}
+        # Imported tasks per document: (its imports, the tasks, the files
+        # they were gathered from)
+        self._imported: dict[
+            Path,
+            tuple[
+                tuple[tuple[str, Path], ...], dict[str, TaskSymbols], frozenset[Path]
+            ],
+        ] = {}
+
+    def build(self, root: Path | str) -> None:
+        """
+        Index every recipe file under *root*, and the files they import.
+
+        Directories starting with "." are skipped.  Files already indexed
+        (such as open documents) are left as they are.
+
+        Args:
+            root: The workspace folder
+        """
+        for directory, subdirectories, filenames in os.walk(root):
+            subdirectories[:] = [d for d in subdirectories if not d.startswith(".")]
+            for filename in filenames:
+                path = _normalise(Path(directory) / filename)
+                if is_recipe_file(path):
+                    self._symbols(path)
+                    for _, imported in self._imports_of(path):
+                        self._symbols(imported)
+        logger.debug("Indexed %d recipe file(s) under %s", len(self._files), root)
+
+    def update_document(self, path: Path | str, tree: Tree) -> None:
+        """
+        Record an open document's latest tree.
+
+        Args:
+            path: The document's path
+            tree: Its parse tree, after the latest edit
+        """
+        path = _normalise(path)
+        with self._lock:
+            self._open[path] = tree
+            self._files.pop(path, None)
+            self._invalidate_dependents(path)
+
+    def close_document(self, path: Path | str) -> None:
+        """
+        Forget an open document's unsaved text: the file on disk is indexed again.
+
+        Args:
+            path: The document's path
+        """
+        path = _normalise(path)
+        with self._lock:
+            self._open.pop(path, None)
+        self.file_changed(path)
+
+    def file_changed(self, path: Path | str) -> None:
+        """
+        Re-read a file that changed on disk (or was created).
+
+        Files neither indexed nor named like a recipe are ignored, as are
+        open documents: the editor's text wins.
+
+        Args:
+            path: The file's path
+        """
+        path = _normalise(path)
+        with self._lock:
+            if path in self._open:
+                return
+            known = path in self._files
+        if not known and not is_recipe_file(path):
+            return
+        symbols = self._read(path)
+        with self._lock:
+            if path not in self._open:
+                self._files[path] = symbols
+                self._invalidate_dependents(path)
+
+    def file_deleted(self, path: Path | str) -> None:
+        """
+        Drop a deleted file from the index.
+
+        Args:
+            path: The file's path
+        """
+        path = _normalise(path)
+        with self._lock:
+            if self._files.pop(path, None) is not None or path in self._open:
+                self._invalidate_dependents(path)
+
+    def imported_tasks(self, path: Path | str) -> dict[str, TaskSymbols]:
+        """
+        The tasks a file imports, transitively, by namespaced name.
+
+        Files not indexed yet (e.g. while build() is still running) are read
+        when first needed.  An import back into a file already being gathered
+        (a circular import, which tt rejects) is not followed.
+
+        Args:
+            path: The importing file (an open document or a file on disk)
+
+        Returns:
+            Namespaced task name (e.g. "build.utils.clean") → its symbols
+        """
+        path = _normalise(path)
+        imports = self._imports_of(path)
+        with self._lock:
+            cached = self._imported.get(path)
+        if cached is not None and cached[0] == imports:
+            return cached[1]
+
+        tasks: dict[str, TaskSymbols] = {}
+        sources = {path}
+        self._gather(imports, "", tasks, sources, [path])
+        with self._lock:
+            self._imported[path] = (imports, tasks, frozenset(sources))
+        return tasks
+
+    def symbols(self, path: Path | str) -> FileSymbols | None:
+        """
+        A file's own symbols, reading the file if it is not indexed yet.
+
+        Args:
+            path: The file's path
+
+        Returns:
+            Its symbols, or None if it cannot be read
+        """
+        return self._symbols(_normalise(path))
+
+    def _gather(
+        self,
+        imports: tuple[tuple[str, Path], ...],
+        prefix: str,
+        tasks: dict[str, TaskSymbols],
+        sources: set[Path],
+        stack: list[Path],
+    ) -> None:
+        """Add the tasks of *imports*, and of what they import, to *tasks*."""
+        for namespace, imported in imports:
+            sources.add(imported)
+            if imported in stack:
+                continue
+            symbols = self._symbols(imported)
+            if symbols is None:
+                continue
+            full_namespace = f"{prefix}{namespace}"
+            for name, task in symbols.tasks.items():
+                tasks[f"{full_namespace}.{name}"] = task
+            self._gather(
+                symbols.imports,
+                f"{full_namespace}.",
+                tasks,
+                sources,
+                stack + [imported],
+            )
+
+    def _imports_of(self, path: Path) -> tuple[tuple[str, Path], ...]:
+        """A file's imports; for an open document, from its latest tree."""
+        with self._lock:
+            tree = self._open.get(path)
+        if tree is None:
+            symbols = self._symbols(path)
+            return symbols.imports if symbols is not None else ()
+        imports = _resolve_imports(tree, path)
+        if not imports and tree.root_node.has_error:
+            # Mid-edit, a broken line can hide the whole imports section:
+            # keep the imports the document last had
+            with self._lock:
+                cached = self._imported.get(path)
+            if cached is not None:
+                return cached[0]
+        return imports
+
+    def _symbols(self, path: Path) -> FileSymbols | None:
+        with self._lock:
+            if path in self._files:
+                return self._files[path]
+            tree = self._open.get(path)
+        symbols = (
+            FileSymbols.from_tree(tree, path) if tree is not None else self._read(path)
+        )
+        with self._lock:
+            if self._open.get(path) is tree:
+                self._files[path] = symbols
+        return symbols
+
+    @staticmethod
+    def _read(path: Path) -> FileSymbols | None:
+        try:
+            text = path.read_text(encoding="utf-8")
+        except (OSError, UnicodeDecodeError) as e:
+            logger.debug("Could not index %s: %s", path, e)
+            return None
+        return FileSymbols.from_tree(parse_document(text), path)
+
+    def _invalidate_dependents(self, path: Path) -> None:
+        """Drop memoized imports gathered from *path*; the caller holds the lock."""
+        for importer, (_, _, sources) in list(self._imported.items()):
+            if path in sources and importer != path:
+                del self._imported[importer]
@@ -0,0 +1,432 @@
+"""Multiplexed task output for concurrent runs.
+
+When several tasks run at once, letting each write straight to the terminal
+interleaves their output mid-line. Instead, each running task's stdout and
+stderr are piped (through the shared output pump) into a :class:`TaskOutput`,
+and an :class:`OutputMultiplexer` decides how they reach the terminal:
+
+- ``interleaved``: complete lines as they arrive, each prefixed ``[task]``
+- ``grouped``: each task's output in one block when the task finishes
+- ``tail``: a live table of running tasks with their last few lines
+
+In every mode a task's full output (both streams, in arrival order) is also
+written to ``.tasktree/logs/<run>/<task>.log`` under the project root, which
+``tt --logs <task>`` reads back for the most recent run.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import shutil
+import struct
+import sys
+import time
+from collections import deque
+from enum import Enum
+from pathlib import Path
+from tempfile import SpooledTemporaryFile
+from threading import Lock
+from typing import IO, Any, Iterator
+
+from rich.console import Console, Group
+from rich.live import Live
+from rich.table import Table
+from rich.text import Text
+
+from tasktree.logging import Logger
+from tasktree.output_pump import StreamSink
+from tasktree.output_types import TaskOutputTypes
+
+__all__ = [
+    "LOGS_DIR",
+    "OutputMode",
+    "OutputMultiplexer",
+    "RunLogs",
+    "TaskOutput",
+]
+
+# Per-run log directories live here, relative to the project root
+LOGS_DIR = Path(".tasktree") / "logs"
+
+# File in LOGS_DIR naming the most recent run's directory
+_LATEST_RUN_FILE = "latest"
+
+# Number of runs whose logs are kept
+_KEPT_RUNS = 10
+
+# Output held in memory per buffer before it spills to a temporary file
+_SPOOL_MEMORY_LIMIT = 1024 * 1024
+
+# An unterminated line longer than this is emitted as it stands, so a task
+# that never writes a newline cannot grow the line buffer without bound
+_MAX_LINE_LENGTH = 64 * 1024
+
+# Lines shown per running task in tail mode
+TAIL_LINES = 5
+
+_STDOUT = 1
+_STDERR = 2
+
+# Header of each record in a spooled buffer: stream number, data length
+_RECORD_HEADER = struct.Struct("!BI")
+
+
+class OutputMode(Enum):
+    """
+    How the output of concurrently running tasks is shown.
+    """
+
+    INTERLEAVED = "interleaved"
+    GROUPED = "grouped"
+    TAIL = "tail"
+
+
+class RunLogs:
+    """
+    The log directory of one run: ``.tasktree/logs/<run>/``.
+    """
+
+    def __init__(self, run_dir: Path):
+        self.run_dir = run_dir
+        self._used_names: set[str] = set()
+        # Tasks are opened from the scheduler's worker threads
+        self._lock = Lock()
+
+    @classmethod
+    def create(cls, project_root: Path) -> RunLogs:
+        """
+        Create a log directory for a new run, record it as the latest run,
+        and remove the logs of all but the most recent runs.
+        """
+        logs_root = project_root / LOGS_DIR
+        # Timestamped names sort in run order; the pid separates nested runs
+        run_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+        run_dir = logs_root / run_id
+        run_dir.mkdir(parents=True, exist_ok=True)
+
+        latest_tmp = logs_root / f"{_LATEST_RUN_FILE}.{os.getpid()}.tmp"
+        latest_tmp.write_text(run_id)
+        os.replace(latest_tmp, logs_root / _LATEST_RUN_FILE)
+
+        runs = sorted(p for p in logs_root.iterdir() if p.is_dir())
+        for old_run in runs[:-_KEPT_RUNS]:
+            shutil.rmtree(old_run, ignore_errors=True)
+        return cls(run_dir)
+
+    @staticmethod
+    def latest(project_root: Path) -> Path | None:
+        """Log directory of the most recent run, or None if there is none."""
+        logs_root = project_root / LOGS_DIR
+        try:
+            run_id = (logs_root / _LATEST_RUN_FILE).read_text().strip()
+        except OSError:
+            return None
+        run_dir = logs_root / run_id
+        return run_dir if run_id and run_dir.is_dir() else None
+
+    @staticmethod
+    def file_name(label: str) -> str:
+        """Log file name for a task (path separators and the like replaced)."""
+        return re.sub(r"[^\w.\-]", "_", label) + ".log"
+
+    def path_for(self, label: str) -> Path:
+        """
+        Log file for a task in this run. A task run more than once (with
+        different arguments) gets numbered files after the first.
+        """
+        name = self.file_name(label)
+        stem = name[: -len(".log")]
+        n = 1
+        with self._lock:
+            while name in self._used_names:
+                n += 1
+                name = f"{stem}.{n}.log"
+            self._used_names.add(name)
+        return self.run_dir / name
+
+    @classmethod
+    def repeat_labels(cls, run_dir: Path, label: str) -> list[str]:
+        """
+        Names (``<task>.2``, ``<task>.3``, ...) by which ``tt --logs`` shows the
+        later runs of a task run more than once in a run.
+        """
+        stem = cls.file_name(label)[: -len(".log")]
+        repeats = []
+        n = 2
+        while (run_dir / f"{stem}.{n}.log").exists():
+            repeats.append(f"{label}.{n}")
+            n += 1
+        return repeats
+
+
+class TaskOutput:
+    """
+    Output of one task in a multiplexed run.
+
+    ``stdout`` and ``stderr`` are sinks for the output pump. Data written to
+    them goes to the task's log file, and to the terminal as the
+    multiplexer's mode and the task's output type (``--task-output``) allow.
+    """
+
+    def __init__(
+        self,
+        mux: OutputMultiplexer,
+        label: str,
+        log_path: Path,
+        output_type: TaskOutputTypes,
+    ):
+        self.label = label
+        self.log_path = log_path
+        self.state = "waiting"
+        self.started_at: float | None = None
+        self.stdout = _TaskStreamSink(self, _STDOUT)
+        self.stderr = _TaskStreamSink(self, _STDERR)
+        self._mux = mux
+        self._shown = {
+            _STDOUT: output_type in (TaskOutputTypes.ALL, TaskOutputTypes.OUT),
+            _STDERR: output_type in (TaskOutputTypes.ALL, TaskOutputTypes.ERR),
+        }
+        self._stderr_on_failure = output_type is TaskOutputTypes.ON_ERR
+        self._log: IO[bytes] | None = None
+        self._partial = {_STDOUT: bytearray(), _STDERR: bytearray()}
+        # Bounded buffers for output shown later: grouped mode's block, and
+        # stderr held back until we know whether the task failed (on-err)
+        self._grouped: SpooledTemporaryFile | None = None
+        self._deferred: SpooledTemporaryFile | None = None
+        self.tail: deque[str] = deque(maxlen=TAIL_LINES)
+
+    def start(self) -> None:
+        """Mark the task as running (it shows up in tail mode)."""
+        self._open_log()
+        self.started_at = time.monotonic()
+        self.state = "running"
+
+    def close(self, failed: bool) -> None:
+        """
+        Finish the task's output: show anything held back and close its log.
+        Also called for tasks that turned out to be up to date, which may
+        still have produced output (e.g. building a runner's image).
+
+        Args:
+            failed: Whether the task failed
+        """
+        if self._deferred is not None:
+            if failed:
+                for stream, data in _read_records(self._deferred):
+                    self._mux._display(self, stream, data)
+            self._deferred.close()
+            self._deferred = None
+        if self.started_at is not None:
+            self.state = "failed" if failed else "done"
+        self._mux._finish(self, failed)
+        if self._grouped is not None:
+            self._grouped.close()
+            self._grouped = None
+        if self._log is not None:
+            self._log.close()
+
+    def _open_log(self) -> None:
+        if self._log is None:
+            self._log = open(self.log_path, "wb")
+
+    def _write(self, stream: int, data: bytes) -> None:
+        self._open_log()
+        self._log.write(data)
+        if self._shown[stream]:
+            self._mux._display(self, stream, data)
+        elif stream == _STDERR and self._stderr_on_failure:
+            if self._deferred is None:
+                self._deferred = SpooledTemporaryFile(max_size=_SPOOL_MEMORY_LIMIT)
+            _write_record(self._deferred, stream, data)
+
+    def _flush(self) -> None:
+        if self._log is not None:
+            self._log.flush()
+
+    def _complete_lines(self, stream: int, data: bytes) -> list[bytes]:
+        """
+        Add data to the stream's unterminated line; return the lines it
+        completes (without their newlines).
+        """
+        partial = self._partial[stream]
+        partial += data
+        *lines, rest = partial.split(b"\n")
+        if len(rest) > _MAX_LINE_LENGTH:
+            lines.append(bytes(rest))
+            rest = b""
+        self._partial[stream] = bytearray(rest)
+        return lines
+
+    def _remaining_lines(self) -> list[tuple[int, bytes]]:
+        """Unterminated lines left at the end of the task."""
+        remaining = [(s, bytes(p)) for s, p in self._partial.items() if p]
+        for partial in self._partial.values():
+            partial.clear()
+        return remaining
+
+    def _group(self, stream: int, data: bytes) -> None:
+        if self._grouped is None:
+            self._grouped = SpooledTemporaryFile(max_size=_SPOOL_MEMORY_LIMIT)
+        _write_record(self._grouped, stream, data)
+
+
+class _TaskStreamSink:
+    """One stream of a TaskOutput, as an output pump sink."""
+
+    def __init__(self, output: TaskOutput, stream: int):
+        self._output = output
+        self._stream = stream
+
+    def write(self, data: bytes) -> None:
+        self._output._write(self._stream, data)
+
+    def flush(self) -> None:
+        self._output._flush()
+
+
+class OutputMultiplexer:
+    """
+    Shows the output of concurrently running tasks according to an
+    :class:`OutputMode`. Use as a context manager around the run.
+    """
+
+    def __init__(self, mode: OutputMode, run_logs: RunLogs, logger: Logger):
+        """
+        Args:
+            mode: How task output is shown
+            run_logs: Log directory of this run
+            logger: Logger for diagnostics
+        """
+        self.mode = mode
+        self.run_logs = run_logs
+        self._logger = logger
+        self._lock = Lock()
+        self._outputs: list[TaskOutput] = []
+        self._terminal: dict[int, StreamSink] = {}
+        self._live: Live | None = None
+
+    def __enter__(self) -> OutputMultiplexer:
+        # Resolved now rather than at construction, so redirected streams are honoured
+        self._terminal = {_STDOUT: StreamSink(sys.stdout), _STDERR: StreamSink(sys.stderr)}
+        if self.mode is OutputMode.TAIL:
+            self._live = Live(
+                self,
+                console=Console(),
+                refresh_per_second=4,
+                transient=True,
+                redirect_stdout=True,
+                redirect_stderr=True,
+            )
+            self._live.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        if self._live is not None:
+            self._live.stop()
+            self._live = None
+
+    def open(self, label: str, output_type: TaskOutputTypes) -> TaskOutput:
+        """
+        Create the output of a task about to be checked and (maybe) run.
+
+        Args:
+            label: Task name, used as the line prefix and log file name
+            output_type: Which of the task's streams are shown
+
+        Returns:
+            TaskOutput whose sinks receive the task's stdout and stderr
+        """
+        output = TaskOutput(self, label, self.run_logs.path_for(label), output_type)
+        with self._lock:
+            self._outputs.append(output)
+        return output
+
+    def _display(self, output: TaskOutput, stream: int, data: bytes) -> None:
+        if self.mode is OutputMode.GROUPED:
+            output._group(stream, data)
+            return
+        lines = output._complete_lines(stream, data)
+        if lines:
+            self._show_lines(output, [(stream, line) for line in lines])
+
+    def _show_lines(self, output: TaskOutput, lines: list[tuple[int, bytes]]) -> None:
+        if self.mode is OutputMode.TAIL:
+            with self._lock:
+                output.tail.extend(
+                    line.decode(errors="replace").rstrip("\r") for _, line in lines
+                )
+            return
+
+        prefix = f"[{output.label}] ".encode()
+        with self._lock:
+            # One write per stream per batch: a line is never split between writes
+            for stream in (_STDOUT, _STDERR):
+                batch = [prefix + line + b"\n" for s, line in lines if s == stream]
+                if batch:
+                    self._write_terminal(stream, b"".join(batch))
+
+    def _finish(self, output: TaskOutput, failed: bool) -> None:
+        remaining = output._remaining_lines()
+        if remaining:
+            self._show_lines(output, remaining)
+
+        if self.mode is OutputMode.GROUPED and output._grouped is not None:
+            with self._lock:
+                self._write_terminal(_STDOUT, f"==> {output.label} <==\n".encode())
+                for stream, data in _read_records(output._grouped):
+                    self._write_terminal(stream, data)
+                # Keep the next block's header on a line of its own
+                self._write_terminal(_STDOUT, b"\n")
+
+        if not failed:
+            return
+        if self.mode is OutputMode.TAIL and self._live is not None:
+            lines = "\n".join(output.tail)
+            self._live.console.print(
+                Text(f"[{output.label}] failed, last lines:", style="red"),
+                Text.from_ansi(lines) if lines else Text("(no output)", style="dim"),
+                sep="\n",
+            )
+        self._logger.info(f"Full log of '{output.label}': {output.log_path}")
+
+    def _write_terminal(self, stream: int, data: bytes) -> None:
+        sink = self._terminal[stream]
+        try:
+            sink.write(data)
+            sink.flush()
+        except (OSError, ValueError):
+            # Terminal gone (e.g. closed pipe); the log still has everything
+            pass
+
+    def __rich__(self) -> Group:
+        """Tail mode's live view: running tasks and their last lines."""
+        now = time.monotonic()
+        with self._lock:
+            running = [o for o in self._outputs if o.state == "running"]
+            done = sum(o.state == "done" for o in self._outputs)
+            failed = sum(o.state == "failed" for o in self._outputs)
+            rows = [(o.label, now - o.started_at, list(o.tail)) for o in running]
+
+        table = Table.grid(padding=(0, 1))
+        for label, elapsed, tail in rows:
+            table.add_row(Text(f"[{label}]", style="bold"), Text(f"{elapsed:.0f}s", style="dim"))
+            for line in tail:
+                table.add_row("", Text.from_ansi(line, no_wrap=True, overflow="ellipsis"))
+        summary = Text(
+            f"{len(rows)} running, {done} done, {failed} failed", style="dim"
+        )
+        return Group(table, summary)
+
+
+def _write_record(spool: IO[bytes], stream: int, data: bytes) -> None:
+    spool.write(_RECORD_HEADER.pack(stream, len(data)))
+    spool.write(data)
+
+
+def _read_records(spool: IO[bytes]) -> Iterator[tuple[int, bytes]]:
+    """Replay (stream, data) records from a spooled buffer, oldest first."""
+    spool.seek(0)
+    while header := spool.read(_RECORD_HEADER.size):
+        stream, length = _RECORD_HEADER.unpack(header)
+        yield stream, spool.read(length)
@@ -0,0 +1,461 @@
+"""Single-threaded pump for task subprocess output.
+
+Runners that filter or capture a task's output read it from a pipe. Rather
+than a thread per pipe doing ``readline`` and ``flush`` on every line, every
+such pipe in the process is registered with one :class:`OutputPump`, whose
+thread waits on all of them with :mod:`selectors`, drains whichever are
+readable in large non-blocking ``os.read`` chunks, and hands each sink all the
+data it received in a round as a single write, flushing once per round.
+
+``selectors`` cannot wait on pipes on Windows, where runners fall back to a
+thread per pipe (see :func:`OutputPump.supported`).
+"""
+
+from __future__ import annotations
+
+import codecs
+import os
+import selectors
+import sys
+import tempfile
+from pathlib import Path
+from threading import Event, Lock, Thread
+from typing import IO, Any, Protocol
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+__all__ = [
+    "BufferSink",
+    "OutputPump",
+    "OutputSink",
+    "PumpedStream",
+    "SpillBuffer",
+    "StreamSink",
+    "output_pump",
+    "send_file",
+]
+
+# Size of each read from a pipe. Reads return whatever is buffered, so a large
+# size costs nothing for a quiet pipe and drains a busy one in few syscalls.
+_READ_CHUNK_SIZE = 1024 * 1024
+
+# Reads from one pipe per round before moving on, so a single very chatty
+# task cannot starve the others
+_MAX_READS_PER_ROUND = 4
+
+# Pipe capacity requested on Linux (the default is 64 KiB). A larger pipe lets
+# a producer run further ahead between pump rounds, so each round moves more data.
+_PIPE_SIZE = 1024 * 1024
+
+
+class OutputSink(Protocol):
+    """Destination for pumped output."""
+
+    def write(self, data: bytes) -> None:
+        """Accept a batch of raw output."""
+        ...
+
+    def flush(self) -> None:
+        """Push out anything written so far (called once per pump round)."""
+        ...
+
+
+class StreamSink:
+    """
+    Sink writing to a file-like stream such as ``sys.stdout``.
+
+    Bytes go straight to the stream's binary buffer when it has one, so output
+    is passed through exactly as the task wrote it. Text-only streams (e.g. a
+    StringIO in tests) get the output decoded as UTF-8.
+    """
+
+    def __init__(self, target: IO[Any]):
+        self._target = target
+        self._buffer = getattr(target, "buffer", None)
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+    def write(self, data: bytes) -> None:
+        if self._buffer is not None:
+            # Anything already written through the text layer goes out first
+            self._target.flush()
+            self._buffer.write(data)
+        else:
+            self._target.write(self._decoder.decode(data))
+
+    def flush(self) -> None:
+        if self._buffer is not None:
+            self._buffer.flush()
+        else:
+            self._target.flush()
+
+
+class BufferSink:
+    """Sink that collects output in memory."""
+
+    def __init__(self) -> None:
+        self._data = bytearray()
+
+    def write(self, data: bytes) -> None:
+        self._data += data
+
+    def flush(self) -> None:
+        pass
+
+    def getvalue(self) -> bytes:
+        """Everything written so far."""
+        return bytes(self._data)
+
+
+class SpillBuffer:
+    """
+    Sink holding output to be shown later, in bounded memory.
+
+    Up to ``memory_limit`` bytes are kept in memory. Past that, everything
+    is written to a temporary file, and only the first and last ``keep``
+    bytes stay in memory, for showing a truncated version of huge output.
+    """
+
+    def __init__(self, memory_limit: int = 1024 * 1024, keep: int = 64 * 1024):
+        """
+        Args:
+            memory_limit: Bytes held in memory before spilling to a file
+            keep: Bytes kept in memory from each end of spilled output
+        """
+        self.size = 0
+        self._memory_limit = memory_limit
+        self._keep = keep
+        self._memory = bytearray()
+        self._head = b""
+        self._tail = bytearray()
+        self._file: IO[bytes] | None = None
+
+    @property
+    def spilled(self) -> bool:
+        """True once the output has outgrown memory and is in a file."""
+        return self._file is not None
+
+    def write(self, data: bytes) -> None:
+        self.size += len(data)
+        if self._file is None:
+            self._memory += data
+            if len(self._memory) <= self._memory_limit:
+                return
+            self._file = tempfile.NamedTemporaryFile(
+                prefix="tt-output-", suffix=".log", delete=False
+            )
+            self._file.write(self._memory)
+            self._head = bytes(self._memory[: self._keep])
+            self._tail = self._memory[-self._keep :]
+            self._memory = bytearray()
+        else:
+            self._file.write(data)
+            self._tail += data
+            del self._tail[: -self._keep]
+
+    def flush(self) -> None:
+        pass
+
+    def replay(self, target: IO[Any], limit: int) -> Path | None:
+        """
+        Write the buffered output to a stream.
+
+        Output of up to ``limit`` bytes is written in full (from a spilled
+        file with ``os.sendfile`` where possible). Larger output is shown as
+        its first and last lines around a notice, and the file holding all
+        of it is kept for the user to read.
+
+        Args:
+            target: Stream to write to, e.g. sys.stderr
+            limit: Largest output written in full
+
+        Returns:
+            Path of the kept file holding the full output, if it was truncated
+        """
+        if self._file is None:
+            sink = StreamSink(target)
+            sink.write(bytes(self._memory))
+            sink.flush()
+            return None
+
+        self._file.close()
+        path = Path(self._file.name)
+        if self.size <= limit:
+            send_file(path, target)
+            return None
+
+        # Cut at line boundaries where there are any, so no line is shown in part
+        head = self._head
+        if b"\n" in head:
+            head = head[: head.rindex(b"\n") + 1]
+        tail = bytes(self._tail)
+        if b"\n" in tail[:-1]:
+            tail = tail[tail.index(b"\n") + 1 :]
+        omitted = self.size - len(head) - len(tail)
+        notice = f"[... {omitted} bytes of output omitted; full output in {path} ...]\n"
+        if head and not head.endswith(b"\n"):
+            notice = "\n" + notice
+        sink = StreamSink(target)
+        sink.write(head)
+        sink.write(notice.encode())
+        sink.write(tail)
+        sink.flush()
+        # Keep the file: the notice points at it
+        self._file = None
+        return path
+
+    def discard(self) -> None:
+        """Free the buffer, deleting any spill file (unless kept by replay)."""
+        self._memory = bytearray()
+        if self._file is not None:
+            self._file.close()
+            os.unlink(self._file.name)
+            self._file = None
+
+
+def send_file(path: Path, target: IO[Any]) -> None:
+    """
+    Copy a file's contents to a stream, with ``os.sendfile`` straight to the
+    stream's file descriptor where the platform allows it.
+    """
+    target.flush()
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        offset = 0
+        try:
+            out_fd = target.fileno()
+            while offset < size:
+                sent = os.sendfile(out_fd, f.fileno(), offset, size - offset)
+                if sent == 0:
+                    break
+                offset += sent
+        except (AttributeError, OSError, ValueError):
+            # No usable descriptor (e.g. StringIO), or sendfile can't write to
+            # it (macOS only sends to sockets; some ttys refuse): copy the rest
+            pass
+        if offset < size:
+            f.seek(offset)
+            sink = StreamSink(target)
+            while chunk := f.read(_READ_CHUNK_SIZE):
+                sink.write(chunk)
+            sink.flush()
+
+
+class PumpedStream:
+    """
+    A pipe registered with an :class:`OutputPump`.
+    """
+
+    def __init__(self, fd: int, sink: OutputSink):
+        self.fd = fd
+        self.sink: OutputSink | None = sink
+        self.done = Event()
+
+
+class OutputPump:
+    """
+    Moves data from any number of pipes to their sinks, on one thread.
+
+    The thread is started on first use and then lives for the rest of the
+    process, idle in ``select`` while no task output is being pumped.
+    """
+
+    def __init__(self) -> None:
+        self._selector = selectors.DefaultSelector()
+        self._lock = Lock()
+        self._added: list[PumpedStream] = []
+        self._detached: list[PumpedStream] = []
+        self._thread: Thread | None = None
+        # Self-pipe used to wake the thread when streams are added or detached
+        self._wake_read_fd, self._wake_write_fd = os.pipe()
+        os.set_blocking(self._wake_read_fd, False)
+        os.set_blocking(self._wake_write_fd, False)
+        self._selector.register(self._wake_read_fd, selectors.EVENT_READ)
+
+    @staticmethod
+    def supported() -> bool:
+        """True if pipes can be waited on with selectors (not on Windows)."""
+        return os.name == "posix"
+
+    @staticmethod
+    def enlarge_pipe(fd: int) -> None:
+        """Grow a pipe's capacity where the platform allows it (Linux only)."""
+        set_pipe_size = getattr(fcntl, "F_SETPIPE_SZ", None)
+        if set_pipe_size is None:
+            return
+        try:
+            fcntl.fcntl(fd, set_pipe_size, _PIPE_SIZE)
+        except OSError:
+            # Above /proc/sys/fs/pipe-max-size; the default capacity still works
+            pass
+
+    def add(self, pipe: IO[bytes], sink: OutputSink) -> PumpedStream:
+        """
+        Start pumping a pipe into a sink.
+
+        The pipe stays owned by the caller, who closes it after :meth:`finish`.
+
+        Args:
+            pipe: Read end of a subprocess pipe (binary)
+            sink: Destination for the data
+
+        Returns:
+            PumpedStream to pass to :meth:`finish`
+        """
+        fd = pipe.fileno()
+        os.set_blocking(fd, False)
+        stream = PumpedStream(fd, sink)
+        with self._lock:
+            self._added.append(stream)
+            if self._thread is None:
+                self._thread = Thread(
+                    target=self._run, name="output-pump", daemon=True
+                )
+                self._thread.start()
+        self._wake()
+        return stream
+
+    def finish(self, stream: PumpedStream, timeout: float | None) -> bool:
+        """
+        Wait for a stream to reach end-of-file, then forget it.
+
+        A pipe can stay open after the task's process exits if something it
+        started in the background still holds it, so the wait is bounded.
+
+        Args:
+            stream: Stream returned by :meth:`add`
+            timeout: Seconds to wait for end-of-file
+
+        Returns:
+            True if the stream reached end-of-file, False if it was cut off
+        """
+        if stream.done.wait(timeout):
+            return True
+        with self._lock:
+            self._detached.append(stream)
+        self._wake()
+        stream.done.wait()
+        return False
+
+    def _wake(self) -> None:
+        try:
+            os.write(self._wake_write_fd, b"\0")
+        except BlockingIOError:
+            # Already plenty of wake-ups pending
+            pass
+
+    def _apply_changes(self) -> None:
+        try:
+            while os.read(self._wake_read_fd, 4096):
+                pass
+        except BlockingIOError:
+            pass
+        with self._lock:
+            added, self._added = self._added, []
+            detached, self._detached = self._detached, []
+        for stream in added:
+            self._selector.register(stream.fd, selectors.EVENT_READ, stream)
+        for stream in detached:
+            self._close(stream)
+
+    def _run(self) -> None:
+        while True:
+            touched: list[PumpedStream] = []
+            for key, _ in self._selector.select():
+                stream = key.data
+                if stream is None:
+                    self._apply_changes()
+                    continue
+                if stream.done.is_set():
+                    # Detached earlier in this round: its pipe may already be
+                    # closed, or its descriptor reused
+                    continue
+                try:
+                    if self._pump(stream):
+                        touched.append(stream)
+                except Exception:
+                    # One broken stream must not stop the pump: give it up,
+                    # so its finish() returns, and carry on with the rest
+                    stream.sink = None
+                    self._close(stream)
+            for stream in touched:
+                self._flush(stream)
+
+    def _pump(self, stream: PumpedStream) -> bool:
+        """Drain a readable pipe. Returns True if data was written to its sink."""
+        chunks = []
+        eof = False
+        for _ in range(_MAX_READS_PER_ROUND):
+            try:
+                chunk = os.read(stream.fd, _READ_CHUNK_SIZE)
+            except BlockingIOError:
+                break
+            except OSError:
+                eof = True
+                break
+            if not chunk:
+                eof = True
+                break
+            chunks.append(chunk)
+            if len(chunk) < _READ_CHUNK_SIZE:
+                break
+
+        wrote = False
+        if chunks and stream.sink is not None:
+            try:
+                stream.sink.write(b"".join(chunks))
+                wrote = True
+            except Exception:
+                # Target closed (or the sink failed): keep draining the pipe
+                # so the task never blocks on it, but drop the output
+                stream.sink = None
+        if eof:
+            if wrote:
+                self._flush(stream)
+                wrote = False
+            self._close(stream)
+        return wrote
+
+    @staticmethod
+    def _flush(stream: PumpedStream) -> None:
+        if stream.sink is None:
+            return
+        try:
+            stream.sink.flush()
+        except Exception:
+            stream.sink = None
+
+    def _close(self, stream: PumpedStream) -> None:
+        if stream.done.is_set():
+            return
+        try:
+            self._selector.unregister(stream.fd)
+        except (KeyError, ValueError):
+            pass
+        stream.done.set()
+
+
+_pump: OutputPump | None = None
+_pump_lock = Lock()
+
+
+def output_pump() -> OutputPump:
+    """The process-wide output pump, created on first use."""
+    global _pump
+    with _pump_lock:
+        if _pump is None:
+            _pump = OutputPump()
+        return _pump
+
+
+def _forget_pump_after_fork() -> None:
+    # The pump's thread does not survive fork, so a child starts its own
+    global _pump, _pump_lock
+    _pump = None
+    _pump_lock = Lock()
+
+
+if sys.platform != "win32":
+    os.register_at_fork(after_in_child=_forget_pump_after_fork)
@@ -0,0 +1,21 @@
+"""Task output control modes.
+
+A leaf module, so that the parser can name output modes without importing
+the process runners (and the output pump, jobserver, ... behind them).
+"""
+
+from enum import Enum
+
+__all__ = ["TaskOutputTypes"]
+
+
+class TaskOutputTypes(Enum):
+    """
+    Enum defining task output control modes.
+    """
+
+    ALL = "all"
+    NONE = "none"
+    OUT = "out"
+    ERR = "err"
+    ON_ERR = "on-err"
@@ -9,18 +9,21 @@ import platform
 import re
 import subprocess
 import tempfile
+from contextlib import nullcontext
 from dataclasses import dataclass, field, replace
 from pathlib import Path
-from collections.abc import KeysView
+from collections.abc import Callable, KeysView
 from typing import Any, Optional
 
 import typer
-import yaml
 
+from tasktree.discovery import find_recipe_file
+from tasktree.import_loader import ParallelImportLoader
 from tasktree.logging import Logger
 from tasktree.types import get_click_type
-from tasktree.process_runner import TaskOutputTypes
+from tasktree.output_types import TaskOutputTypes
 from tasktree.interpreter import Interpreter, InterpreterError
+from tasktree.yaml_loader import DeferredTasks, load_recipe_text, load_yaml
 
 
 # Regex patterns for variable references
@@ -73,6 +76,26 @@ class DockerArgs:
     run: list[str] = field(default_factory=list)  # Arguments for 'docker run'
 
 
+@dataclass(frozen=True)
+class ResourceRequest:
+    """
+    Resources a task holds for as long as it runs.
+
+    The scheduler only admits a task when all of these are available. A task
+    that declares nothing requests no CPU, memory or pool units, so it only
+    needs a free job slot.
+    """
+
+    cpu: float = 0  # Number of CPUs (fractions allowed)
+    mem: int = 0  # Memory in bytes
+    pools: tuple[str, ...] = ()  # Named pools, one unit of each
+
+    @property
+    def is_empty(self) -> bool:
+        """True if the task declares no resources at all."""
+        return not self.cpu and not self.mem and not self.pools
+
+
 @dataclass
 class ParsedFileResult:
     """
@@ -83,6 +106,46 @@ class ParsedFileResult:
     runners: dict[str, Any] = field(default_factory=dict)
     raw_variables: dict[str, Any] = field(default_factory=dict)
     name_errors: dict[str, str] = field(default_factory=dict)
+    pools: dict[str, int] = field(default_factory=dict)
+    data: dict[str, Any] = field(default_factory=dict)  # The file's YAML
+    deferred: dict[str, DeferredTask] = field(
+        default_factory=dict
+    )  # Imported tasks not built yet, by full name (see parse_recipe)
+
+
+@dataclass
+class DeferredTask:
+    """
+    An imported task whose definition is built only if the run reaches it.
+
+    Holds what _build_task needs besides the definition, which is loaded from
+    the file's DeferredTasks on build().
+    """
+
+    name: str  # Name in its file
+    definitions: DeferredTasks
+    file_path: Path
+    namespace: str
+    local_import_namespaces: set[str]
+    blanket_runner: str
+    runners: dict[str, Any]  # The file's runners, by full name
+
+    def build(self) -> Task:
+        """
+        Build the task.
+
+        Raises:
+        ValueError: If the task definition is invalid
+        yaml.YAMLError: If the definition cannot be loaded
+        """
+        return _build_task(
+            self.name,
+            self.definitions.load(self.name),
+            self.file_path,
+            self.namespace,
+            self.local_import_namespaces,
+            self.blanket_runner,
+        )
 
 
 CONTAINERISED_RUNNER_TYPE = "containerised"
@@ -193,6 +256,9 @@ class Task:
     private: bool = False  # If True, task is hidden from --list output
     pin_runner: bool = False  # If True, task's runner cannot be overridden
     task_output: TaskOutputTypes | None = None
+    resources: ResourceRequest = field(
+        default_factory=ResourceRequest
+    )  # Resources held while running (see the 'pools' section)
 
     # Internal fields for efficient output lookup (built in __post_init__)
     _output_map: dict[str, str] = field(
@@ -418,6 +484,9 @@ class Recipe:
     interpreters: dict[str, Interpreter] = field(
         default_factory=dict
     )  # Named interpreter definitions (from the 'interpreters' section)
+    pools: dict[str, int] = field(
+        default_factory=dict
+    )  # Named resource pool capacities (from the 'pools' section)
     default_runner: str = ""  # Name of default runner
     global_runner_override: str = ""  # Global runner override (set via CLI --run-in)
     global_interpreter_override: str = ""  # Global interpreter override (CLI --interpreter)
@@ -437,6 +506,10 @@ class Recipe:
     _name_errors: dict[str, str] = field(
         default_factory=dict
     )  # Deferred name validation errors (checked when items are reachable)
+    source_files: list[Path] = field(
+        default_factory=list
+    )  # The recipe file and every file it imports, in the order they were read
+    unparsed_tasks: int = 0  # Imported tasks left out as root_task does not reach them
 
     def get_task(self, name: str) -> Task | None:
         """
@@ -468,7 +541,12 @@ class Recipe:
         """
         return self.runners.get(name)
 
-    def evaluate_variables(self, root_task: str | None = None) -> None:
+    def evaluate_variables(
+        self,
+        root_task: str | None = None,
+        side_effects: bool = True,
+        metadata_only: bool = False,
+    ) -> None:
         """
         Evaluate variables lazily based on task reachability.
 
@@ -485,6 +563,17 @@ class Recipe:
 
         Args:
         root_task: Optional task name to determine reachability (None = evaluate all)
+        side_effects: If False, { eval: ... } commands are not run and { read: ... }
+        files are not read: their specs are validated, and their values are
+        placeholders (see _unevaluated_value). For checking a recipe without
+        running anything, e.g. in the LSP.
+        metadata_only: If True, evaluate only what describing tasks needs (for
+        --list, --show and shell completion): the variables referenced by the
+        descriptions and argument specs of root_task, or of every public task
+        without one, substituted into those fields only. Every other field
+        keeps its {{ var.* }} placeholders, so no other { eval: ... } command
+        runs and no other { read: ... } file is read. The recipe is not marked
+        evaluated: a later full evaluation reuses the values.
 
         Raises:
         ValueError: If variable evaluation or substitution fails
@@ -497,6 +586,10 @@ class Recipe:
         if self._variables_evaluated:
             return  # Already evaluated, skip (idempotent)
 
+        if metadata_only:
+            self._evaluate_descriptions(root_task, side_effects)
+            return
+
         # Determine which variables to evaluate
         if root_task:
             # Lazy path: only evaluate reachable variables
@@ -527,6 +620,8 @@ class Recipe:
             variables_to_eval,
             self.recipe_path,
             self._original_yaml_data,
+            side_effects,
+            known=self.evaluated_variables,
         )
 
         # Also update the deprecated 'variables' field for backward compatibility
@@ -586,51 +681,7 @@ class Recipe:
             # Rebuild output maps after variable substitution
             task.__post_init__()
 
-            # Substitute in argument default values (handle both string and dict args)
-            resolved_args = []
-            for arg in task.args:
-                if isinstance(arg, str):
-                    resolved_args.append(
-                        substitute_variables(arg, self.evaluated_variables)
-                    )
-                elif isinstance(arg, dict):
-                    # Dict arg: substitute in nested values (like default values)
-                    resolved_dict = {}
-                    for arg_name, arg_spec in arg.items():
-                        if isinstance(arg_spec, dict):
-                            # Substitute in the nested dict values (e.g., default, help, choices)
-                            resolved_spec = {}
-                            for key, value in arg_spec.items():
-                                if isinstance(value, str):
-                                    resolved_spec[key] = substitute_variables(
-                                        value, self.evaluated_variables
-                                    )
-                                elif isinstance(value, list):
-                                    # Handle lists like 'choices'
-                                    resolved_spec[key] = [
-                                        (
-                                            substitute_variables(
-                                                v, self.evaluated_variables
-                                            )
-                                            if isinstance(v, str)
-                                            else v
-                                        )
-                                        for v in value
-                                    ]
-                                else:
-                                    resolved_spec[key] = value
-                            resolved_dict[arg_name] = resolved_spec
-                        else:
-                            # Simple value
-                            resolved_dict[arg_name] = (
-                                substitute_variables(arg_spec, self.evaluated_variables)
-                                if isinstance(arg_spec, str)
-                                else arg_spec
-                            )
-                    resolved_args.append(resolved_dict)
-                else:
-                    resolved_args.append(arg)
-            task.args = resolved_args
+            task.args = self._substitute_args(task.args)
 
         # Substitute evaluated variables into reachable runners only
         reachable_runner_names = self._collect_reachable_runners(reachable_tasks)
@@ -689,6 +740,106 @@ class Recipe:
         # Mark as evaluated
         self._variables_evaluated = True
 
+    def _evaluate_descriptions(self, root_task: str | None, side_effects: bool) -> None:
+        """
+        Evaluate the variables that task descriptions and argument specs
+        reference, and substitute them into those fields only.
+
+        Args:
+        root_task: The task being described, or None for every public task
+        side_effects: See evaluate_variables
+
+        Raises:
+        ValueError: If variable evaluation or substitution fails
+        """
+        from tasktree.substitution import substitute_variables
+
+        if root_task in self.tasks:
+            described = [root_task]
+        else:
+            described = [name for name, task in self.tasks.items() if not task.private]
+
+        variables_to_eval: set[str] = set()
+        for name in described:
+            task = self.tasks[name]
+            variables_to_eval |= _variable_references(task.desc)
+            variables_to_eval |= _variable_references(task.args)
+
+        self._check_reachable_name_errors(self.tasks.keys(), variables_to_eval)
+
+        self.evaluated_variables = _evaluate_variable_subset(
+            self.raw_variables,
+            variables_to_eval,
+            self.recipe_path,
+            self._original_yaml_data,
+            side_effects,
+            known=self.evaluated_variables,
+        )
+        self.variables = self.evaluated_variables
+
+        for name in described:
+            task = self.tasks[name]
+            task.desc = substitute_variables(task.desc, self.evaluated_variables)
+            task.args = self._substitute_args(task.args)
+
+    def _substitute_args(self, args: list[Any]) -> list[Any]:
+        """
+        Substitute evaluated variables into argument specs (string specs, and
+        the values of dict specs such as default, help and choices).
+
+        Args:
+        args: A task's argument specs
+
+        Returns:
+        The specs with {{ var.* }} placeholders substituted
+        """
+        from tasktree.substitution import substitute_variables
+
+        resolved_args = []
+        for arg in args:
+            if isinstance(arg, str):
+                resolved_args.append(
+                    substitute_variables(arg, self.evaluated_variables)
+                )
+            elif isinstance(arg, dict):
+                # Dict arg: substitute in nested values (like default values)
+                resolved_dict = {}
+                for arg_name, arg_spec in arg.items():
+                    if isinstance(arg_spec, dict):
+                        # Substitute in the nested dict values (e.g., default, help, choices)
+                        resolved_spec = {}
+                        for key, value in arg_spec.items():
+                            if isinstance(value, str):
+                                resolved_spec[key] = substitute_variables(
+                                    value, self.evaluated_variables
+                                )
+                            elif isinstance(value, list):
+                                # Handle lists like 'choices'
+                                resolved_spec[key] = [
+                                    (
+                                        substitute_variables(
+                                            v, self.evaluated_variables
+                                        )
+                                        if isinstance(v, str)
+                                        else v
+                                    )
+                                    for v in value
+                                ]
+                            else:
+                                resolved_spec[key] = value
+                        resolved_dict[arg_name] = resolved_spec
+                    else:
+                        # Simple value
+                        resolved_dict[arg_name] = (
+                            substitute_variables(arg_spec, self.evaluated_variables)
+                            if isinstance(arg_spec, str)
+                            else arg_spec
+                        )
+                resolved_args.append(resolved_dict)
+            else:
+                resolved_args.append(arg)
+        return resolved_args
+
     def _collect_variable_name_errors(
         self, reachable_variables: set[str]
     ) -> list[str]:
@@ -777,90 +928,6 @@ class Recipe:
             raise ValueError("; ".join(errors))
 
 
-def find_recipe_file(start_dir: Path | None = None) -> Path | None:
-    """
-    Find recipe file in current or parent directories.
-
-    Looks for recipe files matching these patterns (in order of preference):
-    - tasktree.yaml
-    - tasktree.yml
-    - tt.yaml
-    - *.tasks
-
-    If multiple recipe files are found in the same directory, raises ValueError
-    with instructions to use --tasks option.
-
-    Args:
-    start_dir: Directory to start searching from (defaults to cwd)
-
-    Returns:
-    Path to recipe file if found, None otherwise
-
-    Raises:
-    ValueError: If multiple recipe files found in the same directory
-    """
-    if start_dir is None:
-        start_dir = Path.cwd()
-
-    current = start_dir.resolve()
-
-    # Search up the directory tree
-    while True:
-        candidates = []
-
-        # Check for exact filenames first (these are preferred)
-        for filename in ["tasktree.yaml", "tasktree.yml", "tt.yaml", "tt.yml"]:
-            recipe_path = current / filename
-            if recipe_path.exists():
-                candidates.append(recipe_path)
-
-        # If we found standard recipe files, use the first one
-        if len(candidates) > 1:
-            # Multiple standard recipe files found - ambiguous
-            filenames = [c.name for c in candidates]
-            raise ValueError(
-                f"Multiple recipe files found in {current}:\n"
-                f"  {', '.join(filenames)}\n\n"
-                f"Please specify which file to use with --tasks (-T):\n"
-                f"  tt --tasks {filenames[0]} <task-name>"
-            )
-        elif len(candidates) == 1:
-            return candidates[0]
-
-        # Only check for *.tasks files if no standard recipe files found
-        # (*.tasks files are typically imports, not main recipes)
-        tasks_files = []
-        globs = ["*.tasks", "*.tt"]
-        for g in globs:
-            for tasks_file in current.glob(g):
-                if tasks_file.is_file():
-                    tasks_files.append(tasks_file)
-
-        if len(tasks_files) > 1:
-            # Multiple *.tasks files found - ambiguous
-            filenames = [t.name for t in tasks_files]
-            raise ValueError(
-                f"Multiple recipe files found in {current}:\n"
-                f"  {', '.join(filenames)}\n\n"
-                f"Please specify which file to use with --tasks (-T):\n"
-                f"  tt --tasks {filenames[0]} <task-name>"
-            )
-        elif len(tasks_files) == 1:
-            return tasks_files[0]
-
-        # Move to parent directory
-        parent = current.parent
-        if parent == current:
-            # Reached root
-            break
-        current = parent
-
-    return None
-
-
-
-
-
 def _validate_local_item_name(name: str, kind: str) -> str | None:
     """Return an error message if the local name is invalid, None otherwise."""
     if not name:
@@ -1367,8 +1434,9 @@ def _resolve_eval_variable(
     """
     Execute command and capture output for variable value.
 
-    Writes the command to a temporary script file and executes it via the
-    configured shell (or platform default), consistent with how tasks are run.
+    Writes the command to a temporary script (in memory where the interpreter
+    allows) and executes it via the configured shell (or platform default),
+    consistent with how tasks are run.
 
     Args:
     var_name: Name of the variable being defined
@@ -1382,23 +1450,35 @@ def _resolve_eval_variable(
     Raises:
     ValueError: If command fails or cannot be executed
     """
+    from tasktree.temp_script import memory_script, memory_script_path, script_dir
+
     # Resolve the interpreter to use: the default runner's interpreter if one is
     # configured, otherwise the platform default.
     interpreter = _eval_interpreter(recipe_data)
 
-    # Write command to a temp script file (same mechanism as task execution)
+    # Write command to a temp script (same mechanism as task execution)
     script_ext = interpreter.ext
+    script = ("@echo off\n" if script_ext == ".bat" else "") + command
     script_path = None
+    script_fd = memory_script(script, interpreter)
     try:
-        with tempfile.NamedTemporaryFile(
-            mode="w", suffix=script_ext, delete=False, encoding="utf-8"
-        ) as script_file:
-            script_path = script_file.name
-            if script_ext == ".bat":
-                script_file.write("@echo off\n")
-            script_file.write(command)
-
-        cmd_list = interpreter.invocation + [script_path]
+        if script_fd is None:
+            with tempfile.NamedTemporaryFile(
+                mode="w",
+                suffix=script_ext,
+                dir=script_dir(),
+                delete=False,
+                encoding="utf-8",
+            ) as script_file:
+                script_path = script_file.name
+                script_file.write(script)
+            spawn_kwargs = {}
+        else:
+            spawn_kwargs = {"pass_fds": (script_fd,)}
+
+        cmd_list = interpreter.invocation + [
+            script_path or str(memory_script_path(script_fd))
+        ]
         working_dir = recipe_file_path.parent
 
         try:
@@ -1408,6 +1488,7 @@ def _resolve_eval_variable(
                 text=True,
                 cwd=working_dir,
                 check=False,
+                **spawn_kwargs,
             )
         except FileNotFoundError:
             raise ValueError(
@@ -1423,6 +1504,8 @@ def _resolve_eval_variable(
                 f"Error: {e}"
             )
     finally:
+        if script_fd is not None:
+            os.close(script_fd)
         if script_path:
             try:
                 os.unlink(script_path)
@@ -1449,6 +1532,21 @@ def _resolve_eval_variable(
     return output
 
 
+def _unevaluated_value(kind: str, spec: str) -> str:
+    """
+    Placeholder value of an { eval: ... } or { read: ... } variable that was not
+    evaluated (see Recipe.evaluate_variables).
+
+    Args:
+    kind: "eval" or "read"
+    spec: The command, or file path
+
+    Returns:
+    The placeholder, e.g. "<eval: git rev-parse HEAD>"
+    """
+    return f"<{kind}: {spec}>"
+
+
 def _resolve_variable_value(
     name: str,
     raw_value: Any,
@@ -1456,6 +1554,7 @@ def _resolve_variable_value(
     resolution_stack: list[str],
     file_path: Path,
     recipe_data: dict | None = None,
+    side_effects: bool = True,
 ) -> str:
     """
     Resolve a single variable value with circular reference detection.
@@ -1467,6 +1566,8 @@ def _resolve_variable_value(
     resolution_stack: Stack of variables currently being resolved (for circular detection)
     file_path: Path to recipe file (for resolving relative file paths in { read: ... })
     recipe_data: Parsed YAML data (for accessing default_runner in { eval: ... })
+    side_effects: If False, { eval: ... } and { read: ... } values are validated
+    but resolve to placeholders, without running or reading anything
 
     Returns:
     Resolved string value
@@ -1486,6 +1587,8 @@ def _resolve_variable_value(
         if _is_eval_reference(raw_value):
             # Validate and extract command
             command = _validate_eval_reference(name, raw_value)
+            if not side_effects:
+                return _unevaluated_value("eval", command)
 
             # Execute command and capture output
             string_value = _resolve_eval_variable(name, command, file_path, recipe_data)
@@ -1516,6 +1619,8 @@ def _resolve_variable_value(
         if _is_file_read_reference(raw_value):
             # Validate and extract filepath
             filepath = _validate_file_read_reference(name, raw_value)
+            if not side_effects:
+                return _unevaluated_value("read", filepath)
 
             # Resolve path (handles tilde, absolute, relative)
             resolved_path = _resolve_file_path(filepath, file_path)
@@ -1651,8 +1756,29 @@ def _parse_variables_section(data: dict, file_path: Path) -> dict[str, str]:
     return resolved
 
 
+def _variable_references(value: Any) -> set[str]:
+    """
+    Names of the variables a field references with {{ var.* }}.
+
+    Args:
+    value: A string, or a list or dict of them (nested), such as argument specs
+
+    Returns:
+    The variable names referenced anywhere in the value
+    """
+    if isinstance(value, str):
+        return {
+            match.group(1) for match in VAR_REFERENCE_EXTRACT_PATTERN.finditer(value)
+        }
+    if isinstance(value, dict):
+        value = list(value.values())
+    if isinstance(value, list):
+        return set().union(*(_variable_references(item) for item in value))
+    return set()
+
+
 def _expand_variable_dependencies(
-    variable_names: set[str], raw_variables: dict[str, Any]
+    variable_names: set[str], raw_variables: dict[str, Any], read_files: bool = True
 ) -> set[str]:
     """
     Expand variable set to include all transitively referenced variables.
@@ -1663,6 +1789,7 @@ def _expand_variable_dependencies(
     Args:
     variable_names: Initial set of variable names
     raw_variables: Raw variable definitions from YAML
+    read_files: Whether to read { read: ... } files for the references they contain
 
     Returns:
     Expanded set including all transitively referenced variables
@@ -1696,7 +1823,7 @@ def _expand_variable_dependencies(
                     expanded.add(referenced_var)
                     to_process.append(referenced_var)
         # Handle { read: filepath } variables - check file contents for variable references
-        elif isinstance(raw_value, dict) and "read" in raw_value:
+        elif isinstance(raw_value, dict) and "read" in raw_value and read_files:
             filepath = raw_value["read"]
             # For dependency expansion, we speculatively read files to find variable references
             # This is acceptable because file reads are relatively cheap compared to eval commands
@@ -1737,7 +1864,12 @@ def _expand_variable_dependencies(
 
 
 def _evaluate_variable_subset(
-    raw_variables: dict[str, Any], variable_names: set[str], file_path: Path, data: dict
+    raw_variables: dict[str, Any],
+    variable_names: set[str],
+    file_path: Path,
+    data: dict,
+    side_effects: bool = True,
+    known: dict[str, str] | None = None,
 ) -> dict[str, str]:
     """
     Evaluate only specified variables from raw specs (for lazy evaluation).
@@ -1754,9 +1886,13 @@ def _evaluate_variable_subset(
     variable_names: Set of variable names to evaluate
     file_path: Recipe file path (for relative file resolution)
     data: Full YAML data (for context in _resolve_variable_value)
+    side_effects: Whether to run { eval: ... } commands and read { read: ... } files
+    known: Values already evaluated (by an earlier, partial evaluation), which
+    are reused rather than evaluated again
 
     Returns:
-    Dictionary of evaluated variable values (for specified variables and their dependencies)
+    Dictionary of evaluated variable values (for specified variables and their
+    dependencies, and the known values)
 
     Raises:
     ValueError: For validation errors, undefined refs, or circular refs
@@ -1770,34 +1906,42 @@ def _evaluate_variable_subset(
         raise ValueError("'variables' must be a dictionary")
 
     # Expand variable set to include transitive dependencies
-    variables_to_eval = _expand_variable_dependencies(variable_names, raw_variables)
+    variables_to_eval = _expand_variable_dependencies(
+        variable_names, raw_variables, read_files=side_effects
+    )
 
-    resolved = {}  # name -> resolved string value
+    resolved = dict(known or {})  # name -> resolved string value
     resolution_stack = []  # For circular detection
 
     # Evaluate variables in order (to handle references between variables)
     for var_name, raw_value in raw_variables.items():
-        if var_name in variables_to_eval:
+        if var_name in variables_to_eval and var_name not in resolved:
             resolved[var_name] = _resolve_variable_value(
-                var_name, raw_value, resolved, resolution_stack, file_path, data
+                var_name,
+                raw_value,
+                resolved,
+                resolution_stack,
+                file_path,
+                data,
+                side_effects,
             )
 
     return resolved
 
 
 def _parse_inline_interpreter(value: str | dict[str, Any], context: str) -> Interpreter:
-    """Parse an inline interpreter definition: {cmd, ext?, preamble?}.
+    """Parse an inline interpreter definition: {cmd, ext?, preamble?, persistent?, preload?}.
 
     A bare string is shorthand for ``{cmd: <string>}``.
     """
     if isinstance(value, str):
         value = {"cmd": value}
-    allowed = {"cmd", "ext", "preamble"}
+    allowed = {"cmd", "ext", "preamble", "persistent", "preload"}
     unknown = set(value) - allowed
     if unknown:
         raise ValueError(
             f"{context}: unknown interpreter field(s): {', '.join(sorted(unknown))}. "
-            f"Allowed: cmd, ext, preamble"
+            f"Allowed: cmd, ext, preamble, persistent, preload"
         )
     cmd = value.get("cmd", "")
     ext = value.get("ext", "")
@@ -1805,8 +1949,22 @@ def _parse_inline_interpreter(value: str | dict[str, Any], context: str) -> Inte
     for field_name, field_value in (("cmd", cmd), ("ext", ext), ("preamble", preamble)):
         if not isinstance(field_value, str):
             raise ValueError(f"{context}: interpreter '{field_name}' must be a string")
+    persistent = value.get("persistent", False)
+    if not isinstance(persistent, bool):
+        raise ValueError(f"{context}: interpreter 'persistent' must be a boolean")
+    preload = value.get("preload", [])
+    if not isinstance(preload, list) or not all(
+        isinstance(module, str) and module for module in preload
+    ):
+        raise ValueError(f"{context}: interpreter 'preload' must be a list of module names")
     try:
-        return Interpreter(cmd=cmd, ext=ext, preamble=preamble)
+        return Interpreter(
+            cmd=cmd,
+            ext=ext,
+            preamble=preamble,
+            persistent=persistent,
+            preload=tuple(preload),
+        )
     except InterpreterError as e:
         raise ValueError(f"{context}: {e}") from e
 
@@ -1817,7 +1975,7 @@ def parse_interpreter_spec(
     """Parse a runner's 'interpreter' field into an Interpreter.
 
     Accepts a bare string (shorthand for {cmd: <string>}), an inline definition
-    ({cmd, ext?, preamble?}), or a reference to a named interpreter from the
+    ({cmd, ext?, preamble?, persistent?, preload?}), or a reference to a named interpreter from the
     'interpreters' section ({use: name}).
     """
     if isinstance(value, str):
@@ -1866,6 +2024,134 @@ def _parse_interpreters_section(data: dict[str, Any]) -> dict[str, Interpreter]:
     return interpreters
 
 
+# Memory sizes are binary: K = 1024 bytes. A trailing "B" or "iB" is optional.
+_MEMORY_SIZE_PATTERN = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([kmgt]?)(?:i?b)?\s*$", re.IGNORECASE)
+_MEMORY_UNITS = {"": 1, "k": 1024, "m": 1024**2, "g": 1024**3, "t": 1024**4}
+
+
+def parse_memory_size(value: Any, context: str) -> int:
+    """
+    Parse a memory size such as 512M, 8G, 8GiB or 1024 (bytes) into bytes.
+
+    Args:
+    value: Raw YAML value (an integer byte count or a size string)
+    context: Description of where the value came from (for error messages)
+
+    Returns:
+    Size in bytes
+
+    Raises:
+    ValueError: If the value is not a positive size
+    """
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError(
+            f"{context}: memory size must be an integer byte count or a string "
+            f"like '512M' or '8G', got {value!r}"
+        )
+    if isinstance(value, int):
+        size = value
+    else:
+        match = _MEMORY_SIZE_PATTERN.match(value)
+        if not match:
+            raise ValueError(
+                f"{context}: invalid memory size {value!r}. "
+                f"Expected a number with an optional K, M, G or T suffix (e.g. '8G')"
+            )
+        number, unit = match.groups()
+        size = int(float(number) * _MEMORY_UNITS[unit.lower()])
+    if size <= 0:
+        raise ValueError(f"{context}: memory size must be positive, got {value!r}")
+    return size
+
+
+def format_memory_size(size: int) -> str:
+    """
+    Format a byte count using the largest binary unit that divides it exactly.
+
+    Examples:
+    8589934592 -> '8G'
+    1610612736 -> '1536M'
+    1000 -> '1000'
+    """
+    for unit, factor in (("T", 1024**4), ("G", 1024**3), ("M", 1024**2), ("K", 1024)):
+        if size >= factor and size % factor == 0:
+            return f"{size // factor}{unit}"
+    return str(size)
+
+
+def _parse_task_resources(value: Any, task_name: str) -> ResourceRequest:
+    """
+    Parse a task's 'resources' field: {cpu?, mem?, pools?}.
+
+    Pool names are validated against the recipe's 'pools' section after the
+    whole recipe (including imports) has been parsed.
+    """
+    if value is None:
+        return ResourceRequest()
+    context = f"Task '{task_name}'"
+    if not isinstance(value, dict):
+        raise ValueError(
+            f"{context}: 'resources' must be a mapping with 'cpu', 'mem' and/or 'pools' keys"
+        )
+    unknown = set(value) - {"cpu", "mem", "pools"}
+    if unknown:
+        raise ValueError(
+            f"{context}: unknown resource field(s): {', '.join(sorted(unknown))}. "
+            f"Allowed: cpu, mem, pools"
+        )
+
+    cpu = value.get("cpu", 0)
+    if "cpu" in value and (
+        isinstance(cpu, bool) or not isinstance(cpu, (int, float)) or cpu <= 0
+    ):
+        raise ValueError(f"{context}: 'resources.cpu' must be a positive number, got {cpu!r}")
+
+    mem = parse_memory_size(value["mem"], f"{context} 'resources.mem'") if "mem" in value else 0
+
+    pools = value.get("pools", [])
+    if isinstance(pools, str):
+        pools = [pools]
+    if not isinstance(pools, list) or not all(isinstance(p, str) and p for p in pools):
+        raise ValueError(f"{context}: 'resources.pools' must be a list of pool names")
+    if len(set(pools)) != len(pools):
+        raise ValueError(f"{context}: 'resources.pools' lists the same pool more than once")
+
+    return ResourceRequest(cpu=cpu, mem=mem, pools=tuple(pools))
+
+
+def _parse_pools_section(data: dict[str, Any], file_path: Path) -> dict[str, int]:
+    """
+    Parse the top-level 'pools' section into pool capacities.
+
+    Pools model machine-wide resources (a database, a licence server, a port),
+    so unlike runners and variables their names are not namespaced on import.
+    """
+    section = data.get("pools")
+    if section is None:
+        return {}
+    if not isinstance(section, dict):
+        raise ValueError(f"'pools' in {file_path} must be a mapping of pool name to capacity")
+    pools: dict[str, int] = {}
+    for name, capacity in section.items():
+        if isinstance(capacity, bool) or not isinstance(capacity, int) or capacity < 1:
+            raise ValueError(
+                f"Pool '{name}' in {file_path}: capacity must be a positive integer, got {capacity!r}"
+            )
+        pools[str(name)] = capacity
+    return pools
+
+
+def _merge_pools(pools: dict[str, int], new_pools: dict[str, int], file_path: Path) -> None:
+    """Merge pool capacities, rejecting a pool defined twice with different capacities."""
+    for name, capacity in new_pools.items():
+        if name in pools and pools[name] != capacity:
+            raise ValueError(
+                f"Pool '{name}' is defined with conflicting capacities "
+                f"({pools[name]} and {capacity} in {file_path})"
+            )
+        pools[name] = capacity
+
+
 def parse_docker_args(args_value: Any, runner_name: str) -> DockerArgs:
     """
     Parse docker args configuration from YAML into a DockerArgs.
@@ -2163,31 +2449,61 @@ def _extract_and_validate_runners(
     return runners, default_runner, interpreters, name_errors
 
 
+def load_yaml_file(file_path: Path, defer_tasks: bool = False) -> Any:
+    """
+    Load a recipe file's YAML, the default loader of parse_recipe.
+
+    Args:
+    file_path: Path to the YAML file
+    defer_tasks: Load the file's `tasks` section as a DeferredTasks, which
+    builds each task's body only when asked for (see yaml_loader.py)
+
+    Returns:
+    The parsed document (None for an empty file)
+    """
+    # Explicit UTF-8 encoding to handle Unicode on Windows where default is cp1252
+    with open(file_path, "r", encoding="utf-8") as f:
+        if defer_tasks:
+            return load_recipe_text(f.read(), str(file_path), defer_tasks=True)
+        return load_yaml(f)
+
+
 def _parse_file_with_env(
     file_path: Path,
     namespace: str | None,
     project_root: Path,
     import_stack: list[Path] | None = None,
-) -> tuple[dict[str, Task], dict[str, Runner], dict[str, Interpreter], str, dict[str, Any], dict[str, Any], dict[str, str]]:
+    loader: Callable[[Path], Any] = load_yaml_file,
+    defer_tasks: bool = False,
+) -> tuple[dict[str, Task], dict[str, Runner], dict[str, Interpreter], str, dict[str, Any], dict[str, Any], dict[str, str], dict[str, int], dict[str, DeferredTask]]:
     """
-    Parse file and extract tasks, runners, interpreters, and variables.
+    Parse file and extract tasks, runners, interpreters, variables and pools.
 
     Args:
     file_path: Path to YAML file
     namespace: Optional namespace prefix for tasks
     project_root: Root directory of the project
     import_stack: Stack of files being imported (for circular detection)
+    loader: Loads a file's YAML (see parse_recipe)
+    defer_tasks: Defer imported files' tasks (see _parse_file)
 
     Returns:
-    Tuple of (tasks, runners, interpreters, default_runner_name, raw_variables, YAML_data, name_errors)
+    Tuple of (tasks, runners, interpreters, default_runner_name, raw_variables, YAML_data, name_errors, pools, deferred_tasks)
     Note: Variables are NOT evaluated here - they're stored as raw specs for lazy evaluation
     """
     # Parse tasks normally
-    parsed = _parse_file(file_path, namespace, project_root, import_stack)
+    parsed = _parse_file(
+        file_path,
+        namespace,
+        project_root,
+        import_stack,
+        loader=loader,
+        defer_tasks=defer_tasks,
+    )
     tasks = parsed.tasks
     name_errors: dict[str, str] = dict(parsed.name_errors)
 
-    # Load YAML again to extract runners and variables (only from root file)
+    # Extract runners and variables (only from root file)
     runners: dict[str, Runner] = {}
     interpreters: dict[str, Interpreter] = {}
     default_runner = ""
@@ -2196,9 +2512,8 @@ def _parse_file_with_env(
 
     # Only parse runners and variables from the root file (namespace is None)
     if namespace is None:
-        with open(file_path, "r", encoding="utf-8") as f:
-            data = yaml.safe_load(f)
-            yaml_data = data or {}
+        data = parsed.data
+        yaml_data = data
 
         # Extract and validate variables
         raw_variables, var_errors = _extract_and_validate_variables(data)
@@ -2214,7 +2529,7 @@ def _parse_file_with_env(
     runners.update(parsed.runners)
     raw_variables.update(parsed.raw_variables)
 
-    return tasks, runners, interpreters, default_runner, raw_variables, yaml_data, name_errors
+    return tasks, runners, interpreters, default_runner, raw_variables, yaml_data, name_errors, parsed.pools, parsed.deferred
 
 
 def collect_reachable_tasks(tasks: dict[str, Task], root_task: str) -> set[str]:
@@ -2418,7 +2733,13 @@ def collect_reachable_variables(
 
 
 def parse_recipe(
-    recipe_path: Path, project_root: Path | None = None, root_task: str | None = None
+    recipe_path: Path,
+    project_root: Path | None = None,
+    root_task: str | None = None,
+    *,
+    loader: Callable[[Path], Any] = load_yaml_file,
+    side_effects: bool = True,
+    metadata_only: bool = False,
 ) -> Recipe:
     """
     Parse a recipe file and handle imports recursively.
@@ -2434,6 +2755,23 @@ def parse_recipe(
     root_task: Optional root task for lazy variable evaluation. If provided, only variables
     used by tasks reachable from root_task will be evaluated (optimization).
     If None, all variables will be evaluated (for --list command compatibility).
+    loader: Loads a file's YAML, given its path: the recipe's and each imported
+    file's. The LSP passes one serving unsaved editor text and cached imports.
+    side_effects: If False, { eval: ... } and { read: ... } variables are validated
+    but not evaluated (see Recipe.evaluate_variables)
+    metadata_only: If True, only the variables that task descriptions and
+    argument specs reference are evaluated, for listing and showing tasks (see
+    Recipe.evaluate_variables)
+
+    Imported files' task definitions are only built if root_task reaches them:
+    the files are read with load_yaml_file(defer_tasks=True), and the tasks
+    root_task does not reach are left out of the recipe (counted in
+    Recipe.unparsed_tasks). Without a root task, or with another loader, every
+    task is built.
+
+    With load_yaml_file, imported files are loaded in worker processes when
+    there are enough of them to be worth it (see import_loader.py). The result
+    and the errors raised are the same either way.
 
     Returns:
     Recipe object with all tasks (including recursively imported tasks) and evaluated variables
@@ -2444,18 +2782,41 @@ def parse_recipe(
     yaml.YAMLError: If YAML is invalid
     ValueError: If recipe structure is invalid
     """
-    if not recipe_path.exists():
+    # (Another loader may serve a file not saved yet)
+    if loader is load_yaml_file and not recipe_path.exists():
         raise FileNotFoundError(f"Recipe file not found: {recipe_path}")
 
     # Default project root to recipe file's parent if not specified
     if project_root is None:
         project_root = recipe_path.parent
 
-    # Parse main file - it will recursively handle all imports
-    # Variables are NOT evaluated here (lazy evaluation)
-    tasks, runners, interpreters, default_runner, raw_variables, yaml_data, name_errors = _parse_file_with_env(
-        recipe_path, namespace=None, project_root=project_root
-    )
+    # Record each file as it is read (the shell completion index is
+    # invalidated when any of them changes)
+    source_files: list[Path] = []
+
+    # Another loader may not be picklable, or may serve files from memory
+    defer_tasks = root_task is not None and loader is load_yaml_file
+    if loader is load_yaml_file:
+        file_loader = ParallelImportLoader(load_yaml_file, defer_tasks)
+    else:
+        file_loader = nullcontext(loader)
+
+    with file_loader as load:
+
+        def recording_loader(file_path: Path, **options: Any) -> Any:
+            source_files.append(file_path)
+            return load(file_path, **options)
+
+        # Parse main file - it will recursively handle all imports
+        # Variables are NOT evaluated here (lazy evaluation)
+        tasks, runners, interpreters, default_runner, raw_variables, yaml_data, name_errors, pools, deferred = _parse_file_with_env(
+            recipe_path,
+            namespace=None,
+            project_root=project_root,
+            loader=recording_loader,
+            defer_tasks=defer_tasks,
+        )
+    unparsed_tasks = _build_reachable_tasks(tasks, runners, deferred, root_task)
 
     # Create recipe with raw (unevaluated) variables
     recipe = Recipe(
@@ -2464,6 +2825,7 @@ def parse_recipe(
         recipe_path=recipe_path,
         runners=runners,
         interpreters=interpreters,
+        pools=pools,
         default_runner=default_runner,
         variables={},  # Empty initially (deprecated field)
         raw_variables=raw_variables,
@@ -2471,19 +2833,84 @@ def parse_recipe(
         _variables_evaluated=False,
         _original_yaml_data=yaml_data,
         _name_errors=name_errors,
+        source_files=list(dict.fromkeys(source_files)),
+        unparsed_tasks=unparsed_tasks,
     )
 
     # Validate that task-level interpreter names reference defined interpreters.
     _validate_task_interpreter_refs(recipe)
 
+    # Validate that task resource requests reference defined pools.
+    _validate_task_pool_refs(recipe)
+
     # Trigger lazy variable evaluation
     # If root_task is provided: evaluate only reachable variables
     # If root_task is None: evaluate all variables (for --list)
-    recipe.evaluate_variables(root_task)
+    recipe.evaluate_variables(
+        root_task, side_effects=side_effects, metadata_only=metadata_only
+    )
 
     return recipe
 
 
+def _build_reachable_tasks(
+    tasks: dict[str, Task],
+    runners: dict[str, Runner],
+    deferred: dict[str, DeferredTask],
+    root_task: str | None,
+) -> int:
+    """
+    Build the deferred imported tasks that the root task reaches.
+
+    Reachability follows dependencies, as collect_reachable_tasks does, through
+    the tasks already built and each deferred one as it is built. If the root
+    task is not defined at all, every deferred task is built, so that the
+    error lists them among the available tasks.
+
+    Args:
+    tasks: Built tasks, to which the reached deferred tasks are added
+    runners: Recipe runners, to which the runners of reached pinned tasks are
+    added (as _parse_file imports them for built tasks)
+    deferred: Deferred tasks by full name
+    root_task: Name of the task being run
+
+    Returns:
+    Number of deferred tasks left unbuilt
+    """
+    if not deferred:
+        return 0
+
+    if root_task in tasks or root_task in deferred:
+        queue = [root_task]
+    else:
+        queue = list(deferred)
+
+    seen: set[str] = set()
+    while queue:
+        task_name = queue.pop()
+        if task_name in seen:
+            continue
+        seen.add(task_name)
+
+        task = tasks.get(task_name)
+        if task is None:
+            pending = deferred.get(task_name)
+            if pending is None:
+                # Task not found - will be caught during graph construction
+                continue
+            task = tasks[task_name] = pending.build()
+            if task.pin_runner and task.run_in in pending.runners:
+                runners[task.run_in] = pending.runners[task.run_in]
+
+        for dep_spec in task.deps:
+            if isinstance(dep_spec, str):
+                queue.append(dep_spec)
+            elif isinstance(dep_spec, dict) and len(dep_spec) == 1:
+                queue.append(next(iter(dep_spec)))
+
+    return sum(1 for task_name in deferred if task_name not in tasks)
+
+
 def _validate_task_interpreter_refs(recipe: Recipe) -> None:
     """Validate that each task's 'interpreter' names a defined interpreter."""
     for task in recipe.tasks.values():
@@ -2495,12 +2922,161 @@ def _validate_task_interpreter_refs(recipe: Recipe) -> None:
             )
 
 
+def _validate_task_pool_refs(recipe: Recipe) -> None:
+    """Validate that each pool named in a task's 'resources' is defined."""
+    for task in recipe.tasks.values():
+        for pool in task.resources.pools:
+            if pool not in recipe.pools:
+                known = ", ".join(sorted(recipe.pools)) or "(none defined)"
+                raise ValueError(
+                    f"Task '{task.name}': unknown pool '{pool}' in 'resources'. "
+                    f"Defined pools: {known}"
+                )
+
+
+def _build_task(
+    task_name: str,
+    task_data: Any,
+    file_path: Path,
+    namespace: str | None,
+    local_import_namespaces: set[str],
+    blanket_runner: str,
+) -> Task:
+    """
+    Build a task from its definition in a recipe file.
+
+    Args:
+    task_name: The task's name in its file
+    task_data: The task's YAML body
+    file_path: Path of the file defining the task
+    namespace: Namespace of the file's tasks (None for the root recipe)
+    local_import_namespaces: Namespaces the file itself imports, whose
+    references in dependencies are rewritten into the file's namespace
+    blanket_runner: Runner for the task unless it names or pins its own
+
+    Returns:
+    The task, under its namespaced name
+
+    Raises:
+    ValueError: If the task definition is invalid
+    """
+    # Default working directory is the project root (where tt is invoked)
+    # NOT the directory where the tasks file is located
+    default_working_dir = "."
+
+    if not isinstance(task_data, dict):
+        raise ValueError(f"Task '{task_name}' must be a dictionary")
+
+    task_name_error = _validate_local_item_name(task_name, "Task")
+    if task_name_error:
+        raise ValueError(task_name_error)
+
+    if "cmd" not in task_data:
+        raise ValueError(f"Task '{task_name}' missing required 'cmd' field")
+
+    # Apply namespace if provided
+    full_name = f"{namespace}.{task_name}" if namespace else task_name
+
+    # Set working directory
+    working_dir = task_data.get("working_dir", default_working_dir)
+
+    # Rewrite dependencies with namespace
+    deps = task_data.get("deps", [])
+    if isinstance(deps, str):
+        deps = [deps]
+    if namespace:
+        # Rewrite dependencies: only prefix if it's a local reference
+        # A dependency is local if:
+        # 1. It has no dots (simple name like "init")
+        # 2. It starts with a local import namespace (like "base.setup" when "base" is imported)
+        rewritten_deps = []
+        for dep in deps:
+            if isinstance(dep, str):
+                # Simple string dependency
+                if "." not in dep:
+                    # Simple name - always prefix
+                    rewritten_deps.append(f"{namespace}.{dep}")
+                else:
+                    # Check if it starts with a local import namespace
+                    dep_root = dep.split(".", 1)[0]
+                    if dep_root in local_import_namespaces:
+                        # Local import reference - prefix it
+                        rewritten_deps.append(f"{namespace}.{dep}")
+                    else:
+                        # External reference - keep as-is
+                        rewritten_deps.append(dep)
+            elif isinstance(dep, dict):
+                # Dict dependency with args - rewrite the task name key
+                rewritten_dep = {}
+                for t_name, args in dep.items():
+                    if "." not in t_name:
+                        # Simple name - prefix it
+                        rewritten_dep[f"{namespace}.{t_name}"] = args
+                    else:
+                        # Check if it starts with a local import namespace
+                        dep_root = t_name.split(".", 1)[0]
+                        if dep_root in local_import_namespaces:
+                            # Local import reference - prefix it
+                            rewritten_dep[f"{namespace}.{t_name}"] = args
+                        else:
+                            # External reference - keep as-is
+                            rewritten_dep[t_name] = args
+                rewritten_deps.append(rewritten_dep)
+            else:
+                # Unknown type - keep as-is
+                rewritten_deps.append(dep)
+        deps = rewritten_deps
+
+    # Rewrite run_in with namespace prefix for imported tasks
+    run_in = task_data.get("run_in", "")
+    if namespace and run_in:
+        run_in = f"{namespace}.{run_in}"
+
+    # Task interpreter is the NAME of an interpreter from the 'interpreters'
+    # section; existence is validated post-parse (see _validate_interpreter_refs).
+    interpreter = task_data.get("interpreter", "")
+
+    task = Task(
+        name=full_name,
+        cmd=task_data["cmd"],
+        desc=task_data.get("desc", ""),
+        deps=deps,
+        inputs=task_data.get("inputs", []),
+        outputs=task_data.get("outputs", []),
+        working_dir=working_dir,
+        args=task_data.get("args", []),
+        source_file=str(file_path),
+        run_in=run_in,
+        interpreter=interpreter,
+        private=task_data.get("private", False),
+        pin_runner=task_data.get("pin_runner", False),
+        task_output=task_data.get("task_output", None),
+        resources=_parse_task_resources(task_data.get("resources"), full_name),
+    )
+
+    # Apply blanket runner to non-pinned tasks from imports
+    if blanket_runner and not task.pin_runner and not task.run_in:
+        task.run_in = blanket_runner
+
+    # Rewrite {{ var.* }} references in imported tasks
+    if namespace:
+        _rewrite_task_variable_references(task, namespace)
+
+    # Check for case-sensitive argument collisions
+    if task.args:
+        _check_case_sensitive_arg_collisions(task.args, full_name)
+
+    return task
+
+
 def _parse_file(
     file_path: Path,
     namespace: str | None,
     project_root: Path,
     import_stack: list[Path] | None = None,
     blanket_runner: str = "",
+    loader: Callable[[Path], Any] = load_yaml_file,
+    defer_tasks: bool = False,
 ) -> ParsedFileResult:
     """
     Parse a single YAML file and return tasks, recursively processing imports.
@@ -2511,6 +3087,9 @@ def _parse_file(
     project_root: Root directory of the project
     import_stack: Stack of files being imported (for circular detection)
     blanket_runner: Optional runner name to apply to all non-pinned tasks in this file
+    loader: Loads a file's YAML (see parse_recipe)
+    defer_tasks: Load imported files with load_yaml_file(defer_tasks=True),
+    returning their tasks as DeferredTask entries rather than building them
 
     Returns:
     ParsedFileResult containing tasks, runners, and raw variables
@@ -2532,24 +3111,23 @@ def _parse_file(
     # Add current file to stack
     import_stack.append(file_path)
 
-    # Load YAML (explicit UTF-8 encoding to handle Unicode on Windows where default is cp1252)
-    with open(file_path, "r", encoding="utf-8") as f:
-        data = yaml.safe_load(f)
+    if defer_tasks and namespace:
+        data = loader(file_path, defer_tasks=True)
+    else:
+        data = loader(file_path)
 
     if data is None:
         data = {}
 
     tasks: dict[str, Task] = {}
+    deferred: dict[str, DeferredTask] = {}
     runners: dict[str, Runner] = {}
     raw_variables: dict[str, Any] = {}
     name_errors: dict[str, str] = {}
+    pools: dict[str, int] = {}
     # TODO: Understand why this is not used.
     # file_dir = file_path.parent
 
-    # Default working directory is the project root (where tt is invoked)
-    # NOT the directory where the tasks file is located
-    default_working_dir = "."
-
     # Track local import namespaces for dependency rewriting
     local_import_namespaces: set[str] = set()
 
@@ -2581,9 +3159,12 @@ def _parse_file(
                 project_root,
                 import_stack.copy(),  # Pass copy to avoid shared mutation
                 child_run_in,  # Pass blanket runner to imported file
+                loader=loader,
+                defer_tasks=defer_tasks,
             )
 
             tasks.update(nested_result.tasks)
+            deferred.update(nested_result.deferred)
 
             # Selective runner import: Only import runners referenced by pinned tasks
             #
@@ -2620,9 +3201,10 @@ def _parse_file(
 
             raw_variables.update(nested_result.raw_variables)
             name_errors.update(nested_result.name_errors)
+            _merge_pools(pools, nested_result.pools, child_path)
 
     # Validate top-level keys (only these sections are allowed)
-    valid_top_level_keys = {"imports", "runners", "interpreters", "tasks", "variables"}
+    valid_top_level_keys = {"imports", "runners", "interpreters", "pools", "tasks", "variables"}
 
     # Check if tasks key is missing when there appear to be task definitions at root
     # Do this BEFORE checking for unknown keys, to provide better error message
@@ -2656,6 +3238,7 @@ def _parse_file(
             f"  - imports      (for importing task files)\n"
             f"  - runners      (for runner configuration)\n"
             f"  - interpreters (for interpreter definitions)\n"
+            f"  - pools        (for resource pool capacities)\n"
             f"  - variables    (for variable definitions)\n"
             f"  - tasks        (for task definitions)"
         )
@@ -2665,110 +3248,31 @@ def _parse_file(
     if tasks_data is None:
         tasks_data = {}
 
-    # Process local tasks
-    for task_name, task_data in tasks_data.items():
-        if not isinstance(task_data, dict):
-            raise ValueError(f"Task '{task_name}' must be a dictionary")
-
-        task_name_error = _validate_local_item_name(task_name, "Task")
-        if task_name_error:
-            raise ValueError(task_name_error)
-
-        if "cmd" not in task_data:
-            raise ValueError(f"Task '{task_name}' missing required 'cmd' field")
-
-        # Apply namespace if provided
-        full_name = f"{namespace}.{task_name}" if namespace else task_name
-
-        # Set working directory
-        working_dir = task_data.get("working_dir", default_working_dir)
-
-        # Rewrite dependencies with namespace
-        deps = task_data.get("deps", [])
-        if isinstance(deps, str):
-            deps = [deps]
-        if namespace:
-            # Rewrite dependencies: only prefix if it's a local reference
-            # A dependency is local if:
-            # 1. It has no dots (simple name like "init")
-            # 2. It starts with a local import namespace (like "base.setup" when "base" is imported)
-            rewritten_deps = []
-            for dep in deps:
-                if isinstance(dep, str):
-                    # Simple string dependency
-                    if "." not in dep:
-                        # Simple name - always prefix
-                        rewritten_deps.append(f"{namespace}.{dep}")
-                    else:
-                        # Check if it starts with a local import namespace
-                        dep_root = dep.split(".", 1)[0]
-                        if dep_root in local_import_namespaces:
-                            # Local import reference - prefix it
-                            rewritten_deps.append(f"{namespace}.{dep}")
-                        else:
-                            # External reference - keep as-is
-                            rewritten_deps.append(dep)
-                elif isinstance(dep, dict):
-                    # Dict dependency with args - rewrite the task name key
-                    rewritten_dep = {}
-                    for t_name, args in dep.items():
-                        if "." not in t_name:
-                            # Simple name - prefix it
-                            rewritten_dep[f"{namespace}.{t_name}"] = args
-                        else:
-                            # Check if it starts with a local import namespace
-                            dep_root = t_name.split(".", 1)[0]
-                            if dep_root in local_import_namespaces:
-                                # Local import reference - prefix it
-                                rewritten_dep[f"{namespace}.{t_name}"] = args
-                            else:
-                                # External reference - keep as-is
-                                rewritten_dep[t_name] = args
-                    rewritten_deps.append(rewritten_dep)
-                else:
-                    # Unknown type - keep as-is
-                    rewritten_deps.append(dep)
-            deps = rewritten_deps
-
-        # Rewrite run_in with namespace prefix for imported tasks
-        run_in = task_data.get("run_in", "")
-        if namespace and run_in:
-            run_in = f"{namespace}.{run_in}"
-
-        # Task interpreter is the NAME of an interpreter from the 'interpreters'
-        # section; existence is validated post-parse (see _validate_interpreter_refs).
-        interpreter = task_data.get("interpreter", "")
-
-        task = Task(
-            name=full_name,
-            cmd=task_data["cmd"],
-            desc=task_data.get("desc", ""),
-            deps=deps,
-            inputs=task_data.get("inputs", []),
-            outputs=task_data.get("outputs", []),
-            working_dir=working_dir,
-            args=task_data.get("args", []),
-            source_file=str(file_path),
-            run_in=run_in,
-            interpreter=interpreter,
-            private=task_data.get("private", False),
-            pin_runner=task_data.get("pin_runner", False),
-            task_output=task_data.get("task_output", None),
-        )
-
-        # Apply blanket runner to non-pinned tasks from imports
-        if blanket_runner and not task.pin_runner and not task.run_in:
-            task.run_in = blanket_runner
-
-        # Rewrite {{ var.* }} references in imported tasks
-        if namespace:
-            _rewrite_task_variable_references(task, namespace)
-
-        # Check for case-sensitive argument collisions
-        if task.args:
-            _check_case_sensitive_arg_collisions(task.args, full_name)
-
-        tasks[full_name] = task
+    # Process local tasks.  An imported file's tasks may be deferred: each is
+    # built only if the run reaches it (see parse_recipe)
+    if isinstance(tasks_data, DeferredTasks):
+        for task_name in tasks_data:
+            full_name = f"{namespace}.{task_name}"
+            deferred[full_name] = DeferredTask(
+                task_name,
+                tasks_data,
+                file_path,
+                namespace,
+                local_import_namespaces,
+                blanket_runner,
+                runners,
+            )
+    else:
+        for task_name, task_data in tasks_data.items():
+            task = _build_task(
+                task_name,
+                task_data,
+                file_path,
+                namespace,
+                local_import_namespaces,
+                blanket_runner,
+            )
+            tasks[task.name] = task
 
     # Parse runners and variables from imported files (namespace is set) and apply namespace prefix
     # Root file runners/variables are handled by _parse_file_with_env, not here
@@ -2794,10 +3298,20 @@ def _parse_file(
                     var_value, namespace
                 )
 
+    _merge_pools(pools, _parse_pools_section(data, file_path), file_path)
+
     # Remove current file from stack
     import_stack.pop()
 
-    return ParsedFileResult(tasks=tasks, runners=runners, raw_variables=raw_variables, name_errors=name_errors)
+    return ParsedFileResult(
+        tasks=tasks,
+        runners=runners,
+        raw_variables=raw_variables,
+        name_errors=name_errors,
+        pools=pools,
+        data=data,
+        deferred=deferred,
+    )
 
 
 def _check_case_sensitive_arg_collisions(args: list[str], task_name: str) -> None:
@@ -3404,7 +3918,10 @@ def _parse_named_dependency_args(
 
 
 def get_recipe(
-    logger: Logger, recipe_file: Optional[str] = None, root_task: Optional[str] = None
+    logger: Logger,
+    recipe_file: Optional[str] = None,
+    root_task: Optional[str] = None,
+    metadata_only: bool = False,
 ) -> Optional[Recipe]:
     """
     Get parsed recipe or None if not found.
@@ -3414,6 +3931,8 @@ def get_recipe(
     recipe_file: Optional path to recipe file. If not provided, searches for recipe file.
     root_task: Optional root task for lazy variable evaluation. If provided, only variables
     reachable from this task will be evaluated (performance optimization).
+    metadata_only: Evaluate only the variables task descriptions and argument
+    specs reference, for commands that describe tasks rather than run them
     """
     if recipe_file:
         recipe_path = Path(recipe_file)
@@ -3435,11 +3954,24 @@ def get_recipe(
         project_root = None
 
     try:
-        return parse_recipe(recipe_path, project_root, root_task)
+        recipe = parse_recipe(
+            recipe_path, project_root, root_task, metadata_only=metadata_only
+        )
     except Exception as e:
         logger.error(f"[red]Error parsing recipe: {e}[/red]")
         raise typer.Exit(1)
 
+    # Keep the shell completion index in step with the recipe, so pressing
+    # Tab need not parse it (see completion.py). The index is rebuilt from a
+    # metadata-only parse of its own, as on Tab: a run leaves the tasks it
+    # does not reach unevaluated. A run that left imported tasks unparsed
+    # leaves the rebuild to Tab.
+    if not recipe.unparsed_tasks:
+        from tasktree.completion import load_index
+
+        load_index(recipe.recipe_path)
+    return recipe
+
 
 def parse_task_args(
     logger: Logger, arg_specs: list[str], arg_values: list[str]
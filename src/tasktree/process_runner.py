@@ -4,16 +4,22 @@ This module provides an interface for running subprocesses, allowing for
 better testability and dependency injection.
 """
 
+import os
+import signal
 import subprocess
 import sys
+import time
+import weakref
 from abc import ABC, abstractmethod
-from enum import Enum
+from collections.abc import Callable
 from subprocess import Popen
-from threading import Thread
+from threading import Lock, Thread
 from typing import Any
 
 __all__ = [
+    "ProcessGroups",
     "ProcessRunner",
+    "MultiplexedProcessRunner",
     "PassthroughProcessRunner",
     "SilentProcessRunner",
     "StdoutOnlyProcessRunner",
@@ -25,25 +31,214 @@ __all__ = [
 ]
 
 from tasktree.logging import Logger
-
-
-class TaskOutputTypes(Enum):
+from tasktree.output_pump import (
+    OutputPump,
+    OutputSink,
+    SpillBuffer,
+    StreamSink,
+    output_pump,
+)
+from tasktree.output_types import TaskOutputTypes
+from tasktree.resource_usage import (
+    ResourceUsage,
+    TaskCgroup,
+    wait_for_exit,
+)
+
+
+class ProcessGroups:
     """
-    Enum defining task output control modes.
+    Registry of in-flight task processes, so they can be stopped together.
+
+    Registered processes are started in their own process group (on POSIX),
+    so terminating one also reaches everything it spawned (make's children,
+    a nested tt's tasks, ...).
     """
 
-    ALL = "all"
-    NONE = "none"
-    OUT = "out"
-    ERR = "err"
-    ON_ERR = "on-err"
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self._processes: set[Popen[Any]] = set()
+
+    def popen(
+        self, *args: Any, popen: Callable[..., Popen[Any]] | None = None, **kwargs: Any
+    ) -> Popen[Any]:
+        """
+        Start a process in a new process group and register it.
+
+        ``popen`` replaces subprocess.Popen to start it (see ProcessRunner).
+        """
+        if os.name == "posix":
+            kwargs["process_group"] = 0
+        process = (popen or subprocess.Popen)(*args, **kwargs)
+        with self._lock:
+            self._processes.add(process)
+        return process
+
+    def discard(self, process: Popen[Any]) -> None:
+        """Forget a process once it has been reaped."""
+        with self._lock:
+            self._processes.discard(process)
+
+    def terminate_all(self, grace_period: float, logger: Logger) -> None:
+        """
+        SIGTERM every registered process group, then SIGKILL whatever is
+        still running once the grace period has elapsed.
+        """
+        with self._lock:
+            processes = [p for p in self._processes if p.poll() is None]
+        if not processes:
+            return
+
+        logger.debug(f"Terminating {len(processes)} in-flight task process(es)")
+        for process in processes:
+            self._signal(process, signal.SIGTERM)
+
+        deadline = time.monotonic() + grace_period
+        for process in processes:
+            try:
+                process.wait(timeout=max(0.0, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                logger.debug(
+                    f"Process {process.pid} still running after {grace_period}s, killing it"
+                )
+                self._signal(process, getattr(signal, "SIGKILL", signal.SIGTERM))
+
+    @staticmethod
+    def _signal(process: Popen[Any], sig: int) -> None:
+        try:
+            if os.name == "posix":
+                os.killpg(process.pid, sig)
+            elif sig == signal.SIGTERM:
+                process.terminate()
+            else:
+                process.kill()
+        except (ProcessLookupError, PermissionError):
+            # Already gone
+            pass
 
 
 class ProcessRunner(ABC):
     """
     Abstract interface for running subprocess commands.
+
+    If ``process_groups`` is set, every process the runner starts is
+    registered there (in its own process group) while it runs.
+
+    The resources used by the processes the runner waits for are added up in
+    ``usage`` (see resource_usage); processes whose output the caller
+    captures are not measured. A runner runs one process at a time, all in
+    the same task cgroup where one can be created.
+
+    Besides subprocess.run's arguments, run() takes ``popen``: a replacement
+    for subprocess.Popen to start the process with (e.g. a
+    python_worker.WorkerProcess factory).
     """
 
+    process_groups: ProcessGroups | None = None
+    # Resources used by the processes run so far, if known
+    usage: ResourceUsage | None = None
+    # Line shown before output held back until a process failed (see
+    # StderrOnlyOnFailureProcessRunner), e.g. naming what failed
+    failure_header: str | None = None
+    _cgroup: TaskCgroup | None = None
+    _cgroup_created = False
+    _cgroup_counters: dict[str, int] | None = None
+
+    def _popen(self, *args: Any, **kwargs: Any) -> Popen[Any]:
+        """Start a process, registering it with process_groups if set."""
+        if self.process_groups is None:
+            process = (kwargs.pop("popen", None) or subprocess.Popen)(*args, **kwargs)
+        else:
+            process = self.process_groups.popen(*args, **kwargs)
+
+        cgroup = self._task_cgroup()
+        if cgroup is not None and cgroup.add(process.pid):
+            self._cgroup_counters = cgroup.counters()
+        else:
+            self._cgroup_counters = None
+        return process
+
+    def _task_cgroup(self) -> TaskCgroup | None:
+        """The runner's cgroup, created on first use (removed with the runner)."""
+        if not self._cgroup_created:
+            self._cgroup_created = True
+            self._cgroup = TaskCgroup.create()
+            if self._cgroup is not None:
+                weakref.finalize(self, self._cgroup.remove)
+        return self._cgroup
+
+    def _wait(self, process: Popen[Any], timeout: float | None) -> int:
+        """Popen.wait that adds the process's resource usage to ``usage``."""
+        returncode, usage = wait_for_exit(process, timeout)
+        if usage is not None:
+            if self._cgroup is not None and self._cgroup_counters is not None:
+                usage = TaskCgroup.apply(
+                    usage, self._cgroup_counters, self._cgroup.counters()
+                )
+            self._add_usage(usage)
+        return returncode
+
+    def _add_usage(self, usage: ResourceUsage) -> None:
+        self.usage = usage if self.usage is None else self.usage + usage
+
+    def _release(self, process: Popen[Any]) -> None:
+        """Unregister a reaped process started by _popen."""
+        if self.process_groups is not None:
+            self.process_groups.discard(process)
+
+    def _run_to_completion(
+        self, *args: Any, **kwargs: Any
+    ) -> subprocess.CompletedProcess[Any]:
+        """
+        Equivalent of subprocess.run. Processes whose output the caller
+        captures go to subprocess.run unless they must be registered with
+        process_groups, or started with a ``popen`` of their own; any other
+        process is started with _popen and reaped with _wait, so that its
+        resource usage is measured.
+        """
+        captured = "input" in kwargs or kwargs.get("capture_output") or (
+            subprocess.PIPE in (kwargs.get("stdout"), kwargs.get("stderr"))
+        )
+        if captured and self.process_groups is None and "popen" not in kwargs:
+            return subprocess.run(*args, **kwargs)
+
+        input_data = kwargs.pop("input", None)
+        timeout = kwargs.pop("timeout", None)
+        check = kwargs.pop("check", False)
+        if input_data is not None:
+            kwargs["stdin"] = subprocess.PIPE
+        if kwargs.pop("capture_output", False):
+            kwargs["stdout"] = subprocess.PIPE
+            kwargs["stderr"] = subprocess.PIPE
+        uses_pipes = subprocess.PIPE in (
+            kwargs.get("stdin"),
+            kwargs.get("stdout"),
+            kwargs.get("stderr"),
+        )
+
+        process = self._popen(*args, **kwargs)
+        try:
+            with process:
+                try:
+                    if uses_pipes:
+                        stdout, stderr = process.communicate(input_data, timeout=timeout)
+                        returncode = process.poll()
+                    else:
+                        stdout = stderr = None
+                        returncode = self._wait(process, timeout)
+                except BaseException:
+                    process.kill()
+                    process.wait()
+                    raise
+        finally:
+            self._release(process)
+
+        if check and returncode:
+            raise subprocess.CalledProcessError(
+                returncode, process.args, output=stdout, stderr=stderr
+            )
+        return subprocess.CompletedProcess(process.args, returncode, stdout, stderr)
+
     @abstractmethod
     def run(self, *args: Any, **kwargs: Any) -> subprocess.CompletedProcess[Any]:
         """
@@ -89,7 +284,7 @@ class PassthroughProcessRunner(ProcessRunner):
         subprocess.CalledProcessError: If check=True and process exits non-zero
         subprocess.TimeoutExpired: If timeout is exceeded
         """
-        return subprocess.run(*args, **kwargs)
+        return self._run_to_completion(*args, **kwargs)
 
 
 class SilentProcessRunner(ProcessRunner):
@@ -120,7 +315,7 @@ class SilentProcessRunner(ProcessRunner):
         """
         kwargs["stdout"] = subprocess.DEVNULL
         kwargs["stderr"] = subprocess.DEVNULL
-        return subprocess.run(*args, **kwargs)
+        return self._run_to_completion(*args, **kwargs)
 
 
 def stream_output(pipe: Any, target: Any) -> None:
@@ -198,12 +393,109 @@ def _check_result_if_necessary(
     )
 
 
+# How long to wait for a pipe to close after its process has exited
+_STREAM_DRAIN_TIMEOUT_SECS = 1.0
+
+
+def _pump_and_wait(
+    process: Popen[bytes],
+    streams: list[tuple[Any, Any]],
+    process_allowed_runtime: float | None,
+    logger: Logger,
+    wait: Callable[[Popen[Any], float | None], int] = Popen.wait,
+) -> int:
+    """
+    Pump a process's pipes into sinks until the process exits and the pipes
+    are drained.
+
+    Pipes go to the shared output pump; where it is not supported (Windows)
+    each gets a copying thread instead.
+
+    Args:
+        process: Process whose pipes are pumped
+        streams: (pipe, sink) pairs
+        process_allowed_runtime: Seconds the process may run for
+        logger: Logger for diagnostics
+        wait: Waits for the process to exit, returning its exit code
+
+    Returns:
+        The process's exit code
+
+    Raises:
+        subprocess.TimeoutExpired: If the process outlives its allowed runtime
+    """
+    if OutputPump.supported():
+        pump = output_pump()
+        handles = []
+        for pipe, sink in streams:
+            OutputPump.enlarge_pipe(pipe.fileno())
+            handles.append(pump.add(pipe, sink))
+
+        def finish(handle: Any) -> bool:
+            return pump.finish(handle, timeout=_STREAM_DRAIN_TIMEOUT_SECS)
+
+    else:
+        handles = [
+            Thread(target=_copy_pipe, args=stream, name="output-copier", daemon=True)
+            for stream in streams
+        ]
+        for thread in handles:
+            thread.start()
+
+        def finish(handle: Any) -> bool:
+            handle.join(timeout=_STREAM_DRAIN_TIMEOUT_SECS)
+            return not handle.is_alive()
+
+    try:
+        try:
+            process_return_code = wait(process, process_allowed_runtime)
+        except BaseException:
+            process.kill()
+            process.wait()
+            for handle in handles:
+                finish(handle)
+            raise
+        for handle in handles:
+            if not finish(handle):
+                logger.warn(
+                    f"Stream did not complete within timeout of {_STREAM_DRAIN_TIMEOUT_SECS} seconds"
+                )
+    finally:
+        for pipe, _ in streams:
+            pipe.close()
+    return process_return_code
+
+
+def _copy_pipe(pipe: Any, sink: Any) -> None:
+    """Copy a binary pipe into a sink until end-of-file (thread fallback)."""
+    try:
+        # The pipe is unbuffered, so read() returns whatever is available
+        while chunk := pipe.read(64 * 1024):
+            sink.write(chunk)
+            sink.flush()
+    except (OSError, ValueError):
+        # Pipe closed underneath us, as in stream_output
+        pass
+
+
+def _popen_kwargs_for_streaming(kwargs: dict[str, Any]) -> None:
+    """
+    Set the Popen buffering for a streamed pipe: raw bytes for the output
+    pump, or line-buffered text for the thread-per-pipe fallback.
+    """
+    if OutputPump.supported():
+        kwargs["bufsize"] = 0
+    else:
+        kwargs["text"] = True
+        kwargs["bufsize"] = 1
+
+
 class StdoutOnlyProcessRunner(ProcessRunner):
     """
     Process runner that streams stdout while suppressing stderr.
 
-    This implementation uses threading to asynchronously stream stdout from the
-    subprocess while discarding stderr output.
+    Stdout is pumped by the shared output pump (one thread for all
+    running tasks) while stderr output is discarded.
     """
 
     def __init__(self, logger: Logger) -> None:
@@ -213,12 +505,14 @@ class StdoutOnlyProcessRunner(ProcessRunner):
         """
         Run a subprocess command with stdout streamed and stderr suppressed.
 
-        This implementation uses subprocess.Popen with threading to stream stdout
-        in real-time while discarding stderr. The interface remains synchronous
-        from the caller's perspective.
+        This implementation uses subprocess.Popen and the shared output pump to
+        stream stdout in real-time while discarding stderr. The interface
+        remains synchronous from the caller's perspective.
 
-        Buffering strategy: Uses line buffering (bufsize=1) to ensure output
-        appears promptly while maintaining reasonable performance.
+        Buffering strategy: The pipe is read unbuffered in large chunks, and
+        whatever arrived in one pump round is written (and flushed) at once.
+        On Windows, where pipes cannot be selected on, a line-buffered
+        thread per pipe is used instead.
 
         Args:
             *args: Positional arguments passed to subprocess.Popen
@@ -240,23 +534,33 @@ class StdoutOnlyProcessRunner(ProcessRunner):
         # Force stdout/stderr handling
         kwargs["stdout"] = subprocess.PIPE
         kwargs["stderr"] = subprocess.DEVNULL
-        kwargs["text"] = True
-        kwargs["bufsize"] = 1
+        _popen_kwargs_for_streaming(kwargs)
 
         # Start the process
-        process = subprocess.Popen(*args, **kwargs)
-
-        # Start thread to stream stdout with a descriptive name for debugging
-        thread = Thread(
-            target=stream_output,
-            args=(process.stdout, sys.stdout),
-            name="stdout-streamer",
-            daemon=True,
-        )
+        process = self._popen(*args, **kwargs)
 
-        process_return_code = _start_thread_and_wait_to_complete(
-            process, process.stdout, thread, timeout, self._logger
-        )
+        try:
+            if OutputPump.supported():
+                process_return_code = _pump_and_wait(
+                    process,
+                    [(process.stdout, StreamSink(sys.stdout))],
+                    timeout,
+                    self._logger,
+                    wait=self._wait,
+                )
+            else:
+                # Start thread to stream stdout with a descriptive name for debugging
+                thread = Thread(
+                    target=stream_output,
+                    args=(process.stdout, sys.stdout),
+                    name="stdout-streamer",
+                    daemon=True,
+                )
+                process_return_code = _start_thread_and_wait_to_complete(
+                    process, process.stdout, thread, timeout, self._logger
+                )
+        finally:
+            self._release(process)
         return _check_result_if_necessary(check, process_return_code, *args, **kwargs)
 
 
@@ -264,8 +568,8 @@ class StderrOnlyProcessRunner(ProcessRunner):
     """
     Process runner that streams stderr while suppressing stdout.
 
-    This implementation uses threading to asynchronously stream stderr from the
-    subprocess while discarding stdout output.
+    Stderr is pumped by the shared output pump (one thread for all
+    running tasks) while stdout output is discarded.
     """
 
     def __init__(self, logger: Logger) -> None:
@@ -275,12 +579,14 @@ class StderrOnlyProcessRunner(ProcessRunner):
         """
         Run a subprocess command with stderr streamed and stdout suppressed.
 
-        This implementation uses subprocess.Popen with threading to stream stderr
-        in real-time while discarding stdout. The interface remains synchronous
-        from the caller's perspective.
+        This implementation uses subprocess.Popen and the shared output pump to
+        stream stderr in real-time while discarding stdout. The interface
+        remains synchronous from the caller's perspective.
 
-        Buffering strategy: Uses line buffering (bufsize=1) to ensure output
-        appears promptly while maintaining reasonable performance.
+        Buffering strategy: The pipe is read unbuffered in large chunks, and
+        whatever arrived in one pump round is written (and flushed) at once.
+        On Windows, where pipes cannot be selected on, a line-buffered
+        thread per pipe is used instead.
 
         Args:
             *args: Positional arguments passed to subprocess.Popen
@@ -302,23 +608,33 @@ class StderrOnlyProcessRunner(ProcessRunner):
         # Force stdout/stderr handling
         kwargs["stdout"] = subprocess.DEVNULL
         kwargs["stderr"] = subprocess.PIPE
-        kwargs["text"] = True
-        kwargs["bufsize"] = 1
+        _popen_kwargs_for_streaming(kwargs)
 
         # Start the process
-        process = subprocess.Popen(*args, **kwargs)
-
-        # Start thread to stream stderr with a descriptive name for debugging
-        thread = Thread(
-            target=stream_output,
-            args=(process.stderr, sys.stderr),
-            name="stderr-streamer",
-            daemon=True,
-        )
+        process = self._popen(*args, **kwargs)
 
-        process_return_code = _start_thread_and_wait_to_complete(
-            process, process.stderr, thread, timeout, self._logger
-        )
+        try:
+            if OutputPump.supported():
+                process_return_code = _pump_and_wait(
+                    process,
+                    [(process.stderr, StreamSink(sys.stderr))],
+                    timeout,
+                    self._logger,
+                    wait=self._wait,
+                )
+            else:
+                # Start thread to stream stderr with a descriptive name for debugging
+                thread = Thread(
+                    target=stream_output,
+                    args=(process.stderr, sys.stderr),
+                    name="stderr-streamer",
+                    daemon=True,
+                )
+                process_return_code = _start_thread_and_wait_to_complete(
+                    process, process.stderr, thread, timeout, self._logger
+                )
+        finally:
+            self._release(process)
         return _check_result_if_necessary(check, process_return_code, *args, **kwargs)
 
 
@@ -329,8 +645,15 @@ class StderrOnlyOnFailureProcessRunner(ProcessRunner):
     This implementation ignores stdout completely (sends to DEVNULL) and captures
     stderr. The buffered stderr is only output if the process exits with a non-zero
     code.
+
+    The buffer is bounded: past 1 MiB, stderr spills to a temporary file. On
+    failure, stderr of up to REPLAY_LIMIT bytes is shown in full; beyond that
+    only its start and end are shown, with the path of the file holding all of it.
     """
 
+    # Largest stderr shown in full when a task fails
+    REPLAY_LIMIT = 8 * 1024 * 1024
+
     def __init__(self, logger: Logger) -> None:
         self._logger = logger
 
@@ -343,11 +666,12 @@ class StderrOnlyOnFailureProcessRunner(ProcessRunner):
         buffered stderr is written to sys.stderr before returning/raising.
 
         Args:
-            *args: Positional arguments passed to subprocess.run
-            **kwargs: Keyword arguments passed to subprocess.run
+            *args: Positional arguments passed to subprocess.Popen
+            **kwargs: Keyword arguments passed to subprocess.Popen
 
         Returns:
-            subprocess.CompletedProcess: The completed process result
+            subprocess.CompletedProcess: The completed process result (stderr is
+            shown or discarded, not captured)
 
         Raises:
             subprocess.CalledProcessError: If check=True and process exits non-zero
@@ -358,30 +682,87 @@ class StderrOnlyOnFailureProcessRunner(ProcessRunner):
         kwargs.pop("capture_output", None)  # Remove if present
         kwargs.pop("stdout", None)  # Remove if present
         kwargs.pop("stderr", None)  # Remove if present
+        # The buffer takes raw bytes
+        for text_option in ("text", "universal_newlines", "encoding", "errors"):
+            kwargs.pop(text_option, None)
 
-        result = subprocess.run(
-            *args,
-            **kwargs,
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.PIPE,
-            text=True,
-            timeout=timeout,
-            check=False,
+        process = self._popen(
+            *args, **kwargs, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, bufsize=0
         )
+        buffer = SpillBuffer()
+        try:
+            process_return_code = _pump_and_wait(
+                process, [(process.stderr, buffer)], timeout, self._logger, wait=self._wait
+            )
+            if process_return_code != 0 and buffer.size:
+                if self.failure_header is not None:
+                    sys.stderr.write(f"{self.failure_header}\n")
+                buffer.replay(sys.stderr, self.REPLAY_LIMIT)
+        finally:
+            self._release(process)
+            buffer.discard()
 
-        if result.returncode != 0 and result.stderr:
-            sys.stderr.write(result.stderr)
-            sys.stderr.flush()
+        return _check_result_if_necessary(check, process_return_code, *args, **kwargs)
 
-        if check and result.returncode != 0:
-            raise subprocess.CalledProcessError(
-                result.returncode,
-                result.args,
-                output=result.stdout,
-                stderr=result.stderr,
-            )
 
-        return result
+class MultiplexedProcessRunner(ProcessRunner):
+    """
+    Process runner that sends stdout and stderr to sinks instead of the
+    terminal: the task's TaskOutput in the output multiplexer, which decides
+    what is shown and logs everything.
+
+    Callers that capture output for themselves (capture_output=True, or
+    stdout/stderr=PIPE) get it as with subprocess.run.
+    """
+
+    def __init__(self, logger: Logger, stdout: OutputSink, stderr: OutputSink) -> None:
+        self._logger = logger
+        self._stdout = stdout
+        self._stderr = stderr
+
+    def run(self, *args: Any, **kwargs: Any) -> subprocess.CompletedProcess[Any]:
+        """
+        Run a subprocess command, pumping its stdout and stderr into the sinks.
+
+        Args:
+            *args: Positional arguments passed to subprocess.Popen
+            **kwargs: Keyword arguments passed to subprocess.Popen
+
+        Returns:
+            subprocess.CompletedProcess: The completed process result
+
+        Raises:
+            subprocess.CalledProcessError: If check=True and process exits non-zero
+            subprocess.TimeoutExpired: If timeout is exceeded
+        """
+        if kwargs.get("capture_output") or subprocess.PIPE in (
+            kwargs.get("stdout"),
+            kwargs.get("stderr"),
+        ):
+            return self._run_to_completion(*args, **kwargs)
+
+        check = kwargs.pop("check", False)
+        timeout = kwargs.pop("timeout", None)
+        kwargs.pop("capture_output", None)
+        # The sinks take raw bytes
+        for text_option in ("text", "universal_newlines", "encoding", "errors"):
+            kwargs.pop(text_option, None)
+        kwargs["stdout"] = subprocess.PIPE
+        kwargs["stderr"] = subprocess.PIPE
+        kwargs["bufsize"] = 0
+
+        process = self._popen(*args, **kwargs)
+        try:
+            process_return_code = _pump_and_wait(
+                process,
+                [(process.stdout, self._stdout), (process.stderr, self._stderr)],
+                timeout,
+                self._logger,
+                wait=self._wait,
+            )
+        finally:
+            self._release(process)
+        return _check_result_if_necessary(check, process_return_code, *args, **kwargs)
 
 
 def make_process_runner(output_type: TaskOutputTypes, logger: Logger) -> ProcessRunner:
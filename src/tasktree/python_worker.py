@@ -0,0 +1,556 @@
+"""Warm workers for persistent Python interpreters.
+
+Starting CPython and importing a task's modules can take longer than a small
+task itself. For an interpreter marked ``persistent: true``, tt starts one
+worker (python_worker_server.py, run by that interpreter) the first time a
+task uses it. The worker imports the interpreter's ``preload`` modules, then
+forks a fresh copy of itself for each task, which runs the task's script as
+``__main__``. Isolation comes from the fork: nothing a task does is seen by
+the next one.
+
+A task process is driven through WorkerProcess, a handle with Popen's
+interface for a child forked by the worker instead of exec'd by tt, so the
+process runners pipe, wait for, time out and signal it like any other. Its
+cwd, environment, standard streams, inherited descriptors and exit status
+are those a ``python script`` child would have.
+"""
+
+from __future__ import annotations
+
+import io
+import json
+import os
+import select
+import signal
+import socket
+import subprocess
+import time
+from collections.abc import Callable
+from pathlib import Path
+from subprocess import Popen
+from threading import Lock, Thread
+from types import SimpleNamespace
+from typing import IO, Any
+
+from tasktree.interpreter import Interpreter
+from tasktree.logging import Logger
+from tasktree.python_worker_server import (
+    EXIT_REPLY,
+    REQUEST_LENGTH,
+    START_REPLY,
+    recv_exactly,
+)
+from tasktree.resource_usage import ResourceUsage
+
+__all__ = ["PythonWorker", "PythonWorkerPool", "WorkerProcess"]
+
+_SERVER_SCRIPT = Path(__file__).with_name("python_worker_server.py")
+
+# Seconds a worker may take to start and import its preloaded modules
+_STARTUP_TIMEOUT = 30.0
+
+# The rusage fields in an EXIT_REPLY, in order
+_RUSAGE_FIELDS = (
+    "ru_utime",
+    "ru_stime",
+    "ru_maxrss",
+    "ru_inblock",
+    "ru_oublock",
+    "ru_nvcsw",
+    "ru_nivcsw",
+)
+
+# Environment variables read when Python starts (PYTHONPATH, PYTHONHASHSEED,
+# ...): a worker only serves tasks whose environment agrees on them
+_STARTUP_ENV_PREFIX = "PYTHON"
+
+
+class PythonWorker:
+    """
+    A running warm worker for one persistent interpreter.
+
+    Tasks are started with popen(); any number may run at once.
+    """
+
+    def __init__(
+        self,
+        interpreter: Interpreter,
+        process: Popen[bytes],
+        control: socket.socket,
+    ) -> None:
+        self.interpreter = interpreter
+        self._process = process
+        self._control = control
+
+    @classmethod
+    def start(
+        cls, interpreter: Interpreter, env: dict[str, str], logger: Logger
+    ) -> PythonWorker | None:
+        """
+        Start a worker and wait until it has imported its preloaded modules.
+
+        Args:
+            interpreter: The persistent interpreter to run it with
+            env: Environment to start it in
+            logger: Logger for diagnostics
+
+        Returns:
+            The worker, or None (with a warning logged) if it could not be started
+        """
+        control, remote = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+        try:
+            process = subprocess.Popen(
+                interpreter.invocation
+                + [str(_SERVER_SCRIPT), str(remote.fileno()), *interpreter.preload],
+                # The worker exits when tt closes this pipe, or dies
+                stdin=subprocess.PIPE,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                pass_fds=(remote.fileno(),),
+                env=env,
+            )
+        except OSError as e:
+            control.close()
+            logger.warn(cls._fallback_message(interpreter, str(e)))
+            return None
+        finally:
+            remote.close()
+
+        message = b""
+        deadline = time.monotonic() + _STARTUP_TIMEOUT
+        while process.poll() is None and time.monotonic() < deadline:
+            if select.select([control], [], [], 0.05)[0]:
+                message = control.recv(65536)
+                break
+        if message != b"ready":
+            reason = message.decode(errors="replace").strip() or "it did not start"
+            logger.warn(cls._fallback_message(interpreter, reason))
+            process.kill()
+            process.wait()
+            process.stdin.close()
+            control.close()
+            return None
+
+        logger.debug(
+            f"Started persistent worker {process.pid} for interpreter '{interpreter.cmd}'"
+        )
+        return cls(interpreter, process, control)
+
+    @staticmethod
+    def _fallback_message(interpreter: Interpreter, reason: str) -> str:
+        return (
+            f"Could not start a persistent worker for interpreter "
+            f"'{interpreter.cmd}' ({reason}); running its tasks without one"
+        )
+
+    def alive(self) -> bool:
+        """Whether the worker is still running."""
+        return self._process.poll() is None
+
+    def popen(self, script: str) -> Callable[..., WorkerProcess]:
+        """
+        A Popen substitute that runs ``script`` in this worker.
+
+        Args:
+            script: The whole script (preamble included)
+
+        Returns:
+            A callable taking Popen's arguments, for a process runner's ``popen``
+        """
+
+        def start(args: Any, **kwargs: Any) -> WorkerProcess:
+            return WorkerProcess(self, script, args, **kwargs)
+
+        return start
+
+    def run(
+        self,
+        script: str,
+        name: str,
+        cwd: str,
+        env: dict[str, str],
+        fds: list[int],
+        pass_fds: tuple[int, ...],
+        process_group: int | None,
+        start_new_session: bool,
+    ) -> tuple[socket.socket, int]:
+        """
+        Start a task in a fresh fork of the worker.
+
+        Args:
+            script: The whole script
+            name: Name the script runs under (sys.argv[0], tracebacks)
+            cwd: Working directory
+            env: Complete environment
+            fds: The task's stdin, stdout and stderr
+            pass_fds: Further descriptors the task inherits, at the same numbers
+            process_group: Process group to put the task in, if any
+            start_new_session: Whether the task starts a new session
+
+        Returns:
+            The channel the task's exit status will arrive on, and its pid
+
+        Raises:
+            OSError: If the task could not be started (e.g. a bad cwd)
+        """
+        channel, remote = socket.socketpair()
+        try:
+            # One datagram per request, so threads can send them concurrently
+            socket.send_fds(self._control, [b"r"], [remote.fileno(), *fds, *pass_fds])
+        except OSError:
+            channel.close()
+            raise OSError(
+                f"The persistent worker for interpreter '{self.interpreter.cmd}' "
+                f"has stopped"
+            ) from None
+        finally:
+            remote.close()
+
+        request = json.dumps(
+            {
+                "script": script,
+                "name": name,
+                "cwd": cwd,
+                "env": env,
+                "pass_fds": list(pass_fds),
+                "process_group": process_group,
+                "start_new_session": start_new_session,
+            }
+        ).encode()
+        try:
+            channel.sendall(REQUEST_LENGTH.pack(len(request)) + request)
+            pid, error = START_REPLY.unpack(recv_exactly(channel, START_REPLY.size))
+        except (OSError, EOFError):
+            channel.close()
+            raise OSError(
+                f"The persistent worker for interpreter '{self.interpreter.cmd}' "
+                f"has stopped"
+            ) from None
+        if pid < 0:
+            channel.close()
+            raise OSError(error, os.strerror(error), cwd)
+        return channel, pid
+
+    def close(self) -> None:
+        """Stop the worker; tasks already running are unaffected."""
+        self._process.stdin.close()
+        try:
+            self._process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self._process.kill()
+            self._process.wait()
+        self._control.close()
+
+
+class WorkerProcess:
+    """
+    A task process forked by a PythonWorker, with the parts of Popen's
+    interface the process runners use: ``args``, ``pid``, ``returncode``,
+    the ``stdin``, ``stdout`` and ``stderr`` pipes, poll(), wait(),
+    communicate(), send_signal(), terminate(), kill(), and use as a context
+    manager.
+
+    tt is not its parent, so its exit status (and resource usage, in
+    ``usage``) arrives from the worker instead of from waitpid().
+    """
+
+    def __init__(
+        self,
+        worker: PythonWorker,
+        script: str,
+        args: Any,
+        stdin: Any = None,
+        stdout: Any = None,
+        stderr: Any = None,
+        cwd: Any = None,
+        env: dict[str, str] | None = None,
+        pass_fds: Any = (),
+        process_group: int | None = None,
+        start_new_session: bool = False,
+        bufsize: int = -1,
+        text: bool = False,
+        universal_newlines: bool | None = None,
+        encoding: str | None = None,
+        errors: str | None = None,
+        close_fds: bool = True,
+    ) -> None:
+        """
+        Have the worker fork the task, instead of exec'ing ``args``.
+
+        Takes Popen's arguments, of which ``args`` only names the script
+        (its last item) and ``close_fds`` is implied.
+
+        Raises:
+            OSError: If the task could not be started (e.g. a bad cwd)
+        """
+        self.args = args
+        self.returncode: int | None = None
+        self.usage: ResourceUsage | None = None
+        self.stdin: IO[Any] | None = None
+        self.stdout: IO[Any] | None = None
+        self.stderr: IO[Any] | None = None
+        self._lock = Lock()
+
+        # The task's stdin, stdout and stderr; those opened here are closed
+        # once the worker has them, and pipes keep their other end here
+        fds: list[int] = []
+        opened: list[int] = []
+        pipes: dict[str, int] = {}
+        try:
+            for name, spec, default in (
+                ("stdin", stdin, 0),
+                ("stdout", stdout, 1),
+                ("stderr", stderr, 2),
+            ):
+                if spec is None:
+                    fd = default
+                elif spec == subprocess.PIPE:
+                    read_fd, write_fd = os.pipe()
+                    fd, pipes[name] = (
+                        (read_fd, write_fd) if name == "stdin" else (write_fd, read_fd)
+                    )
+                    opened.append(fd)
+                elif spec == subprocess.DEVNULL:
+                    fd = os.open(os.devnull, os.O_RDWR)
+                    opened.append(fd)
+                elif spec == subprocess.STDOUT:
+                    fd = fds[1]
+                elif isinstance(spec, int):
+                    fd = spec
+                else:
+                    fd = spec.fileno()
+                fds.append(fd)
+
+            self._channel, self.pid = worker.run(
+                script,
+                str(args[-1]),
+                os.fspath(cwd) if cwd is not None else os.getcwd(),
+                dict(os.environ if env is None else env),
+                fds,
+                tuple(pass_fds),
+                # Popen takes -1 for no process group
+                None if process_group is None or process_group < 0 else process_group,
+                start_new_session,
+            )
+        except BaseException:
+            for fd in pipes.values():
+                os.close(fd)
+            raise
+        finally:
+            for fd in opened:
+                os.close(fd)
+
+        text_mode = bool(text or universal_newlines or encoding or errors)
+        for name, fd in pipes.items():
+            setattr(
+                self,
+                name,
+                _open_pipe(fd, name == "stdin", bufsize, text_mode, encoding, errors),
+            )
+
+    def __enter__(self) -> WorkerProcess:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        for pipe in (self.stdout, self.stderr):
+            if pipe is not None:
+                pipe.close()
+        try:
+            if self.stdin is not None:
+                self.stdin.close()
+        finally:
+            self.wait()
+
+    def poll(self) -> int | None:
+        """The exit code, or None while the task is running."""
+        if self.returncode is None and self._lock.acquire(blocking=False):
+            try:
+                if (
+                    self.returncode is None
+                    and select.select([self._channel], [], [], 0)[0]
+                ):
+                    self._receive_exit()
+            finally:
+                self._lock.release()
+        return self.returncode
+
+    def wait(self, timeout: float | None = None) -> int:
+        """
+        Wait for the task to exit.
+
+        Raises:
+            subprocess.TimeoutExpired: If it is still running after timeout
+        """
+        if self.returncode is not None:
+            return self.returncode
+        deadline = None if timeout is None else time.monotonic() + timeout
+        if not self._lock.acquire(timeout=-1 if timeout is None else timeout):
+            raise subprocess.TimeoutExpired(self.args, timeout)
+        try:
+            if self.returncode is None:
+                if (
+                    deadline is not None
+                    and not select.select(
+                        [self._channel], [], [], max(0.0, deadline - time.monotonic())
+                    )[0]
+                ):
+                    raise subprocess.TimeoutExpired(self.args, timeout)
+                self._receive_exit()
+        finally:
+            self._lock.release()
+        return self.returncode
+
+    def communicate(
+        self, input: Any = None, timeout: float | None = None
+    ) -> tuple[Any, Any]:
+        """
+        Send ``input`` to the task, read its output until end-of-file and
+        wait for it to exit.
+
+        Returns:
+            The task's stdout and stderr (None for streams not piped)
+
+        Raises:
+            subprocess.TimeoutExpired: If the task is still running after timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        output: dict[str, Any] = {}
+
+        def read(name: str, pipe: IO[Any]) -> None:
+            output[name] = pipe.read()
+            pipe.close()
+
+        readers = [
+            Thread(target=read, args=(name, pipe), name="worker-reader", daemon=True)
+            for name, pipe in (("stdout", self.stdout), ("stderr", self.stderr))
+            if pipe is not None
+        ]
+        for reader in readers:
+            reader.start()
+        if self.stdin is not None:
+            try:
+                if input:
+                    self.stdin.write(input)
+                self.stdin.close()
+            except BrokenPipeError:
+                # The task exited without reading all of its input
+                pass
+        for reader in readers:
+            reader.join(
+                None if deadline is None else max(0.0, deadline - time.monotonic())
+            )
+            if reader.is_alive():
+                raise subprocess.TimeoutExpired(self.args, timeout)
+        self.wait(None if deadline is None else max(0.0, deadline - time.monotonic()))
+        return output.get("stdout"), output.get("stderr")
+
+    def send_signal(self, sig: int) -> None:
+        """Signal the task, unless it is known to have exited."""
+        if self.poll() is None:
+            try:
+                os.kill(self.pid, sig)
+            except ProcessLookupError:
+                pass
+
+    def terminate(self) -> None:
+        self.send_signal(signal.SIGTERM)
+
+    def kill(self) -> None:
+        self.send_signal(signal.SIGKILL)
+
+    def _receive_exit(self) -> None:
+        """Read the task's exit status and resource usage from the worker."""
+        try:
+            reply = EXIT_REPLY.unpack(recv_exactly(self._channel, EXIT_REPLY.size))
+        except (OSError, EOFError):
+            # The worker's fork that waits for the task was killed; as far
+            # as we know, so was the task
+            status = signal.SIGKILL
+        else:
+            status, *rusage = reply
+            self.usage = ResourceUsage.from_rusage(
+                SimpleNamespace(**dict(zip(_RUSAGE_FIELDS, rusage)))
+            )
+        finally:
+            self._channel.close()
+        self.returncode = os.waitstatus_to_exitcode(status)
+
+
+def _open_pipe(
+    fd: int,
+    writing: bool,
+    bufsize: int,
+    text: bool,
+    encoding: str | None,
+    errors: str | None,
+) -> IO[Any]:
+    """Tt's end of a task's pipe, opened as Popen opens it."""
+    line_buffering = text and bufsize == 1
+    pipe: IO[Any] = open(
+        fd, "wb" if writing else "rb", -1 if line_buffering else bufsize
+    )
+    if text:
+        pipe = io.TextIOWrapper(
+            pipe,
+            encoding=encoding,
+            errors=errors,
+            write_through=writing,
+            line_buffering=line_buffering,
+        )
+    return pipe
+
+
+class PythonWorkerPool:
+    """
+    The warm workers of a run, one per persistent interpreter, each started
+    the first time a task needs it.
+    """
+
+    def __init__(self, logger: Logger) -> None:
+        self._logger = logger
+        self._lock = Lock()
+        # None records a worker that could not be started, so it is not retried
+        self._workers: dict[Any, PythonWorker | None] = {}
+
+    @staticmethod
+    def supported() -> bool:
+        """Whether workers can run here (fork and descriptor passing)."""
+        return hasattr(os, "fork") and hasattr(socket, "send_fds")
+
+    def get(self, interpreter: Interpreter, env: dict[str, str]) -> PythonWorker | None:
+        """
+        The worker to run a task with, starting it if need be.
+
+        Args:
+            interpreter: The task's persistent interpreter
+            env: The task's environment
+
+        Returns:
+            The worker, or None if the task must be run the usual way
+        """
+        if not self.supported():
+            return None
+        startup_env = tuple(
+            sorted(
+                (name, value)
+                for name, value in env.items()
+                if name.startswith(_STARTUP_ENV_PREFIX)
+            )
+        )
+        key = (interpreter, startup_env)
+        with self._lock:
+            if key in self._workers:
+                worker = self._workers[key]
+                if worker is None or worker.alive():
+                    return worker
+            worker = PythonWorker.start(interpreter, env, self._logger)
+            self._workers[key] = worker
+            return worker
+
+    def close(self) -> None:
+        """Stop every worker."""
+        with self._lock:
+            workers = [worker for worker in self._workers.values() if worker]
+            self._workers.clear()
+        for worker in workers:
+            worker.close()
@@ -0,0 +1,234 @@
+"""Warm Python worker, run by a persistent interpreter (see python_worker).
+
+Started by tt as ``<interpreter> python_worker_server.py CONTROL_FD [MODULE...]``,
+it imports the preloaded modules once, then forks a fresh copy of itself for
+every task script tt sends it. Only the standard library may be used here: the
+worker runs under the task's interpreter, which need not have tasktree
+installed.
+
+Protocol, per task:
+
+- tt sends one datagram on the control socket, carrying the descriptors
+  ``[channel, stdin, stdout, stderr, *pass_fds]``
+- tt writes the request to the channel: a 4-byte length, then JSON with
+  ``script``, ``name``, ``cwd``, ``env``, ``pass_fds``, ``process_group`` and
+  ``start_new_session``
+- the worker replies on the channel with the task's pid (or -1 and an errno if
+  it could not be started), and later its wait status and resource usage
+
+The worker exits when its stdin (a pipe from tt) reaches end of file.
+"""
+
+import sys
+
+# Run as a script, the worker has its own directory first on sys.path: that is
+# tasktree's package, whose types.py would shadow the standard library's. Drop
+# it before importing anything else.
+if __name__ == "__main__" and not getattr(sys.flags, "safe_path", False):
+    del sys.path[0]
+
+import atexit
+import fcntl
+import json
+import linecache
+import os
+import select
+import signal
+import socket
+import struct
+import threading
+import traceback
+import types
+
+# Reply to a start request: pid (or -1) and errno
+START_REPLY = struct.Struct("!ii")
+# Reply once the task has exited: wait status, user and system CPU, then
+# max RSS, block reads and writes, voluntary and involuntary context switches
+EXIT_REPLY = struct.Struct("!idd5q")
+REQUEST_LENGTH = struct.Struct("!I")
+# Most descriptors a request can carry
+_MAX_FDS = 64
+
+
+def recv_exactly(sock, size):
+    """Read exactly ``size`` bytes from a stream socket."""
+    data = b""
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise EOFError("channel closed")
+        data += chunk
+    return data
+
+
+def _install_fds(fds, targets):
+    """Dup each received descriptor onto its target number; close the rest."""
+    # Move them out of the way first, so no target overwrites a received fd
+    floor = max(max(targets), max(fds)) + 1
+    staged = [fcntl.fcntl(fd, fcntl.F_DUPFD, floor) for fd in fds]
+    for fd, target in zip(staged, targets):
+        os.dup2(fd, target)
+    low = 0
+    for fd in sorted(set(targets)):
+        # Never an empty range: closerange(0, 0) can close everything
+        if low < fd:
+            os.closerange(low, fd)
+        low = fd + 1
+    os.closerange(low, os.sysconf("SC_OPEN_MAX"))
+
+
+def _exit_code(exc):
+    """The exit status Python gives an uncaught SystemExit."""
+    code = exc.code
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code
+    print(code, file=sys.stderr)
+    return 1
+
+
+def _run_script(source, name):
+    """Run a script as __main__ the way ``python script`` would; never returns."""
+    main = types.ModuleType("__main__")
+    sys.modules["__main__"] = main
+    sys.argv = [name]
+    # So tracebacks can show the script's lines
+    linecache.cache[name] = (len(source), None, source.splitlines(True), name)
+    status = 0
+    try:
+        exec(compile(source, name, "exec"), main.__dict__)
+    except SystemExit as exc:
+        status = _exit_code(exc)
+    except BaseException as exc:
+        # Leave this function's frame out of the traceback
+        exc.with_traceback(exc.__traceback__.tb_next)
+        if sys.excepthook is sys.__excepthook__:
+            # Unlike the built-in hook, this one finds the lines in linecache
+            traceback.print_exception(type(exc), exc, exc.__traceback__)
+        else:
+            sys.excepthook(type(exc), exc, exc.__traceback__)
+        status = None if isinstance(exc, KeyboardInterrupt) else 1
+
+    # Interpreter shutdown: non-daemon threads, then atexit handlers
+    for thread in threading.enumerate():
+        if thread is not threading.main_thread() and not thread.daemon:
+            thread.join()
+    try:
+        atexit._run_exitfuncs()
+    finally:
+        for stream in (sys.stdout, sys.stderr):
+            try:
+                stream.flush()
+            except Exception:
+                pass
+    if status is None:
+        # Like Python, die by SIGINT after an uncaught KeyboardInterrupt
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        os.kill(os.getpid(), signal.SIGINT)
+        status = 130
+    os._exit(status & 0xFF)
+
+
+def _start_script(channel, fds, request):
+    """Runs in the task's process: set it up as requested and run the script."""
+    channel.close()
+    if request["start_new_session"]:
+        os.setsid()
+    elif request["process_group"] is not None:
+        os.setpgid(0, request["process_group"])
+    _install_fds(fds, [0, 1, 2] + request["pass_fds"])
+    # Fresh standard streams on the task's descriptors
+    sys.stdin = open(0, closefd=False)
+    sys.stdout = open(1, "w", closefd=False)
+    sys.stderr = open(2, "w", buffering=1, closefd=False, errors="backslashreplace")
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    _run_script(request["script"], request["name"])
+
+
+def _start_task(control, fds):
+    """Runs in a fork of the worker: start the task and report on it."""
+    control.close()
+    channel = socket.socket(fileno=fds[0])
+    task_fds = fds[1:]
+    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+
+    (length,) = REQUEST_LENGTH.unpack(recv_exactly(channel, REQUEST_LENGTH.size))
+    request = json.loads(recv_exactly(channel, length))
+    try:
+        os.chdir(request["cwd"])
+    except OSError as e:
+        channel.sendall(START_REPLY.pack(-1, e.errno or 0))
+        os._exit(0)
+    os.environ.clear()
+    os.environ.update(request["env"])
+
+    pid = os.fork()
+    if pid == 0:
+        try:
+            _start_script(channel, task_fds, request)
+        except BaseException:
+            traceback.print_exc()
+        finally:
+            os._exit(1)
+
+    # Only the task may hold its output pipes open
+    for fd in task_fds:
+        os.close(fd)
+    if request["process_group"] is not None and not request["start_new_session"]:
+        try:
+            # Also set here, so tt can signal the group as soon as it has the pid
+            os.setpgid(pid, request["process_group"])
+        except OSError:
+            pass
+    channel.sendall(START_REPLY.pack(pid, 0))
+    _, status, rusage = os.wait4(pid, 0)
+    channel.sendall(
+        EXIT_REPLY.pack(
+            status,
+            rusage.ru_utime,
+            rusage.ru_stime,
+            rusage.ru_maxrss,
+            rusage.ru_inblock,
+            rusage.ru_oublock,
+            rusage.ru_nvcsw,
+            rusage.ru_nivcsw,
+        )
+    )
+    os._exit(0)
+
+
+def main():
+    control = socket.socket(fileno=int(sys.argv[1]))
+    try:
+        for module in sys.argv[2:]:
+            __import__(module)
+    except BaseException as e:
+        control.send(("error: " + "".join(traceback.format_exception_only(e))).encode())
+        return
+    # Ctrl-C is for the tasks: the worker, and the forks waiting for tasks,
+    # keep running to report their exit. Those forks are reaped automatically.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+    control.send(b"ready")
+
+    while True:
+        readable, _, _ = select.select([control, sys.stdin], [], [])
+        if sys.stdin in readable:
+            return
+        _, fds, _, _ = socket.recv_fds(control, 1, _MAX_FDS)
+        if not fds:
+            continue
+        if os.fork() == 0:
+            try:
+                _start_task(control, fds)
+            except BaseException:
+                traceback.print_exc()
+            finally:
+                os._exit(1)
+        for fd in fds:
+            os.close(fd)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,347 @@
+"""Resource usage of task processes.
+
+Every process a ProcessRunner starts is reaped with ``os.wait4``, which
+reports what the process and the descendants it waited for used: CPU time,
+peak resident memory, block I/O and context switches. Where tt can create
+cgroups (a delegated cgroup v2 subtree, e.g. a systemd user session), each
+task's processes are also put in a transient cgroup of their own, whose
+counters cover the whole process tree, including anything left running in
+the background.
+"""
+
+from __future__ import annotations
+
+import itertools
+import operator
+import os
+import subprocess
+import sys
+import time
+from dataclasses import asdict, dataclass, fields
+from pathlib import Path
+from subprocess import Popen
+from typing import Any
+
+__all__ = [
+    "ResourceUsage",
+    "TaskCgroup",
+    "wait_for_exit",
+]
+
+
+# ru_maxrss is in KiB on Linux, bytes on macOS
+_RSS_SCALE = 1 if sys.platform == "darwin" else 1024
+
+
+def _format_bytes(size: float) -> str:
+    if size < 1024:
+        return f"{size:.0f} B"
+    for unit in ("KiB", "MiB"):
+        size /= 1024
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+    return f"{size / 1024:.1f} GiB"
+
+
+def _combine(a: int | None, b: int | None, combine: Any) -> int | None:
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return combine(a, b)
+
+
+@dataclass(frozen=True)
+class ResourceUsage:
+    """
+    Resources used by a task's processes.
+
+    The rusage fields come from ``os.wait4``; max_rss is the peak of the
+    largest single process (None if unknown, see between). The other
+    optional fields are only known when the task ran in its own cgroup:
+    peak_memory is the peak of the whole process tree together, and
+    read_bytes/write_bytes its disk I/O.
+    """
+
+    user_cpu: float = 0.0
+    system_cpu: float = 0.0
+    max_rss: int | None = None
+    block_reads: int = 0
+    block_writes: int = 0
+    voluntary_switches: int = 0
+    involuntary_switches: int = 0
+    peak_memory: int | None = None
+    read_bytes: int | None = None
+    write_bytes: int | None = None
+
+    @classmethod
+    def from_rusage(cls, rusage: Any) -> ResourceUsage:
+        """
+        Convert a ``resource.struct_rusage``.
+
+        Args:
+            rusage: Usage as returned by os.wait4
+
+        Returns:
+            The equivalent ResourceUsage
+        """
+        return cls(
+            user_cpu=rusage.ru_utime,
+            system_cpu=rusage.ru_stime,
+            max_rss=rusage.ru_maxrss * _RSS_SCALE,
+            block_reads=rusage.ru_inblock,
+            block_writes=rusage.ru_oublock,
+            voluntary_switches=rusage.ru_nvcsw,
+            involuntary_switches=rusage.ru_nivcsw,
+        )
+
+    def __add__(self, other: ResourceUsage) -> ResourceUsage:
+        """Usage of two processes run one after the other."""
+        return ResourceUsage(
+            user_cpu=self.user_cpu + other.user_cpu,
+            system_cpu=self.system_cpu + other.system_cpu,
+            max_rss=_combine(self.max_rss, other.max_rss, max),
+            block_reads=self.block_reads + other.block_reads,
+            block_writes=self.block_writes + other.block_writes,
+            voluntary_switches=self.voluntary_switches + other.voluntary_switches,
+            involuntary_switches=self.involuntary_switches + other.involuntary_switches,
+            peak_memory=_combine(self.peak_memory, other.peak_memory, max),
+            read_bytes=_combine(self.read_bytes, other.read_bytes, operator.add),
+            write_bytes=_combine(self.write_bytes, other.write_bytes, operator.add),
+        )
+
+    def describe(self) -> str:
+        """One-line, human-readable summary."""
+        parts = [f"CPU {self.user_cpu:.2f}s user + {self.system_cpu:.2f}s sys"]
+        if self.max_rss is not None:
+            parts.append(f"max RSS {_format_bytes(self.max_rss)}")
+        if self.peak_memory is not None:
+            parts.append(f"peak memory {_format_bytes(self.peak_memory)}")
+        parts.append(f"block I/O {self.block_reads} in / {self.block_writes} out")
+        if self.read_bytes is not None and self.write_bytes is not None:
+            parts.append(
+                f"disk {_format_bytes(self.read_bytes)} read / "
+                f"{_format_bytes(self.write_bytes)} written"
+            )
+        parts.append(
+            f"context switches {self.voluntary_switches} voluntary / "
+            f"{self.involuntary_switches} involuntary"
+        )
+        return ", ".join(parts)
+
+    def to_dict(self) -> dict[str, Any]:
+        """
+        Convert to dictionary for JSON serialization.
+        """
+        return {key: value for key, value in asdict(self).items() if value is not None}
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> ResourceUsage:
+        """
+        Create from dictionary loaded from JSON.
+        """
+        known = {f.name for f in fields(cls)}
+        return cls(**{key: value for key, value in data.items() if key in known})
+
+
+def wait_for_exit(
+    process: Popen[Any], timeout: float | None
+) -> tuple[int, ResourceUsage | None]:
+    """
+    Popen.wait that also returns the process's resource usage.
+
+    The process is reaped with ``os.wait4``; where that is not available
+    (Windows), or something else reaped the process first, the usage is None.
+    A process that is not tt's child is waited for through Popen.wait, and
+    its usage is taken from its ``usage`` attribute if it has one (see
+    python_worker.WorkerProcess).
+
+    Args:
+        process: Process to wait for
+        timeout: Seconds to wait, or None to wait for as long as it takes
+
+    Returns:
+        The exit code and the resource usage
+
+    Raises:
+        subprocess.TimeoutExpired: If the process is still running after timeout
+    """
+    if not hasattr(os, "wait4") or process.returncode is not None:
+        return process.wait(timeout), None
+
+    deadline = None if timeout is None else time.monotonic() + timeout
+    delay = 0.0005
+    while True:
+        try:
+            pid, status, rusage = os.wait4(
+                process.pid, 0 if deadline is None else os.WNOHANG
+            )
+        except ChildProcessError:
+            # Reaped by a Popen.poll() elsewhere, which kept the exit status,
+            # or not a child of tt at all
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            return process.wait(remaining), getattr(process, "usage", None)
+        if pid:
+            returncode = os.waitstatus_to_exitcode(status)
+            process.returncode = returncode
+            return returncode, ResourceUsage.from_rusage(rusage)
+
+        # Poll with backoff, as Popen.wait does for a timeout
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise subprocess.TimeoutExpired(process.args, timeout)
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 2, 0.05)
+
+
+class TaskCgroup:
+    """
+    A transient cgroup v2 for one task's processes.
+
+    Created under tt's own cgroup, and only if tt may create cgroups there
+    (never in the root cgroup). Processes are moved in right after they start.
+    Only CPU time is always accounted; peak memory and disk I/O also need the
+    memory and io controllers enabled for tt's cgroup's children.
+    """
+
+    _ids = itertools.count()
+    # tt's own cgroup directory, or None if unusable; looked up once
+    _parent: Path | None
+    _parent_known = False
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+
+    @classmethod
+    def create(cls) -> TaskCgroup | None:
+        """
+        Create a cgroup for a task.
+
+        Returns:
+            The new cgroup, or None if cgroups cannot be used here
+        """
+        if not cls._parent_known:
+            cls._parent = cls._find_own_cgroup()
+            cls._parent_known = True
+        if cls._parent is None:
+            return None
+
+        path = cls._parent / f"tt-{os.getpid()}-{next(cls._ids)}"
+        try:
+            path.mkdir()
+        except OSError:
+            return None
+        return cls(path)
+
+    @staticmethod
+    def _find_own_cgroup() -> Path | None:
+        """This process's cgroup v2 directory, if it may create cgroups in it."""
+        try:
+            cgroup = next(
+                line[3:].strip()
+                for line in Path("/proc/self/cgroup").read_text().splitlines()
+                if line.startswith("0::")
+            )
+            mount_point = next(
+                line.split(" - ")[0].split()[4]
+                for line in Path("/proc/self/mountinfo").read_text().splitlines()
+                if " - cgroup2 " in line
+            )
+        except (OSError, StopIteration):
+            return None
+        if cgroup in ("", "/"):
+            return None
+
+        path = Path(mount_point) / cgroup.lstrip("/")
+        if not os.access(path, os.W_OK) or not os.access(
+            path / "cgroup.procs", os.W_OK
+        ):
+            return None
+        return path
+
+    def add(self, pid: int) -> bool:
+        """
+        Move a process into the cgroup.
+
+        Args:
+            pid: Process to move
+
+        Returns:
+            True if it was moved
+        """
+        try:
+            (self.path / "cgroup.procs").write_text(str(pid))
+        except OSError:
+            return False
+        return True
+
+    def counters(self) -> dict[str, int]:
+        """
+        Current counters: ``user_usec`` and ``system_usec`` (from cpu.stat),
+        plus ``peak_memory``, ``read_bytes`` and ``write_bytes`` where the
+        memory and io controllers are enabled.
+        """
+        counters: dict[str, int] = {}
+        try:
+            for line in (self.path / "cpu.stat").read_text().splitlines():
+                key, _, value = line.partition(" ")
+                if key in ("user_usec", "system_usec"):
+                    counters[key] = int(value)
+        except (OSError, ValueError):
+            pass
+        try:
+            counters["peak_memory"] = int((self.path / "memory.peak").read_text())
+        except (OSError, ValueError):
+            pass
+        try:
+            io_stat = (self.path / "io.stat").read_text()
+        except OSError:
+            pass
+        else:
+            counters["read_bytes"] = counters["write_bytes"] = 0
+            for line in io_stat.splitlines():
+                for field in line.split()[1:]:
+                    key, _, value = field.partition("=")
+                    if key in ("rbytes", "wbytes") and value.isdigit():
+                        counters[
+                            "read_bytes" if key == "rbytes" else "write_bytes"
+                        ] += int(value)
+        return counters
+
+    @staticmethod
+    def apply(
+        usage: ResourceUsage, before: dict[str, int], after: dict[str, int]
+    ) -> ResourceUsage:
+        """
+        Add what a process's cgroup saw while it ran to its rusage.
+
+        The cgroup's CPU time also covers descendants that were never waited
+        for, but can lag just after an exit, so it only ever raises the
+        rusage figures.
+
+        Args:
+            usage: The process's usage from os.wait4
+            before: Cgroup counters from when the process started
+            after: Cgroup counters from when it was reaped
+
+        Returns:
+            The usage, with the cgroup's whole-tree figures where available
+        """
+        changes: dict[str, Any] = {}
+        for key, attr in (("user_usec", "user_cpu"), ("system_usec", "system_cpu")):
+            if key in after:
+                seconds = (after[key] - before.get(key, 0)) / 1e6
+                changes[attr] = max(getattr(usage, attr), seconds)
+        if "peak_memory" in after:
+            changes["peak_memory"] = after["peak_memory"]
+        for key in ("read_bytes", "write_bytes"):
+            if key in after:
+                changes[key] = after[key] - before.get(key, 0)
+        return ResourceUsage(**{**asdict(usage), **changes})
+
+    def remove(self) -> None:
+        """Remove the cgroup (left in place if processes are still in it)."""
+        try:
+            self.path.rmdir()
+        except OSError:
+            pass
@@ -0,0 +1,658 @@
+"""Resource-aware scheduling of task invocations.
+
+The executor resolves a target task into a dependency graph of invocations.
+:class:`TaskScheduler` walks that graph, starting an invocation once all of
+its dependencies have completed, a job slot is free, and the
+:class:`ResourceBudget` can cover the CPU, memory and pool units the task
+declared in its ``resources`` field.
+
+With ``-j auto`` the job limit is not fixed: :class:`AdaptiveConcurrency`
+periodically samples system pressure (Linux PSI and memory headroom) and
+raises or lowers the number of admitted invocations within a range.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable
+
+from tasktree.jobserver import JobTokens
+from tasktree.logging import Logger
+from tasktree.parser import ResourceRequest, format_memory_size
+
+# Tolerance for summing fractional CPU requests
+_CPU_EPSILON = 1e-9
+
+# How often to retry for a jobserver token; other processes returning tokens
+# cannot wake the scheduler, so it polls
+_TOKEN_POLL_INTERVAL = 0.05
+
+
+def host_cpu_count() -> int:
+    """
+    Number of CPUs this process may run on.
+
+    Prefers the scheduler affinity mask (which respects container CPU sets)
+    over the raw CPU count.
+    """
+    try:
+        return len(os.sched_getaffinity(0))
+    except (AttributeError, OSError):
+        return os.cpu_count() or 1
+
+
+def host_memory_bytes() -> int | None:
+    """
+    Total physical memory of the host in bytes, or None if it cannot be read.
+    """
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def describe_resources(request: ResourceRequest) -> str:
+    """Human-readable summary of a resource request, e.g. 'cpu=4, mem=8G, pools=db'."""
+    parts = []
+    if request.cpu:
+        parts.append(f"cpu={request.cpu:g}")
+    if request.mem:
+        parts.append(f"mem={format_memory_size(request.mem)}")
+    if request.pools:
+        parts.append(f"pools={','.join(request.pools)}")
+    return ", ".join(parts) or "none"
+
+
+@dataclass(frozen=True)
+class AutoJobs:
+    """
+    Adaptive job limit requested with ``-j auto``.
+
+    Attributes:
+    min_jobs: Fewest invocations admitted, however loaded the host is
+    max_jobs: Most invocations admitted, or None for the host CPU count
+    """
+
+    min_jobs: int = 1
+    max_jobs: int | None = None
+
+    def resolved_max(self) -> int:
+        """The upper bound, defaulting to the host CPU count."""
+        if self.max_jobs is not None:
+            return self.max_jobs
+        return max(self.min_jobs, host_cpu_count())
+
+
+_AUTO_JOBS_PATTERN = re.compile(r"^auto(?::(?:(\d+)-)?(\d+))?$")
+
+
+def parse_jobs(value: str) -> int | AutoJobs:
+    """
+    Parse a ``--jobs`` value.
+
+    Accepts a positive integer, ``auto``, ``auto:MAX`` or ``auto:MIN-MAX``.
+
+    Raises:
+    ValueError: If the value is not in one of those forms
+    """
+    value = value.strip().lower()
+    if value.isdigit():
+        jobs = int(value)
+        if jobs < 1:
+            raise ValueError(f"Number of jobs must be at least 1, got {jobs}")
+        return jobs
+
+    match = _AUTO_JOBS_PATTERN.match(value)
+    if not match:
+        raise ValueError(
+            f"Invalid jobs value '{value}'. "
+            f"Expected a number, 'auto', 'auto:MAX' or 'auto:MIN-MAX'"
+        )
+    min_text, max_text = match.groups()
+    min_jobs = int(min_text) if min_text else 1
+    max_jobs = int(max_text) if max_text else None
+    if min_jobs < 1 or (max_jobs is not None and max_jobs < min_jobs):
+        raise ValueError(
+            f"Invalid jobs range in '{value}': need 1 <= MIN <= MAX"
+        )
+    return AutoJobs(min_jobs, max_jobs)
+
+
+@dataclass(frozen=True)
+class PressureSample:
+    """
+    One reading of system load.
+
+    Attributes:
+    cpu_some: Percentage of the last 10s in which some runnable task waited
+        for a CPU (PSI ``some avg10``), or None if unavailable
+    memory_some: Percentage of the last 10s in which some task stalled on
+        memory reclaim (PSI ``some avg10``), or None if unavailable
+    mem_available: MemAvailable in bytes, or None if unavailable
+    mem_total: MemTotal in bytes, or None if unavailable
+    """
+
+    cpu_some: float | None = None
+    memory_some: float | None = None
+    mem_available: int | None = None
+    mem_total: int | None = None
+
+    @property
+    def mem_available_fraction(self) -> float | None:
+        """Fraction of memory still available, or None if unknown."""
+        if self.mem_available is None or not self.mem_total:
+            return None
+        return self.mem_available / self.mem_total
+
+    def describe(self) -> str:
+        """Compact form for trace logging."""
+        parts = []
+        if self.cpu_some is not None:
+            parts.append(f"cpu some={self.cpu_some:.1f}%")
+        if self.memory_some is not None:
+            parts.append(f"memory some={self.memory_some:.1f}%")
+        if self.mem_available_fraction is not None:
+            parts.append(f"mem available={self.mem_available_fraction:.0%}")
+        return ", ".join(parts) or "no data"
+
+
+class PressureSource(ABC):
+    """
+    Source of system pressure readings for adaptive concurrency.
+    """
+
+    @abstractmethod
+    def sample(self) -> PressureSample:
+        """Take a reading; fields that cannot be read are None."""
+        ...
+
+
+class ProcPressureSource(PressureSource):
+    """
+    Reads Linux PSI (/proc/pressure/{cpu,memory}) and /proc/meminfo.
+
+    On kernels without PSI, or on other platforms, the corresponding fields
+    are simply None.
+    """
+
+    _PSI_SOME_PATTERN = re.compile(r"^some\s.*?\bavg10=([0-9.]+)", re.MULTILINE)
+    _MEMINFO_PATTERN = re.compile(r"^(MemTotal|MemAvailable):\s+(\d+)\s*kB", re.MULTILINE)
+
+    def __init__(self, proc_root: Path = Path("/proc")):
+        """
+        Args:
+            proc_root: Mount point of procfs (overridable for tests)
+        """
+        self._proc_root = proc_root
+
+    def sample(self) -> PressureSample:
+        """Read the current PSI averages and memory figures."""
+        meminfo = self._read_meminfo()
+        return PressureSample(
+            cpu_some=self._read_psi("cpu"),
+            memory_some=self._read_psi("memory"),
+            mem_available=meminfo.get("MemAvailable"),
+            mem_total=meminfo.get("MemTotal"),
+        )
+
+    def _read_psi(self, resource: str) -> float | None:
+        try:
+            text = (self._proc_root / "pressure" / resource).read_text()
+        except OSError:
+            return None
+        match = self._PSI_SOME_PATTERN.search(text)
+        return float(match.group(1)) if match else None
+
+    def _read_meminfo(self) -> dict[str, int]:
+        try:
+            text = (self._proc_root / "meminfo").read_text()
+        except OSError:
+            return {}
+        return {
+            key: int(kib) * 1024 for key, kib in self._MEMINFO_PATTERN.findall(text)
+        }
+
+
+class AdaptiveConcurrency:
+    """
+    Adjusts the job limit from system pressure, one slot at a time.
+
+    Every ``interval`` seconds the source is sampled. A slot is shed when CPU
+    or memory pressure is high or available memory is low; a slot is added
+    when pressure is low and every current slot is in use. The limit always
+    stays within [min_jobs, max_jobs]. Because PSI reports 10-second averages,
+    stepping by one slot per sample avoids overshooting.
+    """
+
+    # PSI 'some avg10' percentages
+    CPU_HIGH = 40.0
+    CPU_LOW = 10.0
+    MEMORY_HIGH = 10.0
+    MEMORY_LOW = 1.0
+    # Fraction of MemAvailable/MemTotal below which no slot is added, and
+    # half of which sheds a slot
+    MEM_AVAILABLE_LOW = 0.10
+
+    def __init__(
+        self,
+        min_jobs: int,
+        max_jobs: int,
+        source: PressureSource,
+        logger: Logger,
+        interval: float = 2.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            min_jobs: Lower bound on the limit
+            max_jobs: Upper bound on the limit
+            source: Where pressure readings come from
+            logger: Logger for slot changes (trace level)
+            interval: Minimum seconds between samples
+            clock: Monotonic clock (overridable for tests)
+        """
+        self.min_jobs = min_jobs
+        self.max_jobs = max_jobs
+        self.interval = interval
+        self._source = source
+        self._logger = logger
+        self._clock = clock
+        # Start where a fixed -j would: one slot per CPU, within the range
+        self.limit = min(max_jobs, max(min_jobs, host_cpu_count()))
+        self._last_sample: float | None = None
+
+    def update(self, running: int) -> int:
+        """
+        Re-evaluate the limit if a sample is due.
+
+        Args:
+            running: Number of invocations currently running
+
+        Returns:
+            The (possibly adjusted) job limit
+        """
+        now = self._clock()
+        if self._last_sample is not None and now - self._last_sample < self.interval:
+            return self.limit
+        self._last_sample = now
+
+        sample = self._source.sample()
+        new_limit = self.limit
+        if self._overloaded(sample):
+            new_limit = max(self.min_jobs, self.limit - 1)
+        elif running >= self.limit and self._idle(sample):
+            new_limit = min(self.max_jobs, self.limit + 1)
+
+        if new_limit != self.limit:
+            self._logger.trace(
+                f"Adaptive jobs: {self.limit} -> {new_limit} slots "
+                f"({sample.describe()}; {running} running)"
+            )
+            self.limit = new_limit
+        return self.limit
+
+    def _overloaded(self, sample: PressureSample) -> bool:
+        available = sample.mem_available_fraction
+        return (
+            (sample.cpu_some is not None and sample.cpu_some > self.CPU_HIGH)
+            or (sample.memory_some is not None and sample.memory_some > self.MEMORY_HIGH)
+            or (available is not None and available < self.MEM_AVAILABLE_LOW / 2)
+        )
+
+    def _idle(self, sample: PressureSample) -> bool:
+        # Without any signal there is no evidence the host has headroom
+        if sample.cpu_some is None and sample.memory_some is None:
+            return False
+        available = sample.mem_available_fraction
+        return (
+            (sample.cpu_some is None or sample.cpu_some < self.CPU_LOW)
+            and (sample.memory_some is None or sample.memory_some < self.MEMORY_LOW)
+            and (available is None or available >= self.MEM_AVAILABLE_LOW)
+        )
+
+
+class ResourceBudget:
+    """
+    Tracks the free CPU, memory and pool capacity available to running tasks.
+
+    A budget is only touched by the scheduler loop, so it needs no locking.
+    """
+
+    def __init__(self, cpu: float, mem: int | None, pools: dict[str, int]):
+        """
+        Args:
+            cpu: Total CPUs available to tasks
+            mem: Total memory in bytes, or None if unknown (memory is not limited)
+            pools: Capacity of each named pool
+        """
+        self._cpu_capacity = cpu
+        self._mem_capacity = mem
+        self._pool_capacity = dict(pools)
+        self._cpu_used = 0.0
+        self._mem_used = 0
+        self._pool_used = {name: 0 for name in pools}
+
+    @classmethod
+    def for_host(cls, pools: dict[str, int]) -> ResourceBudget:
+        """Budget covering this machine's CPUs and memory plus the recipe's pools."""
+        return cls(host_cpu_count(), host_memory_bytes(), pools)
+
+    def fit(self, request: ResourceRequest) -> ResourceRequest:
+        """
+        Clamp a request to the total capacity.
+
+        A task asking for more CPU or memory than the machine has would never
+        be admitted; clamping lets it run, alone, instead of deadlocking.
+        """
+        cpu = min(request.cpu, self._cpu_capacity)
+        mem = request.mem
+        if self._mem_capacity is not None:
+            mem = min(mem, self._mem_capacity)
+        if cpu == request.cpu and mem == request.mem:
+            return request
+        return ResourceRequest(cpu=cpu, mem=mem, pools=request.pools)
+
+    def can_admit(self, request: ResourceRequest) -> bool:
+        """True if the request fits in the currently free capacity."""
+        if self._cpu_used + request.cpu > self._cpu_capacity + _CPU_EPSILON:
+            return False
+        if (
+            self._mem_capacity is not None
+            and self._mem_used + request.mem > self._mem_capacity
+        ):
+            return False
+        return all(
+            self._pool_used[pool] < self._pool_capacity[pool] for pool in request.pools
+        )
+
+    def acquire(self, request: ResourceRequest) -> None:
+        """Reserve the request's resources (the caller checks can_admit first)."""
+        self._cpu_used += request.cpu
+        self._mem_used += request.mem
+        for pool in request.pools:
+            self._pool_used[pool] += 1
+
+    def release(self, request: ResourceRequest) -> None:
+        """Return the request's resources to the budget."""
+        self._cpu_used -= request.cpu
+        self._mem_used -= request.mem
+        for pool in request.pools:
+            self._pool_used[pool] -= 1
+
+
+class TaskFailures(Exception):
+    """
+    Raised at the end of a keep-going run in which some invocations failed.
+
+    Attributes:
+    failures: (node index, exception) for each failed invocation, in the
+        order they failed
+    skipped: Indices of invocations never started because a dependency
+        (directly or transitively) failed
+    """
+
+    def __init__(self, failures: list[tuple[int, BaseException]], skipped: list[int]):
+        super().__init__(f"{len(failures)} task invocation(s) failed")
+        self.failures = failures
+        self.skipped = skipped
+
+
+@dataclass
+class SchedulerNode:
+    """
+    One task invocation in the graph handed to the scheduler.
+
+    Attributes:
+    label: Display name used in log messages
+    request: Resources the invocation holds while it runs
+    deps: Indices of the nodes this one depends on
+    """
+
+    label: str
+    request: ResourceRequest = field(default_factory=ResourceRequest)
+    deps: set[int] = field(default_factory=set)
+
+
+class TaskScheduler:
+    """
+    Runs a dependency graph of task invocations with bounded concurrency.
+
+    Ready invocations are considered in graph order (the topological execution
+    order), and a later invocation may start ahead of an earlier one that is
+    waiting for resources. With a single job the graph runs strictly in order
+    on the calling thread, exactly like a plain loop over the execution order.
+
+    On the first failure no further invocations are started; those already
+    running are allowed to finish, then the failure is re-raised. ``on_abort``
+    (if given) is called at that point, and if the run is interrupted, so the
+    caller can stop running invocations early instead.
+
+    In keep-going mode a failure only stops the failed invocation's transitive
+    dependents; everything else still runs, and :class:`TaskFailures` is
+    raised at the end.
+
+    Given :class:`AutoJobs`, the limit is driven by :class:`AdaptiveConcurrency`
+    and re-evaluated while invocations run.
+
+    Given jobserver tokens, the first running invocation uses this process's
+    implicit slot and every further one must also hold a token, so tasks share
+    the slot pool with any make, cargo or nested tt processes.
+    """
+
+    def __init__(
+        self,
+        jobs: int | AutoJobs,
+        budget: ResourceBudget,
+        logger: Logger,
+        pressure_source: PressureSource | None = None,
+        clock: Callable[[], float] = time.monotonic,
+        tokens: JobTokens | None = None,
+        keep_going: bool = False,
+        on_abort: Callable[[], None] | None = None,
+    ):
+        """
+        Args:
+            jobs: Maximum number of invocations running at once, or AutoJobs
+            budget: Resource budget that admission is checked against
+            logger: Logger for scheduling diagnostics
+            pressure_source: Pressure readings for AutoJobs (default: /proc)
+            clock: Monotonic clock for AutoJobs sampling
+            tokens: Jobserver to take a token from for each extra invocation
+            keep_going: Run everything not downstream of a failure
+            on_abort: Called once when the run is abandoned (first failure
+                outside keep-going mode, or an interrupt)
+        """
+        self._tokens = tokens
+        self._keep_going = keep_going
+        self._on_abort = on_abort
+        self._adaptive: AdaptiveConcurrency | None = None
+        if isinstance(jobs, AutoJobs):
+            self._adaptive = AdaptiveConcurrency(
+                jobs.min_jobs,
+                jobs.resolved_max(),
+                pressure_source or ProcPressureSource(),
+                logger,
+                clock=clock,
+            )
+            jobs = self._adaptive.max_jobs
+        if jobs < 1:
+            raise ValueError(f"Number of jobs must be at least 1, got {jobs}")
+        self._jobs = jobs
+        self._budget = budget
+        self._logger = logger
+
+    def _limit(self, running: int) -> int:
+        """Current job limit (fixed, or adaptive)."""
+        if self._adaptive is None:
+            return self._jobs
+        return self._adaptive.update(running)
+
+    def run(self, nodes: list[SchedulerNode], work: Callable[[int], None]) -> None:
+        """
+        Run every node once all of its dependencies have completed.
+
+        Args:
+            nodes: Graph nodes; a node's index in this list is its identity
+            work: Callable that runs the node with the given index
+
+        Raises:
+            Exception: The first exception raised by ``work``
+        """
+        requests = [self._budget.fit(node.request) for node in nodes]
+        waiting_on = {idx: set(node.deps) for idx, node in enumerate(nodes)}
+        dependents: dict[int, list[int]] = {idx: [] for idx in range(len(nodes))}
+        for idx, node in enumerate(nodes):
+            for dep in node.deps:
+                dependents[dep].append(idx)
+
+        ready = sorted(idx for idx, deps in waiting_on.items() if not deps)
+        running: dict[Future, int] = {}
+        started: set[int] = set()
+        failures: list[tuple[int, BaseException]] = []
+
+        with ThreadPoolExecutor(
+            max_workers=self._jobs, thread_name_prefix="tt-task"
+        ) as pool:
+            try:
+                while ready or running:
+                    awaiting_token = False
+                    if self._keep_going or not failures:
+                        awaiting_token = self._admit(
+                            nodes, requests, ready, running, started, pool, work
+                        )
+
+                    if not running:
+                        break
+
+                    done, _ = wait(
+                        running,
+                        timeout=self._wait_timeout(awaiting_token),
+                        return_when=FIRST_COMPLETED,
+                    )
+                    for future in done:
+                        idx = running.pop(future)
+                        self._budget.release(requests[idx])
+                        self._release_surplus_tokens(len(running))
+                        error = future.exception()
+                        if error is not None:
+                            failures.append((idx, error))
+                            if len(failures) == 1 and not self._keep_going:
+                                self._abort()
+                            continue
+                        for dependent in dependents[idx]:
+                            waiting_on[dependent].discard(idx)
+                            if not waiting_on[dependent]:
+                                ready.append(dependent)
+                        ready.sort()
+            except BaseException:
+                # Interrupted (e.g. Ctrl-C): stop running work rather than
+                # waiting for it in the pool's shutdown
+                self._abort()
+                raise
+
+        if not failures:
+            return
+        if not self._keep_going:
+            raise failures[0][1]
+        skipped = [idx for idx in range(len(nodes)) if idx not in started]
+        for idx in skipped:
+            self._logger.debug(
+                f"Skipped task '{nodes[idx].label}' because a dependency failed"
+            )
+        raise TaskFailures(failures, skipped)
+
+    def _admit(
+        self,
+        nodes: list[SchedulerNode],
+        requests: list[ResourceRequest],
+        ready: list[int],
+        running: dict[Future, int],
+        started: set[int],
+        pool: ThreadPoolExecutor,
+        work: Callable[[int], None],
+    ) -> bool:
+        """
+        Start as many ready nodes as the job limit, budget and jobserver allow.
+
+        Returns:
+            True if admission stopped because no jobserver token was free
+        """
+        limit = self._limit(len(running))
+        for idx in list(ready):
+            if len(running) >= limit:
+                break
+            if not self._budget.can_admit(requests[idx]):
+                self._logger.trace(
+                    f"Task '{nodes[idx].label}' waiting for resources "
+                    f"({describe_resources(requests[idx])})"
+                )
+                continue
+            if running and not self._acquire_token():
+                self._logger.trace(
+                    f"Task '{nodes[idx].label}' waiting for a jobserver token"
+                )
+                return True
+            ready.remove(idx)
+            self._budget.acquire(requests[idx])
+            if not requests[idx].is_empty:
+                self._logger.debug(
+                    f"Admitting task '{nodes[idx].label}' "
+                    f"({describe_resources(requests[idx])})"
+                )
+            started.add(idx)
+            running[self._submit(pool, work, idx)] = idx
+        return False
+
+    def _abort(self) -> None:
+        """Give the caller a chance to stop in-flight work (at most once)."""
+        on_abort, self._on_abort = self._on_abort, None
+        if on_abort is not None:
+            on_abort()
+
+    def _wait_timeout(self, awaiting_token: bool) -> float | None:
+        """
+        How long to wait for a running invocation before re-checking admission:
+        periodically in adaptive mode (to re-sample pressure) and while waiting
+        for a jobserver token, otherwise until something finishes.
+        """
+        timeouts = []
+        if self._adaptive is not None:
+            timeouts.append(self._adaptive.interval)
+        if awaiting_token:
+            timeouts.append(_TOKEN_POLL_INTERVAL)
+        return min(timeouts, default=None)
+
+    def _acquire_token(self) -> bool:
+        """Take a jobserver token for an extra invocation (always granted without a jobserver)."""
+        return self._tokens is None or self._tokens.try_acquire()
+
+    def _release_surplus_tokens(self, running: int) -> None:
+        """Return tokens beyond one per running invocation past the implicit slot."""
+        if self._tokens is None:
+            return
+        while self._tokens.held > max(0, running - 1):
+            self._tokens.release()
+
+    def _submit(
+        self, pool: ThreadPoolExecutor, work: Callable[[int], None], idx: int
+    ) -> Future:
+        """
+        Start a node, inline when only one job is allowed so that serial runs
+        never leave the calling thread.
+        """
+        if self._jobs > 1:
+            return pool.submit(work, idx)
+        future: Future = Future()
+        try:
+            work(idx)
+        except Exception as e:
+            future.set_exception(e)
+        else:
+            future.set_result(None)
+        return future
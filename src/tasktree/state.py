@@ -4,11 +4,15 @@ from __future__ import annotations
 
 import hashlib
 import json
+import os
+import stat
+import tempfile
 from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Any, Optional, Set
 
 from tasktree.logging import Logger
+from tasktree.resource_usage import ResourceUsage
 
 
 @dataclass
@@ -20,16 +24,21 @@ class TaskState:
     last_run: float
     input_state: dict[str, float | str] = field(default_factory=dict)
     output_state: dict[str, float] = field(default_factory=dict)
+    # Resources the last run used, if known
+    usage: ResourceUsage | None = None
 
     def to_dict(self) -> dict[str, Any]:
         """
         Convert to dictionary for JSON serialization.
         """
-        return {
+        data: dict[str, Any] = {
             "last_run": self.last_run,
             "input_state": self.input_state,
             "output_state": self.output_state,
         }
+        if self.usage is not None:
+            data["usage"] = self.usage.to_dict()
+        return data
 
     @classmethod
     def from_dict(cls, data: dict[str, Any]) -> "TaskState":
@@ -40,6 +49,7 @@ class TaskState:
             last_run=data["last_run"],
             input_state=data.get("input_state", {}),
             output_state=data.get("output_state", {}),
+            usage=ResourceUsage.from_dict(data["usage"]) if "usage" in data else None,
         )
 
 
@@ -102,8 +112,33 @@ class StateManager:
         if self.logger:
             self.logger.trace(f"Saving state to '{self.state_path}' ({len(self._state)} task state(s))")
         data = {key: value.to_dict() for key, value in self._state.items()}
-        with open(self.state_path, "w") as f:
-            json.dump(data, f, indent=2)
+        # Write a sibling temp file and rename it into place, so a concurrent
+        # reader (another task, or a nested tt call) never sees a partial file
+        fd, tmp_path = tempfile.mkstemp(
+            dir=self.state_path.parent, prefix=f"{self.STATE_FILE}.", suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(data, f, indent=2)
+            # mkstemp creates the file owner-only; keep the mode the state file
+            # has (or would get from open()), as others may read it
+            os.chmod(tmp_path, self._file_mode())
+            os.replace(tmp_path, self.state_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def _file_mode(self) -> int:
+        """
+        Permission bits for the state file: the existing file's, or those
+        open() would create it with under the current umask.
+        """
+        try:
+            return stat.S_IMODE(self.state_path.stat().st_mode)
+        except FileNotFoundError:
+            umask = os.umask(0)
+            os.umask(umask)
+            return 0o666 & ~umask
 
     def get(self, cache_key: str) -> TaskState | None:
         """
@@ -5,13 +5,22 @@ This module provides the TempScript context manager for creating, managing,
 and cleaning up temporary shell script files. It ensures consistent behavior
 between containerized and non-containerized execution paths.
 
+On Linux, scripts for interpreters that will run a file from any path are
+kept in memory (``memfd_create``) and passed to the interpreter as
+``/proc/self/fd/N``, so running a task touches no filesystem at all. Other
+scripts are written to a per-run directory, on a tmpfs where there is one.
+
 """
 
+import atexit
 import os
 import platform
+import re
+import shutil
 import tempfile
 import types
 from pathlib import Path
+from threading import Lock
 
 from tasktree.interpreter import Interpreter
 from tasktree.logging import Logger
@@ -19,6 +28,100 @@ from tasktree.logging import Logger
 # Module-level constant for platform detection to avoid repeated system calls
 _IS_WINDOWS = platform.system() == "Windows"
 
+# Interpreters that run a script from any path, whatever its name or extension
+_PATH_AGNOSTIC_INTERPRETERS = re.compile(r"(ba|da|k|mk|z)?sh|python[0-9.]*|perl|ruby")
+
+# Tmpfs directories to put the per-run script directory in, in order of preference
+_TMPFS_CANDIDATES = ("XDG_RUNTIME_DIR", "/dev/shm")
+
+_script_dir: Path | None = None
+_script_dir_lock = Lock()
+
+
+def script_dir() -> Path:
+    """
+    The directory for this run's script files.
+
+    Created on first use and removed when tt exits. It is on a tmpfs
+    ($XDG_RUNTIME_DIR or /dev/shm) where one is available, otherwise in the
+    usual temporary directory.
+
+    Returns:
+        Path to the directory
+    """
+    global _script_dir
+    with _script_dir_lock:
+        if _script_dir is None:
+            _script_dir = Path(tempfile.mkdtemp(prefix="tt-scripts-", dir=_tmpfs_dir()))
+            atexit.register(shutil.rmtree, _script_dir, ignore_errors=True)
+        return _script_dir
+
+
+def _tmpfs_dir() -> str | None:
+    """A writable tmpfs directory, or None to use tempfile's default."""
+    for candidate in _TMPFS_CANDIDATES:
+        path = os.environ.get(candidate, "") if candidate.isupper() else candidate
+        if path and os.path.isdir(path) and os.access(path, os.W_OK | os.X_OK):
+            return path
+    return None
+
+
+def script_content(cmd: str, preamble: str = "") -> str:
+    """
+    The whole script for a command: the preamble (if any), then the command.
+
+    Args:
+        cmd: Command string to execute (can be multi-line)
+        preamble: Optional preamble to prepend to command
+
+    Returns:
+        The script text
+    """
+    if not preamble:
+        return cmd
+    separator = "" if preamble.endswith("\n") else "\n"
+    return preamble + separator + cmd
+
+
+def memory_script(content: str, interpreter: Interpreter | None) -> int | None:
+    """
+    Put a script in an anonymous in-memory file, if its interpreter can run it
+    from there.
+
+    The returned descriptor must be passed to the interpreter's process
+    (``pass_fds``), which reads the script from memory_script_path(fd).
+
+    Args:
+        content: The whole script
+        interpreter: Interpreter that will run it
+
+    Returns:
+        The file descriptor, or None if the script needs a real file (no
+        memfd_create on this platform, or an interpreter that might care
+        about the script's name)
+    """
+    if (
+        interpreter is None
+        or not hasattr(os, "memfd_create")
+        or not os.path.isdir("/proc/self/fd")
+        or not _PATH_AGNOSTIC_INTERPRETERS.fullmatch(
+            Path(interpreter.invocation[0]).name
+        )
+    ):
+        return None
+    try:
+        fd = os.memfd_create("tt-script")
+    except OSError:
+        return None
+    with open(fd, "w", encoding="utf-8", closefd=False) as script_file:
+        script_file.write(content)
+    return fd
+
+
+def memory_script_path(fd: int) -> Path:
+    """The path an interpreter passed ``fd`` reads a memory_script from."""
+    return Path(f"/proc/self/fd/{fd}")
+
 
 class TempScript:
     """
@@ -34,6 +137,10 @@ class TempScript:
     is always passed explicitly when invoking the script, so no shebang is
     written and no executable bit is set.
 
+    With ``in_memory``, the script is kept in memory where its interpreter
+    allows (see memory_script); the process running it must then be given
+    ``pass_fds``. The script cannot be bind-mounted into a container then.
+
     Usage:
         with TempScript(logger=my_logger, cmd="echo hello", preamble="set -e", interpreter=Interpreter(cmd="bash")) as script_path:
             # script_path is a Path object pointing to the temp script
@@ -49,6 +156,7 @@ class TempScript:
         preamble: str = "",
         script_extension: str | None = None,
         interpreter: Interpreter | None = None,
+        in_memory: bool = False,
     ):
         """
         Initialize temp script manager.
@@ -61,6 +169,7 @@ class TempScript:
                             If None, derived from ``interpreter`` when provided, otherwise the platform.
             interpreter: Optional Interpreter describing how the script is run.
                         When provided, supplies the default script extension.
+            in_memory: Keep the script in memory if the interpreter allows it.
 
         """
         self.cmd = cmd
@@ -69,6 +178,9 @@ class TempScript:
         self.script_path: Path | None = None
         self.script_extension = script_extension
         self.interpreter = interpreter
+        self.in_memory = in_memory
+        # Descriptors the process running the script must inherit
+        self.pass_fds: tuple[int, ...] = ()
 
     def __enter__(self) -> Path:
         """
@@ -90,27 +202,27 @@ class TempScript:
         else:
             script_ext = ".bat" if _IS_WINDOWS else ".sh"
 
+        content = script_content(self.cmd, self.preamble)
+
+        if self.in_memory:
+            fd = memory_script(content, self.interpreter)
+            if fd is not None:
+                self.pass_fds = (fd,)
+                self.logger.debug(f"Created in-memory script: {memory_script_path(fd)}")
+                return memory_script_path(fd)
+
         self.logger.debug(f"Creating temp script with extension {script_ext}")
 
         # Create temporary script file with explicit UTF-8 encoding
         with tempfile.NamedTemporaryFile(
             mode="w",
             suffix=script_ext,
+            dir=script_dir(),
             delete=False,
             encoding="utf-8",
         ) as script_file:
             script_path_str = script_file.name
-
-            # Add preamble if provided
-            if self.preamble:
-                script_file.write(self.preamble)
-                if not self.preamble.endswith("\n"):
-                    script_file.write("\n")
-                self.logger.debug("Added preamble to script")
-
-            # Write command to file
-            script_file.write(self.cmd)
-            script_file.flush()
+            script_file.write(content)
 
         # Store path for cleanup
         self.script_path = Path(script_path_str)
@@ -128,11 +240,12 @@ class TempScript:
         """
         Clean up temp script file.
 
-        Deletes the temporary script file. OSError exceptions during cleanup
-        are caught and logged (if logger available) but not raised. This ensures
-        cleanup failures don't interfere with exception propagation from the
-        context manager body. File leaks are acceptable in edge cases where
-        cleanup fails, as the OS will eventually clean up temp files.
+        Deletes the temporary script file (or closes the in-memory one).
+        OSError exceptions during cleanup are caught and logged (if logger
+        available) but not raised. This ensures cleanup failures don't
+        interfere with exception propagation from the context manager body.
+        File leaks are acceptable in edge cases where cleanup fails, as the
+        per-run script directory is removed when tt exits.
 
         Args:
             exc_type: Exception type (if an exception occurred)
@@ -140,6 +253,9 @@ class TempScript:
             exc_tb: Exception traceback (if an exception occurred)
 
         """
+        for fd in self.pass_fds:
+            os.close(fd)
+        self.pass_fds = ()
         if self.script_path:
             try:
                 os.unlink(self.script_path)
@@ -0,0 +1,254 @@
+"""Loading recipe YAML: with libyaml when available, and with task bodies deferred.
+
+PyYAML's C loader (CSafeLoader, built on libyaml) is several times faster
+than its pure-Python SafeLoader.  Both build the same values and raise the
+same MarkedYAMLError, with the line and column of the problem, so the C one
+is used whenever PyYAML was built with libyaml.
+
+An imported file often contributes only a few of its tasks to a run.  For
+such files, load_recipe_text(..., defer_tasks=True) makes one pass over the
+parser's events, which costs a fraction of loading the file, and builds no
+values for the `tasks` section: it notes where each task's body lies in the
+text, and DeferredTasks.load() builds a body when it is asked for.  Resolving
+each scalar's type and constructing the dicts and lists is most of the cost
+of loading, even with libyaml.
+"""
+
+from __future__ import annotations
+
+import io
+from collections.abc import Iterator
+from typing import IO, Any
+
+import yaml
+
+SafeLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+_STR_TAG = "tag:yaml.org,2002:str"
+
+
+def load_yaml(stream: str | IO[str]) -> Any:
+    """
+    Load one YAML document with safe types, using libyaml when it is available.
+
+    Args:
+    stream: YAML text, or a file opened for reading (its name appears in
+    error messages)
+
+    Returns:
+    The document's value (None for an empty document)
+
+    Raises:
+    yaml.YAMLError: If the YAML is invalid
+    """
+    return yaml.load(stream, Loader=SafeLoader)
+
+
+class _Unsupported(Exception):
+    """
+    The document uses YAML that a body cannot be loaded apart from: anchors
+    and aliases, explicit tags, or more than one document.
+    """
+
+
+def _load_span(text: str, name: str, start: yaml.Mark, end: yaml.Mark) -> Any:
+    """
+    Load the value between two marks of a document, on its own.
+
+    The text before the value on its first line is replaced by spaces, so that
+    the block's indentation is unchanged.  Errors report the marks' position in
+    the whole document.
+    """
+    try:
+        return load_yaml(" " * start.column + text[start.index : end.index])
+    except yaml.MarkedYAMLError as e:
+        line_start = start.index - start.column
+        for attr in ("context_mark", "problem_mark"):
+            mark = getattr(e, attr)
+            if mark is not None:
+                setattr(
+                    e,
+                    attr,
+                    yaml.Mark(
+                        name,
+                        line_start + mark.index,
+                        start.line + mark.line,
+                        mark.column,
+                        None,
+                        None,
+                    ),
+                )
+        raise
+
+
+class DeferredTasks:
+    """
+    The `tasks` section of a file loaded with defer_tasks: the task names, in
+    file order, with each body loaded only when asked for.
+    """
+
+    def __init__(
+        self, text: str, name: str, spans: dict[str, tuple[yaml.Mark, yaml.Mark]]
+    ):
+        self._text = text
+        self._name = name
+        self._spans = spans
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._spans)
+
+    def __len__(self) -> int:
+        return len(self._spans)
+
+    def __contains__(self, task_name: object) -> bool:
+        return task_name in self._spans
+
+    def load(self, task_name: str) -> Any:
+        """
+        Load a task's body, as loading the whole file would have.
+
+        Raises:
+        KeyError: If the section has no such task
+        yaml.YAMLError: If the body cannot be constructed
+        """
+        start, end = self._spans[task_name]
+        return _load_span(self._text, self._name, start, end)
+
+
+def _check_untagged(event: yaml.Event) -> None:
+    """
+    Raises:
+    _Unsupported: If a node has an anchor or an explicit tag
+    """
+    if event.anchor is not None or event.tag is not None:
+        raise _Unsupported()
+
+
+class _EventReader:
+    """
+    Reads a document's parse events, skipping over whole nodes.
+    """
+
+    def __init__(self, text: str):
+        self._loader = SafeLoader(text)
+
+    def close(self) -> None:
+        self._loader.dispose()
+
+    def next(self) -> yaml.Event:
+        return self._loader.get_event()
+
+    def key(self, event: yaml.Event) -> str | None:
+        """
+        A mapping key's string, or None if the event ends the mapping.
+
+        Raises:
+        _Unsupported: If the key is not a plain string (a complex key, or a
+        plain scalar another type resolves to, such as 1 or true)
+        """
+        if event.__class__ is yaml.MappingEndEvent:
+            return None
+        _check_untagged(event)
+        if event.__class__ is not yaml.ScalarEvent:
+            raise _Unsupported()
+        if event.implicit[0] and (
+            self._loader.resolve(yaml.ScalarNode, event.value, event.implicit)
+            != _STR_TAG
+        ):
+            raise _Unsupported()
+        return event.value
+
+    def skip(self, event: yaml.Event) -> yaml.Event:
+        """
+        Skip the node an event starts.
+
+        Returns:
+        The node's last event
+        """
+        depth = 0
+        while True:
+            cls = event.__class__
+            if cls is yaml.ScalarEvent:
+                _check_untagged(event)
+            elif cls is yaml.MappingStartEvent or cls is yaml.SequenceStartEvent:
+                _check_untagged(event)
+                depth += 1
+            elif cls is yaml.MappingEndEvent or cls is yaml.SequenceEndEvent:
+                depth -= 1
+            else:
+                # An alias
+                raise _Unsupported()
+            if depth == 0:
+                return event
+            event = self._loader.get_event()
+
+
+def _load_deferred(text: str, name: str) -> Any:
+    """
+    Load a document, deferring its `tasks` section's bodies (see module docstring).
+
+    Raises:
+    _Unsupported: If the document must be loaded as a whole
+    yaml.YAMLError: If the YAML is invalid
+    """
+    reader = _EventReader(text)
+    try:
+        reader.next()  # Stream start
+        event = reader.next()
+        if event.__class__ is yaml.StreamEndEvent:
+            return None
+        event = reader.next()  # The document's root node
+        if event.__class__ is not yaml.MappingStartEvent:
+            raise _Unsupported()
+        _check_untagged(event)
+
+        data: dict[str, Any] = {}
+        while (key := reader.key(reader.next())) is not None:
+            value = reader.next()
+            if key == "tasks" and value.__class__ is yaml.MappingStartEvent:
+                _check_untagged(value)
+                spans = {}
+                while (task_name := reader.key(reader.next())) is not None:
+                    body = reader.next()
+                    spans[task_name] = (body.start_mark, reader.skip(body).end_mark)
+                data[key] = DeferredTasks(text, name, spans)
+            else:
+                last = reader.skip(value)
+                data[key] = _load_span(text, name, value.start_mark, last.end_mark)
+
+        reader.next()  # Document end
+        if reader.next().__class__ is not yaml.StreamEndEvent:
+            raise _Unsupported()
+        return data
+    finally:
+        reader.close()
+
+
+def load_recipe_text(text: str, name: str, defer_tasks: bool = False) -> Any:
+    """
+    Load a recipe file's YAML.
+
+    Args:
+    text: The file's content
+    name: The file's path, for error messages
+    defer_tasks: Load the `tasks` section as DeferredTasks, whose bodies are
+    built on request. Documents using anchors, aliases or explicit tags are
+    loaded whole all the same.
+
+    Returns:
+    The document's value (None for an empty document)
+
+    Raises:
+    yaml.YAMLError: If the YAML is invalid
+    """
+    if defer_tasks:
+        try:
+            return _load_deferred(text, name)
+        except (_Unsupported, yaml.YAMLError):
+            # Invalid YAML is reported by the full load below, which names
+            # the file in the error
+            pass
+
+    stream = io.StringIO(text)
+    stream.name = name
+    return load_yaml(stream)
@@ -0,0 +1,65 @@
+"""Helpers for tests that stand in for subprocess.run."""
+
+import os
+import subprocess
+from typing import Any
+from unittest.mock import patch
+
+from tasktree.process_runner import ProcessRunner
+
+
+class _CompletedPopen:
+    """
+    A Popen whose command has already been run with subprocess.run.
+    """
+
+    # No such process: never moved into a task cgroup, never signalled
+    pid = -1
+    stdin = stdout = stderr = None
+
+    def __init__(self, args: Any, **kwargs: Any):
+        self.args = args
+        result = subprocess.run(args, **kwargs)
+        returncode = getattr(result, "returncode", 0)
+        self.returncode = returncode if isinstance(returncode, int) else 0
+        # Pipes the runner reads hold whatever output the result has
+        for stream in ("stdout", "stderr"):
+            if kwargs.get(stream) == subprocess.PIPE:
+                read_fd, write_fd = os.pipe()
+                data = getattr(result, stream, None)
+                if isinstance(data, bytes):
+                    os.write(write_fd, data)
+                os.close(write_fd)
+                setattr(self, stream, open(read_fd, "rb", buffering=0))
+
+    def __enter__(self) -> "_CompletedPopen":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        pass
+
+    def poll(self) -> int:
+        return self.returncode
+
+    def wait(self, timeout: float | None = None) -> int:
+        return self.returncode
+
+    def kill(self) -> None:
+        pass
+
+
+def popen_through_run():
+    """
+    Patch process runners to run the processes they would start with Popen
+    through subprocess.run instead, so that a test's patched subprocess.run
+    sees every command, as it did when runners delegated to it.
+
+    Returns:
+        The patcher, for use as a context manager or with start()/stop()
+    """
+
+    def popen(self: ProcessRunner, *args: Any, **kwargs: Any) -> _CompletedPopen:
+        kwargs.pop("popen", None)
+        return _CompletedPopen(*args, **kwargs)
+
+    return patch.object(ProcessRunner, "_popen", popen)
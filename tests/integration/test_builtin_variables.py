@@ -12,6 +12,7 @@ from tasktree.process_runner import TaskOutputTypes, make_process_runner, Proces
 from tasktree.state import StateManager
 
 from helpers.logging import logger_stub
+from helpers.processes import popen_through_run
 from fixture_utils import copy_fixture_files
 
 
@@ -360,7 +361,9 @@ class TestBuiltinVariables(unittest.TestCase):
                 result.returncode = 0
                 return result
 
-            with patch("tasktree.docker.subprocess.run", side_effect=mock_run):
+            with popen_through_run(), patch(
+                "tasktree.docker.subprocess.run", side_effect=mock_run
+            ):
                 # Execute task
                 executor.execute_task("docker-test", TaskOutputTypes.ALL)
 
@@ -449,7 +452,9 @@ class TestBuiltinVariables(unittest.TestCase):
             result.returncode = 0
             return result
 
-        with patch("tasktree.docker.subprocess.run", side_effect=mock_run):
+        with popen_through_run(), patch(
+            "tasktree.docker.subprocess.run", side_effect=mock_run
+        ):
             # Execute task
             executor.execute_task("docker-test", TaskOutputTypes.ALL)
 
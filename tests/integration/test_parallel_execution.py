@@ -0,0 +1,296 @@
+"""Integration tests for parallel execution (--jobs) and task resources."""
+
+import os
+import re
+import shutil
+import sys
+import time
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from typer.testing import CliRunner
+
+from tasktree.cli import app
+from fixture_utils import copy_fixture_files
+
+
+def strip_ansi_codes(text: str) -> str:
+    """
+    Remove ANSI escape sequences from text.
+    """
+    ansi_escape = re.compile(r"\x1b\[[0-9;]*m")
+    return ansi_escape.sub("", text)
+
+
+class TestParallelExecution(unittest.TestCase):
+    """
+    Test running independent tasks concurrently.
+    """
+
+    def setUp(self):
+        """
+        Set up test fixtures.
+        """
+        self.runner = CliRunner()
+        self.env = {"NO_COLOR": "1"}
+
+    def _invoke_in(self, fixture: str, args: list[str]):
+        """
+        Copy a fixture into a temp dir and invoke tt there.
+        """
+        tmpdir = TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        project_root = Path(tmpdir.name)
+        copy_fixture_files(fixture, project_root)
+        original_cwd = os.getcwd()
+        try:
+            os.chdir(project_root)
+            result = self.runner.invoke(app, args, env=self.env)
+        finally:
+            os.chdir(original_cwd)
+        return result, project_root
+
+    @unittest.skipIf(sys.platform == "win32", "uses POSIX shell commands")
+    def test_jobs_runs_independent_tasks_concurrently(self):
+        """
+        Test that -j 2 runs two independent dependencies at the same time.
+        """
+        result, project_root = self._invoke_in("parallel_rendezvous", ["-j", "2", "all"])
+
+        self.assertEqual(result.exit_code, 0, strip_ansi_codes(result.stdout))
+        self.assertTrue((project_root / "all.txt").exists())
+
+    @unittest.skipIf(sys.platform == "win32", "uses POSIX shell commands")
+    def test_auto_jobs_runs_independent_tasks_concurrently(self):
+        """
+        Test that -j auto with a minimum of 2 still runs both dependencies at once.
+        """
+        result, project_root = self._invoke_in(
+            "parallel_rendezvous", ["-j", "auto:2-4", "all"]
+        )
+
+        self.assertEqual(result.exit_code, 0, strip_ansi_codes(result.stdout))
+        self.assertTrue((project_root / "all.txt").exists())
+
+    def test_invalid_jobs_value_is_rejected(self):
+        """
+        Test that a malformed --jobs value is a usage error.
+        """
+        result, _ = self._invoke_in("parallel_show_resources", ["-j", "auto:5-2", "build"])
+
+        self.assertNotEqual(result.exit_code, 0)
+
+    @unittest.skipIf(sys.platform == "win32", "uses POSIX shell commands")
+    def test_pool_keeps_tasks_exclusive(self):
+        """
+        Test that tasks sharing a pool of capacity 1 never overlap, even with -j 2.
+        """
+        result, project_root = self._invoke_in("parallel_pool_exclusive", ["-j", "2", "all"])
+
+        self.assertEqual(result.exit_code, 0, strip_ansi_codes(result.stdout))
+        order = (project_root / "order.txt").read_text().split()
+        self.assertEqual(sorted(order), ["migrate", "seed"])
+
+    def test_jobs_must_be_positive(self):
+        """
+        Test that -j 0 is rejected.
+        """
+        result, _ = self._invoke_in("parallel_show_resources", ["-j", "0", "build"])
+
+        self.assertNotEqual(result.exit_code, 0)
+
+    @unittest.skipIf(sys.platform == "win32", "jobserver FIFOs are POSIX-only")
+    def test_parallel_run_exports_jobserver(self):
+        """
+        Test that tasks in a parallel run see the jobserver in MAKEFLAGS.
+        """
+        result, project_root = self._invoke_in("parallel_jobserver_makeflags", ["-j", "3", "flags"])
+
+        self.assertEqual(result.exit_code, 0, strip_ansi_codes(result.stdout))
+        makeflags = (project_root / "makeflags.txt").read_text()
+        self.assertIn("-j3", makeflags)
+        self.assertIn("--jobserver-auth=fifo:", makeflags)
+        self.assertRegex(makeflags, r"--jobserver-auth=\d+,\d+")
+
+    @unittest.skipIf(sys.platform == "win32", "jobserver FIFOs are POSIX-only")
+    def test_serial_run_exports_no_jobserver(self):
+        """
+        Test that a serial run does not start a jobserver.
+        """
+        result, project_root = self._invoke_in("parallel_jobserver_makeflags", ["flags"])
+
+        self.assertEqual(result.exit_code, 0, strip_ansi_codes(result.stdout))
+        self.assertNotIn("--jobserver-auth", (project_root / "makeflags.txt").read_text())
+
+    @unittest.skipIf(shutil.which("make") is None, "GNU make not installed")
+    def test_make_joins_jobserver(self):
+        """
+        Test that make accepts the exported jobserver and completes its jobs.
+        """
+        result, project_root = self._invoke_in("parallel_jobserver_make", ["-j", "2", "all"])
+
+        self.assertEqual(result.exit_code, 0, strip_ansi_codes(result.stdout))
+        for target in "abcd":
+            self.assertTrue((project_root / f"{target}.out").exists())
+
+    def test_show_displays_resources(self):
+        """
+        Test that --show displays a task's resources and its pools' capacity.
+        """
+        result, _ = self._invoke_in("parallel_show_resources", ["--show", "build"])
+
+        self.assertEqual(result.exit_code, 0)
+        output = strip_ansi_codes(result.stdout)
+        self.assertIn("Pool capacity: db=2", output)
+        self.assertIn("resources:", output)
+        self.assertIn("cpu: 4", output)
+        self.assertIn("mem: 8G", output)
+
+    @unittest.skipIf(sys.platform == "win32", "uses POSIX shell commands")
+    def test_keep_going_runs_unaffected_tasks_and_summarises(self):
+        """
+        Test that -k runs every task not downstream of a failure, then reports
+        all failures and the tasks skipped because of them.
+        """
+        for jobs in ("1", "2"):
+            with self.subTest(jobs=jobs):
+                result, project_root = self._invoke_in(
+                    "parallel_keep_going", ["-j", jobs, "-k", "all"]
+                )
+
+                self.assertNotEqual(result.exit_code, 0)
+                output = strip_ansi_codes(result.stdout)
+                self.assertIn("2 task(s) failed", output)
+                self.assertIn("Skipped because a dependency failed: after-broken, all", output)
+                self.assertTrue((project_root / "independent.txt").exists())
+                self.assertFalse((project_root / "after-broken.txt").exists())
+                self.assertFalse((project_root / "all.txt").exists())
+
+    @unittest.skipIf(sys.platform == "win32", "uses POSIX process groups")
+    def test_fail_fast_terminates_running_tasks(self):
+        """
+        Test that --fail-fast stops a long-running sibling of a failed task.
+        """
+        start = time.monotonic()
+        result, project_root = self._invoke_in(
+            "parallel_fail_fast", ["-j", "2", "--fail-fast", "all"]
+        )
+
+        self.assertNotEqual(result.exit_code, 0)
+        self.assertLess(time.monotonic() - start, 15)
+        self.assertFalse((project_root / "slow.txt").exists())
+
+    def test_keep_going_and_fail_fast_are_exclusive(self):
+        """
+        Test that -k and --fail-fast cannot be combined.
+        """
+        result, project_root = self._invoke_in(
+            "parallel_keep_going", ["-k", "--fail-fast", "all"]
+        )
+
+        self.assertNotEqual(result.exit_code, 0)
+        self.assertFalse((project_root / "independent.txt").exists())
+
+    def test_parallel_output_is_prefixed_and_logged(self):
+        """
+        Test that a parallel run prefixes each task's lines and writes its log.
+        """
+        result, project_root = self._invoke_in("parallel_output", ["-j", "2", "all"])
+
+        self.assertEqual(result.exit_code, 0, strip_ansi_codes(result.output))
+        output = strip_ansi_codes(result.output)
+        self.assertIn("[a] a line 1", output)
+        self.assertIn("[b] b line 1", output)
+        self.assertIn("[all] all done", output)
+
+        logs = list((project_root / ".tasktree" / "logs").glob("*/a.log"))
+        self.assertEqual(len(logs), 1)
+        self.assertEqual(logs[0].read_text(), "a line 1\na error\n")
+
+    def test_grouped_output_mode(self):
+        """
+        Test that --output-mode grouped prints each task's output as one block.
+        """
+        result, _ = self._invoke_in(
+            "parallel_output", ["-j", "2", "--output-mode", "grouped", "all"]
+        )
+
+        self.assertEqual(result.exit_code, 0, strip_ansi_codes(result.output))
+        output = strip_ansi_codes(result.output)
+        self.assertIn("==> a <==\na line 1\n", output)
+        self.assertIn("==> all <==\nall done\n", output)
+
+    def test_on_err_output_shown_on_failure_with_log_path(self):
+        """
+        Test that a task's own task_output setting applies in a multiplexed run.
+        """
+        result, _ = self._invoke_in("parallel_output", ["-j", "2", "quiet-failure"])
+
+        self.assertNotEqual(result.exit_code, 0)
+        output = strip_ansi_codes(result.output)
+        self.assertIn("[quiet-failure] shown because the task failed", output)
+        self.assertNotIn("never shown", output)
+        self.assertIn("Full log of 'quiet-failure'", output)
+
+    def test_logs_shows_last_run_output(self):
+        """
+        Test that --logs prints a task's full output from the last run.
+        """
+        tmpdir = TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        project_root = Path(tmpdir.name)
+        copy_fixture_files("parallel_output", project_root)
+        original_cwd = os.getcwd()
+        try:
+            os.chdir(project_root)
+            before = self.runner.invoke(app, ["--logs", "a"], env=self.env)
+            self.runner.invoke(app, ["-j", "2", "quiet-failure"], env=self.env)
+            result = self.runner.invoke(app, ["--logs", "quiet-failure"], env=self.env)
+            missing = self.runner.invoke(app, ["--logs", "a"], env=self.env)
+        finally:
+            os.chdir(original_cwd)
+
+        self.assertNotEqual(before.exit_code, 0)
+        self.assertIn("No task logs found", strip_ansi_codes(before.output))
+        self.assertEqual(result.exit_code, 0)
+        self.assertEqual(
+            result.output, "never shown\nshown because the task failed\n"
+        )
+        self.assertNotEqual(missing.exit_code, 0)
+        self.assertIn("did not run in the last run", strip_ansi_codes(missing.output))
+
+    def test_logs_with_tasks_option_and_repeated_task(self):
+        """
+        Test that --logs finds the logs of a run made with -T, where the
+        working directory is the project root, and each run of a task run
+        more than once.
+        """
+        tmpdir = TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        project_root = Path(tmpdir.name)
+        copy_fixture_files("parallel_output", project_root / "sub")
+        recipe = ["-T", str(Path("sub") / "tasktree.yaml")]
+        original_cwd = os.getcwd()
+        try:
+            os.chdir(project_root)
+            run = self.runner.invoke(app, [*recipe, "-j", "2", "greet-both"], env=self.env)
+            first = self.runner.invoke(app, [*recipe, "--logs", "greet"], env=self.env)
+            second = self.runner.invoke(app, [*recipe, "--logs", "greet.2"], env=self.env)
+            missing = self.runner.invoke(app, [*recipe, "--logs", "greet.3"], env=self.env)
+        finally:
+            os.chdir(original_cwd)
+
+        self.assertEqual(run.exit_code, 0, strip_ansi_codes(run.output))
+        self.assertEqual(first.exit_code, 0, strip_ansi_codes(first.output))
+        self.assertEqual(second.exit_code, 0, strip_ansi_codes(second.output))
+        self.assertEqual(
+            sorted([first.stdout, second.stdout]), ["hello alice\n", "hello bob\n"]
+        )
+        self.assertIn("also ran as: greet.2", first.stderr)
+        self.assertNotEqual(missing.exit_code, 0)
+        self.assertIn("greet, greet-both, greet.2", strip_ansi_codes(missing.output))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,6 @@
 """Integration tests for state persistence across multiple CLI invocations."""
 
+import json
 import os
 import re
 import time
@@ -120,6 +121,35 @@ class TestStatePersistence(unittest.TestCase):
             finally:
                 os.chdir(original_cwd)
 
+    def test_run_keeps_state_of_unreached_imported_tasks(self):
+        """
+        Test a run does not prune the state of imported tasks it does not reach.
+        """
+        with TemporaryDirectory() as tmpdir:
+            project_root = Path(tmpdir)
+
+            copy_fixture_files("state_unreached_imported_task", project_root)
+            state_file = project_root / ".tasktree-state"
+
+            original_cwd = os.getcwd()
+            try:
+                os.chdir(project_root)
+
+                result = self.runner.invoke(app, ["lib.package"], env=self.env)
+                self.assertEqual(result.exit_code, 0)
+                package_state = json.loads(state_file.read_text())
+
+                # Imported tasks build does not reach are not parsed for its run
+                result = self.runner.invoke(app, ["build"], env=self.env)
+                self.assertEqual(result.exit_code, 0)
+
+                state = json.loads(state_file.read_text())
+                for cache_key in package_state:
+                    self.assertIn(cache_key, state)
+
+            finally:
+                os.chdir(original_cwd)
+
     def test_clean_enables_fresh_run(self):
         """
         Test --clean removes state and forces rebuild.
@@ -719,5 +719,50 @@ class TestVariablesIntegration(unittest.TestCase):
                 os.chdir(original_cwd)
 
 
+    def test_list_evaluates_only_variables_descriptions_use(self):
+        """
+        Test --list runs the eval command a description uses, and no other.
+        """
+        with TemporaryDirectory() as tmpdir:
+            project_root = Path(tmpdir)
+            copy_fixture_files("list_metadata_only", project_root)
+
+            original_cwd = os.getcwd()
+            try:
+                os.chdir(project_root)
+
+                result = self.runner.invoke(app, ["--list"], env=self.env)
+                self.assertEqual(result.exit_code, 0, result.output)
+
+                self.assertIn("Release v1.2", result.output)
+                self.assertTrue((project_root / "version_evaluated.txt").exists())
+                self.assertFalse((project_root / "changelog_evaluated.txt").exists())
+
+            finally:
+                os.chdir(original_cwd)
+
+    def test_show_leaves_command_variables_unevaluated(self):
+        """
+        Test --show displays command variables as placeholders, without
+        running their eval commands or reading their files.
+        """
+        with TemporaryDirectory() as tmpdir:
+            project_root = Path(tmpdir)
+            copy_fixture_files("list_metadata_only", project_root)
+
+            original_cwd = os.getcwd()
+            try:
+                os.chdir(project_root)
+
+                result = self.runner.invoke(app, ["--show", "release"], env=self.env)
+                self.assertEqual(result.exit_code, 0, result.output)
+
+                self.assertIn("Release v1.2", result.output)
+                self.assertIn("{{ var.changelog }} {{ var.token }}", result.output)
+                self.assertFalse((project_root / "changelog_evaluated.txt").exists())
+
+            finally:
+                os.chdir(original_cwd)
+
 if __name__ == "__main__":
     unittest.main()
@@ -1,11 +1,16 @@
 """Tests for CLI argument parsing."""
 
+import subprocess
+import sys
 import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
 from unittest.mock import patch
 
 import click
 import typer
 
+from tasktree.cli import _OUTPUT_MODES, _TASK_OUTPUT_TYPES
 from tasktree.cli_commands import (
     _supports_unicode,
     get_action_failure_string,
@@ -13,6 +18,8 @@ from tasktree.cli_commands import (
 )
 from tasktree.parser import parse_task_args
 from tasktree.logging import LogLevel
+from tasktree.output_mux import OutputMode
+from tasktree.process_runner import TaskOutputTypes
 from helpers.logging import logger_stub
 
 
@@ -379,5 +386,97 @@ class TestTaskOutputParameter(unittest.TestCase):
         self.assertEqual(result, "all")
 
 
+class TestOptionChoices(unittest.TestCase):
+    """
+    Test the choices spelled out in cli.py against the enums they stand for.
+    """
+
+    def test_output_modes_match_output_mode(self):
+        """
+        Test that --output-mode offers exactly OutputMode's values.
+        """
+        self.assertEqual(_OUTPUT_MODES, tuple(m.value for m in OutputMode))
+
+    def test_task_output_types_match_task_output_types(self):
+        """
+        Test that --task-output offers exactly TaskOutputTypes' values.
+        """
+        self.assertEqual(_TASK_OUTPUT_TYPES, tuple(t.value for t in TaskOutputTypes))
+
+
+class TestStartupImports(unittest.TestCase):
+    """
+    Test which modules `tt` imports, with `python -X importtime`, for commands
+    that must start quickly.
+    """
+
+    def setUp(self):
+        tmpdir = TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.project = Path(tmpdir.name)
+        (self.project / "tasktree.yaml").write_text(
+            "tasks:\n  hello:\n    desc: Say hello\n    cmd: echo hello\n"
+        )
+
+    def _imported_modules(self, *args: str) -> set[str]:
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-m", "tasktree.cli", *args],
+            cwd=self.project,
+            capture_output=True,
+            text=True,
+            timeout=60,
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        return {
+            line.rsplit("|", 1)[1].strip()
+            for line in result.stderr.splitlines()
+            if line.startswith("import time:") and "|" in line
+        }
+
+    def test_version_imports_no_recipe_support(self):
+        """
+        Test that --version imports neither the parser nor the executor.
+        """
+        modules = self._imported_modules("--version")
+
+        for module in ("tasktree.parser", "yaml", "tasktree.executor", "rich.table"):
+            self.assertNotIn(module, modules)
+
+    def test_list_imports_no_execution_support(self):
+        """
+        Test that --list imports neither the executor, Docker support, output
+        multiplexer, process runners, scheduler, Jinja2 nor process pools.
+        """
+        modules = self._imported_modules("--list")
+
+        self.assertIn("tasktree.parser", modules)
+        for module in (
+            "tasktree.executor",
+            "tasktree.docker",
+            "tasktree.output_mux",
+            "tasktree.process_runner",
+            "tasktree.output_pump",
+            "tasktree.resource_usage",
+            "tasktree.jobserver",
+            "tasktree.scheduler",
+            "tasktree.temp_script",
+            "jinja2",
+            "rich.syntax",
+            "concurrent.futures.process",
+        ):
+            self.assertNotIn(module, modules)
+
+    def test_host_run_imports_no_docker_support(self):
+        """
+        Test that running a task on the host imports no Docker support, and no
+        Jinja2 for a command without placeholders.
+        """
+        modules = self._imported_modules("hello")
+
+        self.assertIn("tasktree.executor", modules)
+        for module in ("tasktree.docker", "tasktree.docker_engine", "jinja2"):
+            self.assertNotIn(module, modules)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,484 @@
+"""Tests for the shell completion index and the tt-complete helper."""
+
+import os
+import shutil
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+import typer
+
+from tasktree.cli import _OUTPUT_MODES, _TASK_OUTPUT_TYPES, app
+from tasktree.completion import (
+    _FLAGS,
+    _LOG_LEVELS,
+    _OPTION_VALUES,
+    SHELLS,
+    complete,
+    completion_script,
+    index_path,
+    load_index,
+    main,
+    parse_index,
+    write_index,
+)
+from tasktree.logging import LogLevel
+from tasktree.parser import get_recipe, parse_recipe
+from helpers.logging import logger_stub
+
+RECIPE = """\
+imports:
+  - file: lib.tasks
+    as: lib
+runners:
+  ci:
+    shell: bash
+tasks:
+  build:
+    desc: |
+      Build the project
+      in the chosen mode
+    args:
+      - mode: { choices: [debug, release] }
+      - jobs: { type: int, default: 4 }
+      - verbose: { type: bool, default: false }
+    cmd: echo build
+  deploy:
+    desc: Deploy
+    args: [$token, env]
+    cmd: echo deploy
+  helper:
+    private: true
+    cmd: echo helper
+"""
+
+LIBRARY = """\
+tasks:
+  fmt:
+    desc: Format the sources
+    cmd: echo fmt
+"""
+
+
+class CompletionTestCase(unittest.TestCase):
+    """
+    A project with a recipe importing lib.tasks.
+    """
+
+    def setUp(self):
+        tmpdir = TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.project = Path(tmpdir.name).resolve()
+        self.recipe_path = self.project / "tasktree.yaml"
+        self.recipe_path.write_text(RECIPE)
+        (self.project / "lib.tasks").write_text(LIBRARY)
+
+    def complete(self, *words: str) -> list[str]:
+        return [value for value, _ in complete(list(words), self.project)]
+
+
+class TestCompletionIndex(CompletionTestCase):
+    """
+    Tests for writing and reading the completion index.
+    """
+
+    def test_index_records_tasks_args_and_fingerprints(self):
+        """
+        Test that the index holds every task, its arguments and the files read.
+        """
+        write_index(parse_recipe(self.recipe_path))
+
+        index = parse_index(index_path(self.recipe_path).read_text())
+
+        self.assertEqual(
+            [path for path, _, _ in index.files],
+            [str(self.recipe_path), str(self.project / "lib.tasks")],
+        )
+        self.assertEqual(set(index.tasks), {"build", "deploy", "helper", "lib.fmt"})
+        self.assertTrue(index.tasks["helper"].private)
+        self.assertEqual(index.tasks["build"].desc, "Build the project")
+        self.assertEqual(
+            [(a.name, a.type, a.default, a.choices) for a in index.tasks["build"].args],
+            [
+                ("mode", "str", None, ["debug", "release"]),
+                ("jobs", "int", "4", []),
+                ("verbose", "bool", "False", []),
+            ],
+        )
+        self.assertEqual([a.name for a in index.tasks["deploy"].args], ["token", "env"])
+        self.assertEqual(index.runners, ["ci"])
+
+    def test_get_recipe_writes_index(self):
+        """
+        Test that parsing a recipe for a command leaves its index behind.
+        """
+        cwd = os.getcwd()
+        os.chdir(self.project)
+        try:
+            get_recipe(logger_stub)
+        finally:
+            os.chdir(cwd)
+
+        self.assertTrue(index_path(self.recipe_path).is_file())
+
+    def test_run_leaving_tasks_unparsed_writes_no_index(self):
+        """
+        Test that a run, which builds only the imported tasks it reaches, does
+        not index the recipe.
+        """
+        cwd = os.getcwd()
+        os.chdir(self.project)
+        try:
+            recipe = get_recipe(logger_stub, root_task="deploy")
+        finally:
+            os.chdir(cwd)
+
+        self.assertEqual(recipe.unparsed_tasks, 1)
+        self.assertFalse(index_path(self.recipe_path).exists())
+
+    def test_run_indexes_tasks_it_does_not_reach(self):
+        """
+        Test that the index written after a run holds the evaluated metadata
+        of tasks the run left unevaluated.
+        """
+        self.recipe_path.write_text(
+            "variables:\n"
+            "  env: staging\n"
+            "tasks:\n"
+            "  a:\n"
+            "    desc: 'Deploy to {{ var.env }}'\n"
+            "    args:\n"
+            "      - target: { default: '{{ var.env }}' }\n"
+            "    cmd: echo a\n"
+            "  b:\n"
+            "    cmd: echo b\n"
+        )
+        cwd = os.getcwd()
+        os.chdir(self.project)
+        try:
+            get_recipe(logger_stub, root_task="b")
+        finally:
+            os.chdir(cwd)
+
+        self.assertEqual(
+            complete([""], self.project), [("a", "Deploy to staging"), ("b", "")]
+        )
+        self.assertEqual(
+            complete(["a", "t"], self.project),
+            [("target=", "str, default staging")],
+        )
+
+    def test_unchanged_index_is_not_rewritten(self):
+        """
+        Test that an index with the same content is left untouched.
+        """
+        recipe = parse_recipe(self.recipe_path)
+        write_index(recipe)
+        path = index_path(self.recipe_path)
+        os.utime(path, ns=(0, 0))
+
+        write_index(recipe)
+
+        self.assertEqual(path.stat().st_mtime_ns, 0)
+
+    def test_fresh_index_is_read_without_parsing(self):
+        """
+        Test that completion answers from a fresh index alone.
+        """
+        write_index(parse_recipe(self.recipe_path))
+
+        with patch("tasktree.parser.parse_recipe") as parse:
+            self.assertEqual(self.complete("b"), ["build"])
+        parse.assert_not_called()
+
+    def test_changed_import_rebuilds_index(self):
+        """
+        Test that editing an imported file invalidates the index.
+        """
+        write_index(parse_recipe(self.recipe_path))
+        (self.project / "lib.tasks").write_text(
+            LIBRARY + "  lint:\n    cmd: echo lint\n"
+        )
+
+        self.assertEqual(self.complete("lib."), ["lib.fmt", "lib.lint"])
+        self.assertIn("lib.lint", index_path(self.recipe_path).read_text())
+
+    def test_missing_index_is_built(self):
+        """
+        Test that completion builds the index when there is none.
+        """
+        self.assertEqual(self.complete("d"), ["deploy"])
+        self.assertTrue(index_path(self.recipe_path).is_file())
+
+    def test_other_version_is_stale(self):
+        """
+        Test that an index of another format version is not read.
+        """
+        self.assertIsNone(parse_index("tasktree-completion\t0\ntask\tx\t0\t\n"))
+
+    def test_rebuild_runs_no_eval_commands(self):
+        """
+        Test that rebuilding the index never runs { eval: ... } commands.
+        """
+        marker = self.project / "evaluated"
+        self.recipe_path.write_text(
+            "variables:\n"
+            f"  stamp: {{ eval: 'touch {marker.as_posix()}' }}\n"
+            "tasks:\n"
+            "  build:\n"
+            "    desc: 'Build {{ var.stamp }}'\n"
+            "    cmd: echo build\n"
+        )
+
+        self.assertIsNotNone(load_index(self.recipe_path))
+        self.assertFalse(marker.exists())
+
+    def test_unparseable_recipe_completes_nothing(self):
+        """
+        Test that a broken recipe gives no completions rather than an error.
+        """
+        self.recipe_path.write_text("tasks: [unclosed\n")
+
+        self.assertEqual(self.complete(""), [])
+
+
+class TestComplete(CompletionTestCase):
+    """
+    Tests for what complete() offers in each position on the command line.
+    """
+
+    def test_task_names_hide_private_tasks(self):
+        """
+        Test that the first word completes public task names with descriptions.
+        """
+        self.assertEqual(
+            complete([""], self.project),
+            [
+                ("lib.fmt", "Format the sources"),
+                ("build", "Build the project"),
+                ("deploy", "Deploy"),
+            ],
+        )
+
+    def test_argument_names(self):
+        """
+        Test that a task's arguments complete as name=, with type and default.
+        """
+        self.assertEqual(
+            complete(["build", "j"], self.project), [("jobs=", "int, default 4")]
+        )
+
+    def test_given_arguments_are_not_offered_again(self):
+        """
+        Test that arguments given by name or position are left out.
+        """
+        self.assertEqual(self.complete("build", "debug", "verbose=1", ""), ["jobs="])
+
+    def test_positional_choices(self):
+        """
+        Test that the next positional argument's choices are offered.
+        """
+        self.assertEqual(
+            self.complete("build", ""),
+            ["mode=", "jobs=", "verbose=", "debug", "release"],
+        )
+
+    def test_argument_choices(self):
+        """
+        Test that name= completes the argument's choices.
+        """
+        self.assertEqual(self.complete("build", "mode=r"), ["mode=release"])
+
+    def test_bool_argument_values(self):
+        """
+        Test that a bool argument completes true and false.
+        """
+        self.assertEqual(
+            self.complete("build", "verbose="), ["verbose=true", "verbose=false"]
+        )
+
+    def test_options_before_and_after_task(self):
+        """
+        Test that options, and their values, are skipped to find the task.
+        """
+        self.assertEqual(
+            self.complete("-j", "4", "build", "--force", "-L", "debug", "m"),
+            ["mode="],
+        )
+
+    def test_option_names(self):
+        """
+        Test that a word starting with - completes tt's options.
+        """
+        self.assertEqual(self.complete("--log"), ["--logs", "--log-level"])
+
+    def test_task_valued_options(self):
+        """
+        Test that --show, --tree and --logs complete task names.
+        """
+        for option in ("--show", "-t", "--logs"):
+            self.assertEqual(self.complete(option, "d"), ["deploy"])
+
+    def test_choice_valued_options(self):
+        """
+        Test that options with choices complete them, also as --option=value.
+        """
+        self.assertEqual(self.complete("--output-mode", "g"), ["grouped"])
+        self.assertEqual(self.complete("--log-level=w"), ["--log-level=warn"])
+
+    def test_runner_names(self):
+        """
+        Test that --runner completes the recipe's runner names.
+        """
+        self.assertEqual(self.complete("-r", ""), ["ci"])
+
+    def test_tasks_option_selects_recipe(self):
+        """
+        Test that --tasks makes completion read that recipe.
+        """
+        (self.project / "other.yaml").write_text(
+            "tasks:\n  release:\n    cmd: echo release\n"
+        )
+
+        self.assertEqual(self.complete("--tasks", "other.yaml", ""), ["release"])
+        self.assertTrue(index_path(self.project / "other.yaml").is_file())
+
+    def test_unknown_task_completes_nothing(self):
+        """
+        Test that arguments of an unknown task complete nothing.
+        """
+        self.assertEqual(self.complete("nosuchtask", ""), [])
+
+
+class TestCompletionCli(CompletionTestCase):
+    """
+    Tests for tt-complete and tt --completion.
+    """
+
+    def test_main_prints_tab_separated_lines(self):
+        """
+        Test that tt-complete prints each completion and its description.
+        """
+        cwd = os.getcwd()
+        os.chdir(self.project)
+        try:
+            with patch("sys.stdout") as stdout:
+                self.assertEqual(main(["--", "build", "jo"]), 0)
+        finally:
+            os.chdir(cwd)
+
+        stdout.write.assert_called_once_with("jobs=\tint, default 4\n")
+
+    def test_helper_imports_no_parser_when_index_is_fresh(self):
+        """
+        Test that tt-complete answers from a fresh index without importing
+        the parser, PyYAML or Typer.
+        """
+        write_index(parse_recipe(self.recipe_path))
+
+        result = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                "import sys; from tasktree.completion import main; main(['b']); "
+                "print(sorted(m for m in sys.modules if m.split('.')[0] in "
+                "('yaml', 'typer', 'click', 'jinja2') or m == 'tasktree.parser'))",
+            ],
+            cwd=self.project,
+            capture_output=True,
+            text=True,
+            timeout=60,
+        )
+
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout.splitlines(), ["build\tBuild the project", "[]"])
+
+    def test_scripts_call_helper(self):
+        """
+        Test that every shell's script calls tt-complete and registers for tt.
+        """
+        for shell in SHELLS:
+            with self.subTest(shell=shell):
+                script = completion_script(shell)
+                self.assertIn("tt-complete --", script)
+                self.assertIn("tt", script.splitlines()[-1])
+
+    def test_unsupported_shell(self):
+        """
+        Test that asking for another shell's script raises ValueError.
+        """
+        with self.assertRaises(ValueError):
+            completion_script("tcsh")
+
+    @unittest.skipUnless(shutil.which("bash"), "bash not available")
+    def test_bash_script(self):
+        """
+        Test the bash script's replies, with tt-complete on the PATH.
+        """
+        bin_dir = self.project / "bin"
+        bin_dir.mkdir()
+        helper = bin_dir / "tt-complete"
+        helper.write_text(
+            f"#!/bin/sh\nexec '{sys.executable}' -m tasktree.completion \"$@\"\n"
+        )
+        helper.chmod(0o755)
+
+        def replies(line: str) -> list[str]:
+            result = subprocess.run(
+                [
+                    "bash",
+                    "-c",
+                    f'eval "$1"; COMP_LINE="{line}"; COMP_POINT=${{#COMP_LINE}}; '
+                    "_tt_complete; printf '%s\\n' \"${COMPREPLY[@]}\"",
+                    "bash",
+                    completion_script("bash"),
+                ],
+                cwd=self.project,
+                env={
+                    **os.environ,
+                    "PATH": f"{bin_dir}{os.pathsep}{os.environ['PATH']}",
+                    "PYTHONPATH": os.pathsep.join(sys.path),
+                },
+                capture_output=True,
+                text=True,
+                timeout=60,
+            )
+            self.assertEqual(result.returncode, 0, result.stderr)
+            return [r for r in result.stdout.splitlines() if r]
+
+        self.assertEqual(replies("tt de"), ["deploy"])
+        # Readline replaces only what follows the "="
+        self.assertEqual(replies("tt build mode=d"), ["debug"])
+        self.assertEqual(replies("tt build v"), ["verbose="])
+
+    def test_options_match_cli(self):
+        """
+        Test that the helper knows every tt option, which take values, and
+        the choices they offer.
+        """
+        command = typer.main.get_command(app)
+        long_flags, value_options, choices = set(), set(), {}
+        for param in command.params:
+            if param.param_type_name != "option":
+                continue
+            long_flags.update(o for o in param.opts if o.startswith("--"))
+            if not param.is_flag:
+                value_options.update(param.opts)
+                for opt in param.opts:
+                    choices[opt] = tuple(getattr(param.type, "choices", ()))
+
+        self.assertEqual(set(_FLAGS), long_flags | {"--help"})
+        self.assertEqual(set(_OPTION_VALUES), value_options)
+        for option, values in choices.items():
+            if values:
+                self.assertEqual(_OPTION_VALUES[option], values, option)
+        self.assertEqual(_LOG_LEVELS, tuple(level.name.lower() for level in LogLevel))
+        self.assertEqual(_OPTION_VALUES["--output-mode"], _OUTPUT_MODES)
+        self.assertEqual(_OPTION_VALUES["--task-output"], _TASK_OUTPUT_TYPES)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,12 +1,19 @@
 """Unit tests for Docker integration."""
 
+import contextlib
+import functools
 import subprocess
+import threading
+import time
 import unittest
 from pathlib import Path
+from tempfile import TemporaryDirectory
 from unittest.mock import Mock, patch
 
 from helpers.logging import logger_stub
+from helpers.processes import popen_through_run
 from tasktree.docker import (
+    DockerError,
     DockerManager,
     resolve_container_working_dir,
 )
@@ -68,6 +75,10 @@ class TestDockerManager(unittest.TestCase):
         """
         self.project_root = Path("/fake/project")
         self.manager = DockerManager(self.project_root, logger_stub)
+        # The tests' patched subprocess.run stands in for every docker command
+        popen = popen_through_run()
+        popen.start()
+        self.addCleanup(popen.stop)
 
     @patch("tasktree.docker.subprocess.run")
     def test_ensure_image_built_caching(self, mock_run):
@@ -433,6 +444,39 @@ class TestDockerManager(unittest.TestCase):
             ["sh", "-c", "the-script", "sh", "/base", "*.txt"],
         )
 
+    @patch("tasktree.docker.platform.system", return_value="Windows")
+    def test_stream_in_container_yields_lines_and_runs_argv(self, _mock_platform):
+        """
+        stream_in_container runs the given argv in the container and yields its
+        stdout line by line, raising DockerError if the command fails.
+        """
+        env = DockerRunner(name="builder", dockerfile="./Dockerfile", context=".")
+        self.manager.ensure_image_built = Mock(
+            return_value=("tt-env-builder", "sha256:abc")
+        )
+        commands = []
+        real_popen = subprocess.Popen
+
+        def fake_popen(cmd, **kwargs):
+            commands.append(cmd)
+            # Stand in for the container: print two lines, then exit with $1
+            script = "printf 'a.txt\\t1\\nb.txt\\t2\\n'; echo oops >&2; exit $1"
+            return real_popen(["sh", "-c", script, "sh", cmd[-1]], **kwargs)
+
+        process_runner = make_process_runner(TaskOutputTypes.ALL, logger_stub)
+        with patch("tasktree.docker.subprocess.Popen", side_effect=fake_popen):
+            lines = list(
+                self.manager.stream_in_container(env, ["probe", "0"], process_runner)
+            )
+            with self.assertRaises(DockerError) as context:
+                list(self.manager.stream_in_container(env, ["probe", "3"], process_runner))
+
+        self.assertEqual(lines, ["a.txt\t1", "b.txt\t2"])
+        self.assertEqual(commands[0][:3], ["docker", "run", "--rm"])
+        self.assertEqual(commands[0][-3:], ["tt-env-builder", "probe", "0"])
+        self.assertIn("exit code 3", str(context.exception))
+        self.assertIn("oops", str(context.exception))
+
     @patch("tasktree.docker.subprocess.run")
     @patch("tasktree.docker.platform.system")
     def test_run_in_container_does_not_duplicate_project_root_mount(
@@ -1116,5 +1160,347 @@ class TestDockerManager(unittest.TestCase):
         self.assertIn("125", str(context.exception))
 
 
+
+@patch("tasktree.docker.platform.system", return_value="Windows")
+@patch("tasktree.docker.subprocess.run")
+class TestContainerSessions(unittest.TestCase):
+    """
+    Test running consecutive tasks of a runner in one container session.
+    """
+
+    def setUp(self):
+        self.manager = DockerManager(Path("/fake/project"), logger_stub)
+        popen = popen_through_run()
+        popen.start()
+        self.addCleanup(popen.stop)
+        self.env = DockerRunner(
+            name="builder",
+            dockerfile="./Dockerfile",
+            context=".",
+            interpreter=Interpreter(cmd="sh"),
+        )
+        self.entrypoint = "null"
+
+    def _docker(self, cmd, **_kwargs):
+        result = Mock(returncode=0)
+        if "inspect" in cmd:
+            result.stdout = (
+                self.entrypoint + "\n"
+                if "{{json .Config.Entrypoint}}" in cmd
+                else "sha256:abc123def456\n"
+            )
+        elif cmd[:3] == ["docker", "run", "--detach"]:
+            result.stdout = "c0ffee0123456789\n"
+        return result
+
+    def _run_task(self, env=None, **kwargs):
+        self.manager.run_in_container(
+            env=env or self.env,
+            cmd="echo hello",
+            working_dir=Path("/fake/project"),
+            container_working_dir="/workspace",
+            process_runner=make_process_runner(TaskOutputTypes.ALL, logger_stub),
+            interpreter=Interpreter(cmd="sh"),
+            reuse_container=True,
+            **kwargs,
+        )
+
+    @staticmethod
+    def _commands(mock_run, *prefix):
+        return [
+            call.args[0]
+            for call in mock_run.call_args_list
+            if call.args[0][: len(prefix)] == list(prefix)
+        ]
+
+    def test_consecutive_tasks_share_one_container(self, mock_run, _mock_platform):
+        """
+        Test that tasks of a runner are exec'd into one container, each with its own variables.
+        """
+        mock_run.side_effect = self._docker
+
+        self._run_task(task_env_vars={"TT_CALL_CHAIN": "a"})
+        self._run_task(task_env_vars={"TT_CALL_CHAIN": "b"})
+
+        [start] = self._commands(mock_run, "docker", "run")
+        self.assertIn("--detach", start)
+        self.assertNotIn("TT_CALL_CHAIN=a", start)
+        script_mount = next(arg for arg in start if ":/tmp/tt-scripts-" in arg)
+        container_dir = script_mount.split(":")[1]
+
+        execs = self._commands(mock_run, "docker", "exec")
+        self.assertEqual(len(execs), 2)
+        for exec_cmd, chain in zip(execs, ("a", "b")):
+            self.assertEqual(exec_cmd[2:4], ["-w", "/workspace"])
+            self.assertIn(f"TT_CALL_CHAIN={chain}", exec_cmd)
+            self.assertIn("c0ffee0123456789", exec_cmd)
+            self.assertTrue(exec_cmd[-1].startswith(container_dir + "/"))
+            self.assertEqual(exec_cmd[-2], "sh")
+
+    def test_close_sessions_removes_the_container(self, mock_run, _mock_platform):
+        """
+        Test that closing a runner's session removes its container, and later tasks start a new one.
+        """
+        mock_run.side_effect = self._docker
+        self._run_task()
+
+        self.manager.close_sessions("builder")
+        self._run_task()
+
+        self.assertEqual(
+            self._commands(mock_run, "docker", "rm"),
+            [["docker", "rm", "--force", "c0ffee0123456789"]],
+        )
+        self.assertEqual(len(self._commands(mock_run, "docker", "run")), 2)
+
+    def test_retired_session_is_stopped_after_its_running_tasks(
+        self, mock_run, _mock_platform
+    ):
+        """
+        Test that a session closed while a task runs in it is stopped when the task finishes.
+        """
+        mock_run.side_effect = self._docker
+        session = self.manager._acquire_session(self.env, "tt-env-builder", [])
+
+        self.manager.close_sessions()
+        self.assertEqual(self._commands(mock_run, "docker", "rm"), [])
+        self.manager._release_session(session)
+
+        self.assertEqual(len(self._commands(mock_run, "docker", "rm")), 1)
+
+    def test_tasks_get_their_own_container_when_a_session_does_not_fit(
+        self, mock_run, _mock_platform
+    ):
+        """
+        Test that tasks fall back to a container of their own when a session does not fit.
+        """
+        mock_run.side_effect = self._docker
+        cases = {
+            "image entrypoint": (self.env, '["/entrypoint.sh"]'),
+            "published ports": (
+                DockerRunner(
+                    name="server",
+                    dockerfile="./Dockerfile",
+                    context=".",
+                    ports=["8080:80"],
+                ),
+                "null",
+            ),
+            "entrypoint override": (
+                DockerRunner(
+                    name="custom",
+                    dockerfile="./Dockerfile",
+                    context=".",
+                    args=DockerArgs(run=["--entrypoint", "/bin/bash"]),
+                ),
+                "null",
+            ),
+        }
+        for case, (env, entrypoint) in cases.items():
+            with self.subTest(case=case):
+                mock_run.reset_mock()
+                self.entrypoint = entrypoint
+
+                self._run_task(env, task_env_vars={"ARG": "1"})
+
+                self.assertEqual(self._commands(mock_run, "docker", "exec"), [])
+                [run_cmd] = self._commands(mock_run, "docker", "run", "--rm")
+                self.assertIn("ARG=1", run_cmd)
+
+
+
+class TestImageBuilds(unittest.TestCase):
+    """
+    Tests for building runners' images in the background (start_builds).
+    """
+
+    def setUp(self):
+        patcher = patch(
+            "tasktree.docker.subprocess.run",
+            side_effect=lambda cmd, **_: Mock(
+                returncode=0, stdout=f"sha256:{cmd[-1]}\n"
+            ),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.manager = DockerManager(Path("/fake/project"), logger_stub)
+        self.addCleanup(self.manager.cancel_builds)
+        self.lock = threading.Lock()
+        self.building: set[str] = set()
+        self.peak = 0
+        self.built: list[str] = []
+        self.release = threading.Event()
+        self.closed: list[str] = []
+
+    def _build(self, cmd, **_kwargs):
+        """A docker build that waits for self.release."""
+        image_tag = cmd[cmd.index("-t") + 1]
+        with self.lock:
+            self.building.add(image_tag)
+            self.peak = max(self.peak, len(self.building))
+        self.release.wait(timeout=10)
+        with self.lock:
+            self.building.discard(image_tag)
+            self.built.append(image_tag)
+
+    def _builds(self, *names: str) -> list:
+        @contextlib.contextmanager
+        def open_process_runner(name):
+            yield Mock(run=Mock(side_effect=self._build))
+            self.closed.append(name)
+
+        return [
+            (
+                DockerRunner(name=name, dockerfile="Dockerfile", context="."),
+                functools.partial(open_process_runner, name),
+            )
+            for name in names
+        ]
+
+    def _wait_for(self, condition) -> None:
+        deadline = time.monotonic() + 10
+        while not condition():
+            self.assertLess(time.monotonic(), deadline, "timed out")
+            time.sleep(0.01)
+
+    def test_builds_run_concurrently_up_to_the_limit(self):
+        """
+        Test that at most max_concurrent builds run at once.
+        """
+        self.manager.start_builds(self._builds("a", "b", "c"), max_concurrent=2)
+
+        self._wait_for(lambda: len(self.building) == 2)
+        self.release.set()
+        self._wait_for(lambda: len(self.built) == 3)
+
+        self.assertEqual(self.peak, 2)
+        self.assertCountEqual(self.closed, ["a", "b", "c"])
+
+    def test_task_waits_for_the_started_build(self):
+        """
+        Test that ensure_image_built waits for a started build instead of
+        building the image again.
+        """
+        [(env, open_process_runner)] = self._builds("a")
+        self.manager.start_builds([(env, open_process_runner)], max_concurrent=1)
+        self._wait_for(lambda: self.building)
+        threading.Timer(0.05, self.release.set).start()
+        task_runner = Mock()
+
+        tag, image_id = self.manager.ensure_image_built(env, task_runner)
+
+        self.assertEqual((tag, image_id), ("tt-env-a", "sha256:tt-env-a"))
+        self.assertEqual(self.built, ["tt-env-a"])
+        task_runner.run.assert_not_called()
+
+    def test_failed_build_fails_every_task_needing_it(self):
+        """
+        Test that a failed build raises its DockerError for each task waiting
+        on it.
+        """
+        [(env, open_process_runner)] = self._builds("a")
+
+        def fail(cmd, **_kwargs):
+            raise subprocess.CalledProcessError(1, cmd)
+
+        def open_failing_runner():
+            return contextlib.nullcontext(Mock(run=Mock(side_effect=fail)))
+
+        self.manager.start_builds([(env, open_failing_runner)], max_concurrent=1)
+
+        for _ in range(2):
+            with self.assertRaises(DockerError) as context:
+                self.manager.ensure_image_built(env, Mock())
+            self.assertIn("docker build exited with code 1", str(context.exception))
+
+    def test_cancelled_build_is_built_by_the_task(self):
+        """
+        Test that a task whose queued build was cancelled builds the image
+        itself.
+        """
+        builds = self._builds("a", "b")
+        self.manager.start_builds(builds, max_concurrent=1)
+        self._wait_for(lambda: self.building)
+
+        self.manager.cancel_builds()
+        self.release.set()
+        self._wait_for(lambda: len(self.built) == 1)
+        task_runner = Mock(run=Mock(side_effect=self._build))
+        self.manager.ensure_image_built(builds[1][0], task_runner)
+
+        self.assertEqual(self.built, ["tt-env-a", "tt-env-b"])
+        task_runner.run.assert_called_once()
+
+    def test_runner_already_building_is_not_queued_again(self):
+        """
+        Test that start_builds skips runners whose build has started.
+        """
+        self.release.set()
+        builds = self._builds("a")
+        self.manager.start_builds(builds, max_concurrent=1)
+        self.manager.start_builds(builds, max_concurrent=1)
+        self.manager.ensure_image_built(builds[0][0], Mock())
+
+        self.assertEqual(self.built, ["tt-env-a"])
+
+
+@patch("tasktree.docker.platform.system", return_value="Linux")
+class TestHostMirror(unittest.TestCase):
+    """
+    Test finding the directories a runner's containers see as the host does.
+    """
+
+    def setUp(self):
+        self._tmpdir = TemporaryDirectory()
+        self.addCleanup(self._tmpdir.cleanup)
+        self.root = Path(self._tmpdir.name).resolve()
+        (self.root / "src").mkdir()
+        self.manager = DockerManager(self.root, logger_stub)
+
+    def _mirror(self, volumes, path=None):
+        env = DockerRunner(
+            name="builder", dockerfile="Dockerfile", context=".", volumes=volumes
+        )
+        return self.manager.host_mirror(env, path or self.root / "src")
+
+    def test_auto_mounted_project_root_is_mirrored(self, _mock_platform):
+        """
+        Test that the automatic project-root mount mirrors the whole project.
+        """
+        self.assertEqual(self._mirror([]), self.root)
+
+    def test_project_root_mounted_at_its_own_path_is_mirrored(self, _mock_platform):
+        """
+        Test that a user volume mapping the project root to its own path mirrors it.
+        """
+        self.assertEqual(self._mirror([f".:{self.root}:ro"]), self.root)
+
+    def test_remapped_project_root_is_not_mirrored(self, _mock_platform):
+        """
+        Test that a project root mounted at another container path is not mirrored.
+        """
+        self.assertIsNone(self._mirror([".:/workspace"]))
+
+    def test_other_mount_inside_the_project_is_not_mirrored(self, _mock_platform):
+        """
+        Test that a different host directory mounted over part of the project
+        breaks the mirror.
+        """
+        self.assertIsNone(self._mirror([f"/var/cache:{self.root}/src/cache"]))
+
+    def test_unmounted_path_is_not_mirrored(self, _mock_platform):
+        """
+        Test that a path outside every mount is not mirrored.
+        """
+        self.assertIsNone(self._mirror([], Path("/opt/elsewhere")))
+
+    def test_windows_is_never_mirrored(self, mock_platform):
+        """
+        Test that Windows hosts always probe in the container.
+        """
+        mock_platform.return_value = "Windows"
+        self.assertIsNone(self._mirror([]))
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,310 @@
+"""Tests for docker_engine module, against a fake engine on a Unix socket."""
+
+import json
+import os
+import socket
+import socketserver
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import Mock, patch
+
+from helpers.logging import logger_stub
+from tasktree.docker import ContainerSession, DockerError, DockerManager
+from tasktree.docker_engine import (
+    DEFAULT_SOCKET,
+    DockerEngineClient,
+    DockerEngineError,
+    socket_path_from_environment,
+)
+from tasktree.parser import DockerRunner
+
+IMAGE = {
+    "Id": "sha256:0123abcd",
+    "Config": {"Entrypoint": None, "Cmd": ["sh"]},
+    "RootFS": {"Type": "layers", "Layers": ["sha256:aaa", "sha256:bbb"]},
+}
+
+
+class FakeEngine:
+    """
+    A Docker Engine API on a Unix socket, answering from a dict of images.
+
+    Records each request as (method, path), and counts connections.
+    """
+
+    def __init__(self, socket_path: str, images: dict[str, dict]) -> None:
+        self.images = images
+        self.requests: list[tuple[str, str]] = []
+        self.connections = 0
+        # Close each connection after one response, without saying so
+        self.drop_connections = False
+        engine = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                engine.connections += 1
+
+            def _reply(self, status: int, body: object) -> None:
+                data = body if isinstance(body, bytes) else json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+                self.close_connection = engine.drop_connections
+
+            def do_GET(self):
+                engine.requests.append(("GET", self.path))
+                if self.path == "/_ping":
+                    self._reply(200, b"OK")
+                elif self.path.startswith("/images/") and self.path.endswith("/json"):
+                    name = self.path[len("/images/") : -len("/json")]
+                    if name in engine.images:
+                        self._reply(200, engine.images[name])
+                    else:
+                        self._reply(404, {"message": f"No such image: {name}"})
+                else:
+                    self._reply(404, {"message": "page not found"})
+
+            def do_DELETE(self):
+                engine.requests.append(("DELETE", self.path))
+                if self.path.startswith("/containers/gone"):
+                    self._reply(404, {"message": "No such container: gone"})
+                elif "force=1" in self.path:
+                    self._reply(204, b"")
+                else:
+                    self._reply(409, {"message": "container is running"})
+
+            def log_message(self, *_args):
+                pass
+
+        self._server = socketserver.ThreadingUnixStreamServer(socket_path, Handler)
+        self._server.daemon_threads = True
+        threading.Thread(
+            target=self._server.serve_forever, args=(0.05,), daemon=True
+        ).start()
+
+    def close(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+@unittest.skipUnless(hasattr(socket, "AF_UNIX"), "needs Unix sockets")
+class EngineTestCase(unittest.TestCase):
+    """
+    Base for tests with a fake engine and a client for it.
+    """
+
+    def setUp(self):
+        tmpdir = TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.socket_path = os.path.join(tmpdir.name, "docker.sock")
+        self.engine = FakeEngine(self.socket_path, {"tt-env-builder": IMAGE})
+        self.addCleanup(self.engine.close)
+        self.client = DockerEngineClient(self.socket_path, timeout=10)
+        self.addCleanup(self.client.close)
+
+
+class TestDockerEngineClient(EngineTestCase):
+    """
+    Tests for DockerEngineClient.
+    """
+
+    def test_requests_share_one_kept_alive_connection(self):
+        """
+        Test that consecutive requests from a thread reuse its connection.
+        """
+        self.assertTrue(self.client.ping())
+        self.assertEqual(self.client.inspect_image("tt-env-builder"), IMAGE)
+        self.assertEqual(self.client.inspect_image("tt-env-builder"), IMAGE)
+
+        self.assertEqual(self.engine.connections, 1)
+        self.assertEqual(
+            self.engine.requests,
+            [("GET", "/_ping")] + [("GET", "/images/tt-env-builder/json")] * 2,
+        )
+
+    def test_reconnects_when_the_daemon_closed_the_connection(self):
+        """
+        Test that a request on a connection the daemon has closed is sent
+        again on a new one.
+        """
+        self.engine.drop_connections = True
+
+        for _ in range(3):
+            self.assertEqual(self.client.inspect_image("tt-env-builder"), IMAGE)
+
+        self.assertEqual(self.engine.connections, 3)
+
+    def test_error_response_raises_with_its_message(self):
+        """
+        Test that an error response raises DockerEngineError.
+        """
+        with self.assertRaises(DockerEngineError) as context:
+            self.client.inspect_image("missing")
+
+        self.assertEqual(context.exception.status, 404)
+        self.assertIn("No such image: missing", str(context.exception))
+
+    def test_remove_container(self):
+        """
+        Test that remove_container sends DELETE, and ignores a container
+        already gone.
+        """
+        self.client.remove_container("abc123", force=True)
+        self.client.remove_container("gone", force=True)
+        with self.assertRaises(DockerEngineError):
+            self.client.remove_container("abc123")
+
+        self.assertEqual(
+            self.engine.requests,
+            [
+                ("DELETE", "/containers/abc123?force=1"),
+                ("DELETE", "/containers/gone?force=1"),
+                ("DELETE", "/containers/abc123"),
+            ],
+        )
+
+    def test_ping_without_a_daemon(self):
+        """
+        Test that ping is False when nothing listens on the socket.
+        """
+        client = DockerEngineClient(self.socket_path + ".missing")
+
+        self.assertFalse(client.ping())
+
+
+class TestSocketPathFromEnvironment(unittest.TestCase):
+    """
+    Tests for choosing the daemon socket the way the docker CLI does.
+    """
+
+    @unittest.skipUnless(os.name == "posix", "Unix sockets only")
+    def test_socket_path(self):
+        """
+        Test that only a Unix socket in DOCKER_HOST, or the default context's
+        socket, is used.
+        """
+        with TemporaryDirectory() as config_dir:
+            base = {"DOCKER_CONFIG": config_dir}
+            cases = [
+                ({}, DEFAULT_SOCKET),
+                (
+                    {"DOCKER_HOST": "unix:///run/user/1000/docker.sock"},
+                    "/run/user/1000/docker.sock",
+                ),
+                ({"DOCKER_HOST": "tcp://10.0.0.1:2375"}, None),
+                ({"DOCKER_HOST": "ssh://build-host"}, None),
+                ({"DOCKER_CONTEXT": "remote"}, None),
+                ({"DOCKER_CONTEXT": "default"}, DEFAULT_SOCKET),
+            ]
+            for environ, expected in cases:
+                with self.subTest(environ=environ):
+                    self.assertEqual(
+                        socket_path_from_environment({**base, **environ}), expected
+                    )
+
+            Path(config_dir, "config.json").write_text('{"currentContext": "colima"}')
+            self.assertIsNone(socket_path_from_environment(base))
+
+    def test_engine_api_is_opt_in(self):
+        """
+        Test that there is no client unless TT_DOCKER_API=1.
+        """
+        self.assertIsNone(
+            DockerEngineClient.from_environment({"DOCKER_HOST": "unix:///x.sock"})
+        )
+        client = DockerEngineClient.from_environment(
+            {"TT_DOCKER_API": "1", "DOCKER_HOST": "unix:///x.sock"}
+        )
+        if os.name == "posix":
+            self.assertEqual(client.socket_path, "/x.sock")
+
+
+class TestDockerManagerWithEngine(EngineTestCase):
+    """
+    Tests for DockerManager's use of the engine, and its CLI fallback.
+    """
+
+    def setUp(self):
+        super().setUp()
+        patcher = patch(
+            "tasktree.docker.subprocess.run",
+            return_value=Mock(returncode=0, stdout="sha256:from-cli\n"),
+        )
+        self.mock_run = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.env = DockerRunner(name="builder", dockerfile="Dockerfile", context=".")
+
+    def _manager(self, client: DockerEngineClient) -> DockerManager:
+        return DockerManager(Path("/fake/project"), logger_stub, engine=client)
+
+    def test_build_inspects_image_once_through_the_engine(self):
+        """
+        Test that the availability check and every question about the built
+        image go to the engine, which inspects the image once.
+        """
+        manager = self._manager(self.client)
+        process_runner = Mock()
+
+        tag, image_id = manager.ensure_image_built(self.env, process_runner)
+        fingerprint = manager.image_content_fingerprint(tag)
+        session = manager._start_session(self.env, tag, [])
+
+        self.assertEqual((tag, image_id), ("tt-env-builder", "sha256:0123abcd"))
+        self.assertEqual(fingerprint, '["sha256:aaa","sha256:bbb"]')
+        self.assertIsNotNone(session)
+        self.assertEqual(
+            self.engine.requests,
+            [("GET", "/_ping"), ("GET", "/images/tt-env-builder/json")],
+        )
+        # Only the build, and the session's container, used the CLI
+        process_runner.run.assert_called_once()
+        self.assertEqual(
+            [call.args[0][:2] for call in self.mock_run.call_args_list],
+            [["docker", "run"]],
+        )
+
+    def test_session_container_removed_through_the_engine(self):
+        """
+        Test that a container session is removed with a DELETE request.
+        """
+        manager = self._manager(self.client)
+        session = ContainerSession("abc123", "builder", "/tmp/tt-scripts", 0.5)
+
+        manager._stop_session(session)
+
+        self.assertIn(("DELETE", "/containers/abc123?force=1"), self.engine.requests)
+        self.mock_run.assert_not_called()
+
+    def test_engine_error_is_a_docker_error(self):
+        """
+        Test that an image the daemon cannot inspect raises DockerError.
+        """
+        manager = self._manager(self.client)
+
+        with self.assertRaises(DockerError) as context:
+            manager.image_content_fingerprint("missing")
+
+        self.assertIn("No such image: missing", str(context.exception))
+
+    def test_falls_back_to_the_cli_without_a_daemon(self):
+        """
+        Test that the CLI is used when nothing answers on the socket.
+        """
+        manager = self._manager(DockerEngineClient(self.socket_path + ".missing"))
+
+        _, image_id = manager.ensure_image_built(self.env, Mock())
+
+        self.assertEqual(image_id, "sha256:from-cli")
+        commands = [call.args[0][:2] for call in self.mock_run.call_args_list]
+        self.assertEqual(commands, [["docker", "--version"], ["docker", "inspect"]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,6 @@
 """Tests for executor module."""
 
+import io
 import os
 import platform
 import tempfile
@@ -10,7 +11,8 @@ from tempfile import TemporaryDirectory
 from unittest.mock import MagicMock, patch, call
 
 from helpers.logging import logger_stub
-from tasktree.executor import Executor
+from tasktree.executor import Executor, TaskStatus
+from tasktree.freshness import HostProbe, RunnerProbe
 from tasktree.interpreter import Interpreter
 from tasktree.parser import DockerRunner, HostRunner, Recipe, Runner, Task, parse_recipe
 from tasktree.process_runner import ProcessRunner, TaskOutputTypes, make_process_runner
@@ -195,6 +197,241 @@ class TestExecutor(unittest.TestCase):
             # Verify both tasks were executed
             self.assertEqual(process_runner_spy.run.call_count, 2)
 
+    def test_container_session_closes_after_runners_last_task(self):
+        """
+        Test that a runner's container session is closed once its last task
+        has run, and every session at the end of the run.
+        """
+
+        with TemporaryDirectory() as tmpdir:
+            project_root = Path(tmpdir)
+            recipe = Recipe(
+                tasks={
+                    "gen": Task(name="gen", cmd="gen", run_in="builder"),
+                    "compile": Task(
+                        name="compile", cmd="cc", run_in="builder", deps=["gen"]
+                    ),
+                    "report": Task(name="report", cmd="echo", deps=["compile"]),
+                },
+                project_root=project_root,
+                recipe_path=project_root / "tasktree.yaml",
+                runners={
+                    "builder": DockerRunner(
+                        name="builder", dockerfile="Dockerfile", context="."
+                    )
+                },
+            )
+            executor = Executor(
+                recipe, StateManager(project_root), logger_stub, make_process_runner
+            )
+            executor.docker_manager = MagicMock()
+            events = []
+            executor.docker_manager.close_sessions.side_effect = (
+                lambda runner_name=None: events.append(("close", runner_name))
+            )
+
+            with patch.object(
+                executor,
+                "check_task_status",
+                side_effect=lambda task, *_, **__: TaskStatus(task.name, True, "forced"),
+            ), patch.object(
+                executor,
+                "_run_task",
+                side_effect=lambda task, *_: events.append(("run", task.name)),
+            ):
+                executor.execute_task("report", TaskOutputTypes.ALL)
+
+            self.assertEqual(
+                events,
+                [
+                    ("run", "gen"),
+                    ("run", "compile"),
+                    ("close", "builder"),
+                    ("run", "report"),
+                    ("close", None),
+                ],
+            )
+
+    def test_image_builds_start_before_tasks_run(self):
+        """
+        Test that every Docker runner the run reaches starts building before
+        the first task runs, once per runner, with the build limit.
+        """
+
+        with TemporaryDirectory() as tmpdir:
+            project_root = Path(tmpdir)
+            recipe = Recipe(
+                tasks={
+                    "lint": Task(name="lint", cmd="lint", run_in="linter"),
+                    "gen": Task(name="gen", cmd="gen", run_in="builder"),
+                    "compile": Task(
+                        name="compile", cmd="cc", run_in="builder", deps=["gen"]
+                    ),
+                    "all": Task(name="all", cmd="echo", deps=["lint", "compile"]),
+                    "docs": Task(name="docs", cmd="doc", run_in="documenter"),
+                },
+                project_root=project_root,
+                recipe_path=project_root / "tasktree.yaml",
+                runners={
+                    name: DockerRunner(name=name, dockerfile="Dockerfile", context=".")
+                    for name in ("linter", "builder", "documenter")
+                },
+            )
+            executor = Executor(
+                recipe, StateManager(project_root), logger_stub, make_process_runner
+            )
+            executor.docker_manager = MagicMock()
+            events = []
+            executor.docker_manager.start_builds.side_effect = (
+                lambda builds, limit: events.append(
+                    ("build", sorted(env.name for env, _ in builds), limit)
+                )
+            )
+
+            with patch.object(
+                executor,
+                "check_task_status",
+                side_effect=lambda task, *_, **__: TaskStatus(task.name, True, "forced"),
+            ), patch.object(
+                executor,
+                "_run_task",
+                side_effect=lambda task, *_: events.append(("run", task.name)),
+            ):
+                executor.execute_task("all", TaskOutputTypes.ALL, max_concurrent_builds=2)
+
+            self.assertEqual(events[0], ("build", ["builder", "linter"], 2))
+            self.assertEqual(len(events), 5)
+            executor.docker_manager.cancel_builds.assert_called_once_with()
+
+    @unittest.skipIf(platform.system() == "Windows", "uses sh")
+    def test_image_build_output_shown_on_failure_without_multiplexer(self):
+        """
+        Test that with no output multiplexer (-j 1), a background build's
+        output never reaches the terminal alongside running tasks' output,
+        except for a failed build's stderr, under an "image:<runner>" header.
+        """
+
+        with TemporaryDirectory() as tmpdir:
+            project_root = Path(tmpdir)
+            recipe = Recipe(
+                tasks={
+                    "lint": Task(
+                        name="lint", cmd="lint", run_in="linter", task_output="none"
+                    ),
+                    "cc": Task(name="cc", cmd="cc", run_in="builder"),
+                    "doc": Task(name="doc", cmd="doc", run_in="documenter"),
+                    "all": Task(name="all", cmd="echo", deps=["lint", "cc", "doc"]),
+                },
+                project_root=project_root,
+                recipe_path=project_root / "tasktree.yaml",
+                runners={
+                    name: DockerRunner(name=name, dockerfile="Dockerfile", context=".")
+                    for name in ("linter", "builder", "documenter")
+                },
+            )
+            executor = Executor(
+                recipe, StateManager(project_root), logger_stub, make_process_runner
+            )
+            executor.docker_manager = MagicMock()
+            failing = {"linter", "documenter"}
+            stdout, stderr = io.StringIO(), io.StringIO()
+
+            def build(builds, limit):
+                for env, open_process_runner in builds:
+                    script = f"echo {env.name} out; echo {env.name} err >&2"
+                    if env.name in failing:
+                        script += "; exit 1"
+                    with open_process_runner() as process_runner:
+                        process_runner.run(["sh", "-c", script])
+
+            executor.docker_manager.start_builds.side_effect = build
+
+            with patch.object(
+                executor,
+                "check_task_status",
+                side_effect=lambda task, *_, **__: TaskStatus(task.name, True, "forced"),
+            ), patch.object(executor, "_run_task"), patch(
+                "sys.stdout", stdout
+            ), patch("sys.stderr", stderr):
+                executor.execute_task("all", None)
+
+            self.assertEqual(stdout.getvalue(), "")
+            self.assertEqual(
+                stderr.getvalue(), "==> image:documenter <==\ndocumenter err\n"
+            )
+
+    def test_host_run_creates_no_docker_manager(self):
+        """
+        Test that a run with no Docker runner never creates the Docker manager,
+        which is created on first use otherwise.
+        """
+
+        with TemporaryDirectory() as tmpdir:
+            project_root = Path(tmpdir)
+            recipe = Recipe(
+                tasks={
+                    "build": Task(name="build", cmd="make"),
+                    "test": Task(name="test", cmd="pytest", deps=["build"]),
+                },
+                project_root=project_root,
+                recipe_path=project_root / "tasktree.yaml",
+            )
+            executor = Executor(
+                recipe, StateManager(project_root), logger_stub, make_process_runner
+            )
+
+            with patch.object(
+                executor,
+                "check_task_status",
+                side_effect=lambda task, *_, **__: TaskStatus(task.name, True, "forced"),
+            ), patch.object(executor, "_run_task"):
+                executor.execute_task("test", TaskOutputTypes.ALL, jobs=2)
+
+            self.assertIsNone(executor._docker_manager)
+            self.assertIs(executor.docker_manager, executor.docker_manager)
+
+    @unittest.skipIf(platform.system() == "Windows", "containers never mirror Windows paths")
+    def test_freshness_probe_for_container_task_with_identity_mounts(self):
+        """
+        Test that a Docker task is probed on the host when its container sees
+        its files at their host paths, and in the container otherwise.
+        """
+
+        with TemporaryDirectory() as tmpdir:
+            project_root = Path(tmpdir)
+            cases = {
+                "auto-mounted project root": ([], ["src/**/*.c"], HostProbe),
+                "remapped project root": ([".:/workspace"], ["src/*.c"], RunnerProbe),
+                "pattern leaving the project": ([], ["../shared/*.h"], RunnerProbe),
+            }
+            for case, (volumes, inputs, probe_type) in cases.items():
+                with self.subTest(case=case):
+                    recipe = Recipe(
+                        tasks={
+                            "build": Task(
+                                name="build", cmd="make", run_in="builder", inputs=inputs
+                            )
+                        },
+                        project_root=project_root,
+                        recipe_path=project_root / "tasktree.yaml",
+                        runners={
+                            "builder": DockerRunner(
+                                name="builder",
+                                dockerfile="Dockerfile",
+                                context=".",
+                                volumes=volumes,
+                            )
+                        },
+                    )
+                    executor = Executor(
+                        recipe, StateManager(project_root), logger_stub, make_process_runner
+                    )
+
+                    with patch.dict(os.environ, {"TT_CONTAINERIZED_RUNNER": ""}):
+                        probe = executor._freshness_probe(recipe.tasks["build"], None)
+
+                    self.assertIsInstance(probe, probe_type)
+
     def test_execute_with_args(self):
         """
         Test executing task with arguments.
@@ -234,8 +471,9 @@ class TestExecutor(unittest.TestCase):
             # Script path is the last element; check it's a valid file path, not a shell name
             self.assertGreater(len(run_cmd), 1, "Should have at least shell + script_path")
 
+    @patch("tasktree.temp_script.memory_script", return_value=None)
     @patch("tasktree.temp_script.os.unlink")
-    def test_run_command_as_script_single_line(self, mock_unlink):
+    def test_run_command_as_script_single_line(self, mock_unlink, _memory_script):
         """
         Test _run_command_as_script with single-line command.
         """
@@ -276,8 +514,9 @@ class TestExecutor(unittest.TestCase):
             # Verify cleanup (unlink) was called
             mock_unlink.assert_called_once()
 
+    @patch("tasktree.temp_script.memory_script", return_value=None)
     @patch("tasktree.temp_script.os.unlink")
-    def test_run_command_as_script_with_preamble(self, unlink_spy):
+    def test_run_command_as_script_with_preamble(self, unlink_spy, _memory_script):
         """
         Test _run_command_as_script with preamble.
         """
@@ -306,8 +545,9 @@ class TestExecutor(unittest.TestCase):
             process_runner_spy.run.assert_called_once()
             unlink_spy.assert_called_once()
 
+    @patch("tasktree.temp_script.memory_script", return_value=None)
     @patch("tasktree.temp_script.os.unlink")
-    def test_run_command_as_script_multiline(self, unlink_spy):
+    def test_run_command_as_script_multiline(self, unlink_spy, _memory_script):
         """
         Test _run_command_as_script with multi-line command.
         """
@@ -366,22 +606,25 @@ class TestExecutor(unittest.TestCase):
             captured_script_path = None
             captured_script_content = None
 
-            def mock_subprocess_run(*args, **kwargs):
+            def mock_popen(*args, **kwargs):
                 # Capture script path (last element of cmd list) and content
                 nonlocal captured_script_path, captured_script_content
                 script_path = args[0][-1]
                 captured_script_path = script_path
                 self.assertTrue(
                     Path(script_path).exists(),
-                    "Script should exist when subprocess.run is called",
+                    "Script should exist when the process is started",
                 )
                 with open(script_path, "r") as f:
                     captured_script_content = f.read()
-                return MagicMock(returncode=0)
+                # Already exited, so it is waited for with Popen.wait
+                process = MagicMock(returncode=0)
+                process.wait.return_value = 0
+                return process
 
             process_runner = make_process_runner(TaskOutputTypes.ALL, logger_stub)
 
-            with patch("subprocess.run", side_effect=mock_subprocess_run):
+            with patch("subprocess.Popen", side_effect=mock_popen):
                 executor._run_command_as_script(
                     cmd="echo hello\necho world",
                     working_dir=project_root,
@@ -413,7 +656,80 @@ class TestExecutor(unittest.TestCase):
             self.assertLess(preamble_idx, command_idx, "Preamble should come before command")
 
             # Requirement 4: subprocess called with shell_cmd + [script_path]
-            # (Verified implicitly by mock_subprocess_run receiving args[0][-1] as script)
+            # (Verified implicitly by mock_popen receiving args[0][-1] as script)
+
+    @unittest.skipUnless(hasattr(os, "memfd_create"), "memfd_create is Linux-only")
+    def test_run_command_as_script_in_memory(self):
+        """
+        Test that a bash script is passed in memory, and closed afterwards.
+        """
+
+        with TemporaryDirectory() as tmpdir:
+            project_root = Path(tmpdir)
+            recipe = Recipe(
+                tasks={"test": Task(name="test", cmd="echo hello")},
+                project_root=project_root,
+                recipe_path=project_root / "tasktree.yaml",
+            )
+            executor = Executor(
+                recipe, StateManager(project_root), logger_stub, make_process_runner
+            )
+            process_runner_spy = MagicMock(spec=ProcessRunner)
+
+            executor._run_command_as_script(
+                cmd="echo hello",
+                working_dir=project_root,
+                task_name="test",
+                interpreter=Interpreter(cmd="bash"),
+                process_runner=process_runner_spy,
+            )
+
+            call_args = process_runner_spy.run.call_args
+            (script_fd,) = call_args.kwargs["pass_fds"]
+            self.assertEqual(call_args.args[0], ["bash", f"/proc/self/fd/{script_fd}"])
+            with self.assertRaises(OSError):
+                os.fstat(script_fd)
+
+    def test_run_command_as_script_persistent_interpreter(self):
+        """
+        Test that a persistent interpreter's task is started by its worker,
+        with no script file.
+        """
+
+        with TemporaryDirectory() as tmpdir:
+            project_root = Path(tmpdir)
+            recipe = Recipe(
+                tasks={"gen": Task(name="gen", cmd="print('hi')")},
+                project_root=project_root,
+                recipe_path=project_root / "tasktree.yaml",
+            )
+            executor = Executor(
+                recipe, StateManager(project_root), logger_stub, make_process_runner
+            )
+            worker = MagicMock()
+            executor._python_workers = MagicMock()
+            executor._python_workers.get.return_value = worker
+            process_runner_spy = MagicMock(spec=ProcessRunner)
+            interpreter = Interpreter(
+                cmd="python3", preamble="import sys", persistent=True
+            )
+
+            with patch("tasktree.executor.TempScript") as temp_script:
+                executor._run_command_as_script(
+                    cmd="print('hi')",
+                    working_dir=project_root,
+                    task_name="gen",
+                    interpreter=interpreter,
+                    process_runner=process_runner_spy,
+                )
+
+            temp_script.assert_not_called()
+            executor._python_workers.get.assert_called_once()
+            self.assertIs(executor._python_workers.get.call_args.args[0], interpreter)
+            worker.popen.assert_called_once_with("import sys\nprint('hi')")
+            call_args = process_runner_spy.run.call_args
+            self.assertEqual(call_args.args[0], ["python3", "<gen>"])
+            self.assertIs(call_args.kwargs["popen"], worker.popen.return_value)
 
     @patch("tasktree.temp_script.os.unlink")
     @unittest.skipUnless(platform.system() == "Windows", "Windows-only test")
@@ -1,10 +1,14 @@
 """Unit tests for the filesystem freshness probe abstraction."""
 
+import os
+import shutil
+import subprocess
+import sys
 import unittest
 from pathlib import Path
 from tempfile import TemporaryDirectory
 
-from tasktree.freshness import HostProbe, RunnerProbe
+from tasktree.freshness import GlobMatcher, HostProbe, RunnerProbe
 
 
 class TestHostProbe(unittest.TestCase):
@@ -83,42 +87,77 @@ class TestRunnerProbe(unittest.TestCase):
     standing in for the actual container execution.
     """
 
-    def test_passes_base_dir_and_patterns_to_runner(self):
-        """The probe invokes the runner with the base dir and each pattern as args."""
+    def test_passes_base_dir_and_find_roots_to_runner(self):
+        """The probe invokes the runner with the base dir and each pattern's literal prefix."""
         captured = {}
 
         def fake_run(argv):
             captured["argv"] = argv
-            return ""
+            return []
 
-        RunnerProbe("/work", fake_run).stat_patterns(["a.txt", "build/*.bin"])
+        RunnerProbe("/work", fake_run).stat_patterns(
+            ["a.txt", "build/*.bin", "build/**/*.o", "../shared/*.h"]
+        )
 
         argv = captured["argv"]
         self.assertEqual(argv[0], "sh")
         self.assertEqual(argv[1], "-c")
-        # After the script and the "sh" argv[0] sentinel come the base dir + patterns.
-        self.assertEqual(argv[3:], ["sh", "/work", "a.txt", "build/*.bin"])
+        # After the script and the "sh" argv[0] sentinel come the base dir + roots;
+        # build/**/*.o is covered by build/*.bin's root.
+        self.assertEqual(argv[3:], ["sh", "/work", "./../shared", "./a.txt", "./build"])
+
+    def test_matches_listing_against_patterns(self):
+        """'path\tmtime' lines are matched against every pattern, ** included."""
 
-    def test_parses_output_into_per_pattern_mtimes(self):
-        """Tab-separated 'pattern\\trelpath\\tmtime' lines parse into the result map."""
         def fake_run(argv):
-            return (
-                "build/*.bin\tbuild/a.bin\t1000\n"
-                "build/*.bin\tbuild/b.bin\t1001\n"
-                "a.txt\ta.txt\t1002\n"
+            return iter(
+                [
+                    "./build/a.bin\t1000.25",
+                    "./build/sub/b.bin\t1001",
+                    "./a.txt\t1002",
+                    "./other.txt\t1003",
+                ]
             )
 
         result = RunnerProbe("/work", fake_run).stat_patterns(
-            ["a.txt", "build/*.bin", "absent/*"]
+            ["a.txt", "build/*.bin", "build/**/*.bin", "absent/*"]
         )
 
         self.assertEqual(result["a.txt"], {"a.txt": 1002.0})
+        self.assertEqual(result["build/*.bin"], {"build/a.bin": 1000.25})
         self.assertEqual(
-            result["build/*.bin"], {"build/a.bin": 1000.0, "build/b.bin": 1001.0}
+            result["build/**/*.bin"],
+            {"build/a.bin": 1000.25, "build/sub/b.bin": 1001.0},
         )
-        # A pattern with no output line maps to an empty dict (not missing).
+        # A pattern with no matching line maps to an empty dict (not missing).
         self.assertEqual(result["absent/*"], {})
 
+    def test_dot_dot_and_symlinked_dirs_in_listing(self):
+        """
+        Listed ".." paths match only patterns spelling them out, and "**" does
+        not descend into listed links to directories.
+        """
+
+        def fake_run(argv):
+            return iter(
+                [
+                    "./src/lnk\t@link",
+                    "./src/a/x.c\t1000",
+                    "./src/lnk/y.c\t1001",
+                    "./src/a/../top.c\t1002",
+                ]
+            )
+
+        result = RunnerProbe("/work", fake_run).stat_patterns(
+            ["src/**/*.c", "src/a/../*.c", "src/*/*.c"]
+        )
+
+        self.assertEqual(result["src/**/*.c"], {"src/a/x.c": 1000.0})
+        self.assertEqual(result["src/a/../*.c"], {"src/a/../top.c": 1002.0})
+        self.assertEqual(
+            result["src/*/*.c"], {"src/a/x.c": 1000.0, "src/lnk/y.c": 1001.0}
+        )
+
     def test_empty_patterns_short_circuits(self):
         """No patterns means no container call and an empty result."""
         called = False
@@ -126,7 +165,7 @@ class TestRunnerProbe(unittest.TestCase):
         def fake_run(argv):
             nonlocal called
             called = True
-            return ""
+            return []
 
         result = RunnerProbe("/work", fake_run).stat_patterns([])
 
@@ -134,14 +173,174 @@ class TestRunnerProbe(unittest.TestCase):
         self.assertFalse(called, "runner should not be invoked for empty patterns")
 
     def test_ignores_malformed_lines(self):
-        """Lines that are not 3 tab-separated fields are skipped."""
+        """Lines without a tab-separated mtime are skipped."""
+
         def fake_run(argv):
-            return "garbage line\na.txt\ta.txt\t1002\n\n"
+            return ["garbage line", "./a.txt\tnot-a-time", "./a.txt\t1002", ""]
 
         result = RunnerProbe("/work", fake_run).stat_patterns(["a.txt"])
 
         self.assertEqual(result["a.txt"], {"a.txt": 1002.0})
 
 
+@unittest.skipUnless(shutil.which("sh") and shutil.which("find"), "needs sh and find")
+class TestRunnerProbeScript(unittest.TestCase):
+    """
+    Test the probe's script against a real find, run on the host.
+    """
+
+    PATTERNS = [
+        "*.txt",
+        "src/**/*.py",
+        "src/lib/[a-m]*.c",
+        "docs/readme.md",
+        "missing/*",
+    ]
+
+    def setUp(self):
+        self._tmpdir = TemporaryDirectory()
+        self.addCleanup(self._tmpdir.cleanup)
+        self.base = Path(self._tmpdir.name)
+        for name in [
+            "a.txt",
+            ".hidden.txt",
+            "src/main.py",
+            "src/pkg/deep/mod.py",
+            "src/lib/alpha.c",
+            "src/lib/zeta.c",
+            "docs/readme.md",
+        ]:
+            (self.base / name).parent.mkdir(parents=True, exist_ok=True)
+            (self.base / name).write_text(name)
+
+    def _probe(self, env=None, patterns=None):
+        def run(argv):
+            output = subprocess.run(
+                argv, capture_output=True, text=True, check=True, env=env
+            ).stdout
+            return output.splitlines()
+
+        return RunnerProbe(str(self.base), run).stat_patterns(patterns or self.PATTERNS)
+
+    def _env_without_find_printf(self):
+        """An environment whose find fails on -printf, as busybox's does."""
+        shim_dir = TemporaryDirectory()
+        self.addCleanup(shim_dir.cleanup)
+        shim = Path(shim_dir.name) / "find"
+        shim.write_text(
+            "#!/bin/sh\n"
+            'for arg in "$@"; do [ "$arg" = -printf ] && exit 1; done\n'
+            f'exec {shutil.which("find")} "$@"\n'
+        )
+        shim.chmod(0o755)
+        return dict(os.environ, PATH=f"{shim_dir.name}{os.pathsep}{os.environ['PATH']}")
+
+    def test_agrees_with_host_probe(self):
+        """The container probe finds what HostProbe finds, with the same mtimes."""
+        expected = HostProbe(self.base).stat_patterns(self.PATTERNS)
+
+        result = self._probe()
+
+        self.assertEqual(
+            {pattern: set(files) for pattern, files in result.items()},
+            {pattern: set(files) for pattern, files in expected.items()},
+        )
+        for pattern, files in expected.items():
+            for path, mtime in files.items():
+                self.assertAlmostEqual(result[pattern][path], mtime, places=5)
+
+    @unittest.skipIf(sys.platform == "win32", "creates symbolic links")
+    def test_agrees_with_host_probe_on_symlinks_and_dot_dot(self):
+        """
+        Links to directories, a trailing "**" and ".." prefixes select the
+        same files as HostProbe, with and without find -printf.
+        """
+        os.symlink("src/pkg", self.base / "lnk")
+        os.symlink("../docs", self.base / "src" / "docs_link")
+        patterns = [
+            "**/*.py",
+            "**/*.md",
+            "lnk/**/*.py",
+            "src/*/*.md",
+            "src/**",
+            "src/pkg/../**/*.c",
+            "src/**/*.c",
+        ]
+        expected = HostProbe(self.base).stat_patterns(patterns)
+
+        for env in (None, self._env_without_find_printf()):
+            with self.subTest(printf=env is None):
+                result = self._probe(env, patterns)
+                self.assertEqual(
+                    {pattern: set(files) for pattern, files in result.items()},
+                    {pattern: set(files) for pattern, files in expected.items()},
+                )
+
+    def test_falls_back_to_stat_without_find_printf(self):
+        """A find without -printf (busybox) still lists files, with whole-second mtimes."""
+        result = self._probe(self._env_without_find_printf())
+
+        mtime = (self.base / "src/pkg/deep/mod.py").stat().st_mtime
+        self.assertEqual(
+            set(result["src/**/*.py"]), {"src/main.py", "src/pkg/deep/mod.py"}
+        )
+        self.assertEqual(result["src/**/*.py"]["src/pkg/deep/mod.py"], int(mtime))
+
+
+class TestGlobMatcher(unittest.TestCase):
+    """
+    Test glob pattern matching for probe listings.
+    """
+
+    def test_matches(self):
+        """Segments match like pathlib's globbing; ** spans directories."""
+        cases = [
+            ("*.txt", "a.txt", True),
+            ("*.txt", "sub/a.txt", False),
+            ("**/*.txt", "a.txt", True),
+            ("**/*.txt", "x/y/a.txt", True),
+            ("./src/?.c", "src/a.c", True),
+            ("src/?.c", "src/ab.c", False),
+            ("[!a]*.c", "b.c", True),
+            ("[!a]*.c", "a.c", False),
+            ("/opt/*.h", "/opt/x.h", True),
+            ("a+b(1).txt", "a+b(1).txt", True),
+            # Wildcards and "**" never match "." or ".." segments
+            ("src/**/*.c", "src/a/../x.c", False),
+            ("src/*/x.c", "src/../x.c", False),
+            ("*/*.c", "../x.c", False),
+            ("../*.c", "../x.c", True),
+            ("src/a/../*.c", "src/a/../x.c", True),
+        ]
+        for pattern, path, matches in cases:
+            with self.subTest(pattern=pattern, path=path):
+                self.assertEqual(GlobMatcher(pattern).matches(path), matches)
+
+    def test_recursive_wildcard_skips_symlinked_dirs(self):
+        """** does not descend into links to directories; other segments do."""
+        links = {"src/lnk", "/opt/lnk"}
+        cases = [
+            ("src/**/*.c", "src/lnk/x.c", False),
+            ("src/**/*.c", "src/a/lnk/x.c", True),
+            ("**/*.c", "src/lnk/x.c", False),
+            ("src/lnk/**/*.c", "src/lnk/sub/x.c", True),
+            ("src/*/*.c", "src/lnk/x.c", True),
+            ("/opt/**/*.h", "/opt/lnk/x.h", False),
+            ("**/x/**/*.c", "x/x/lnk/y.c", True),
+        ]
+        for pattern, path, matches in cases:
+            with self.subTest(pattern=pattern, path=path):
+                self.assertEqual(GlobMatcher(pattern).matches(path, links), matches)
+
+    def test_trailing_recursive_wildcard(self):
+        """A trailing ** selects files from Python 3.13 on, as pathlib does."""
+        selects_files = sys.version_info >= (3, 13)
+
+        self.assertEqual(GlobMatcher("src/**").matches("src/a/x.c"), selects_files)
+        self.assertEqual(
+            GlobMatcher("src/**").matches("src/lnk/x.c", {"src/lnk"}), False
+        )
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -8,12 +8,41 @@ from tasktree.graph import (
     TaskNotFoundError,
     build_dependency_tree,
     get_implicit_inputs,
+    resolve_execution_graph,
     resolve_execution_order,
     resolve_self_references,
 )
 from tasktree.parser import DockerRunner, Recipe, Runner, Task
 
 
+class TestResolveExecutionGraph(unittest.TestCase):
+    """
+    Tests for the dependency edges returned alongside the execution order.
+    """
+
+    def test_diamond_edges(self):
+        """
+        Test that each invocation's edges point at the indices of its dependencies.
+        """
+        tasks = {
+            "a": Task(name="a", cmd="echo a"),
+            "b": Task(name="b", cmd="echo b", deps=["a"]),
+            "c": Task(name="c", cmd="echo c", deps=["a"]),
+            "d": Task(name="d", cmd="echo d", deps=["b", "c"]),
+        }
+        recipe = Recipe(
+            tasks=tasks, project_root=Path.cwd(), recipe_path=Path("tasktree.yaml")
+        )
+
+        order, deps = resolve_execution_graph(recipe, "d")
+        self.assertEqual(order, resolve_execution_order(recipe, "d"))
+        index = {name: idx for idx, (name, _) in enumerate(order)}
+        self.assertEqual(deps[index["a"]], set())
+        self.assertEqual(deps[index["b"]], {index["a"]})
+        self.assertEqual(deps[index["c"]], {index["a"]})
+        self.assertEqual(deps[index["d"]], {index["b"], index["c"]})
+
+
 class TestResolveExecutionOrder(unittest.TestCase):
     """
     """
@@ -0,0 +1,248 @@
+"""Tests for loading imported recipe files in worker processes."""
+
+import concurrent.futures
+import unittest
+import warnings
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from threading import Event, Thread
+from unittest.mock import patch
+
+import yaml
+
+from tasktree import import_loader
+from tasktree.parser import CircularImportError, parse_recipe
+
+
+def _write(project: Path, files: dict[str, str]) -> Path:
+    for name, text in files.items():
+        (project / name).write_text(text)
+    return project / "tasktree.yaml"
+
+
+def _imports(*names: str) -> str:
+    return "imports:\n" + "".join(
+        f"  - file: {name}.tasks\n    as: {name}\n" for name in names
+    )
+
+
+def _lib(name: str, tasks: int = 3) -> str:
+    return (
+        "runners:\n"
+        "  sh:\n    shell: bash\n"
+        "variables:\n"
+        f"  greeting: hello from {name}\n"
+        "tasks:\n"
+        + "".join(
+            f"  t{i}:\n"
+            f"    deps: [{f't{i - 1}' if i else ''}]\n"
+            f"    run_in: sh\n    pin_runner: true\n"
+            f"    cmd: echo {{{{ var.greeting }}}} {i}\n"
+            for i in range(tasks)
+        )
+    )
+
+
+class TestParallelImportLoader(unittest.TestCase):
+    """
+    Tests for parse_recipe with imported files loaded in worker processes.
+    """
+
+    def setUp(self):
+        tmpdir = TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.project = Path(tmpdir.name)
+
+    def _parse(self, recipe_path: Path, parallel: bool, **kwargs):
+        """Parse with the pool forced on, or never started."""
+        with (
+            patch.object(
+                import_loader, "_MIN_PARALLEL_BYTES", 0 if parallel else 1 << 62
+            ),
+            patch("tasktree.scheduler.host_cpu_count", return_value=2),
+        ):
+            return parse_recipe(recipe_path, **kwargs)
+
+    def _parse_error(self, recipe_path: Path, parallel: bool) -> Exception:
+        with self.assertRaises(Exception) as cm:
+            self._parse(recipe_path, parallel)
+        return cm.exception
+
+    def test_same_recipe_as_serial_parse(self):
+        """
+        Test that loading imports in workers gives the same tasks, runners and
+        variables, in the same order.
+        """
+        recipe_path = _write(
+            self.project,
+            {
+                "tasktree.yaml": _imports("a", "b", "c")
+                + "tasks:\n  build:\n    deps: [a.t2, c.nested.t0]\n    cmd: echo\n",
+                "a.tasks": _lib("a"),
+                "b.tasks": _lib("b"),
+                "c.tasks": _imports("nested") + _lib("c"),
+                "nested.tasks": _lib("nested"),
+            },
+        )
+
+        for kwargs in ({}, {"root_task": "build"}):
+            serial = self._parse(recipe_path, parallel=False, **kwargs)
+            with patch(
+                "concurrent.futures.ProcessPoolExecutor",
+                wraps=concurrent.futures.ProcessPoolExecutor,
+            ) as pool:
+                parallel = self._parse(recipe_path, parallel=True, **kwargs)
+
+            pool.assert_called_once()
+            self.assertEqual(list(parallel.tasks), list(serial.tasks), kwargs)
+            self.assertEqual(parallel.tasks, serial.tasks, kwargs)
+            self.assertEqual(parallel.runners, serial.runners, kwargs)
+            self.assertEqual(parallel.raw_variables, serial.raw_variables, kwargs)
+            self.assertEqual(parallel.source_files, serial.source_files, kwargs)
+            self.assertEqual(parallel.unparsed_tasks, serial.unparsed_tasks, kwargs)
+
+    def test_workers_are_not_forked_from_a_threaded_process(self):
+        """
+        Test that starting the pool while other threads run does not fork
+        this process.
+        """
+        recipe_path = _write(
+            self.project,
+            {
+                "tasktree.yaml": _imports("a", "b"),
+                "a.tasks": _lib("a"),
+                "b.tasks": _lib("b"),
+            },
+        )
+        stop = Event()
+        thread = Thread(target=stop.wait)
+        thread.start()
+        try:
+            with warnings.catch_warnings(record=True) as caught:
+                warnings.simplefilter("always")
+                recipe = self._parse(recipe_path, parallel=True)
+        finally:
+            stop.set()
+            thread.join()
+
+        self.assertIn("b.t2", recipe.tasks)
+        self.assertEqual(
+            [w for w in caught if "fork" in str(w.message)], [], "forked workers"
+        )
+
+    def test_first_error_in_import_order_is_raised(self):
+        """
+        Test that with several broken imports, the error raised is the one a
+        serial parse meets first.
+        """
+        files = {
+            "cycle.tasks": "imports:\n  - file: tasktree.yaml\n    as: root\n",
+            "invalid.tasks": "tasks:\n  a: [unclosed\n",
+            "ok.tasks": _lib("ok"),
+        }
+        cases = [
+            ("cycle", "invalid"),
+            ("invalid", "cycle"),
+            ("ok", "missing", "invalid"),
+            ("ok", "invalid", "missing"),
+        ]
+        for names in cases:
+            recipe_path = _write(
+                self.project, {**files, "tasktree.yaml": _imports(*names)}
+            )
+
+            serial = self._parse_error(recipe_path, parallel=False)
+            parallel = self._parse_error(recipe_path, parallel=True)
+
+            self.assertIs(type(parallel), type(serial), names)
+            self.assertEqual(str(parallel), str(serial), names)
+
+        self.assertIsInstance(
+            self._parse_error(
+                _write(self.project, {"tasktree.yaml": _imports("cycle")}),
+                parallel=True,
+            ),
+            CircularImportError,
+        )
+
+    def test_worker_yaml_error_names_file_and_line(self):
+        """
+        Test that a YAML error from a worker gives the imported file and line.
+        """
+        recipe_path = _write(
+            self.project,
+            {
+                "tasktree.yaml": _imports("ok", "invalid"),
+                "ok.tasks": _lib("ok"),
+                "invalid.tasks": "tasks:\n  a: [unclosed\n",
+            },
+        )
+
+        error = self._parse_error(recipe_path, parallel=True)
+
+        self.assertIsInstance(error, yaml.MarkedYAMLError)
+        self.assertIn("invalid.tasks", str(error))
+        self.assertEqual(error.problem_mark.line, 2)
+
+    def test_malformed_import_specs_are_left_to_the_parser(self):
+        """
+        Test that import specs without a file are reported as a serial parse
+        reports them.
+        """
+        recipe_path = _write(
+            self.project,
+            {"tasktree.yaml": "imports:\n  - as: lib\n  - just-a-string\n"},
+        )
+
+        serial = self._parse_error(recipe_path, parallel=False)
+        parallel = self._parse_error(recipe_path, parallel=True)
+
+        self.assertIs(type(parallel), type(serial))
+        self.assertEqual(str(parallel), str(serial))
+
+    def test_small_recipe_starts_no_pool(self):
+        """
+        Test that recipes with less imported YAML than the threshold are
+        loaded in this process.
+        """
+        recipe_path = _write(
+            self.project,
+            {
+                "tasktree.yaml": _imports("a", "b"),
+                "a.tasks": _lib("a"),
+                "b.tasks": _lib("b"),
+            },
+        )
+
+        with patch("concurrent.futures.ProcessPoolExecutor") as pool:
+            recipe = parse_recipe(recipe_path)
+
+        pool.assert_not_called()
+        self.assertIn("b.t2", recipe.tasks)
+
+    def test_single_cpu_starts_no_pool(self):
+        """
+        Test that no workers are started when only one CPU is available.
+        """
+        recipe_path = _write(
+            self.project,
+            {
+                "tasktree.yaml": _imports("a", "b"),
+                "a.tasks": _lib("a"),
+                "b.tasks": _lib("b"),
+            },
+        )
+
+        with (
+            patch.object(import_loader, "_MIN_PARALLEL_BYTES", 0),
+            patch("tasktree.scheduler.host_cpu_count", return_value=1),
+            patch("concurrent.futures.ProcessPoolExecutor") as pool,
+        ):
+            recipe = parse_recipe(recipe_path)
+
+        pool.assert_not_called()
+        self.assertIn("a.t0", recipe.tasks)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -29,6 +29,12 @@ class TestInterpreterConstruction(unittest.TestCase):
             Interpreter(cmd="sh", ext="bat")
         self.assertIn("dot", str(ctx.exception))
 
+    def test_persistent_requires_python(self):
+        with self.assertRaises(InterpreterError) as ctx:
+            Interpreter(cmd="bash", persistent=True)
+        self.assertIn("Python", str(ctx.exception))
+        self.assertTrue(Interpreter(cmd="python3 -u", persistent=True).persistent)
+
     def test_empty_ext_is_allowed(self):
         self.assertEqual(Interpreter(cmd="sh", ext="").ext, "")
 
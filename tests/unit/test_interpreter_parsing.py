@@ -51,6 +51,52 @@ class TestParseInlineInterpreter(unittest.TestCase):
             _parse_inline_interpreter({"cmd": "sh", "ext": "sh"}, "ctx")
         self.assertIn("dot", str(ctx.exception))
 
+    def test_persistent_with_preload(self):
+        interp = _parse_inline_interpreter(
+            {"cmd": "python3", "persistent": True, "preload": ["json", "yaml"]}, "ctx"
+        )
+        self.assertTrue(interp.persistent)
+        self.assertEqual(interp.preload, ("json", "yaml"))
+
+    def test_non_boolean_persistent_raises(self):
+        with self.assertRaises(ValueError) as ctx:
+            _parse_inline_interpreter({"cmd": "python3", "persistent": "yes"}, "ctx")
+        self.assertIn("boolean", str(ctx.exception))
+
+    def test_preload_must_be_module_names(self):
+        for preload in ("json", [""], [1]):
+            with self.subTest(preload=preload), self.assertRaises(ValueError):
+                _parse_inline_interpreter(
+                    {"cmd": "python3", "persistent": True, "preload": preload}, "ctx"
+                )
+
+    def test_persistent_non_python_interpreter_raises(self):
+        with self.assertRaises(ValueError) as ctx:
+            _parse_interpreters_section(
+                {"interpreters": {"sh_worker": {"cmd": "bash", "persistent": True}}}
+            )
+        self.assertIn("sh_worker", str(ctx.exception))
+        self.assertIn("Python", str(ctx.exception))
+
+    def test_persistent_python_commands(self):
+        for cmd in (
+            "python3",
+            "python3.12 -X dev",
+            "/usr/bin/env python3",
+            "uv run python",
+            r"C:\\Python312\\python.exe",
+            "pypy3",
+        ):
+            with self.subTest(cmd=cmd):
+                self.assertTrue(
+                    _parse_inline_interpreter({"cmd": cmd, "persistent": True}, "ctx").persistent
+                )
+
+    def test_preload_without_persistent_raises(self):
+        with self.assertRaises(ValueError) as ctx:
+            _parse_inline_interpreter({"cmd": "python3", "preload": ["json"]}, "ctx")
+        self.assertIn("persistent", str(ctx.exception))
+
 
 class TestParseInterpretersSection(unittest.TestCase):
     """Tests for the top-level 'interpreters' section."""
@@ -0,0 +1,100 @@
+"""Tests for jobserver module."""
+
+import os
+import unittest
+from unittest.mock import MagicMock
+
+from helpers.logging import logger_stub
+from tasktree.jobserver import JobServer, JobTokens
+
+
+@unittest.skipUnless(JobServer.supported(), "FIFO jobservers need os.mkfifo")
+class TestJobServer(unittest.TestCase):
+    """
+    Tests for the jobserver FIFO and its tokens.
+    """
+
+    def setUp(self):
+        self.server = JobServer(3, logger_stub)
+        self.addCleanup(self.server.close)
+
+    def test_pool_holds_one_token_per_extra_slot(self):
+        tokens = self.server.tokens
+        self.assertTrue(tokens.try_acquire())
+        self.assertTrue(tokens.try_acquire())
+        self.assertFalse(tokens.try_acquire())
+        self.assertEqual(tokens.held, 2)
+
+        tokens.release()
+        self.assertEqual(tokens.held, 1)
+        self.assertTrue(tokens.try_acquire())
+
+    def test_close_removes_fifo(self):
+        fifo_path = self.server.tokens.fifo_path
+        self.assertTrue(fifo_path.exists())
+        self.server.close()
+        self.assertFalse(fifo_path.parent.exists())
+
+    def test_makeflags_advertises_fifo_then_descriptors(self):
+        read_fd, write_fd = self.server.tokens.pass_fds
+        self.assertEqual(
+            self.server.tokens.makeflags(None),
+            f"-j3 --jobserver-auth=fifo:{self.server.tokens.fifo_path} "
+            f"--jobserver-auth={read_fd},{write_fd}",
+        )
+
+    def test_makeflags_replaces_existing_job_flags(self):
+        flags = self.server.tokens.makeflags("-k -j8 --jobserver-auth=3,4 --no-print-directory")
+        self.assertTrue(flags.startswith("-k --no-print-directory -j3 "))
+        self.assertNotIn("-j8", flags)
+        self.assertNotIn("=3,4", flags)
+
+    def test_client_shares_the_servers_pool(self):
+        makeflags = self.server.tokens.makeflags("")
+        client = JobTokens.from_makeflags(makeflags, logger_stub)
+        self.assertIsNotNone(client)
+        self.addCleanup(client.close)
+
+        self.assertTrue(client.try_acquire())
+        self.assertTrue(self.server.tokens.try_acquire())
+        self.assertFalse(client.try_acquire())
+
+        client.close()
+        self.assertTrue(self.server.tokens.try_acquire())
+
+    def test_client_keeps_inherited_job_count(self):
+        client = JobTokens(self.server.tokens.fifo_path, logger_stub)
+        try:
+            flags = client.makeflags(f"-j3 --jobserver-auth=fifo:{client.fifo_path}")
+            self.assertTrue(flags.startswith("-j3 --jobserver-auth=fifo:"))
+            self.assertEqual(flags.count("--jobserver-auth=fifo:"), 1)
+        finally:
+            client.close()
+
+    def test_child_descriptors_are_blocking(self):
+        for fd in self.server.tokens.pass_fds:
+            self.assertTrue(os.get_blocking(fd))
+
+
+class TestJobTokensFromMakeflags(unittest.TestCase):
+    """
+    Tests for detecting an inherited jobserver.
+    """
+
+    def test_no_jobserver(self):
+        self.assertIsNone(JobTokens.from_makeflags(None, logger_stub))
+        self.assertIsNone(JobTokens.from_makeflags("-k", logger_stub))
+
+    def test_descriptor_form_is_ignored(self):
+        logger = MagicMock()
+        self.assertIsNone(JobTokens.from_makeflags("-j4 --jobserver-auth=3,4", logger))
+        logger.debug.assert_called_once()
+
+    def test_missing_fifo_is_ignored(self):
+        self.assertIsNone(
+            JobTokens.from_makeflags("--jobserver-auth=fifo:/nonexistent/fifo", logger_stub)
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,301 @@
+"""Tests for the LSP server's recipe diagnostics (diagnostics.py)."""
+
+import os
+import threading
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+from tasktree.lsp.diagnostics import DiagnosticsWorker, ImportCache, check_document
+
+
+class TestCheckDocument(unittest.TestCase):
+    """
+    Tests for check_document().
+    """
+
+    def setUp(self):
+        tmpdir = TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.root = Path(tmpdir.name)
+        self.path = self.root / "tasktree.yaml"
+
+    def _check(self, text, open_documents=None):
+        return check_document(self.path, text, open_documents)
+
+    def test_valid_document(self):
+        """
+        Test that a valid recipe has no diagnostics.
+        """
+        text = "tasks:\n  build:\n    cmd: make\n  test:\n    deps: [build]\n    cmd: pytest\n"
+
+        self.assertEqual(self._check(text), [])
+
+    def test_unknown_dependency(self):
+        """
+        Test that a dependency on an unknown task is reported at the task.
+        """
+        text = "tasks:\n  build:\n    deps: [nope]\n    cmd: make\n"
+
+        [diagnostic] = self._check(text)
+
+        self.assertIn("unknown task 'nope'", diagnostic.message)
+        self.assertEqual(diagnostic.range.start.line, 1)
+        self.assertEqual(diagnostic.range.start.character, 2)
+        self.assertEqual(diagnostic.range.end.character, 7)
+        self.assertEqual(diagnostic.source, "tasktree")
+
+    def test_dependency_cycle(self):
+        """
+        Test that each task in a cycle is reported.
+        """
+        text = (
+            "tasks:\n"
+            "  a:\n    deps: [b]\n    cmd: x\n"
+            "  b:\n    deps: [a]\n    cmd: y\n"
+            "  c:\n    deps: [a]\n    cmd: z\n"
+        )
+
+        diagnostics = self._check(text)
+
+        self.assertEqual(sorted(d.range.start.line for d in diagnostics), [1, 4])
+        self.assertTrue(all("Dependency cycle" in d.message for d in diagnostics))
+
+    def test_invalid_arg_spec(self):
+        """
+        Test that an arg whose default does not match its type is reported at
+        the task declaring it.
+        """
+        text = (
+            "tasks:\n  build:\n    args: [{jobs: {type: int, default: many}}]\n"
+            "    cmd: make\n"
+        )
+
+        [diagnostic] = self._check(text)
+
+        self.assertIn("argument 'jobs'", diagnostic.message)
+        self.assertEqual(diagnostic.range.start.line, 1)
+
+    def test_parse_error_is_located_at_its_task(self):
+        """
+        Test that an error raised by parse_recipe about a task is reported at
+        that task.
+        """
+        text = "tasks:\n  ok:\n    cmd: x\n  build:\n    run_in: nowhere\n    cmd: y\n"
+
+        [diagnostic] = self._check(text)
+
+        self.assertIn("nowhere", diagnostic.message)
+        self.assertEqual(diagnostic.range.start.line, 3)
+
+    def test_yaml_error(self):
+        """
+        Test that invalid YAML is reported where the YAML parser stopped.
+        """
+        text = "tasks:\n  build:\n    cmd: [make\n"
+
+        [diagnostic] = self._check(text)
+
+        self.assertTrue(diagnostic.message.startswith("Invalid YAML"))
+        # The parser stops at the end of the text, on the last line
+        self.assertEqual(diagnostic.range.start.line, 2)
+
+    def test_missing_import(self):
+        """
+        Test that an import of a missing file is reported at the import.
+        """
+        text = "imports:\n  - file: nope.tasks\n    as: nope\ntasks: {}\n"
+
+        [diagnostic] = self._check(text)
+
+        self.assertIn("nope.tasks", diagnostic.message)
+        self.assertEqual(diagnostic.range.start.line, 1)
+        self.assertEqual(diagnostic.range.start.character, 10)
+
+    def test_unknown_imported_dependency(self):
+        """
+        Test that a dependency on a task missing from an imported file is
+        reported.
+        """
+        (self.root / "build.tasks").write_text("tasks:\n  compile:\n    cmd: cc\n")
+        text = (
+            "imports:\n  - file: build.tasks\n    as: b\n"
+            "tasks:\n  main:\n    deps: [b.compile, b.link]\n    cmd: x\n"
+        )
+
+        [diagnostic] = self._check(text)
+
+        self.assertIn("unknown task 'b.link'", diagnostic.message)
+
+    def test_open_import_is_checked_from_the_editor(self):
+        """
+        Test that an imported file open in the editor is read from its
+        unsaved text.
+        """
+        imported = self.root / "build.tasks"
+        imported.write_text("tasks:\n  compile:\n    cmd: cc\n")
+        text = (
+            "imports:\n  - file: build.tasks\n    as: b\n"
+            "tasks:\n  main:\n    deps: [b.link]\n    cmd: x\n"
+        )
+        open_documents = {imported: "tasks:\n  link:\n    cmd: ld\n"}
+
+        self.assertEqual(self._check(text, open_documents), [])
+
+    def test_unsaved_document(self):
+        """
+        Test that a document not yet saved to disk is checked.
+        """
+        self.assertFalse(self.path.exists())
+
+        self.assertEqual(self._check("tasks:\n  a:\n    cmd: x\n"), [])
+
+    def test_eval_and_read_variables_are_not_evaluated(self):
+        """
+        Test that checking a document runs no eval command and reads no file.
+        """
+        marker = self.root / "ran"
+        text = (
+            "variables:\n"
+            f"  ran: {{ eval: touch {marker} }}\n"
+            "  secret: { read: missing.txt }\n"
+            "tasks:\n  a:\n    cmd: echo {{ var.ran }} {{ var.secret }}\n"
+        )
+
+        self.assertEqual(self._check(text), [])
+        self.assertFalse(marker.exists())
+
+    def test_non_ascii_columns_are_utf16(self):
+        """
+        Test that positions count UTF-16 code units, as LSP does.
+        """
+        text = "tasks:\n  bäd:\n    deps: [nope]\n    cmd: x\n"
+
+        [diagnostic] = self._check(text)
+
+        self.assertIn("unknown task", diagnostic.message)
+        self.assertEqual(diagnostic.range.end.character, 5)
+
+
+class TestImportCache(unittest.TestCase):
+    """
+    Tests for ImportCache.
+    """
+
+    def setUp(self):
+        tmpdir = TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.path = Path(tmpdir.name) / "build.tasks"
+        self.path.write_text("tasks:\n  a: {}\n")
+        self.cache = ImportCache()
+
+    def test_unchanged_file_is_loaded_once(self):
+        """
+        Test that an unchanged file is not read again.
+        """
+        self.cache.load(self.path)
+
+        with patch(
+            "tasktree.lsp.diagnostics.load_yaml_file",
+            side_effect=AssertionError("read"),
+        ):
+            self.assertEqual(self.cache.load(self.path), {"tasks": {"a": {}}})
+
+    def test_changed_file_is_loaded_again(self):
+        """
+        Test that a file whose size or modification time changed is re-read.
+        """
+        self.cache.load(self.path)
+
+        self.path.write_text("tasks:\n  a: {}\n  b: {}\n")
+        stat = self.path.stat()
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+
+        self.assertEqual(list(self.cache.load(self.path)["tasks"]), ["a", "b"])
+
+    def test_load_returns_a_copy(self):
+        """
+        Test that changing a loaded document does not change the cache.
+        """
+        self.cache.load(self.path)["tasks"].clear()
+
+        self.assertEqual(self.cache.load(self.path), {"tasks": {"a": {}}})
+
+
+class TestDiagnosticsWorker(unittest.TestCase):
+    """
+    Tests for DiagnosticsWorker.
+    """
+
+    def setUp(self):
+        tmpdir = TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.path = Path(tmpdir.name) / "tasktree.yaml"
+        self.published = []
+        self.done = threading.Event()
+
+    def _publish(self, uri, version, diagnostics):
+        self.published.append((uri, version, diagnostics))
+        self.done.set()
+
+    def _worker(self, delay):
+        worker = DiagnosticsWorker(self._publish, delay=delay)
+        self.addCleanup(worker.stop)
+        return worker
+
+    def test_only_the_latest_version_is_published(self):
+        """
+        Test that edits made within the debounce delay are checked once, at
+        their latest version.
+        """
+        worker = self._worker(delay=0.2)
+
+        worker.schedule("file:///a", 1, self.path, "tasks:\n  a:\n    deps: [x]\n")
+        worker.schedule("file:///a", 2, self.path, "tasks:\n  a:\n    cmd: ok\n")
+
+        self.assertTrue(self.done.wait(5))
+        self.assertEqual(self.published, [("file:///a", 2, [])])
+
+    def test_outdated_check_is_not_published(self):
+        """
+        Test that a check whose document changed while it ran is dropped.
+        """
+        worker = self._worker(delay=0)
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow_check(*args):
+            started.set()
+            release.wait(5)
+            return []
+
+        with patch("tasktree.lsp.diagnostics.check_document", side_effect=slow_check):
+            worker.schedule("file:///a", 1, self.path, "tasks: {}\n")
+            self.assertTrue(started.wait(5))
+            worker.cancel("file:///a")
+            release.set()
+            worker.stop()
+            worker._thread.join(5)
+
+        self.assertEqual(self.published, [])
+
+    def test_cancelled_document_is_not_checked(self):
+        """
+        Test that a pending check is dropped when its document is closed.
+        """
+        worker = self._worker(delay=0.2)
+
+        with patch("tasktree.lsp.diagnostics.check_document") as check:
+            worker.schedule("file:///a", 1, self.path, "tasks: {}\n")
+            worker.cancel("file:///a")
+            worker.schedule("file:///b", 1, self.path, "tasks: {}\n")
+            check.return_value = []
+            self.assertTrue(self.done.wait(5))
+
+        self.assertEqual([uri for uri, _, _ in self.published], ["file:///b"])
+        check.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,11 +2,14 @@
 
 import os
 import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
 from unittest.mock import MagicMock, Mock, patch
 
 import tasktree
 import tasktree.lsp.server
 from tasktree.lsp.server import TasktreeLanguageServer, create_server, main, _is_inside_open_parens
+from tasktree.lsp.ts_context import parse_document
 from lsprotocol.types import (
     InitializeParams,
     CompletionOptions,
@@ -19,9 +22,19 @@ from lsprotocol.types import (
     TextDocumentIdentifier,
     VersionedTextDocumentIdentifier,
     TextDocumentContentChangeEvent,
+    TextDocumentContentChangePartial,
+    TextDocumentContentChangeWholeDocument,
+    Range,
     CompletionParams,
     Position,
     CompletionList,
+    ClientCapabilities,
+    DidChangeWatchedFilesClientCapabilities,
+    DidChangeWatchedFilesParams,
+    FileChangeType,
+    FileEvent,
+    InitializedParams,
+    WorkspaceClientCapabilities,
 )
 
 
@@ -65,7 +78,7 @@ class TestCreateServer(unittest.TestCase):
 
         # Verify the result contains text sync capability
         self.assertIsNotNone(result.capabilities)
-        self.assertEqual(result.capabilities.text_document_sync, TextDocumentSyncKind.Full)
+        self.assertEqual(result.capabilities.text_document_sync, TextDocumentSyncKind.Incremental)
 
         # Verify the result contains completion capabilities
         self.assertIsNotNone(result.capabilities.completion_provider)
@@ -165,6 +178,42 @@ class TestCreateServer(unittest.TestCase):
             "tasks:\n  hello:\n    cmd: echo world",
         )
 
+    def test_did_change_applies_incremental_changes(self):
+        """Test that did_change applies range edits to the text and tree."""
+        server = create_server()
+        uri = "file:///test/tasktree.yaml"
+        server.handlers["textDocument/didOpen"](
+            DidOpenTextDocumentParams(
+                text_document=TextDocumentItem(
+                    uri=uri,
+                    language_id="yaml",
+                    version=1,
+                    text="tasks:\n  hello:\n    cmd: echo hello\n",
+                )
+            )
+        )
+
+        def edit(start, end, text):
+            return TextDocumentContentChangePartial(
+                range=Range(start=Position(*start), end=Position(*end)), text=text
+            )
+
+        server.handlers["textDocument/didChange"](
+            DidChangeTextDocumentParams(
+                text_document=VersionedTextDocumentIdentifier(uri=uri, version=2),
+                content_changes=[
+                    edit((2, 14), (2, 19), "world"),
+                    edit((3, 0), (3, 0), "  bye:\n    deps: [hello]\n"),
+                ],
+            )
+        )
+
+        text = "tasks:\n  hello:\n    cmd: echo world\n  bye:\n    deps: [hello]\n"
+        self.assertEqual(server.documents[uri], text)
+        self.assertEqual(
+            str(server.trees[uri].root_node), str(parse_document(text).root_node)
+        )
+
     def test_did_close_handler_registered(self):
         """Test that the did_close handler is registered."""
         server = create_server()
@@ -1440,6 +1489,187 @@ class TestDepsTaskNameCompletion(unittest.TestCase):
         task_name_items = [i for i in result.items if i.kind == CompletionItemKind.Reference]
         self.assertEqual(task_name_items, [], "Task names must not appear inside dep argument parens")
 
+    def test_parses_per_request_logged(self):
+        """Test that completion logs its parse count, and that a broken
+        document's recovery tree is parsed once per version."""
+        self._open_doc(
+            "tasks:\n  build:\n    cmd: echo build\n  test:\n    deps: [bu"
+        )
+        with self.assertLogs("tasktree.lsp.server", level="DEBUG") as logs:
+            first = self._complete_at(4, len("    deps: [bu"))
+            second = self._complete_at(4, len("    deps: [bu"))
+        self.assertEqual([i.label for i in first.items], ["build"])
+        self.assertEqual(second.items, first.items)
+        self.assertIn("1 item(s), 1 parse(s)", logs.output[0])
+        self.assertIn("1 item(s), 0 parse(s)", logs.output[1])
+
+    def test_last_valid_tree_used_when_recovery_fails(self):
+        """Test that tasks come from the last version without errors when
+        none can be recovered from the broken document."""
+        self._open_doc(
+            "tasks:\n  build:\n    cmd: x\n  test:\n    deps:\n      - "
+        )
+        self.server.handlers["textDocument/didChange"](DidChangeTextDocumentParams(
+            text_document=VersionedTextDocumentIdentifier(uri=self.uri, version=2),
+            content_changes=[TextDocumentContentChangePartial(
+                range=Range(start=Position(line=1, character=2),
+                            end=Position(line=1, character=2)),
+                text='"',
+            )],
+        ))
+        result = self._complete_at(5, len("      - "))
+        self.assertEqual([i.label for i in result.items], ["build"])
+
+
+class TestWorkspaceImports(unittest.TestCase):
+    """Tests for deps completion of imported tasks through the workspace index."""
+
+    def setUp(self):
+        """Create a workspace with a recipe importing a file that imports another."""
+        tmpdir = TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.root = Path(tmpdir.name)
+        (self.root / "build.tasks").write_text(
+            "imports:\n  - file: utils.tasks\n    as: utils\n"
+            "tasks:\n  compile:\n    cmd: cc\n"
+        )
+        self.utils = self.root / "utils.tasks"
+        self.utils.write_text("tasks:\n  clean:\n    cmd: rm\n")
+        self.uri = (self.root / "tasktree.yaml").as_uri()
+        self.server = create_server()
+
+    def _labels(self) -> list[str]:
+        text = (
+            "imports:\n  - file: build.tasks\n    as: build\n"
+            "tasks:\n  main:\n    deps:\n      - "
+        )
+        self.server.handlers["textDocument/didOpen"](DidOpenTextDocumentParams(
+            text_document=TextDocumentItem(
+                uri=self.uri, language_id="yaml", version=1, text=text,
+            )
+        ))
+        result = self.server.handlers["textDocument/completion"](CompletionParams(
+            text_document=TextDocumentIdentifier(uri=self.uri),
+            position=Position(line=6, character=len("      - ")),
+        ))
+        return [item.label for item in result.items]
+
+    def test_transitively_imported_tasks_offered(self):
+        """Test that tasks of imported files' imports are offered, namespaced."""
+        self.assertEqual(self._labels(), ["build.compile", "build.utils.clean"])
+
+    def test_watched_file_change_updates_completions(self):
+        """Test that a didChangeWatchedFiles event re-indexes the changed file."""
+        self._labels()
+        self.utils.write_text("tasks:\n  clean:\n    cmd: rm\n  lint:\n    cmd: ruff\n")
+        self.server.handlers["workspace/didChangeWatchedFiles"](
+            DidChangeWatchedFilesParams(changes=[
+                FileEvent(uri=self.utils.as_uri(), type=FileChangeType.Changed),
+            ])
+        )
+        self.assertIn("build.utils.lint", self._labels())
+
+        self.utils.unlink()
+        self.server.handlers["workspace/didChangeWatchedFiles"](
+            DidChangeWatchedFilesParams(changes=[
+                FileEvent(uri=self.utils.as_uri(), type=FileChangeType.Deleted),
+            ])
+        )
+        self.assertEqual(self._labels(), ["build.compile"])
+
+    def test_watcher_registered_when_client_supports_it(self):
+        """Test that the initialized notification registers a file watcher,
+        only for clients that accept dynamic registration."""
+        for dynamic, expected_calls in ((True, 1), (False, 0)):
+            with self.subTest(dynamic_registration=dynamic):
+                server = create_server()
+                server.handlers["initialize"](InitializeParams(
+                    process_id=1,
+                    root_uri=self.root.as_uri(),
+                    capabilities=ClientCapabilities(
+                        workspace=WorkspaceClientCapabilities(
+                            did_change_watched_files=(
+                                DidChangeWatchedFilesClientCapabilities(
+                                    dynamic_registration=dynamic
+                                )
+                            )
+                        )
+                    ),
+                ))
+                with patch.object(server, "client_register_capability") as register:
+                    server.handlers["initialized"](InitializedParams())
+                self.assertEqual(register.call_count, expected_calls)
+                if expected_calls:
+                    registration = register.call_args.args[0].registrations[0]
+                    self.assertEqual(
+                        registration.method, "workspace/didChangeWatchedFiles"
+                    )
+
+
+class TestDiagnostics(unittest.TestCase):
+    """Tests for the server's scheduling of document diagnostics."""
+
+    def setUp(self):
+        """Create a server that has been initialized, with a mocked worker."""
+        tmpdir = TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.root = Path(tmpdir.name)
+        self.uri = (self.root / "tasktree.yaml").as_uri()
+        self.server = create_server()
+        self.server.handlers["initialize"](InitializeParams(
+            process_id=1, root_uri=self.root.as_uri(), capabilities=ClientCapabilities(),
+        ))
+        self.server.diagnostics = Mock()
+
+    def _open(self, uri, text, version=1):
+        self.server.handlers["textDocument/didOpen"](DidOpenTextDocumentParams(
+            text_document=TextDocumentItem(
+                uri=uri, language_id="yaml", version=version, text=text,
+            )
+        ))
+
+    def test_open_and_change_schedule_a_check(self):
+        """Test that opening and editing a document schedule a check of its
+        latest version, with the other open documents' text."""
+        other = self.root / "build.tasks"
+        self._open(other.as_uri(), "tasks: {}\n")
+        self._open(self.uri, "tasks:\n")
+        self.server.handlers["textDocument/didChange"](DidChangeTextDocumentParams(
+            text_document=VersionedTextDocumentIdentifier(uri=self.uri, version=2),
+            content_changes=[TextDocumentContentChangeWholeDocument(text="tasks: {}\n")],
+        ))
+
+        uri, version, path, text, open_documents = (
+            self.server.diagnostics.schedule.call_args.args
+        )
+        self.assertEqual((uri, version, text), (self.uri, 2, "tasks: {}\n"))
+        self.assertEqual(Path(path), self.root / "tasktree.yaml")
+        self.assertEqual(open_documents, {other: "tasks: {}\n"})
+
+    def test_close_clears_diagnostics(self):
+        """Test that closing a document cancels its check and clears its
+        diagnostics."""
+        self._open(self.uri, "tasks:\n")
+        with patch.object(self.server, "publish_diagnostics") as publish:
+            self.server.handlers["textDocument/didClose"](DidCloseTextDocumentParams(
+                text_document=TextDocumentIdentifier(uri=self.uri)
+            ))
+
+        self.server.diagnostics.cancel.assert_called_once_with(self.uri)
+        publish.assert_called_once_with(self.uri, None, [])
+
+    def test_not_scheduled_before_initialize(self):
+        """Test that no check is scheduled for a server not initialized."""
+        server = create_server()
+        server.diagnostics = Mock()
+        server.handlers["textDocument/didOpen"](DidOpenTextDocumentParams(
+            text_document=TextDocumentItem(
+                uri=self.uri, language_id="yaml", version=1, text="tasks:\n",
+            )
+        ))
+
+        server.diagnostics.schedule.assert_not_called()
+
 
 class TestIsInsideOpenParens(unittest.TestCase):
     """Unit tests for _is_inside_open_parens helper."""
@@ -0,0 +1,199 @@
+"""Tests for the LSP workspace index (workspace_index.py)."""
+
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+from tasktree.lsp.ts_context import parse_document
+from tasktree.lsp.workspace_index import TaskSymbols, WorkspaceIndex, is_recipe_file
+
+ROOT_RECIPE = """\
+imports:
+  - file: tools/build.tasks
+    as: build
+tasks:
+  main:
+    deps: [build.compile]
+"""
+
+BUILD_TASKS = """\
+imports:
+  - file: ../utils.tasks
+    as: utils
+tasks:
+  compile:
+    args: [target]
+    outputs: [{binary: app}]
+"""
+
+UTILS_TASKS = """\
+tasks:
+  clean:
+    cmd: rm -rf build
+"""
+
+
+class TestWorkspaceIndex(unittest.TestCase):
+    """
+    Tests for WorkspaceIndex.
+    """
+
+    def setUp(self):
+        tmpdir = TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.root = Path(tmpdir.name)
+        (self.root / "tools").mkdir()
+        self.recipe = self._write("tasktree.yaml", ROOT_RECIPE)
+        self._write("tools/build.tasks", BUILD_TASKS)
+        self.utils = self._write("utils.tasks", UTILS_TASKS)
+        self.index = WorkspaceIndex()
+
+    def _write(self, name: str, text: str) -> Path:
+        path = self.root / name
+        path.write_text(text)
+        return path
+
+    def test_imported_tasks_are_namespaced_transitively(self):
+        """
+        Test that tasks imported through an imported file get the chain of
+        namespaces the parser gives them.
+        """
+        self.index.build(self.root)
+
+        tasks = self.index.imported_tasks(self.recipe)
+
+        self.assertEqual(sorted(tasks), ["build.compile", "build.utils.clean"])
+        self.assertEqual(
+            tasks["build.compile"],
+            TaskSymbols(args=("target",), outputs=("binary",)),
+        )
+
+    def test_build_indexes_recipes_and_their_imports(self):
+        """
+        Test that build() reads every recipe and imported file, after which
+        completion reads nothing from disk.
+        """
+        self.index.build(self.root)
+
+        with patch.object(Path, "read_text", side_effect=AssertionError("read")):
+            self.assertEqual(len(self.index.imported_tasks(self.recipe)), 2)
+        self.assertEqual(self.index.symbols(self.utils).tasks, {"clean": TaskSymbols()})
+
+    def test_imported_tasks_are_memoized(self):
+        """
+        Test that a second request returns the memoized tasks.
+        """
+        first = self.index.imported_tasks(self.recipe)
+
+        self.assertIs(self.index.imported_tasks(self.recipe), first)
+
+    def test_changed_import_invalidates_importers(self):
+        """
+        Test that a watched-file change to a transitively imported file is
+        seen by the files importing it.
+        """
+        self.index.build(self.root)
+        self.index.imported_tasks(self.recipe)
+
+        self._write(
+            "utils.tasks", "tasks:\n  clean:\n    cmd: x\n  lint:\n    cmd: y\n"
+        )
+        self.index.file_changed(self.utils)
+
+        self.assertIn("build.utils.lint", self.index.imported_tasks(self.recipe))
+
+    def test_deleted_import(self):
+        """
+        Test that a deleted file's tasks are no longer offered.
+        """
+        self.index.build(self.root)
+        self.index.imported_tasks(self.recipe)
+
+        self.utils.unlink()
+        self.index.file_deleted(self.utils)
+
+        self.assertEqual(
+            list(self.index.imported_tasks(self.recipe)), ["build.compile"]
+        )
+
+    def test_open_document_overrides_the_file_on_disk(self):
+        """
+        Test that an open document's unsaved text is indexed, both as an
+        importer and as an imported file, until it is closed.
+        """
+        self.index.build(self.root)
+        self.index.update_document(
+            self.utils, parse_document("tasks:\n  clean:\n  unsaved:\n")
+        )
+        self.index.update_document(
+            self.recipe,
+            parse_document("imports:\n  - file: utils.tasks\n    as: u\ntasks: {}\n"),
+        )
+
+        self.assertEqual(
+            sorted(self.index.imported_tasks(self.recipe)), ["u.clean", "u.unsaved"]
+        )
+        # Changes on disk to an open document are ignored...
+        self.index.file_changed(self.utils)
+        self.assertIn("u.unsaved", self.index.imported_tasks(self.recipe))
+
+        # ...until it is closed
+        self.index.close_document(self.utils)
+        self.assertEqual(list(self.index.imported_tasks(self.recipe)), ["u.clean"])
+
+    def test_broken_document_keeps_its_imports(self):
+        """
+        Test that while an open document does not parse, its last imports
+        are kept.
+        """
+        self.index.update_document(self.recipe, parse_document(ROOT_RECIPE))
+        self.index.imported_tasks(self.recipe)
+
+        self.index.update_document(
+            self.recipe, parse_document(ROOT_RECIPE.replace("tasks:", "tasks: [{"))
+        )
+
+        self.assertEqual(len(self.index.imported_tasks(self.recipe)), 2)
+
+    def test_circular_imports(self):
+        """
+        Test that an import back into a file already being gathered is not
+        followed.
+        """
+        self._write(
+            "a.tasks", "imports:\n  - file: b.tasks\n    as: b\ntasks:\n  a1: {}\n"
+        )
+        self._write(
+            "b.tasks", "imports:\n  - file: a.tasks\n    as: a\ntasks:\n  b1: {}\n"
+        )
+
+        tasks = self.index.imported_tasks(self.root / "a.tasks")
+
+        self.assertEqual(sorted(tasks), ["b.b1"])
+
+    def test_missing_import(self):
+        """
+        Test that an import of a file that does not exist is skipped.
+        """
+        self._write("tt.yaml", "imports:\n  - file: nope.tasks\n    as: nope\n")
+
+        self.assertEqual(self.index.imported_tasks(self.root / "tt.yaml"), {})
+
+    def test_is_recipe_file(self):
+        """
+        Test which files build() indexes on their own.
+        """
+        for name, expected in [
+            ("tasktree.yaml", True),
+            ("tt.yml", True),
+            ("build.tasks", True),
+            ("ci.tt", True),
+            ("docker-compose.yaml", False),
+        ]:
+            with self.subTest(name=name):
+                self.assertEqual(is_recipe_file(Path(name)), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,209 @@
+"""Tests for output_mux module."""
+
+import threading
+import time
+import unittest
+from io import StringIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+from helpers.logging import logger_stub
+from tasktree.output_mux import (
+    LOGS_DIR,
+    OutputMode,
+    OutputMultiplexer,
+    RunLogs,
+    _MAX_LINE_LENGTH,
+)
+from tasktree.process_runner import TaskOutputTypes
+
+
+class TestRunLogs(unittest.TestCase):
+    """
+    Tests for RunLogs.
+    """
+
+    def setUp(self):
+        tmpdir = TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.project_root = Path(tmpdir.name)
+
+    def test_latest_is_none_before_any_run(self):
+        self.assertIsNone(RunLogs.latest(self.project_root))
+
+    def test_create_records_latest_run(self):
+        run_logs = RunLogs.create(self.project_root)
+
+        self.assertTrue(run_logs.run_dir.is_dir())
+        self.assertEqual(run_logs.run_dir.parent, self.project_root / LOGS_DIR)
+        self.assertEqual(RunLogs.latest(self.project_root), run_logs.run_dir)
+
+    def test_create_keeps_only_recent_runs(self):
+        logs_root = self.project_root / LOGS_DIR
+        for n in range(12):
+            (logs_root / f"20200101-0000{n:02d}-1").mkdir(parents=True)
+
+        run_logs = RunLogs.create(self.project_root)
+
+        runs = sorted(p.name for p in logs_root.iterdir() if p.is_dir())
+        self.assertEqual(len(runs), 10)
+        self.assertEqual(runs[-1], run_logs.run_dir.name)
+        self.assertNotIn("20200101-000000-1", runs)
+
+    def test_path_for_sanitises_and_numbers_repeats(self):
+        run_logs = RunLogs(self.project_root)
+
+        self.assertEqual(run_logs.path_for("lib.build").name, "lib.build.log")
+        self.assertEqual(run_logs.path_for("a/b c").name, "a_b_c.log")
+        self.assertEqual(run_logs.path_for("lib.build").name, "lib.build.2.log")
+
+    def test_path_for_is_unique_across_threads(self):
+        class SlowSet(set):
+            # Widens the window between checking a name and taking it
+            def __contains__(self, name):
+                found = super().__contains__(name)
+                time.sleep(0.001)
+                return found
+
+        run_logs = RunLogs(self.project_root)
+        run_logs._used_names = SlowSet()
+        paths = []
+
+        def open_logs():
+            for _ in range(5):
+                paths.append(run_logs.path_for("build"))
+
+        threads = [threading.Thread(target=open_logs) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(set(paths)), len(paths))
+
+
+class TestOutputMultiplexer(unittest.TestCase):
+    """
+    Tests for OutputMultiplexer and TaskOutput.
+    """
+
+    def setUp(self):
+        tmpdir = TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.run_logs = RunLogs(Path(tmpdir.name))
+        self.stdout = StringIO()
+        self.stderr = StringIO()
+        patcher = patch.multiple("sys", stdout=self.stdout, stderr=self.stderr)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _mux(self, mode: OutputMode) -> OutputMultiplexer:
+        mux = OutputMultiplexer(mode, self.run_logs, logger_stub)
+        mux.__enter__()
+        self.addCleanup(mux.__exit__, None, None, None)
+        return mux
+
+    def test_interleaved_prefixes_whole_lines(self):
+        mux = self._mux(OutputMode.INTERLEAVED)
+        a = mux.open("a", TaskOutputTypes.ALL)
+        b = mux.open("b", TaskOutputTypes.ALL)
+        a.start()
+        b.start()
+
+        a.stdout.write(b"one\npartial ")
+        b.stdout.write(b"from b\n")
+        a.stdout.write(b"line\n")
+        b.stderr.write(b"b error\n")
+        a.stdout.write(b"no newline")
+        a.close(failed=False)
+        b.close(failed=False)
+
+        self.assertEqual(
+            self.stdout.getvalue(),
+            "[a] one\n[b] from b\n[a] partial line\n[a] no newline\n",
+        )
+        self.assertEqual(self.stderr.getvalue(), "[b] b error\n")
+
+    def test_interleaved_emits_overlong_line(self):
+        mux = self._mux(OutputMode.INTERLEAVED)
+        a = mux.open("a", TaskOutputTypes.ALL)
+        a.start()
+
+        a.stdout.write(b"x" * (_MAX_LINE_LENGTH + 1))
+
+        self.assertEqual(len(self.stdout.getvalue()), len("[a] \n") + _MAX_LINE_LENGTH + 1)
+        a.close(failed=False)
+
+    def test_grouped_shows_each_task_on_completion(self):
+        mux = self._mux(OutputMode.GROUPED)
+        a = mux.open("a", TaskOutputTypes.ALL)
+        b = mux.open("b", TaskOutputTypes.ALL)
+        a.start()
+        b.start()
+
+        a.stdout.write(b"a1\n")
+        b.stdout.write(b"b1\n")
+        a.stderr.write(b"a err\n")
+        a.stdout.write(b"a2\n")
+        self.assertEqual(self.stdout.getvalue(), "")
+
+        b.close(failed=False)
+        a.close(failed=False)
+
+        self.assertEqual(self.stdout.getvalue(), "==> b <==\nb1\n\n==> a <==\na1\na2\n\n")
+        self.assertEqual(self.stderr.getvalue(), "a err\n")
+
+    def test_task_output_type_filters_display_but_not_log(self):
+        mux = self._mux(OutputMode.INTERLEAVED)
+        a = mux.open("a", TaskOutputTypes.OUT)
+        a.start()
+
+        a.stdout.write(b"shown\n")
+        a.stderr.write(b"hidden\n")
+        a.close(failed=False)
+
+        self.assertEqual(self.stdout.getvalue(), "[a] shown\n")
+        self.assertEqual(self.stderr.getvalue(), "")
+        self.assertEqual(a.log_path.read_bytes(), b"shown\nhidden\n")
+
+    def test_on_err_shows_stderr_only_on_failure(self):
+        mux = self._mux(OutputMode.INTERLEAVED)
+        ok = mux.open("ok", TaskOutputTypes.ON_ERR)
+        bad = mux.open("bad", TaskOutputTypes.ON_ERR)
+        for output in (ok, bad):
+            output.start()
+            output.stdout.write(b"out\n")
+            output.stderr.write(b"err\n")
+
+        ok.close(failed=False)
+        self.assertEqual(self.stderr.getvalue(), "")
+        bad.close(failed=True)
+
+        self.assertEqual(self.stdout.getvalue(), "")
+        self.assertEqual(self.stderr.getvalue(), "[bad] err\n")
+
+    def test_tail_keeps_last_lines(self):
+        mux = OutputMultiplexer(OutputMode.TAIL, self.run_logs, logger_stub)
+        a = mux.open("a", TaskOutputTypes.ALL)
+        a.start()
+
+        a.stdout.write(b"".join(b"line %d\n" % i for i in range(20)))
+
+        self.assertEqual(list(a.tail), [f"line {i}" for i in range(15, 20)])
+        self.assertEqual(self.stdout.getvalue(), "")
+        a.close(failed=False)
+        self.assertEqual(a.state, "done")
+
+    def test_unstarted_task_is_not_counted_as_run(self):
+        mux = self._mux(OutputMode.INTERLEAVED)
+        a = mux.open("a", TaskOutputTypes.ALL)
+
+        a.close(failed=False)
+
+        self.assertEqual(a.state, "waiting")
+        self.assertFalse(a.log_path.exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
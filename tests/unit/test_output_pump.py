@@ -0,0 +1,304 @@
+"""Tests for output_pump module."""
+
+import os
+import select
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from io import BytesIO, StringIO, TextIOWrapper
+from pathlib import Path
+from threading import Event, Thread
+
+from tasktree.output_pump import (
+    BufferSink,
+    OutputPump,
+    SpillBuffer,
+    StreamSink,
+    send_file,
+)
+
+
+class TestStreamSink(unittest.TestCase):
+    """
+    Tests for StreamSink.
+    """
+
+    def test_writes_bytes_to_binary_buffer(self):
+        raw = BytesIO()
+        target = TextIOWrapper(raw, encoding="utf-8", newline="")
+        target.write("before ")
+        sink = StreamSink(target)
+
+        sink.write(b"caf\xc3\xa9\r\n")
+        sink.flush()
+
+        self.assertEqual(raw.getvalue(), "before café\r\n".encode())
+
+    def test_decodes_for_text_only_streams(self):
+        target = StringIO()
+        sink = StreamSink(target)
+
+        # A multi-byte character split across two writes
+        sink.write(b"caf\xc3")
+        sink.write(b"\xa9\n")
+
+        self.assertEqual(target.getvalue(), "café\n")
+
+
+class TestSpillBuffer(unittest.TestCase):
+    """
+    Tests for SpillBuffer.
+    """
+
+    def _lines(self, first: int, last: int) -> bytes:
+        return b"".join(b"line %04d\n" % i for i in range(first, last))
+
+    def test_small_output_stays_in_memory(self):
+        buffer = SpillBuffer(memory_limit=1000, keep=100)
+        buffer.write(b"one\n")
+        buffer.write(b"two\n")
+        target = StringIO()
+
+        self.assertIsNone(buffer.replay(target, limit=1000))
+
+        self.assertFalse(buffer.spilled)
+        self.assertEqual(target.getvalue(), "one\ntwo\n")
+
+    def test_spilled_output_replayed_in_full_under_limit(self):
+        buffer = SpillBuffer(memory_limit=100, keep=20)
+        data = self._lines(0, 50)
+        for i in range(0, len(data), 30):
+            buffer.write(data[i : i + 30])
+        self.assertTrue(buffer.spilled)
+
+        with tempfile.TemporaryFile() as target_file:
+            target = TextIOWrapper(target_file, encoding="utf-8")
+            self.assertIsNone(buffer.replay(target, limit=len(data)))
+            target.flush()
+            target_file.seek(0)
+            self.assertEqual(target_file.read(), data)
+        buffer.discard()
+
+    def test_huge_output_truncated_with_notice_and_kept_file(self):
+        buffer = SpillBuffer(memory_limit=100, keep=35)
+        data = self._lines(0, 100)
+        for i in range(0, len(data), 7):
+            buffer.write(data[i : i + 7])
+        target = StringIO()
+
+        path = buffer.replay(target, limit=200)
+        buffer.discard()
+
+        self.addCleanup(os.unlink, path)
+        self.assertEqual(path.read_bytes(), data)
+        shown = target.getvalue()
+        # Whole lines only from each end, around the notice
+        self.assertTrue(shown.startswith("line 0000\nline 0001\nline 0002\n[... "))
+        self.assertTrue(shown.endswith("...]\nline 0097\nline 0098\nline 0099\n"))
+        omitted = len(data) - 3 * 10 - 3 * 10
+        self.assertIn(f"[... {omitted} bytes of output omitted; full output in {path} ...]", shown)
+
+    def test_discard_removes_spill_file(self):
+        buffer = SpillBuffer(memory_limit=10, keep=5)
+        buffer.write(b"x" * 100)
+        spill_path = Path(buffer._file.name)
+        self.assertTrue(spill_path.exists())
+
+        buffer.discard()
+
+        self.assertFalse(spill_path.exists())
+
+
+class TestSendFile(unittest.TestCase):
+    """
+    Tests for send_file.
+    """
+
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.source = Path(tmpdir.name) / "source"
+        self.source.write_bytes(b"abc\n" * 100000)
+
+    def test_copies_to_file_descriptor(self):
+        with tempfile.TemporaryFile() as target_file:
+            target = TextIOWrapper(target_file, encoding="utf-8")
+            target.write("before\n")
+
+            send_file(self.source, target)
+
+            target_file.seek(0)
+            self.assertEqual(target_file.read(), b"before\n" + b"abc\n" * 100000)
+
+    def test_copies_to_stream_without_descriptor(self):
+        target = StringIO()
+
+        send_file(self.source, target)
+
+        self.assertEqual(target.getvalue(), "abc\n" * 100000)
+
+
+@unittest.skipUnless(OutputPump.supported(), "selectors cannot wait on pipes")
+class TestOutputPump(unittest.TestCase):
+    """
+    Tests for OutputPump.
+    """
+
+    def setUp(self):
+        self.pump = OutputPump()
+
+    def _spawn(self, script: str) -> subprocess.Popen:
+        process = subprocess.Popen(
+            [sys.executable, "-c", script], stdout=subprocess.PIPE, bufsize=0
+        )
+        self.addCleanup(process.stdout.close)
+        return process
+
+    def test_pumps_many_pipes_concurrently(self):
+        """
+        Output from several processes reaches each one's own sink intact.
+        """
+        processes = [
+            self._spawn(
+                f"import sys\nfor i in range(20000): sys.stdout.write('{n}:%d\\n' % i)"
+            )
+            for n in range(4)
+        ]
+        sinks = [BufferSink() for _ in processes]
+        streams = [self.pump.add(p.stdout, s) for p, s in zip(processes, sinks)]
+
+        for process, stream in zip(processes, streams):
+            self.assertEqual(process.wait(timeout=30), 0)
+            self.assertTrue(self.pump.finish(stream, timeout=10))
+
+        for n, sink in enumerate(sinks):
+            expected = "".join(f"{n}:{i}\n" for i in range(20000)).encode()
+            self.assertEqual(sink.getvalue(), expected)
+
+    def test_finish_cuts_off_pipe_held_open_by_background_child(self):
+        """
+        finish() gives up on a pipe that stays open after the process exits.
+        """
+        read_fd, write_fd = os.pipe()
+        pipe = os.fdopen(read_fd, "rb", buffering=0)
+        self.addCleanup(pipe.close)
+        self.addCleanup(os.close, write_fd)
+        os.write(write_fd, b"partial")
+        sink = BufferSink()
+
+        stream = self.pump.add(pipe, sink)
+        start = time.monotonic()
+
+        self.assertFalse(self.pump.finish(stream, timeout=0.2))
+        self.assertLess(time.monotonic() - start, 5)
+        self.assertEqual(sink.getvalue(), b"partial")
+
+    def test_keeps_draining_after_sink_fails(self):
+        """
+        A sink that raises stops receiving output, but the pipe is still
+        drained so the process is never blocked writing to it.
+        """
+
+        class ClosedSink:
+            def write(self, data):
+                raise ValueError("I/O operation on closed file")
+
+            def flush(self):
+                pass
+
+        # Several times the pipe's capacity
+        process = self._spawn("import sys\nsys.stdout.write('x' * (8 * 1024 * 1024))")
+        stream = self.pump.add(process.stdout, ClosedSink())
+
+        self.assertEqual(process.wait(timeout=30), 0)
+        self.assertTrue(self.pump.finish(stream, timeout=10))
+
+
+    def _pipe(self):
+        read_fd, write_fd = os.pipe()
+        pipe = os.fdopen(read_fd, "rb", buffering=0)
+        self.addCleanup(pipe.close)
+        return pipe, write_fd
+
+    def test_stream_detached_with_unread_data(self):
+        """
+        A stream detached while it still has unread data (and has reached
+        end-of-file) is not read again, and the pump keeps working.
+        """
+        entered, release = Event(), Event()
+
+        class BlockingSink(BufferSink):
+            def write(self, data):
+                entered.set()
+                release.wait(10)
+                super().write(data)
+
+        # Rounds in which the wake-up and the stream are both ready handle
+        # the wake-up (and so the detach) first
+        select_ready = self.pump._selector.select
+        self.pump._selector.select = lambda *args: sorted(
+            select_ready(*args), key=lambda event: event[0].data is not None
+        )
+        blocking_pipe, blocking_fd = self._pipe()
+        detached_pipe, detached_fd = self._pipe()
+        detached_sink = BufferSink()
+        detached = self.pump.add(detached_pipe, detached_sink)
+        self.pump.add(blocking_pipe, BlockingSink())
+        # Hold the pump thread in a sink while the stream is detached
+        os.write(blocking_fd, b"x")
+        self.assertTrue(entered.wait(10))
+        finisher = Thread(target=self.pump.finish, args=(detached, 0))
+        finisher.start()
+        # The detach's wake-up is pending before the stream's data arrives
+        select.select([self.pump._wake_read_fd], [], [], 10)
+        os.write(detached_fd, b"unread")
+        os.close(detached_fd)
+        release.set()
+
+        finisher.join(10)
+        self.assertFalse(finisher.is_alive())
+        os.close(blocking_fd)
+
+        pipe, write_fd = self._pipe()
+        sink = BufferSink()
+        stream = self.pump.add(pipe, sink)
+        os.write(write_fd, b"still pumping")
+        os.close(write_fd)
+        # Bounded, unlike finish(), in case the pump thread has died
+        self.assertTrue(stream.done.wait(10))
+        self.assertTrue(self.pump.finish(stream, timeout=0))
+        self.assertEqual(sink.getvalue(), b"still pumping")
+        self.assertEqual(detached_sink.getvalue(), b"")
+
+    def test_keeps_pumping_after_sink_raises_unexpectedly(self):
+        """
+        A sink raising something other than an I/O error loses its output,
+        but neither its stream nor the others stop being pumped.
+        """
+
+        class BrokenSink:
+            def write(self, data):
+                raise RuntimeError("broken sink")
+
+            def flush(self):
+                raise RuntimeError("broken sink")
+
+        broken_pipe, broken_fd = self._pipe()
+        pipe, write_fd = self._pipe()
+        sink = BufferSink()
+        broken = self.pump.add(broken_pipe, BrokenSink())
+        stream = self.pump.add(pipe, sink)
+
+        os.write(broken_fd, b"lost")
+        os.close(broken_fd)
+        os.write(write_fd, b"kept")
+        os.close(write_fd)
+
+        self.assertTrue(broken.done.wait(10))
+        self.assertTrue(stream.done.wait(10))
+        self.assertEqual(sink.getvalue(), b"kept")
+
+if __name__ == "__main__":
+    unittest.main()
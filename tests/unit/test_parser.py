@@ -19,12 +19,16 @@ from tasktree.parser import (
     DockerRunner,
     HostRunner,
     Recipe,
+    ResourceRequest,
     Runner,
     Task,
     _resolve_eval_variable,
     containerised_runner_from_config,
     find_recipe_file,
+    format_memory_size,
+    load_yaml_file,
     parse_arg_spec,
+    parse_memory_size,
     runner_from_config,
     parse_recipe,
 )
@@ -584,6 +588,174 @@ tasks:
             self.assertEqual(recipe.interpreters["py"], Interpreter(cmd="python3", ext=".py"))
 
 
+class TestParseTaskResources(unittest.TestCase):
+    """Tests for task 'resources' and the top-level 'pools' section."""
+
+    def _parse(self, text: str) -> Recipe:
+        with TemporaryDirectory() as tmpdir:
+            recipe_path = Path(tmpdir) / "tasktree.yaml"
+            recipe_path.write_text(text)
+            return parse_recipe(recipe_path)
+
+    def test_resources_default_to_empty(self):
+        recipe = self._parse("""
+tasks:
+  build:
+    cmd: echo hi
+""")
+        self.assertEqual(recipe.tasks["build"].resources, ResourceRequest())
+        self.assertTrue(recipe.tasks["build"].resources.is_empty)
+        self.assertEqual(recipe.pools, {})
+
+    def test_resources_are_parsed(self):
+        recipe = self._parse("""
+pools:
+  db: 1
+  net: 4
+tasks:
+  build:
+    resources:
+      cpu: 1.5
+      mem: 8G
+      pools: [db, net]
+    cmd: echo hi
+""")
+        self.assertEqual(recipe.pools, {"db": 1, "net": 4})
+        self.assertEqual(
+            recipe.tasks["build"].resources,
+            ResourceRequest(cpu=1.5, mem=8 * 1024**3, pools=("db", "net")),
+        )
+
+    def test_single_pool_name_is_accepted(self):
+        recipe = self._parse("""
+pools:
+  db: 1
+tasks:
+  migrate:
+    resources:
+      pools: db
+    cmd: echo hi
+""")
+        self.assertEqual(recipe.tasks["migrate"].resources.pools, ("db",))
+
+    def test_unknown_pool_raises(self):
+        with self.assertRaises(ValueError) as ctx:
+            self._parse("""
+tasks:
+  migrate:
+    resources:
+      pools: db
+    cmd: echo hi
+""")
+        self.assertIn("db", str(ctx.exception))
+        self.assertIn("migrate", str(ctx.exception))
+
+    def test_invalid_resource_values_raise(self):
+        for resources in (
+            "cpu: 0",
+            "cpu: fast",
+            "mem: lots",
+            "mem: -1",
+            "pools: [db, db]",
+            "gpu: 1",
+        ):
+            with self.subTest(resources=resources):
+                with self.assertRaises(ValueError):
+                    self._parse(f"""
+pools:
+  db: 1
+tasks:
+  build:
+    resources:
+      {resources}
+    cmd: echo hi
+""")
+
+    def test_invalid_pool_capacity_raises(self):
+        with self.assertRaises(ValueError) as ctx:
+            self._parse("""
+pools:
+  db: 0
+tasks:
+  build:
+    cmd: echo hi
+""")
+        self.assertIn("db", str(ctx.exception))
+
+    def test_imported_pools_are_merged(self):
+        with TemporaryDirectory() as tmpdir:
+            Path(tmpdir, "db.yaml").write_text("""
+pools:
+  db: 1
+tasks:
+  migrate:
+    resources:
+      pools: db
+    cmd: echo migrate
+""")
+            recipe_path = Path(tmpdir) / "tasktree.yaml"
+            recipe_path.write_text("""
+imports:
+  - file: db.yaml
+    as: db
+pools:
+  db: 1
+tasks:
+  seed:
+    resources:
+      pools: db
+    cmd: echo seed
+""")
+            recipe = parse_recipe(recipe_path)
+            self.assertEqual(recipe.pools, {"db": 1})
+            self.assertEqual(recipe.tasks["db.migrate"].resources.pools, ("db",))
+
+    def test_conflicting_pool_capacities_raise(self):
+        with TemporaryDirectory() as tmpdir:
+            Path(tmpdir, "db.yaml").write_text("""
+pools:
+  db: 2
+tasks:
+  migrate:
+    cmd: echo migrate
+""")
+            recipe_path = Path(tmpdir) / "tasktree.yaml"
+            recipe_path.write_text("""
+imports:
+  - file: db.yaml
+    as: db
+pools:
+  db: 1
+tasks:
+  seed:
+    cmd: echo seed
+""")
+            with self.assertRaises(ValueError) as ctx:
+                parse_recipe(recipe_path)
+            self.assertIn("conflicting", str(ctx.exception))
+
+
+class TestMemorySize(unittest.TestCase):
+    """Tests for parse_memory_size / format_memory_size."""
+
+    def test_parse_units(self):
+        self.assertEqual(parse_memory_size(1024, "ctx"), 1024)
+        self.assertEqual(parse_memory_size("512M", "ctx"), 512 * 1024**2)
+        self.assertEqual(parse_memory_size("8GiB", "ctx"), 8 * 1024**3)
+        self.assertEqual(parse_memory_size("1.5g", "ctx"), 1536 * 1024**2)
+
+    def test_parse_rejects_garbage(self):
+        for value in ("big", True, 0, "0M", [1]):
+            with self.subTest(value=value):
+                with self.assertRaises(ValueError):
+                    parse_memory_size(value, "ctx")
+
+    def test_format(self):
+        self.assertEqual(format_memory_size(8 * 1024**3), "8G")
+        self.assertEqual(format_memory_size(1536 * 1024**2), "1536M")
+        self.assertEqual(format_memory_size(1000), "1000")
+
+
 class TestParseTaskInterpreter(unittest.TestCase):
     """Tests for the task-level 'interpreter' name reference."""
 
@@ -3696,6 +3868,262 @@ tasks:
             self.assertFalse(os.path.exists(script_path_used), "Temp script was not deleted")
 
 
+class TestParseRecipeWithoutSideEffects(unittest.TestCase):
+    """
+    Tests for parse_recipe(side_effects=False) and its loader hook.
+    """
+
+    def test_eval_and_read_are_not_evaluated(self):
+        """
+        Test that eval commands are not run and read files are not read.
+        """
+        with TemporaryDirectory() as tmpdir:
+            recipe_path = Path(tmpdir) / "tasktree.yaml"
+            recipe_path.write_text("""
+variables:
+  version: { eval: "exit 1" }
+  token: { read: missing.txt }
+  tag: "v{{ var.version }}"
+
+tasks:
+  build:
+    cmd: echo {{ var.tag }} {{ var.token }}
+""")
+
+            recipe = parse_recipe(recipe_path, side_effects=False)
+            recipe.evaluate_variables(side_effects=False)
+
+            self.assertEqual(recipe.variables["version"], "<eval: exit 1>")
+            self.assertEqual(recipe.variables["token"], "<read: missing.txt>")
+            self.assertEqual(recipe.variables["tag"], "v<eval: exit 1>")
+
+    def test_loader_supplies_file_contents(self):
+        """
+        Test that files are loaded through the loader: the root recipe need
+        not be on disk, and imported files' contents come from the loader.
+        """
+        with TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            (root / "build.tasks").write_text("tasks: {}\n")
+            documents = {
+                root / "tasktree.yaml": {
+                    "imports": [{"file": "build.tasks", "as": "build"}],
+                    "tasks": {"main": {"deps": ["build.compile"], "cmd": "x"}},
+                },
+                root / "build.tasks": {"tasks": {"compile": {"cmd": "cc"}}},
+            }
+
+            recipe = parse_recipe(
+                root / "tasktree.yaml",
+                project_root=root,
+                loader=lambda path: documents[path],
+            )
+
+            self.assertEqual(sorted(recipe.tasks), ["build.compile", "main"])
+
+
+class TestParseRecipeMetadataOnly(unittest.TestCase):
+    """
+    Tests for parse_recipe(metadata_only=True), used to list and show tasks.
+    """
+
+    def setUp(self):
+        tmpdir = TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.root = Path(tmpdir.name)
+        self.recipe_path = self.root / "tasktree.yaml"
+        self.recipe_path.write_text(f"""
+variables:
+  version: {{ eval: "echo run >> {self.root / 'version.log'}; echo 1.2" }}
+  changelog: {{ eval: "echo run >> {self.root / 'changelog.log'}; echo notes" }}
+  token: {{ read: missing.txt }}
+  mode: release
+
+tasks:
+  build:
+    desc: Build v{{{{ var.version }}}}
+    args: [{{profile: {{default: "{{{{ var.mode }}}}"}}}}]
+    cmd: echo {{{{ var.changelog }}}} {{{{ var.token }}}}
+  _publish:
+    private: true
+    desc: Publish {{{{ var.changelog }}}}
+    cmd: publish
+""")
+
+    def _runs(self, name):
+        log = self.root / f"{name}.log"
+        return len(log.read_text().splitlines()) if log.exists() else 0
+
+    def test_only_description_and_arg_variables_are_evaluated(self):
+        """
+        Test that only the variables public tasks' descriptions and argument
+        specs reference are evaluated, and substituted into those fields only.
+        """
+        recipe = parse_recipe(self.recipe_path, metadata_only=True)
+
+        build = recipe.tasks["build"]
+        self.assertEqual(build.desc, "Build v1.2")
+        self.assertEqual(build.args, [{"profile": {"default": "release"}}])
+        self.assertEqual(build.cmd, "echo {{ var.changelog }} {{ var.token }}")
+        self.assertEqual(self._runs("version"), 1)
+        self.assertEqual(self._runs("changelog"), 0)
+
+    def test_root_task_describes_only_that_task(self):
+        """
+        Test that with a root task only its own fields are evaluated, private
+        or not.
+        """
+        recipe = parse_recipe(
+            self.recipe_path, root_task="_publish", metadata_only=True
+        )
+
+        self.assertEqual(recipe.tasks["_publish"].desc, "Publish notes")
+        self.assertEqual(recipe.tasks["build"].desc, "Build v{{ var.version }}")
+        self.assertEqual(self._runs("version"), 0)
+
+    def test_full_evaluation_reuses_described_values(self):
+        """
+        Test that evaluating the variables afterwards does not run the
+        description's eval command again.
+        """
+        (self.root / "missing.txt").write_text("secret")
+        recipe = parse_recipe(self.recipe_path, metadata_only=True)
+
+        recipe.evaluate_variables("build")
+
+        self.assertEqual(recipe.tasks["build"].cmd, "echo notes secret")
+        self.assertEqual(self._runs("version"), 1)
+        self.assertEqual(self._runs("changelog"), 1)
+
+
+class TestDeferredImportedTasks(unittest.TestCase):
+    """
+    Tests for building only the imported tasks a run reaches.
+    """
+
+    def setUp(self):
+        tmpdir = TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.root = Path(tmpdir.name)
+        self.recipe_path = self.root / "tasktree.yaml"
+        self.recipe_path.write_text("""
+imports:
+  - file: lib.tasks
+    as: lib
+  - file: tools.tasks
+    as: tools
+tasks:
+  build:
+    deps: [lib.compile]
+    cmd: echo build
+  clean:
+    cmd: echo clean
+""")
+        (self.root / "lib.tasks").write_text("""
+runners:
+  sh:
+    shell: sh
+tasks:
+  compile:
+    deps: [{generate: [src]}, tools.fmt]
+    cmd: echo compile
+  generate:
+    args: [dir]
+    run_in: sh
+    pin_runner: true
+    cmd: echo generate
+  broken:
+    desc: No command
+""")
+        (self.root / "tools.tasks").write_text("""
+tasks:
+  fmt:
+    cmd: echo fmt
+  lint:
+    cmd: echo lint
+""")
+
+    def test_only_reachable_imported_tasks_are_built(self):
+        """
+        Test that a run builds the imported tasks its root task reaches,
+        following dependencies into sibling imports.
+        """
+        recipe = parse_recipe(self.recipe_path, root_task="build")
+
+        self.assertEqual(
+            set(recipe.tasks),
+            {"build", "clean", "lib.compile", "lib.generate", "tools.fmt"},
+        )
+        self.assertEqual(recipe.unparsed_tasks, 2)
+        self.assertEqual(recipe.tasks["lib.generate"].args, ["dir"])
+
+    def test_reached_pinned_task_brings_its_runner(self):
+        """
+        Test that a reached pinned task's runner is imported, as when every
+        task is built.
+        """
+        recipe = parse_recipe(self.recipe_path, root_task="build")
+
+        self.assertIn("lib.sh", recipe.runners)
+        self.assertEqual(recipe.tasks["lib.generate"].run_in, "lib.sh")
+
+    def test_unreachable_invalid_task_is_not_validated(self):
+        """
+        Test that an invalid imported task the run does not reach is not
+        reported, while parsing every task still reports it.
+        """
+        parse_recipe(self.recipe_path, root_task="clean")
+
+        with self.assertRaisesRegex(ValueError, "'broken' missing required 'cmd'"):
+            parse_recipe(self.recipe_path)
+
+    def test_unknown_root_task_builds_every_task(self):
+        """
+        Test that every task is built when the root task is not defined, so
+        that the available tasks can be listed.
+        """
+        (self.root / "lib.tasks").write_text(
+            "tasks:\n  compile:\n    cmd: echo compile\n"
+        )
+
+        recipe = parse_recipe(self.recipe_path, root_task="nosuchtask")
+
+        self.assertEqual(recipe.unparsed_tasks, 0)
+        self.assertIn("tools.lint", recipe.tasks)
+
+    def test_deferred_tasks_match_fully_built_tasks(self):
+        """
+        Test that a reached imported task is built exactly as when every task
+        is built.
+        """
+        (self.root / "lib.tasks").write_text(
+            (self.root / "lib.tasks").read_text().replace("  broken:\n    desc: No command\n", "")
+        )
+
+        deferred = parse_recipe(self.recipe_path, root_task="build")
+        full = parse_recipe(self.recipe_path)
+
+        for name in deferred.tasks:
+            self.assertEqual(deferred.tasks[name], full.tasks[name], name)
+
+    def test_custom_loader_builds_every_task(self):
+        """
+        Test that a loader other than load_yaml_file gets no defer_tasks
+        option and every task is built.
+        """
+        loader = MagicMock(side_effect=load_yaml_file)
+        (self.root / "lib.tasks").write_text(
+            "tasks:\n  compile:\n    cmd: echo compile\n"
+        )
+
+        recipe = parse_recipe(self.recipe_path, root_task="build", loader=loader)
+
+        self.assertEqual(recipe.unparsed_tasks, 0)
+        self.assertIn("tools.lint", recipe.tasks)
+        for call in loader.call_args_list:
+            self.assertEqual(call.kwargs, {})
+
+
 class TestArgMinMax(unittest.TestCase):
     """
     Tests for min/max range constraints on arguments.
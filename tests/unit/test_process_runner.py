@@ -1,17 +1,24 @@
 """Unit tests for process_runner module."""
 
 import os
+import re
 import subprocess
 import sys
 import tempfile
+import time
 import unittest
 from io import StringIO
+from pathlib import Path
+from threading import Thread
 from unittest.mock import patch
 
 from helpers.logging import logger_stub
+from tasktree.output_pump import BufferSink
 from tasktree.process_runner import (
+    MultiplexedProcessRunner,
     StderrOnlyOnFailureProcessRunner,
     PassthroughProcessRunner,
+    ProcessGroups,
     ProcessRunner,
     SilentProcessRunner,
     StderrOnlyProcessRunner,
@@ -20,6 +27,7 @@ from tasktree.process_runner import (
     make_process_runner,
     stream_output,
 )
+from tasktree.resource_usage import wait_for_exit
 
 
 class TestProcessRunner(unittest.TestCase):
@@ -42,6 +50,87 @@ class TestProcessRunner(unittest.TestCase):
         self.assertTrue(callable(getattr(ProcessRunner, "run")))
 
 
+@unittest.skipIf(sys.platform == "win32", "uses POSIX process groups")
+class TestProcessGroups(unittest.TestCase):
+    """
+    Tests for tracking and terminating in-flight task process groups.
+    """
+
+    def _wait_for_file(self, path):
+        deadline = time.monotonic() + 5
+        while not os.path.exists(path):
+            self.assertLess(time.monotonic(), deadline, f"{path} never appeared")
+            time.sleep(0.01)
+
+    def test_runner_captures_while_tracked(self):
+        groups = ProcessGroups()
+        runner = PassthroughProcessRunner(logger_stub)
+        runner.process_groups = groups
+        result = runner.run(
+            ["sh", "-c", "echo out; echo err >&2; exit 3"], capture_output=True, text=True
+        )
+        self.assertEqual(result.returncode, 3)
+        self.assertEqual(result.stdout, "out\n")
+        self.assertEqual(result.stderr, "err\n")
+        self.assertEqual(groups._processes, set())
+
+    def test_runner_check_raises(self):
+        runner = PassthroughProcessRunner(logger_stub)
+        runner.process_groups = ProcessGroups()
+        with self.assertRaises(subprocess.CalledProcessError) as ctx:
+            runner.run(["sh", "-c", "exit 2"], check=True)
+        self.assertEqual(ctx.exception.returncode, 2)
+
+    def test_terminate_all_reaches_grandchildren(self):
+        groups = ProcessGroups()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            marker = os.path.join(tmpdir, "started")
+            done = os.path.join(tmpdir, "done")
+            # The shell's background child would outlive a plain kill of the shell
+            process = groups.popen(
+                ["sh", "-c", f"(sleep 30; touch {done}) & touch {marker}; wait"]
+            )
+            self._wait_for_file(marker)
+
+            start = time.monotonic()
+            groups.terminate_all(5.0, logger_stub)
+            process.wait(timeout=5)
+
+            self.assertLess(time.monotonic() - start, 5.0)
+            self.assertNotEqual(process.returncode, 0)
+            # The orphaned sleep is reaped by init, so give it a moment to go
+            deadline = time.monotonic() + 5
+            while True:
+                try:
+                    os.killpg(process.pid, 0)
+                except ProcessLookupError:
+                    break
+                self.assertLess(time.monotonic(), deadline, "process group survived")
+                time.sleep(0.01)
+
+    def test_terminate_all_kills_after_grace_period(self):
+        groups = ProcessGroups()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            marker = os.path.join(tmpdir, "started")
+            process = groups.popen(
+                ["sh", "-c", f"trap '' TERM; touch {marker}; while :; do sleep 0.1; done"]
+            )
+            self._wait_for_file(marker)
+
+            groups.terminate_all(0.2, logger_stub)
+
+            self.assertEqual(process.wait(timeout=5), -9)
+
+    def test_runner_registers_with_process_groups(self):
+        groups = ProcessGroups()
+        runner = StdoutOnlyProcessRunner(logger_stub)
+        runner.process_groups = groups
+        with patch("sys.stdout", StringIO()):
+            result = runner.run(["sh", "-c", "echo hi"], check=True)
+        self.assertEqual(result.returncode, 0)
+        self.assertEqual(groups._processes, set())
+
+
 class TestPassthroughProcessRunner(unittest.TestCase):
     """
     Tests for PassthroughProcessRunner implementation.
@@ -707,6 +796,146 @@ class TestStderrOnlyOnFailureProcessRunner(unittest.TestCase):
         self.assertIn("line3", stderr_output)
 
 
+    def test_run_truncates_huge_stderr_on_failure(self):
+        """
+        StderrOnlyOnFailureProcessRunner shows only the ends of huge stderr,
+        pointing at a file holding all of it.
+        """
+        stderr_capture = StringIO()
+        script = (
+            "import sys\n"
+            "for i in range(200000): sys.stderr.write('warning %d\\n' % i)\n"
+            "sys.exit(1)"
+        )
+
+        with patch("sys.stderr", stderr_capture), patch.object(
+            StderrOnlyOnFailureProcessRunner, "REPLAY_LIMIT", 1024 * 1024
+        ):
+            result = self.runner.run([sys.executable, "-c", script], check=False)
+
+        self.assertEqual(result.returncode, 1)
+        shown = stderr_capture.getvalue()
+        self.assertTrue(shown.startswith("warning 0\n"))
+        self.assertTrue(shown.endswith("warning 199999\n"))
+        self.assertLess(len(shown), 256 * 1024)
+        match = re.search(r"full output in (.+) \.\.\.\]", shown)
+        self.assertIsNotNone(match)
+        full_output = Path(match.group(1))
+        self.addCleanup(full_output.unlink)
+        self.assertEqual(full_output.read_text().count("\n"), 200000)
+
+
+class TestMultiplexedProcessRunner(unittest.TestCase):
+    """
+    Tests for MultiplexedProcessRunner implementation.
+    """
+
+    def setUp(self):
+        self.stdout = BufferSink()
+        self.stderr = BufferSink()
+        self.runner = MultiplexedProcessRunner(logger_stub, self.stdout, self.stderr)
+
+    def test_run_sends_both_streams_to_sinks(self):
+        """
+        run() pumps stdout and stderr into their sinks, whatever the caller asked for.
+        """
+        result = self.runner.run(
+            [sys.executable, "-c", "import sys; print('out'); sys.stderr.write('err\\n')"],
+            stdout=sys.stdout,
+            stderr=sys.stderr,
+            text=True,
+        )
+
+        self.assertEqual(result.returncode, 0)
+        self.assertIsNone(result.stdout)
+        self.assertEqual(self.stdout.getvalue().replace(b"\r\n", b"\n"), b"out\n")
+        self.assertEqual(self.stderr.getvalue().replace(b"\r\n", b"\n"), b"err\n")
+
+    def test_run_returns_captured_output_to_caller(self):
+        """
+        run() leaves output the caller captures for itself out of the sinks.
+        """
+        result = self.runner.run(
+            [sys.executable, "-c", "print('probe')"], capture_output=True, text=True
+        )
+
+        self.assertEqual(result.stdout.strip(), "probe")
+        self.assertEqual(self.stdout.getvalue(), b"")
+
+    def test_run_raises_called_process_error_when_check_true(self):
+        """
+        run() raises CalledProcessError when check=True and process fails.
+        """
+        with self.assertRaises(subprocess.CalledProcessError) as context:
+            self.runner.run([sys.executable, "-c", "import sys; sys.exit(3)"], check=True)
+
+        self.assertEqual(context.exception.returncode, 3)
+
+
+@unittest.skipIf(sys.platform == "win32", "os.wait4 is POSIX-only")
+class TestResourceUsageRecording(unittest.TestCase):
+    """
+    Tests for the resource usage runners record.
+    """
+
+    def test_usage_added_up_across_processes(self):
+        burn = [sys.executable, "-c", "sum(range(2_000_000))"]
+        for runner_class in (
+            PassthroughProcessRunner,
+            SilentProcessRunner,
+            StdoutOnlyProcessRunner,
+            StderrOnlyOnFailureProcessRunner,
+        ):
+            with self.subTest(runner=runner_class.__name__):
+                runner = runner_class(logger_stub)
+                runner.run(burn)
+                first = runner.usage
+                runner.run(burn)
+
+                self.assertGreater(first.user_cpu, 0)
+                self.assertGreater(runner.usage.user_cpu, first.user_cpu)
+
+    def test_other_children_reaped_meanwhile_not_counted(self):
+        """
+        A process tt reaps elsewhere while a runner's process runs (e.g. a
+        background image build) is not counted in the runner's usage.
+        """
+        for runner_class in (PassthroughProcessRunner, SilentProcessRunner):
+            with self.subTest(runner=runner_class.__name__):
+                other = subprocess.Popen(
+                    [sys.executable, "-c", "sum(range(5_000_000))"]
+                )
+                reaped = {}
+                reaper = Thread(
+                    target=lambda: reaped.update(usage=wait_for_exit(other, None)[1])
+                )
+                reaper.start()
+                runner = runner_class(logger_stub)
+
+                runner.run(["sh", "-c", f"while kill -0 {other.pid}; do sleep 0.05; done"])
+                reaper.join()
+
+                self.assertGreater(reaped["usage"].user_cpu, 0.02)
+                self.assertLess(runner.usage.user_cpu, reaped["usage"].user_cpu)
+
+    def test_popen_runners_know_peak_memory(self):
+        # Keeps 64 MiB resident
+        hog = [sys.executable, "-c", "x = bytearray(64 * 1024 * 1024); x[::4096] = b'x' * 16384"]
+        for runner_class in (StdoutOnlyProcessRunner, StderrOnlyOnFailureProcessRunner):
+            with self.subTest(runner=runner_class.__name__):
+                runner = runner_class(logger_stub)
+                runner.run(hog)
+
+                self.assertGreater(runner.usage.max_rss, 64 * 1024 * 1024)
+
+    def test_captured_process_not_measured(self):
+        runner = PassthroughProcessRunner(logger_stub)
+
+        runner.run(["sh", "-c", "echo hi"], capture_output=True)
+
+        self.assertIsNone(runner.usage)
+
+
 class TestMakeProcessRunner(unittest.TestCase):
     """
     Tests for make_process_runner factory function.
@@ -0,0 +1,208 @@
+"""Tests for python_worker module."""
+
+import os
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import MagicMock
+
+from helpers.logging import logger_stub
+from tasktree.interpreter import Interpreter
+from tasktree.process_runner import (
+    PassthroughProcessRunner,
+    ProcessGroups,
+    StdoutOnlyProcessRunner,
+)
+from tasktree.python_worker import PythonWorker, PythonWorkerPool
+
+
+@unittest.skipUnless(PythonWorkerPool.supported(), "needs fork and descriptor passing")
+class TestPythonWorker(unittest.TestCase):
+    """
+    Tests for running scripts in a PythonWorker.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.worker = PythonWorker.start(
+            Interpreter(cmd=sys.executable, persistent=True, preload=("json",)),
+            dict(os.environ),
+            logger_stub,
+        )
+        assert cls.worker is not None
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.worker.close()
+
+    def _run(self, script: str, **kwargs) -> subprocess.CompletedProcess:
+        process = self.worker.popen(script)(
+            [sys.executable, "<test>"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            **kwargs,
+        )
+        stdout, stderr = process.communicate(timeout=30)
+        return subprocess.CompletedProcess(
+            process.args, process.returncode, stdout, stderr
+        )
+
+    def test_runs_script_in_requested_cwd_and_env(self):
+        with TemporaryDirectory() as tmpdir:
+            result = self._run(
+                "import json, os, sys\n"
+                "print(os.getcwd(), os.environ['GREETING'], sys.argv, __name__)\n"
+                "print('json' in sys.modules and 'preloaded')\n",
+                cwd=tmpdir,
+                env={"GREETING": "hello"},
+            )
+
+            self.assertEqual(result.returncode, 0, result.stderr)
+            self.assertEqual(
+                result.stdout.splitlines(),
+                [f"{os.path.realpath(tmpdir)} hello ['<test>'] __main__", "preloaded"],
+            )
+
+    def test_exit_status_like_a_python_process(self):
+        cases = [
+            ("x = 1", 0, ""),
+            ("import sys; sys.exit(3)", 3, ""),
+            ("import sys; sys.exit('giving up')", 1, "giving up"),
+            ("raise ValueError('boom')", 1, "raise ValueError('boom')"),
+        ]
+        for script, returncode, stderr in cases:
+            with self.subTest(script=script):
+                result = self._run(script)
+
+                self.assertEqual(result.returncode, returncode)
+                self.assertIn(stderr, result.stderr)
+                self.assertNotIn("python_worker_server", result.stderr)
+
+    def test_each_script_gets_a_fresh_fork(self):
+        self._run("import json; json.leaked = True")
+
+        result = self._run("import json; print(hasattr(json, 'leaked'))")
+
+        self.assertEqual(result.stdout, "False\n")
+
+    def test_runs_at_exit_handlers_and_waits_for_threads(self):
+        result = self._run(
+            "import atexit, threading, time\n"
+            "atexit.register(print, 'at exit')\n"
+            "threading.Thread(target=lambda: (time.sleep(0.1), print('thread'))).start()\n"
+        )
+
+        self.assertEqual(result.stdout, "thread\nat exit\n")
+
+    def test_timeout_and_kill(self):
+        process = self.worker.popen("import time; time.sleep(30)")(
+            [sys.executable, "<test>"]
+        )
+
+        with self.assertRaises(subprocess.TimeoutExpired):
+            process.wait(timeout=0.2)
+        process.kill()
+
+        self.assertEqual(process.wait(timeout=10), -9)
+
+    def test_bad_cwd_raises_like_popen(self):
+        with self.assertRaises(FileNotFoundError):
+            self._run("x = 1", cwd="/no/such/directory")
+
+    def test_inherits_pass_fds(self):
+        read_fd, write_fd = os.pipe()
+        self.addCleanup(os.close, read_fd)
+        try:
+            result = self._run(
+                f"import os; os.write({write_fd}, b'through the pipe')",
+                pass_fds=(write_fd,),
+            )
+        finally:
+            os.close(write_fd)
+
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(os.read(read_fd, 100), b"through the pipe")
+
+    def test_process_runners_drive_worker_processes(self):
+        script = "import sys; print('out'); sys.exit(2)"
+        for runner in (
+            PassthroughProcessRunner(logger_stub),
+            StdoutOnlyProcessRunner(logger_stub),
+        ):
+            with self.subTest(runner=type(runner).__name__):
+                runner.process_groups = ProcessGroups()
+
+                result = runner.run(
+                    [sys.executable, "<test>"],
+                    popen=self.worker.popen(script),
+                    stdout=subprocess.DEVNULL,
+                )
+
+                self.assertEqual(result.returncode, 2)
+                self.assertIsNotNone(runner.usage)
+
+
+    def test_process_runners_capture_worker_process_output(self):
+        script = (
+            "import sys\n"
+            "sys.stdout.write(sys.stdin.read().upper())\n"
+            "print('err', file=sys.stderr)\n"
+        )
+        runner = PassthroughProcessRunner(logger_stub)
+        for process_groups in (None, ProcessGroups()):
+            with self.subTest(process_groups=process_groups is not None):
+                runner.process_groups = process_groups
+
+                result = runner.run(
+                    [sys.executable, "<test>"],
+                    popen=self.worker.popen(script),
+                    input="a\r\nb\n",
+                    capture_output=True,
+                    text=True,
+                    timeout=30,
+                )
+
+                self.assertEqual(result.returncode, 0)
+                self.assertEqual(result.stdout, "A\nB\n")
+                self.assertEqual(result.stderr, "err\n")
+
+@unittest.skipUnless(PythonWorkerPool.supported(), "needs fork and descriptor passing")
+class TestPythonWorkerPool(unittest.TestCase):
+    """
+    Tests for PythonWorkerPool.
+    """
+
+    def setUp(self):
+        self.logger = MagicMock()
+        self.pool = PythonWorkerPool(self.logger)
+        self.addCleanup(self.pool.close)
+
+    def test_one_worker_per_interpreter_and_python_environment(self):
+        interpreter = Interpreter(cmd=sys.executable, persistent=True)
+        env = dict(os.environ)
+
+        worker = self.pool.get(interpreter, env)
+
+        self.assertIsNotNone(worker)
+        self.assertIs(self.pool.get(interpreter, dict(env, UNRELATED="1")), worker)
+        other = self.pool.get(interpreter, dict(env, PYTHONPATH=str(Path.cwd())))
+        self.assertIsNotNone(other)
+        self.assertIsNot(other, worker)
+
+    def test_worker_that_cannot_start_is_not_retried(self):
+        interpreter = Interpreter(
+            cmd=sys.executable, persistent=True, preload=("no_such_module_for_tt",)
+        )
+
+        self.assertIsNone(self.pool.get(interpreter, dict(os.environ)))
+        self.assertIsNone(self.pool.get(interpreter, dict(os.environ)))
+
+        self.logger.warn.assert_called_once()
+        self.assertIn("no_such_module_for_tt", self.logger.warn.call_args.args[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,150 @@
+"""Tests for resource_usage module."""
+
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from tasktree.resource_usage import ResourceUsage, TaskCgroup, wait_for_exit
+
+
+class TestResourceUsage(unittest.TestCase):
+    """
+    Tests for ResourceUsage.
+    """
+
+    def test_add_sums_counters_and_keeps_peaks(self):
+        first = ResourceUsage(
+            user_cpu=1.0,
+            system_cpu=0.5,
+            max_rss=100,
+            block_reads=1,
+            voluntary_switches=10,
+        )
+        second = ResourceUsage(
+            user_cpu=2.0, system_cpu=0.25, max_rss=50, block_reads=2, peak_memory=300
+        )
+
+        total = first + second
+
+        self.assertEqual(total.user_cpu, 3.0)
+        self.assertEqual(total.system_cpu, 0.75)
+        self.assertEqual(total.max_rss, 100)
+        self.assertEqual(total.block_reads, 3)
+        self.assertEqual(total.voluntary_switches, 10)
+        self.assertEqual(total.peak_memory, 300)
+        self.assertIsNone(total.read_bytes)
+
+    def test_describe(self):
+        usage = ResourceUsage(
+            user_cpu=1.234,
+            system_cpu=0.5,
+            max_rss=3 * 1024 * 1024,
+            block_reads=7,
+            block_writes=8,
+            voluntary_switches=9,
+            involuntary_switches=10,
+        )
+
+        self.assertEqual(
+            usage.describe(),
+            "CPU 1.23s user + 0.50s sys, max RSS 3.0 MiB, block I/O 7 in / 8 out, "
+            "context switches 9 voluntary / 10 involuntary",
+        )
+
+    def test_from_dict_ignores_unknown_keys(self):
+        usage = ResourceUsage.from_dict({"user_cpu": 1.0, "gpu_seconds": 5})
+
+        self.assertEqual(usage, ResourceUsage(user_cpu=1.0))
+
+
+@unittest.skipIf(sys.platform == "win32", "os.wait4 is POSIX-only")
+class TestWaitForExit(unittest.TestCase):
+    """
+    Tests for wait_for_exit.
+    """
+
+    def test_returns_exit_code_and_usage_of_process_tree(self):
+        # The CPU is burnt by a grandchild, which the shell waits for
+        process = subprocess.Popen(
+            ["sh", "-c", f"{sys.executable} -c 'sum(range(3_000_000))'; exit 3"]
+        )
+
+        returncode, usage = wait_for_exit(process, None)
+
+        self.assertEqual(returncode, 3)
+        self.assertEqual(process.returncode, 3)
+        self.assertGreater(usage.user_cpu + usage.system_cpu, 0)
+        self.assertGreater(usage.max_rss, 1024 * 1024)
+
+    def test_timeout(self):
+        process = subprocess.Popen(["sleep", "30"])
+        self.addCleanup(process.wait)
+        self.addCleanup(process.kill)
+
+        with self.assertRaises(subprocess.TimeoutExpired):
+            wait_for_exit(process, 0.1)
+
+    def test_process_reaped_elsewhere(self):
+        process = subprocess.Popen(["sh", "-c", "exit 4"])
+        process.wait()
+
+        self.assertEqual(wait_for_exit(process, None), (4, None))
+
+
+class TestTaskCgroup(unittest.TestCase):
+    """
+    Tests for TaskCgroup, against a directory laid out like a cgroup.
+    """
+
+    def setUp(self):
+        tmpdir = TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.path = Path(tmpdir.name)
+        self.cgroup = TaskCgroup(self.path)
+
+    def test_counters_from_cpu_stat_only(self):
+        (self.path / "cpu.stat").write_text(
+            "usage_usec 3000\nuser_usec 2000\nsystem_usec 1000\nnr_periods 0\n"
+        )
+
+        self.assertEqual(
+            self.cgroup.counters(), {"user_usec": 2000, "system_usec": 1000}
+        )
+
+    def test_counters_with_memory_and_io_controllers(self):
+        (self.path / "cpu.stat").write_text("user_usec 1\nsystem_usec 2\n")
+        (self.path / "memory.peak").write_text("1048576\n")
+        (self.path / "io.stat").write_text(
+            "8:0 rbytes=100 wbytes=200 rios=1 wios=2\n259:0 rbytes=5 wbytes=6\n"
+        )
+
+        counters = self.cgroup.counters()
+
+        self.assertEqual(counters["peak_memory"], 1048576)
+        self.assertEqual(counters["read_bytes"], 105)
+        self.assertEqual(counters["write_bytes"], 206)
+
+    def test_apply_takes_tree_wide_figures(self):
+        usage = ResourceUsage(user_cpu=1.0, system_cpu=0.5, max_rss=10)
+        before = {"user_usec": 1_000_000, "system_usec": 0, "read_bytes": 10}
+        after = {
+            "user_usec": 4_000_000,
+            "system_usec": 100_000,
+            "peak_memory": 99,
+            "read_bytes": 60,
+        }
+
+        applied = TaskCgroup.apply(usage, before, after)
+
+        # Background processes added CPU time; a lagging counter never lowers it
+        self.assertEqual(applied.user_cpu, 3.0)
+        self.assertEqual(applied.system_cpu, 0.5)
+        self.assertEqual(applied.max_rss, 10)
+        self.assertEqual(applied.peak_memory, 99)
+        self.assertEqual(applied.read_bytes, 50)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,521 @@
+"""Tests for scheduler module."""
+
+import threading
+import time
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import MagicMock, patch
+
+from helpers.logging import logger_stub
+from tasktree.jobserver import JobServer, JobTokens
+from tasktree.parser import ResourceRequest
+from tasktree.scheduler import (
+    AdaptiveConcurrency,
+    AutoJobs,
+    PressureSample,
+    PressureSource,
+    ProcPressureSource,
+    ResourceBudget,
+    SchedulerNode,
+    TaskFailures,
+    TaskScheduler,
+    describe_resources,
+    parse_jobs,
+)
+
+
+class FakePressureSource(PressureSource):
+    """
+    Pressure source that replays a fixed sequence of samples (the last repeats).
+    """
+
+    def __init__(self, *samples: PressureSample):
+        self.samples = list(samples)
+        self.calls = 0
+
+    def sample(self) -> PressureSample:
+        self.calls += 1
+        if len(self.samples) > 1:
+            return self.samples.pop(0)
+        return self.samples[0]
+
+
+class FakeClock:
+    """
+    Manually advanced monotonic clock.
+    """
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+IDLE = PressureSample(cpu_some=0.5, memory_some=0.0, mem_available=8, mem_total=10)
+CPU_BUSY = PressureSample(cpu_some=80.0, memory_some=0.0, mem_available=8, mem_total=10)
+MEMORY_STALLED = PressureSample(cpu_some=0.5, memory_some=25.0)
+LOW_MEMORY = PressureSample(cpu_some=0.5, memory_some=0.0, mem_available=1, mem_total=100)
+MODERATE = PressureSample(cpu_some=20.0, memory_some=0.0)
+
+
+class TestResourceBudget(unittest.TestCase):
+    """
+    Tests for ResourceBudget admission accounting.
+    """
+
+    def test_admits_until_cpu_exhausted(self):
+        budget = ResourceBudget(cpu=4, mem=None, pools={})
+        request = ResourceRequest(cpu=3)
+        self.assertTrue(budget.can_admit(request))
+        budget.acquire(request)
+        self.assertFalse(budget.can_admit(ResourceRequest(cpu=2)))
+        self.assertTrue(budget.can_admit(ResourceRequest(cpu=1)))
+        budget.release(request)
+        self.assertTrue(budget.can_admit(ResourceRequest(cpu=4)))
+
+    def test_fractional_cpu_fills_capacity_exactly(self):
+        budget = ResourceBudget(cpu=1, mem=None, pools={})
+        for _ in range(10):
+            self.assertTrue(budget.can_admit(ResourceRequest(cpu=0.1)))
+            budget.acquire(ResourceRequest(cpu=0.1))
+        self.assertFalse(budget.can_admit(ResourceRequest(cpu=0.1)))
+
+    def test_memory_limit(self):
+        budget = ResourceBudget(cpu=8, mem=1000, pools={})
+        budget.acquire(ResourceRequest(mem=600))
+        self.assertFalse(budget.can_admit(ResourceRequest(mem=500)))
+        self.assertTrue(budget.can_admit(ResourceRequest(mem=400)))
+
+    def test_unknown_memory_is_unlimited(self):
+        budget = ResourceBudget(cpu=8, mem=None, pools={})
+        budget.acquire(ResourceRequest(mem=10**15))
+        self.assertTrue(budget.can_admit(ResourceRequest(mem=10**15)))
+
+    def test_pool_capacity(self):
+        budget = ResourceBudget(cpu=8, mem=None, pools={"db": 1, "net": 2})
+        db = ResourceRequest(pools=("db",))
+        budget.acquire(db)
+        self.assertFalse(budget.can_admit(db))
+        self.assertFalse(budget.can_admit(ResourceRequest(pools=("net", "db"))))
+        self.assertTrue(budget.can_admit(ResourceRequest(pools=("net",))))
+
+    def test_fit_clamps_oversized_requests(self):
+        budget = ResourceBudget(cpu=2, mem=1000, pools={})
+        fitted = budget.fit(ResourceRequest(cpu=16, mem=5000))
+        self.assertEqual(fitted, ResourceRequest(cpu=2, mem=1000))
+        self.assertTrue(budget.can_admit(fitted))
+
+    def test_describe_resources(self):
+        self.assertEqual(describe_resources(ResourceRequest()), "none")
+        self.assertEqual(
+            describe_resources(ResourceRequest(cpu=0.5, mem=2 * 1024**3, pools=("db",))),
+            "cpu=0.5, mem=2G, pools=db",
+        )
+
+
+class TestParseJobs(unittest.TestCase):
+    """
+    Tests for parsing --jobs values.
+    """
+
+    def test_integer(self):
+        self.assertEqual(parse_jobs("4"), 4)
+
+    def test_auto_forms(self):
+        self.assertEqual(parse_jobs("auto"), AutoJobs(1, None))
+        self.assertEqual(parse_jobs("AUTO:6"), AutoJobs(1, 6))
+        self.assertEqual(parse_jobs("auto:2-8"), AutoJobs(2, 8))
+
+    def test_invalid(self):
+        for value in ("0", "-1", "many", "auto:", "auto:0", "auto:5-2", "auto:0-2"):
+            with self.subTest(value=value):
+                with self.assertRaises(ValueError):
+                    parse_jobs(value)
+
+    def test_auto_max_defaults_to_cpu_count(self):
+        with patch("tasktree.scheduler.host_cpu_count", return_value=6):
+            self.assertEqual(AutoJobs().resolved_max(), 6)
+            self.assertEqual(AutoJobs(min_jobs=8).resolved_max(), 8)
+
+
+class TestProcPressureSource(unittest.TestCase):
+    """
+    Tests for reading PSI and meminfo from a procfs tree.
+    """
+
+    def test_reads_psi_and_meminfo(self):
+        with TemporaryDirectory() as tmpdir:
+            proc = Path(tmpdir)
+            (proc / "pressure").mkdir()
+            (proc / "pressure" / "cpu").write_text(
+                "some avg10=12.50 avg60=3.00 avg300=1.00 total=123\n"
+                "full avg10=0.00 avg60=0.00 avg300=0.00 total=0\n"
+            )
+            (proc / "pressure" / "memory").write_text(
+                "some avg10=0.75 avg60=0.10 avg300=0.00 total=9\n"
+                "full avg10=0.50 avg60=0.00 avg300=0.00 total=4\n"
+            )
+            (proc / "meminfo").write_text(
+                "MemTotal:       16000000 kB\n"
+                "MemFree:         1000000 kB\n"
+                "MemAvailable:    4000000 kB\n"
+            )
+
+            sample = ProcPressureSource(proc).sample()
+
+        self.assertEqual(sample.cpu_some, 12.5)
+        self.assertEqual(sample.memory_some, 0.75)
+        self.assertEqual(sample.mem_total, 16000000 * 1024)
+        self.assertEqual(sample.mem_available, 4000000 * 1024)
+        self.assertEqual(sample.mem_available_fraction, 0.25)
+
+    def test_missing_files_give_empty_sample(self):
+        with TemporaryDirectory() as tmpdir:
+            sample = ProcPressureSource(Path(tmpdir)).sample()
+        self.assertEqual(sample, PressureSample())
+
+
+class TestAdaptiveConcurrency(unittest.TestCase):
+    """
+    Tests for the pressure-driven job limit, using a fake pressure source.
+    """
+
+    def _controller(self, *samples, min_jobs=1, max_jobs=8, logger=logger_stub):
+        self.clock = FakeClock()
+        self.source = FakePressureSource(*samples)
+        with patch("tasktree.scheduler.host_cpu_count", return_value=4):
+            return AdaptiveConcurrency(
+                min_jobs, max_jobs, self.source, logger, interval=1.0, clock=self.clock
+            )
+
+    def _step(self, controller, running):
+        limit = controller.update(running)
+        self.clock.now += 1.0
+        return limit
+
+    def test_starts_at_cpu_count_within_range(self):
+        self.assertEqual(self._controller(IDLE).limit, 4)
+        self.assertEqual(self._controller(IDLE, max_jobs=2).limit, 2)
+        self.assertEqual(self._controller(IDLE, min_jobs=6).limit, 6)
+
+    def test_cpu_pressure_sheds_slots_down_to_min(self):
+        controller = self._controller(CPU_BUSY, min_jobs=2)
+        limits = [self._step(controller, running=4) for _ in range(4)]
+        self.assertEqual(limits, [3, 2, 2, 2])
+
+    def test_memory_pressure_and_low_memory_shed_slots(self):
+        for sample in (MEMORY_STALLED, LOW_MEMORY):
+            with self.subTest(sample=sample):
+                controller = self._controller(sample)
+                self.assertEqual(controller.update(running=4), 3)
+
+    def test_idle_host_adds_slots_only_when_saturated(self):
+        controller = self._controller(IDLE, max_jobs=5)
+        # Fewer tasks running than slots: no evidence more slots would help
+        self.assertEqual(self._step(controller, running=2), 4)
+        self.assertEqual(self._step(controller, running=4), 5)
+        self.assertEqual(self._step(controller, running=5), 5)
+
+    def test_moderate_pressure_holds(self):
+        controller = self._controller(MODERATE)
+        self.assertEqual(self._step(controller, running=4), 4)
+
+    def test_no_signal_holds(self):
+        controller = self._controller(PressureSample())
+        self.assertEqual(self._step(controller, running=4), 4)
+
+    def test_samples_at_most_once_per_interval(self):
+        controller = self._controller(CPU_BUSY)
+        controller.update(running=4)
+        controller.update(running=4)
+        self.assertEqual(self.source.calls, 1)
+        self.assertEqual(controller.limit, 3)
+        self.clock.now += 1.0
+        controller.update(running=4)
+        self.assertEqual(self.source.calls, 2)
+
+    def test_slot_changes_logged_at_trace(self):
+        logger = MagicMock()
+        controller = self._controller(CPU_BUSY, IDLE, logger=logger)
+        self._step(controller, running=4)
+        logger.trace.assert_called_once()
+        self.assertIn("4 -> 3", logger.trace.call_args[0][0])
+        self.assertIn("cpu some=80.0%", logger.trace.call_args[0][0])
+        self._step(controller, running=1)
+        logger.trace.assert_called_once()
+
+
+class TestTaskScheduler(unittest.TestCase):
+    """
+    Tests for TaskScheduler ordering, concurrency and failure handling.
+    """
+
+    def _budget(self, cpu=8, pools=None):
+        return ResourceBudget(cpu=cpu, mem=None, pools=pools or {})
+
+    def test_rejects_zero_jobs(self):
+        with self.assertRaises(ValueError):
+            TaskScheduler(0, self._budget(), logger_stub)
+
+    def test_single_job_runs_in_order_on_calling_thread(self):
+        nodes = [
+            SchedulerNode("a"),
+            SchedulerNode("b"),
+            SchedulerNode("c", deps={0, 1}),
+        ]
+        ran = []
+        threads = set()
+
+        def work(idx):
+            ran.append(idx)
+            threads.add(threading.current_thread())
+
+        TaskScheduler(1, self._budget(), logger_stub).run(nodes, work)
+        self.assertEqual(ran, [0, 1, 2])
+        self.assertEqual(threads, {threading.current_thread()})
+
+    def test_dependencies_complete_before_dependents(self):
+        nodes = [
+            SchedulerNode("a"),
+            SchedulerNode("b", deps={0}),
+            SchedulerNode("c", deps={0}),
+            SchedulerNode("d", deps={1, 2}),
+        ]
+        finished = []
+        lock = threading.Lock()
+
+        def work(idx):
+            for dep in nodes[idx].deps:
+                self.assertIn(dep, finished)
+            time.sleep(0.01)
+            with lock:
+                finished.append(idx)
+
+        TaskScheduler(4, self._budget(), logger_stub).run(nodes, work)
+        self.assertEqual(sorted(finished), [0, 1, 2, 3])
+        self.assertEqual(finished[0], 0)
+        self.assertEqual(finished[-1], 3)
+
+    def _max_concurrency(self, nodes, jobs, budget):
+        running = 0
+        peak = 0
+        lock = threading.Lock()
+
+        def work(idx):
+            nonlocal running, peak
+            with lock:
+                running += 1
+                peak = max(peak, running)
+            time.sleep(0.05)
+            with lock:
+                running -= 1
+
+        TaskScheduler(jobs, budget, logger_stub).run(nodes, work)
+        return peak
+
+    def test_independent_tasks_run_concurrently(self):
+        nodes = [SchedulerNode(str(i)) for i in range(4)]
+        self.assertEqual(self._max_concurrency(nodes, 4, self._budget()), 4)
+
+    def test_jobs_bound_concurrency(self):
+        nodes = [SchedulerNode(str(i)) for i in range(6)]
+        self.assertEqual(self._max_concurrency(nodes, 2, self._budget()), 2)
+
+    def test_pool_makes_tasks_exclusive(self):
+        db = ResourceRequest(pools=("db",))
+        nodes = [SchedulerNode(str(i), request=db) for i in range(3)]
+        budget = self._budget(pools={"db": 1})
+        self.assertEqual(self._max_concurrency(nodes, 3, budget), 1)
+
+    def test_cpu_budget_bounds_concurrency(self):
+        nodes = [SchedulerNode(str(i), request=ResourceRequest(cpu=2)) for i in range(4)]
+        self.assertEqual(self._max_concurrency(nodes, 4, self._budget(cpu=4)), 2)
+
+    def test_small_task_backfills_past_blocked_one(self):
+        # 'big' cannot start while 'hog' holds the CPUs, but 'small' can
+        nodes = [
+            SchedulerNode("hog", request=ResourceRequest(cpu=3)),
+            SchedulerNode("big", request=ResourceRequest(cpu=2)),
+            SchedulerNode("small", request=ResourceRequest(cpu=1)),
+        ]
+        started = []
+        lock = threading.Lock()
+
+        def work(idx):
+            with lock:
+                started.append(idx)
+            time.sleep(0.05)
+
+        TaskScheduler(3, self._budget(cpu=4), logger_stub).run(nodes, work)
+        self.assertEqual(started, [0, 2, 1])
+
+    def test_auto_jobs_follow_pressure(self):
+        # Pressure sheds a slot on every admission pass, down to the minimum
+        nodes = [SchedulerNode(str(i)) for i in range(6)]
+        with patch("tasktree.scheduler.host_cpu_count", return_value=4):
+            scheduler = TaskScheduler(
+                AutoJobs(1, 4),
+                self._budget(),
+                logger_stub,
+                pressure_source=FakePressureSource(CPU_BUSY),
+                clock=time.monotonic,
+            )
+        scheduler._adaptive.interval = 0.0
+        running = 0
+        peaks = []
+        lock = threading.Lock()
+
+        def work(idx):
+            nonlocal running
+            with lock:
+                running += 1
+                peaks.append(running)
+            time.sleep(0.02)
+            with lock:
+                running -= 1
+
+        scheduler.run(nodes, work)
+        self.assertEqual(scheduler._adaptive.limit, 1)
+        self.assertLessEqual(max(peaks), 3)
+        self.assertEqual(peaks[-1], 1)
+
+    @unittest.skipUnless(JobServer.supported(), "FIFO jobservers need os.mkfifo")
+    def test_jobserver_tokens_bound_concurrency(self):
+        server = JobServer(2, logger_stub)
+        self.addCleanup(server.close)
+        nodes = [SchedulerNode(str(i)) for i in range(4)]
+
+        scheduler_peak = self._max_concurrency_with_tokens(nodes, server)
+
+        self.assertEqual(scheduler_peak, 2)
+        self.assertEqual(server.tokens.held, 0)
+
+    @unittest.skipUnless(JobServer.supported(), "FIFO jobservers need os.mkfifo")
+    def test_tokens_taken_elsewhere_leave_only_the_implicit_slot(self):
+        server = JobServer(2, logger_stub)
+        self.addCleanup(server.close)
+        # Another member of the pool (say, make) holds the only token
+        other = JobTokens(server.tokens.fifo_path, logger_stub)
+        self.addCleanup(other.close)
+        self.assertTrue(other.try_acquire())
+        nodes = [SchedulerNode(str(i)) for i in range(3)]
+
+        self.assertEqual(self._max_concurrency_with_tokens(nodes, server), 1)
+
+    def _max_concurrency_with_tokens(self, nodes, server):
+        running = 0
+        peak = 0
+        lock = threading.Lock()
+
+        def work(idx):
+            nonlocal running, peak
+            with lock:
+                running += 1
+                peak = max(peak, running)
+            time.sleep(0.05)
+            with lock:
+                running -= 1
+
+        TaskScheduler(4, self._budget(), logger_stub, tokens=server.tokens).run(nodes, work)
+        return peak
+
+    def test_failure_stops_new_work_and_is_raised(self):
+        nodes = [
+            SchedulerNode("a"),
+            SchedulerNode("b", deps={0}),
+        ]
+        ran = []
+
+        def work(idx):
+            ran.append(idx)
+            raise RuntimeError("boom")
+
+        for jobs in (1, 2):
+            ran.clear()
+            with self.subTest(jobs=jobs):
+                with self.assertRaises(RuntimeError):
+                    TaskScheduler(jobs, self._budget(), logger_stub).run(nodes, work)
+                self.assertEqual(ran, [0])
+
+    def test_keep_going_runs_everything_not_downstream_of_a_failure(self):
+        nodes = [
+            SchedulerNode("broken"),
+            SchedulerNode("after-broken", deps={0}),
+            SchedulerNode("after-after-broken", deps={1}),
+            SchedulerNode("independent"),
+            SchedulerNode("also-broken"),
+            SchedulerNode("all", deps={2, 3, 4}),
+        ]
+        ran = []
+
+        def work(idx):
+            ran.append(idx)
+            if nodes[idx].label.endswith("broken") and idx in (0, 4):
+                raise RuntimeError(nodes[idx].label)
+
+        for jobs in (1, 3):
+            ran.clear()
+            with self.subTest(jobs=jobs):
+                scheduler = TaskScheduler(jobs, self._budget(), logger_stub, keep_going=True)
+                with self.assertRaises(TaskFailures) as ctx:
+                    scheduler.run(nodes, work)
+                self.assertEqual(sorted(ran), [0, 3, 4])
+                self.assertEqual(
+                    sorted(idx for idx, _ in ctx.exception.failures), [0, 4]
+                )
+                self.assertEqual(ctx.exception.skipped, [1, 2, 5])
+
+    def test_on_abort_called_once_on_first_failure(self):
+        nodes = [SchedulerNode("a"), SchedulerNode("b")]
+        on_abort = MagicMock()
+
+        def work(idx):
+            raise RuntimeError("boom")
+
+        with self.assertRaises(RuntimeError):
+            TaskScheduler(2, self._budget(), logger_stub, on_abort=on_abort).run(nodes, work)
+        on_abort.assert_called_once_with()
+
+    def test_on_abort_not_called_when_keeping_going(self):
+        on_abort = MagicMock()
+
+        def work(idx):
+            raise RuntimeError("boom")
+
+        scheduler = TaskScheduler(
+            2, self._budget(), logger_stub, keep_going=True, on_abort=on_abort
+        )
+        with self.assertRaises(TaskFailures):
+            scheduler.run([SchedulerNode("a")], work)
+        on_abort.assert_not_called()
+
+    def test_on_abort_called_on_interrupt(self):
+        on_abort = MagicMock()
+
+        def work(idx):
+            raise KeyboardInterrupt
+
+        scheduler = TaskScheduler(1, self._budget(), logger_stub, on_abort=on_abort)
+        with self.assertRaises(KeyboardInterrupt):
+            scheduler.run([SchedulerNode("a")], work)
+        on_abort.assert_called_once_with()
+
+    def test_running_work_finishes_after_failure(self):
+        nodes = [SchedulerNode("fail"), SchedulerNode("slow"), SchedulerNode("later", deps={1})]
+        finished = []
+
+        def work(idx):
+            if idx == 0:
+                raise RuntimeError("boom")
+            time.sleep(0.05)
+            finished.append(idx)
+
+        with self.assertRaises(RuntimeError):
+            TaskScheduler(2, self._budget(), logger_stub).run(nodes, work)
+        self.assertEqual(finished, [1])
+
+
+if __name__ == "__main__":
+    unittest.main()
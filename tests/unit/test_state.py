@@ -1,9 +1,12 @@
 """Tests for state module."""
 
+import os
+import stat
 import unittest
 from pathlib import Path
 from tempfile import TemporaryDirectory
 
+from tasktree.resource_usage import ResourceUsage
 from tasktree.state import StateManager, TaskState
 
 
@@ -28,6 +31,19 @@ class TestTaskState(unittest.TestCase):
         state = TaskState.from_dict(data)
         self.assertEqual(state.last_run, 1234567890.0)
         self.assertEqual(state.input_state, {"file.txt": 1234567880.0})
+        self.assertIsNone(state.usage)
+
+    def test_usage_round_trip(self):
+        """
+        Test that the resources used by the last run are kept.
+        """
+        usage = ResourceUsage(user_cpu=1.5, max_rss=4096, peak_memory=8192)
+        state = TaskState(last_run=1234567890.0, usage=usage)
+
+        data = state.to_dict()
+
+        self.assertNotIn("read_bytes", data["usage"])
+        self.assertEqual(TaskState.from_dict(data).usage, usage)
 
 
 class TestStateManager(unittest.TestCase):
@@ -58,6 +74,29 @@ class TestStateManager(unittest.TestCase):
             self.assertEqual(loaded_state.last_run, 1234567890.0)
             self.assertEqual(loaded_state.input_state, {"file.txt": 1234567880.0})
 
+    @unittest.skipIf(os.name == "nt", "POSIX permission bits")
+    def test_save_keeps_file_mode(self):
+        """
+        Test that the state file gets the umask's mode, and keeps a mode
+        given to it, rather than the temp file's owner-only mode.
+        """
+        with TemporaryDirectory() as tmpdir:
+            project_root = Path(tmpdir)
+            state_manager = StateManager(project_root)
+            state_manager.set("abc12345", TaskState(last_run=1234567890.0))
+
+            old_umask = os.umask(0o022)
+            try:
+                state_manager.save()
+            finally:
+                os.umask(old_umask)
+            state_path = project_root / StateManager.STATE_FILE
+            self.assertEqual(stat.S_IMODE(state_path.stat().st_mode), 0o644)
+
+            state_path.chmod(0o664)
+            state_manager.save()
+            self.assertEqual(stat.S_IMODE(state_path.stat().st_mode), 0o664)
+
     def test_prune(self):
         """
         Test pruning stale state entries.
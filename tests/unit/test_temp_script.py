@@ -13,7 +13,7 @@ from pathlib import Path
 from unittest.mock import patch
 
 from helpers.logging import logger_stub
-from tasktree.temp_script import TempScript
+from tasktree.temp_script import TempScript, memory_script, script_dir
 from tasktree.interpreter import Interpreter
 
 
@@ -247,5 +247,58 @@ class TestTempScriptInterpreter(unittest.TestCase):
                 )
 
 
+class TestTempScriptInMemory(unittest.TestCase):
+    """Tests for in-memory scripts and the per-run script directory."""
+
+    @unittest.skipUnless(hasattr(os, "memfd_create"), "memfd_create is Linux-only")
+    def test_in_memory_script_readable_through_proc(self):
+        with TempScript(
+            logger=logger_stub,
+            cmd="echo hello",
+            preamble="set -e",
+            interpreter=Interpreter(cmd="bash"),
+            in_memory=True,
+        ) as temp_script_path:
+            self.assertEqual(str(temp_script_path.parent), "/proc/self/fd")
+            self.assertEqual(temp_script_path.read_text(), "set -e\necho hello")
+
+    @unittest.skipUnless(hasattr(os, "memfd_create"), "memfd_create is Linux-only")
+    def test_in_memory_fd_passed_and_closed(self):
+        temp_script = TempScript(
+            logger=logger_stub,
+            cmd="echo hello",
+            interpreter=Interpreter(cmd="/usr/bin/python3.12"),
+            in_memory=True,
+        )
+        with temp_script as script_path:
+            (fd,) = temp_script.pass_fds
+            self.assertEqual(script_path, Path(f"/proc/self/fd/{fd}"))
+
+        self.assertEqual(temp_script.pass_fds, ())
+        with self.assertRaises(OSError):
+            os.fstat(fd)
+
+    def test_interpreter_that_may_need_extension_gets_a_file(self):
+        self.assertIsNone(
+            memory_script("Write-Host hi", Interpreter(cmd="pwsh", ext=".ps1"))
+        )
+        self.assertIsNone(memory_script("echo hi", None))
+
+        with TempScript(
+            logger=logger_stub,
+            cmd="Write-Host hi",
+            interpreter=Interpreter(cmd="pwsh -File", ext=".ps1"),
+            in_memory=True,
+        ) as script_path:
+            self.assertEqual(script_path.parent, script_dir())
+            self.assertTrue(script_path.is_file())
+
+        self.assertFalse(script_path.exists())
+
+    def test_script_dir_is_reused(self):
+        self.assertEqual(script_dir(), script_dir())
+        self.assertTrue(script_dir().is_dir())
+
+
 if __name__ == "__main__":
     unittest.main()
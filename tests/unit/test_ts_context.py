@@ -3,8 +3,12 @@
 import tempfile
 import unittest
 from pathlib import Path
+from unittest.mock import patch
+
+import tasktree.lsp.ts_context
 
 from tasktree.lsp.ts_context import (
+    apply_edit,
     parse_document,
     get_task_at_position,
     is_in_field,
@@ -14,6 +18,9 @@ from tasktree.lsp.ts_context import (
     extract_task_inputs,
     extract_task_outputs,
     extract_task_names,
+    extract_imports,
+    extract_task_symbols,
+    parse_count,
 )
 
 
@@ -47,6 +54,75 @@ class TestParseDocument(unittest.TestCase):
         self.assertIsNotNone(tree)
 
 
+# ---------------------------------------------------------------------------
+# apply_edit
+# ---------------------------------------------------------------------------
+
+
+class TestApplyEdit(unittest.TestCase):
+    TEXT = (
+        "variables:\n"
+        "  greeting: héllo 👋\n"
+        "tasks:\n"
+        "  build:\n"
+        "    cmd: echo {{ var.greeting }}\n"
+        "  test:\n"
+        "    deps: [build]\n"
+        "    cmd: pytest\n"
+    )
+
+    def _assert_reparse_matches(self, text, tree, edits):
+        for start, end, new_text in edits:
+            text = apply_edit(text, tree, start, end, new_text)
+        tree = parse_document(text, tree)
+        self.assertEqual(str(tree.root_node), str(parse_document(text).root_node))
+        self.assertEqual(tree.root_node.end_byte, len(text.encode("utf-8")))
+        return text
+
+    def test_insert_delete_and_replace(self):
+        text = self._assert_reparse_matches(
+            self.TEXT,
+            parse_document(self.TEXT),
+            [
+                ((7, 15), (7, 15), " -q"),
+                ((5, 2), (5, 6), "check"),
+                ((6, 0), (7, 0), ""),
+            ],
+        )
+        self.assertIn("  check:\n    cmd: pytest -q\n", text)
+        self.assertNotIn("deps", text)
+
+    def test_multi_line_insert(self):
+        tree = parse_document(self.TEXT)
+        text = self._assert_reparse_matches(
+            self.TEXT,
+            tree,
+            [((8, 0), (8, 0), "  lint:\n    cmd: ruff check\n")],
+        )
+        self.assertTrue(text.endswith("  lint:\n    cmd: ruff check\n"))
+        self.assertEqual(extract_task_names(parse_document(text, tree)), ["build", "lint", "test"])
+
+    def test_positions_are_utf16_code_units(self):
+        # "👋" is two UTF-16 code units and four UTF-8 bytes
+        text = self._assert_reparse_matches(
+            self.TEXT,
+            parse_document(self.TEXT),
+            [((1, 20), (1, 20), "!"), ((1, 13), (1, 14), "e")],
+        )
+        self.assertIn("  greeting: hello 👋!\n", text)
+
+    def test_positions_past_the_end_are_clamped(self):
+        text = self._assert_reparse_matches(
+            self.TEXT,
+            parse_document(self.TEXT),
+            [((7, 100), (7, 100), " -x"), ((50, 0), (50, 0), "# end\n")],
+        )
+        self.assertTrue(text.endswith("    cmd: pytest -x\n# end\n"))
+
+    def test_without_a_tree(self):
+        self.assertEqual(apply_edit("a\nb\n", None, (1, 0), (1, 1), "c"), "a\nc\n")
+
+
 # ---------------------------------------------------------------------------
 # get_task_at_position
 # ---------------------------------------------------------------------------
@@ -539,5 +615,159 @@ class TestExtractTaskNames(unittest.TestCase):
         self.assertIn("compile", result)
 
 
+class TestRecoveryTreeCache(unittest.TestCase):
+
+    BROKEN = "tasks:\n  build:\n    cmd: x\n  test:\n    deps: [bu"
+
+    def test_recovery_parsed_once_per_tree(self):
+        tree = _tree(self.BROKEN)
+        parses = parse_count()
+        for _ in range(3):
+            self.assertEqual(extract_task_names(tree), ["build", "test"])
+            self.assertEqual(get_task_at_position(tree, 4, 12), "test")
+        self.assertEqual(parse_count() - parses, 1)
+
+    def test_edited_tree_recovered_again(self):
+        tree = _tree(self.BROKEN)
+        extract_task_names(tree)
+        text = apply_edit(self.BROKEN, tree, (1, 2), (1, 7), "compile")
+        tree = parse_document(text, tree)
+        self.assertEqual(extract_task_names(tree), ["compile", "test"])
+
+
+
+# ---------------------------------------------------------------------------
+# Compiled queries and per-tree memoization
+# ---------------------------------------------------------------------------
+
+
+class TestMappingQueries(unittest.TestCase):
+
+    def test_quoted_and_non_string_keys(self):
+        text = (
+            "tasks:\n"
+            "  \"quoted-task\":\n    cmd: a\n"
+            "  'single':\n    cmd: b\n"
+            "  123:\n    cmd: c\n"
+            "  plain:\n    cmd: d\n"
+        )
+        self.assertEqual(
+            extract_task_names(_tree(text)), ["plain", "quoted-task", "single"]
+        )
+
+    def test_nested_pairs_not_taken_for_tasks(self):
+        text = "tasks:\n  build:\n    args:\n      - jobs: {type: int}\n"
+        self.assertEqual(extract_task_names(_tree(text)), ["build"])
+
+    def test_position_between_and_before_tasks(self):
+        text = "variables:\n  a: 1\ntasks:\n  first:\n    cmd: x\n\n  second:\n    cmd: y\n"
+        tree = _tree(text)
+        self.assertIsNone(get_task_at_position(tree, 1, 2))
+        self.assertEqual(get_task_at_position(tree, 5, 0), "first")
+        self.assertEqual(get_task_at_position(tree, 6, 2), "second")
+        self.assertEqual(get_task_at_position(tree, 6, 1), "first")
+
+    def test_duplicate_task_uses_first_definition(self):
+        text = "tasks:\n  a:\n    args: [x]\n  a:\n    args: [y]\n"
+        tree = _tree(text)
+        self.assertEqual(extract_task_args(tree, "a"), ["x"])
+        self.assertEqual(get_task_at_position(tree, 4, 6), "a")
+
+    def test_flow_sequence_items_with_comment(self):
+        text = "tasks:\n  a:\n    args: [x, # note\n      {y: {default: 1}}]\n"
+        self.assertEqual(extract_task_args(_tree(text), "a"), ["x", "y"])
+
+
+class TestTaskSymbolsMemoized(unittest.TestCase):
+
+    TEXT = (
+        "tasks:\n"
+        "  build:\n"
+        "    args: [target]\n"
+        "    inputs: [{src: main.c}]\n"
+        "    outputs: [{binary: app}]\n"
+    )
+
+    def _count_extractions(self):
+        symbols_of_task = tasktree.lsp.ts_context._symbols_of_task
+        patcher = patch.object(
+            tasktree.lsp.ts_context,
+            "_symbols_of_task",
+            side_effect=symbols_of_task,
+        )
+        mock = patcher.start()
+        self.addCleanup(patcher.stop)
+        return mock
+
+    def test_extracted_once_per_tree_and_task(self):
+        extractions = self._count_extractions()
+        tree = _tree(self.TEXT)
+        for _ in range(3):
+            self.assertEqual(extract_task_args(tree, "build"), ["target"])
+            self.assertEqual(extract_task_inputs(tree, "build"), ["src"])
+            self.assertEqual(extract_task_outputs(tree, "build"), ["binary"])
+        self.assertEqual(extractions.call_count, 1)
+
+    def test_edited_tree_extracted_again(self):
+        tree = _tree(self.TEXT)
+        self.assertEqual(extract_task_args(tree, "build"), ["target"])
+        text = apply_edit(self.TEXT, tree, (2, 11), (2, 17), "platform")
+        tree = parse_document(text, tree)
+        self.assertEqual(extract_task_args(tree, "build"), ["platform"])
+
+    def test_returned_lists_are_copies(self):
+        tree = _tree(self.TEXT)
+        extract_task_args(tree, "build").append("mutated")
+        self.assertEqual(extract_task_args(tree, "build"), ["target"])
+
+
+# ---------------------------------------------------------------------------
+# extract_imports / extract_task_symbols
+# ---------------------------------------------------------------------------
+
+
+class TestExtractImports(unittest.TestCase):
+
+    def test_imports_in_document_order(self):
+        text = (
+            "imports:\n"
+            "  - file: tools/build.tasks\n    as: build\n"
+            "  - file: missing-namespace.tasks\n"
+            "  - as: missing-file\n"
+            "  - file: utils.tasks\n    as: utils\n"
+        )
+        self.assertEqual(
+            extract_imports(_tree(text)),
+            [("tools/build.tasks", "build"), ("utils.tasks", "utils")],
+        )
+
+    def test_no_imports(self):
+        self.assertEqual(extract_imports(_tree("tasks:\n  a:\n    cmd: x\n")), [])
+
+
+class TestExtractTaskSymbols(unittest.TestCase):
+
+    def test_tasks_with_args_and_named_io(self):
+        text = (
+            "tasks:\n"
+            "  build:\n"
+            "    args: [target, {mode: {default: debug}}]\n"
+            "    inputs: [{src: main.c}, header.h]\n"
+            "    outputs:\n      - binary: app\n      - app.map\n"
+            "  clean:\n"
+            "    cmd: rm -rf build\n"
+        )
+        self.assertEqual(
+            extract_task_symbols(_tree(text)),
+            {
+                "build": (["mode", "target"], ["src"], ["binary"]),
+                "clean": ([], [], []),
+            },
+        )
+
+    def test_no_tasks(self):
+        self.assertEqual(extract_task_symbols(_tree("variables:\n  a: 1\n")), {})
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,199 @@
+"""Tests for the recipe YAML loader."""
+
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+import yaml
+
+from tasktree import yaml_loader
+from tasktree.parser import load_yaml_file
+from tasktree.yaml_loader import DeferredTasks, load_recipe_text
+
+RECIPE = """\
+# Shared settings
+imports:
+- file: base.tasks
+  as: base
+variables:
+  version: "1.2"   # quoted
+  count: 3
+tasks:
+  build:
+    desc: Build ünïcode
+    deps: [base.setup, {generate: [src, 2]}]
+    args:
+      - mode: { choices: [debug, release], default: debug }
+    cmd: |
+      echo one
+        indented two
+
+      echo three
+  flow: {cmd: echo flow, private: true}
+  "quoted name":
+    cmd: >-
+      folded
+      line
+  empty:
+  last:
+    deps:
+    - build
+    - flow
+    cmd: echo last
+"""
+
+
+class TestLoadYaml(unittest.TestCase):
+    """
+    Tests for load_yaml() and the loader it uses.
+    """
+
+    def test_uses_libyaml_when_available(self):
+        """
+        Test that the C loader is used when PyYAML was built with libyaml.
+        """
+        if yaml.__with_libyaml__:
+            self.assertIs(yaml_loader.SafeLoader, yaml.CSafeLoader)
+        else:
+            self.assertIs(yaml_loader.SafeLoader, yaml.SafeLoader)
+
+    def test_falls_back_to_pure_python_loader(self):
+        """
+        Test that without libyaml the pure-Python SafeLoader is used.
+        """
+        result = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                "import yaml; del yaml.CSafeLoader; from tasktree import yaml_loader; "
+                "print(yaml_loader.SafeLoader is yaml.SafeLoader)",
+            ],
+            capture_output=True,
+            text=True,
+            timeout=60,
+        )
+
+        self.assertEqual(result.stdout.strip(), "True", result.stderr)
+
+    def test_errors_name_file_and_line(self):
+        """
+        Test that a recipe's YAML errors give the file and line.
+        """
+        with TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "tasktree.yaml"
+            path.write_text("tasks:\n  build:\n    cmd: [unclosed\n")
+
+            with self.assertRaises(yaml.MarkedYAMLError) as cm:
+                load_yaml_file(path)
+
+        self.assertIn(str(path), str(cm.exception))
+        self.assertEqual(cm.exception.problem_mark.line, 3)
+
+
+class TestDeferredTasks(unittest.TestCase):
+    """
+    Tests for load_recipe_text(defer_tasks=True).
+    """
+
+    def test_other_sections_are_loaded(self):
+        """
+        Test that every section but the task bodies is loaded as usual.
+        """
+        data = load_recipe_text(RECIPE, "lib.tasks", defer_tasks=True)
+        full = yaml.safe_load(RECIPE)
+
+        self.assertIsInstance(data["tasks"], DeferredTasks)
+        self.assertEqual(data["imports"], full["imports"])
+        self.assertEqual(data["variables"], full["variables"])
+
+    def test_bodies_match_full_load(self):
+        """
+        Test that each task body is loaded, in file order, as loading the
+        whole file loads it.
+        """
+        tasks = load_recipe_text(RECIPE, "lib.tasks", defer_tasks=True)["tasks"]
+        full = yaml.safe_load(RECIPE)["tasks"]
+
+        self.assertEqual(list(tasks), list(full))
+        for name in full:
+            self.assertEqual(tasks.load(name), full[name], name)
+
+    def test_pure_python_loader(self):
+        """
+        Test that bodies are found with the pure-Python loader's events too.
+        """
+        with patch.object(yaml_loader, "SafeLoader", yaml.SafeLoader):
+            tasks = load_recipe_text(RECIPE, "lib.tasks", defer_tasks=True)["tasks"]
+            bodies = {name: tasks.load(name) for name in tasks}
+
+        self.assertEqual(bodies, yaml.safe_load(RECIPE)["tasks"])
+
+    def test_crlf_line_endings(self):
+        """
+        Test that bodies are found in files with Windows line endings.
+        """
+        text = RECIPE.replace("\n", "\r\n")
+        tasks = load_recipe_text(text, "lib.tasks", defer_tasks=True)["tasks"]
+
+        self.assertEqual(tasks.load("build"), yaml.safe_load(text)["tasks"]["build"])
+
+    def test_anchors_load_whole_file(self):
+        """
+        Test that a file using anchors and aliases is loaded whole.
+        """
+        text = (
+            "tasks:\n"
+            "  a: &common\n    cmd: echo\n"
+            "  b:\n    <<: *common\n    desc: B\n"
+        )
+
+        data = load_recipe_text(text, "lib.tasks", defer_tasks=True)
+
+        self.assertEqual(data, yaml.safe_load(text))
+
+    def test_non_string_task_name_loads_whole_file(self):
+        """
+        Test that a task name YAML reads as another type is kept as that type.
+        """
+        text = "tasks:\n  1:\n    cmd: echo\n"
+
+        data = load_recipe_text(text, "lib.tasks", defer_tasks=True)
+
+        self.assertEqual(data, {"tasks": {1: {"cmd": "echo"}}})
+
+    def test_empty_document(self):
+        """
+        Test that an empty file loads as None.
+        """
+        self.assertIsNone(load_recipe_text("", "lib.tasks", defer_tasks=True))
+        self.assertIsNone(
+            load_recipe_text("# nothing\n", "lib.tasks", defer_tasks=True)
+        )
+
+    def test_syntax_error_names_file(self):
+        """
+        Test that invalid YAML is reported with the file's name and line.
+        """
+        with self.assertRaises(yaml.MarkedYAMLError) as cm:
+            load_recipe_text("tasks:\n  a: [x\n", "lib.tasks", defer_tasks=True)
+
+        self.assertIn('"lib.tasks"', str(cm.exception))
+
+    def test_body_error_reports_file_position(self):
+        """
+        Test that an error building a body gives its line in the file.
+        """
+        text = "tasks:\n  ok:\n    cmd: echo\n  bad:\n    cmd: {[a, b]: c}\n"
+        tasks = load_recipe_text(text, "lib.tasks", defer_tasks=True)["tasks"]
+
+        with self.assertRaises(yaml.MarkedYAMLError) as cm:
+            tasks.load("bad")
+
+        self.assertIn('"lib.tasks", line 5', str(cm.exception))
+
+
+if __name__ == "__main__":
+    unittest.main()